@@ -0,0 +1,145 @@
+"""
+Measure the end-to-end throughput and latency of common operations against a
+:class:`~hostedpi.testing.FakeMythicAPI` with fleets of different sizes::
+
+    python -m benchmarks --sizes 10 100 1000 --latency 0.02
+"""
+
+import argparse
+import io
+import json
+import sys
+from contextlib import redirect_stdout
+from statistics import quantiles
+from time import perf_counter
+from typing import Any, Callable
+from unittest.mock import patch
+
+from hostedpi import MythicAuth, Pi4ServerSpec, PiCloud, WaitPolicy
+from hostedpi.cli import utils as cli_utils
+from hostedpi.testing import FakeMythicAPI
+
+
+# poll new Pis quickly, as the fake API provisions them after a fixed number of polls
+WAIT_POLICY = WaitPolicy(interval=0.01, max_interval=0.05, jitter=0)
+
+
+class Recorder:
+    """
+    Pipeline middleware which records the duration of every request
+    """
+
+    def __init__(self):
+        self.durations: list[float] = []
+
+    def __call__(self, call, send) -> Any:
+        start = perf_counter()
+        try:
+            return send(call)
+        finally:
+            self.durations.append(perf_counter() - start)
+
+
+def bench_list(cloud: PiCloud, api: FakeMythicAPI):
+    cloud.refresh()
+    assert len(cloud.pis) == len(api.servers)
+
+
+def bench_full_table(cloud: PiCloud, api: FakeMythicAPI):
+    # the table is rendered to a buffer rather than the terminal
+    with patch.object(cli_utils, "get_picloud", return_value=cloud):
+        with redirect_stdout(io.StringIO()):
+            cli_utils.full_pis_table(list(cloud.pis.values()))
+
+
+def bench_power(cloud: PiCloud, api: FakeMythicAPI):
+    results = cloud.bulk_power(cloud.pis.values(), on=False)
+    assert all(result.ok for result in results.values())
+
+
+def bench_create(cloud: PiCloud, api: FakeMythicAPI):
+    specs = [Pi4ServerSpec()] * len(cloud.pis)
+    results = cloud.create_pis(specs, wait=WAIT_POLICY)
+    assert all(result.ok for result in results)
+    # remove the new Pis, so every run starts with the same fleet
+    for result in results:
+        del api.servers[result.name]
+    cloud.refresh()
+
+
+SCENARIOS: dict[str, Callable[[PiCloud, FakeMythicAPI], None]] = {
+    "list": bench_list,
+    "full_table": bench_full_table,
+    "power": bench_power,
+    "create": bench_create,
+}
+
+
+def run(scenario: str, size: int, *, latency: float, repeat: int, workers: int) -> dict:
+    """
+    Run *scenario* *repeat* times against a fleet of *size* Pis and return the results
+    """
+    bench = SCENARIOS[scenario]
+    with FakeMythicAPI(size=size, latency=latency) as api:
+        settings = api.settings(max_workers=workers, info_cache_ttl=0)
+        recorder = Recorder()
+        cloud = PiCloud(auth=MythicAuth(settings=settings))
+        cloud.pipeline.use(recorder)
+        cloud.pis
+        recorder.durations.clear()
+        times = []
+        for _ in range(repeat):
+            start = perf_counter()
+            bench(cloud, api)
+            times.append(perf_counter() - start)
+    durations = recorder.durations
+    requests = len(durations) // repeat
+    best = min(times)
+    if len(durations) > 1:
+        p50, p95 = (q for i, q in enumerate(quantiles(durations, n=20)) if i in (9, 18))
+    else:
+        p50 = p95 = durations[0] if durations else 0
+    return {
+        "scenario": scenario,
+        "size": size,
+        "requests": requests,
+        "seconds": round(best, 4),
+        "requests_per_second": round(requests / best, 1) if best else 0,
+        "p50_ms": round(p50 * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+    }
+
+
+COLUMNS = ["scenario", "size", "requests", "seconds", "requests_per_second", "p50_ms", "p95_ms"]
+
+
+def print_results(results: list[dict]):
+    widths = {col: max(len(col), *(len(str(r[col])) for r in results)) for col in COLUMNS}
+    print("  ".join(col.ljust(widths[col]) for col in COLUMNS))
+    for result in results:
+        print("  ".join(str(result[col]).ljust(widths[col]) for col in COLUMNS))
+
+
+def main(args: list[str]):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.strip())
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added per request")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--json", help="also write the results to this file")
+    options = parser.parse_args(args)
+
+    results = [
+        run(scenario, size, latency=options.latency, repeat=options.repeat, workers=options.workers)
+        for size in options.sizes
+        for scenario in options.scenarios
+    ]
+    print_results(results)
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,9 +1,20 @@
-from . import logger
-from .auth import MythicAuth
-from .models import Pi3ServerSpec, Pi4ServerSpec, PiInfo, SSHKeySources
-from .pi import Pi
-from .picloud import PiCloud
-from .settings import Settings
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from .auth import MythicAuth
+    from .models import (
+        Pi3ServerSpec,
+        Pi4ServerSpec,
+        PiInfo,
+        PiResult,
+        SSHKeySources,
+        WaitPolicy,
+    )
+    from .pi import Pi
+    from .picloud import PiCloud
+    from .settings import Settings
 
 
 __all__ = [
@@ -13,6 +24,37 @@ __all__ = [
     "Pi3ServerSpec",
     "Pi4ServerSpec",
     "PiInfo",
+    "PiResult",
     "SSHKeySources",
     "Settings",
+    "WaitPolicy",
 ]
+
+# the submodule each public name is imported from when it is first used, so that importing
+# hostedpi (including for the CLI) does not import requests or pydantic until they are needed
+_LAZY_IMPORTS = {
+    "MythicAuth": ".auth",
+    "Pi": ".pi",
+    "PiCloud": ".picloud",
+    "Pi3ServerSpec": ".models",
+    "Pi4ServerSpec": ".models",
+    "PiInfo": ".models",
+    "PiResult": ".models",
+    "SSHKeySources": ".models",
+    "Settings": ".settings",
+    "WaitPolicy": ".models",
+}
+
+
+def __getattr__(name: str):
+    try:
+        module = _LAZY_IMPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,17 @@
+try:
+    import httpx  # noqa: F401
+except ImportError as exc:  # pragma: no cover
+    raise ImportError(
+        "The asyncio client requires httpx. Install it with: pip install hostedpi[async]"
+    ) from exc
+
+from .auth import AsyncMythicAuth
+from .pi import AsyncPi
+from .picloud import AsyncPiCloud
+
+
+__all__ = [
+    "AsyncMythicAuth",
+    "AsyncPi",
+    "AsyncPiCloud",
+]
@@ -0,0 +1,151 @@
+import asyncio
+from datetime import datetime, timedelta
+from importlib.metadata import version
+from typing import Union
+
+from httpx import AsyncClient, HTTPStatusError, Response
+from pydantic import ValidationError
+
+from ..exc import MythicAuthenticationError
+from ..logger import get_logger
+from ..models.mythic.responses import AuthResponse
+from ..settings import Settings
+from ..tracing import start_span
+from .transport import make_client
+
+
+hostedpi_version = version("hostedpi")
+logger = get_logger()
+
+
+class AsyncMythicAuth:
+    """
+    This class handles authentication with the Mythic Beasts Hosted Pi API for the asyncio client.
+
+    It manages the access token used to authenticate requests to the API, and automatically
+    refreshes it :attr:`~hostedpi.settings.Settings.token_refresh_skew` seconds before it expires.
+    Concurrent requests which find the token needs refreshing share a single refresh request.
+
+    :type settings: :class:`~hostedpi.settings.Settings` or None
+    :param settings:
+        The settings used to configure the API. If not provided, defaults to a new
+        instance of :class:`~hostedpi.settings.Settings`.
+
+    :type client: :class:`httpx.AsyncClient` or None
+    :param client:
+        The client used to make authentication and API requests. If not provided, defaults to a
+        new :class:`httpx.AsyncClient` configured from *settings* by
+        :func:`~hostedpi.aio.transport.make_client`.
+
+    .. warning::
+        This is for advanced use only. Most users should not need to interact with the
+        authentication system directly, as it is handled automatically by
+        :class:`~hostedpi.aio.picloud.AsyncPiCloud`.
+
+    :raises pydantic_core.ValidationError:
+        If the provided settings are invalid or missing required fields.
+    """
+
+    def __init__(
+        self,
+        *,
+        settings: Union[Settings, None] = None,
+        client: Union[AsyncClient, None] = None,
+    ):
+        if settings is None:
+            settings = Settings()
+        if client is None:
+            client = make_client(settings)
+        client.headers["User-Agent"] = f"python-hostedpi/{hostedpi_version}"
+        self._settings = settings
+        self._client = client
+        self._token = None
+        self._token_expiry = datetime.now()
+        self._refresh_at = self._token_expiry
+        self._lock: Union[asyncio.Lock, None] = None
+        self._refreshes = 0
+
+    def __repr__(self):
+        return f"<AsyncMythicAuth id={self._settings.id}>"
+
+    @property
+    def client(self) -> AsyncClient:
+        """
+        The client used to make requests to the Hosted Pi API
+        """
+        return self._client
+
+    @property
+    def refreshes(self) -> int:
+        """
+        The number of access tokens fetched from the authentication server
+        """
+        return self._refreshes
+
+    @property
+    def settings(self) -> Settings:
+        """
+        The settings used to configure the API
+        """
+        return self._settings
+
+    async def get_token(self) -> str:
+        """
+        Return the access token used to authenticate requests to the API, refreshing it first if it
+        is about to expire.
+        """
+        if self._token_is_valid():
+            return self._token
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # another task may have refreshed the token while we were waiting for the lock
+            if not self._token_is_valid():
+                await self._refresh_token()
+        return self._token
+
+    async def request(self, method: str, url: str, **kwargs) -> Response:
+        """
+        Send an authenticated request to the API and return the response
+        """
+        token = await self.get_token()
+        headers = kwargs.pop("headers", {})
+        headers["Authorization"] = f"Bearer {token}"
+        return await self._client.request(method, url, headers=headers, **kwargs)
+
+    async def aclose(self):
+        """
+        Close the underlying client
+        """
+        await self._client.aclose()
+
+    def _token_is_valid(self) -> bool:
+        return self._token is not None and datetime.now() < self._refresh_at
+
+    async def _refresh_token(self):
+        data = {"grant_type": "client_credentials"}
+        creds = (self.settings.id, self.settings.secret.get_secret_value())
+        logger.debug("Authenticating", client_id=self.settings.id)
+        with start_span("hostedpi.auth.refresh", {"hostedpi.client_id": self.settings.id}) as span:
+            response = await self._client.post(str(self.settings.auth_url), auth=creds, data=data)
+            span.set_attribute("http.response.status_code", response.status_code)
+
+        try:
+            response.raise_for_status()
+        except HTTPStatusError as exc:
+            logger.debug("Failed to authenticate", error=str(exc))
+            raise MythicAuthenticationError("Failed to authenticate") from exc
+
+        try:
+            body = AuthResponse.model_validate(response.json())
+        except ValidationError as exc:
+            logger.debug("Failed to validate auth response", error=str(exc))
+            raise MythicAuthenticationError("Failed to validate auth response") from exc
+
+        now = datetime.now()
+        refresh_in = max(body.expires_in - self.settings.token_refresh_skew, body.expires_in / 2)
+        self._token = body.access_token
+        self._token_expiry = now + timedelta(seconds=body.expires_in)
+        self._refresh_at = now + timedelta(seconds=refresh_in)
+        self._refreshes += 1
+        logger.debug("Got token", expires_in=body.expires_in, expires_at=self._token_expiry)
@@ -0,0 +1,495 @@
+import asyncio
+from collections.abc import Awaitable, Iterable
+from time import monotonic
+from typing import Callable, Union
+
+from httpx import TransportError
+from pydantic import ValidationError
+
+from ..cache import InfoCache
+from ..endpoints import (
+    DELETE_SERVER,
+    GET_PROVISION_STATUS,
+    GET_SERVER,
+    GET_SSH_KEYS,
+    PUT_POWER,
+    PUT_SSH_KEYS,
+    REBOOT,
+)
+from ..exc import HostedPiTimeoutError, HostedPiUserError
+from ..keycache import get_key_cache
+from ..logger import get_logger
+from ..models.mythic.responses import PiInfo, PiInfoBasic, ProvisioningServer
+from ..models.sshkeys import SSHKeyDiff, SSHKeySources
+from ..models.wait import WaitPolicy
+from ..sshkey import SSHKey
+from ..tracing import start_span
+from ..utils import (
+    dedupe_ssh_keys,
+    get_status,
+    get_wait_policy,
+    remove_imported_ssh_keys,
+    remove_ssh_keys_by_label,
+)
+from .auth import AsyncMythicAuth
+from .pipeline import AsyncPipeline
+
+
+logger = get_logger()
+
+
+class AsyncPi:
+    """
+    The asyncio counterpart of :class:`~hostedpi.pi.Pi`, representing a single Raspberry Pi service
+    in the Mythic Beasts Pi cloud. Anything which requires a request to the API is a coroutine
+    method rather than a property.
+
+    There are two ways to get access to an ``AsyncPi`` object: the return value of
+    :meth:`~hostedpi.aio.picloud.AsyncPiCloud.get_pis`; and the return value of
+    :meth:`~hostedpi.aio.picloud.AsyncPiCloud.create_pi`.
+
+    .. note::
+        The ``AsyncPi`` class should not be initialised by the user, only internally within the
+        module
+    """
+
+    def __init__(
+        self,
+        name: Union[str, None],
+        *,
+        info: PiInfoBasic,
+        auth: AsyncMythicAuth,
+        status_url: Union[str, None] = None,
+        info_cache: Union[InfoCache, None] = None,
+        pipeline: Union[AsyncPipeline, None] = None,
+    ):
+        self._name = name
+        self._model = info.model
+        self._memory = info.memory
+        self._cpu_speed = info.cpu_speed
+        self._auth = auth
+        self._cancelled = False
+        if info_cache is None:
+            info_cache = InfoCache(ttl=auth.settings.info_cache_ttl)
+        self._info_cache = info_cache
+        if pipeline is None:
+            pipeline = AsyncPipeline(auth, info_cache=info_cache)
+        self._pipeline = pipeline
+        self._info: Union[PiInfo, None] = info if isinstance(info, PiInfo) else None
+        self._status_url: Union[str, None] = status_url
+
+    def __repr__(self):
+        if self._cancelled:
+            return f"<AsyncPi name={self.name} cancelled>"
+        if self._info is None or self._info.model_full is None:
+            return f"<AsyncPi name={self.name} model={self.model}>"
+        return f"<AsyncPi name={self.name} model={self._info.model_full}>"
+
+    @property
+    def info(self) -> Union[PiInfo, None]:
+        """
+        The most recently fetched :class:`~hostedpi.models.mythic.responses.PiInfo` for the Pi, or
+        ``None`` if it has not been fetched yet. Use :meth:`get_info` to fetch it.
+        """
+        return self._info
+
+    @property
+    def name(self) -> Union[str, None]:
+        """
+        The name of the Pi
+        """
+        return self._name
+
+    @property
+    def model(self) -> int:
+        """
+        The Pi's model (3 or 4)
+        """
+        return self._model
+
+    @property
+    def memory_mb(self) -> Union[int, None]:
+        """
+        The Pi's RAM size in MB
+        """
+        return self._memory
+
+    @property
+    def memory_gb(self) -> Union[int, None]:
+        """
+        The Pi's RAM size in GB
+        """
+        return self._memory // 1024 if self._memory else None
+
+    @property
+    def cpu_speed(self) -> Union[int, None]:
+        """
+        The Pi's CPU speed in MHz
+        """
+        return self._cpu_speed
+
+    @property
+    def hostname(self) -> str:
+        """
+        The hostname of the Pi
+        """
+        return f"{self.name}.hostedpi.com"
+
+    @property
+    def ipv4_ssh_hostname(self) -> str:
+        """
+        The hostname to use when connecting to the Pi over SSH using IPv4
+        """
+        return f"ssh.{self.hostname}"
+
+    @property
+    def ipv6_ssh_hostname(self) -> str:
+        """
+        The hostname to use when connecting to the Pi over SSH using IPv6
+        """
+        return self.hostname
+
+    @property
+    def ipv6_ssh_command(self) -> str:
+        """
+        The SSH command required to connect to the Pi over SSH using IPv6
+        """
+        return f"ssh root@{self.ipv6_ssh_hostname}"
+
+    @property
+    def ipv6_ssh_config(self) -> str:
+        """
+        A string containing the IPv6 SSH config for the Pi
+        """
+        return f"""Host {self.name}
+    user root
+    hostname {self.ipv6_ssh_hostname}
+        """.strip()
+
+    @property
+    def url(self) -> str:
+        """
+        The http version of the hostedpi.com URL of the Pi
+        """
+        return f"http://www.{self.hostname}"
+
+    @property
+    def url_ssl(self) -> str:
+        """
+        The https version of the hostedpi.com URL of the Pi
+        """
+        return f"https://www.{self.hostname}"
+
+    async def get_info(self) -> PiInfo:
+        """
+        Fetch and return the full Pi information as a
+        :class:`~hostedpi.models.mythic.responses.PiInfo` object (cached for
+        :attr:`~hostedpi.settings.Settings.info_cache_ttl` seconds, 10 by default).
+
+        :raises HostedPiUserError:
+            If the Pi has not been initialised with a name yet
+
+        :raises HostedPiNotAuthorizedError:
+            If the user is not authorised to access the server info
+
+        :raises HostedPiProvisioningError:
+            If the Pi is still provisioning
+
+        :raises HostedPiServerError:
+            If there is another error retrieving the Pi information from the API
+        """
+        if self.name is None:
+            raise HostedPiUserError("Cannot fetch info for a Pi without a name")
+        self._info = await self._pipeline.request(GET_SERVER, name=self.name)
+        return self._info
+
+    async def get_status(self) -> str:
+        """
+        Return a string representing the Pi's current status (provisioning, booting, live, powered
+        on or powered off)
+        """
+        return get_status(await self.get_info())
+
+    async def get_ipv4_ssh_command(self) -> str:
+        """
+        Return the SSH command required to connect to the Pi over SSH using IPv4
+        """
+        info = await self.get_info()
+        return f"ssh -p {info.ssh_port} root@{self.ipv4_ssh_hostname}"
+
+    async def get_ipv4_ssh_config(self) -> str:
+        """
+        Return a string containing the IPv4 SSH config for the Pi
+        """
+        info = await self.get_info()
+        return f"""Host {self.name}
+    user root
+    port {info.ssh_port}
+    hostname {self.ipv4_ssh_hostname}
+        """.strip()
+
+    async def get_ssh_keys(self) -> set[SSHKey]:
+        """
+        Retrieve the SSH keys on the Pi
+
+        :raises HostedPiNotAuthorizedError:
+            If the user is not authorised to access the server
+
+        :raises HostedPiProvisioningError:
+            If the Pi is still provisioning
+
+        :raises HostedPiServerError:
+            If there is another error accessing the API
+        """
+        data = await self._pipeline.request(GET_SSH_KEYS, name=self.name)
+        return dedupe_ssh_keys(data.keys)
+
+    async def set_ssh_keys(self, ssh_keys: Union[Iterable[Union[str, SSHKey]], None]):
+        """
+        Replace the SSH keys on the Pi with *ssh_keys*, or remove them all if ``None``
+
+        :raises HostedPiNotAuthorizedError:
+            If the user is not authorised to access the server
+
+        :raises HostedPiProvisioningError:
+            If the Pi is still provisioning
+
+        :raises HostedPiServerError:
+            If there is another error accessing the API
+        """
+        if ssh_keys is None:
+            data = {"ssh_key": ""}
+        else:
+            data = {"ssh_key": "\r\n".join(map(str, dedupe_ssh_keys(ssh_keys)))}
+        await self._pipeline.request(PUT_SSH_KEYS, json=data, name=self.name)
+
+    async def add_ssh_keys(self, ssh_keys: SSHKeySources) -> set[SSHKey]:
+        """
+        Add SSH keys to the Pi from the specified sources, and return the resulting set of keys
+        """
+        cache = get_key_cache(self._auth.settings)
+        keys = await asyncio.to_thread(ssh_keys.collect, cache=cache)
+        current_keys = await self.get_ssh_keys()
+        if keys:
+            current_keys |= keys
+            await self.set_ssh_keys(current_keys)
+        return current_keys
+
+    async def unimport_ssh_keys(
+        self,
+        *,
+        github_usernames: Union[set[str], None] = None,
+        launchpad_usernames: Union[set[str], None] = None,
+    ) -> set[SSHKey]:
+        """
+        Remove SSH keys that were imported from GitHub or Launchpad, and return the remaining set of
+        keys
+        """
+        ssh_keys = await self.get_ssh_keys()
+        for username in github_usernames or ():
+            ssh_keys = remove_imported_ssh_keys(ssh_keys, "gh", username)
+        for username in launchpad_usernames or ():
+            ssh_keys = remove_imported_ssh_keys(ssh_keys, "lp", username)
+        await self.set_ssh_keys(ssh_keys)
+        return ssh_keys
+
+    async def remove_ssh_keys(self, label: Union[str, None] = None) -> set[SSHKey]:
+        """
+        Remove SSH keys from the Pi that have a specific label (e.g. ``user@hostname``) and return
+        the remaining set of keys. If *label* is ``None``, all keys will be removed.
+        """
+        if label is None:
+            await self.set_ssh_keys(None)
+            return set()
+        ssh_keys = remove_ssh_keys_by_label(await self.get_ssh_keys(), label)
+        await self.set_ssh_keys(ssh_keys)
+        return ssh_keys
+
+    async def sync_ssh_keys(
+        self, ssh_keys: Iterable[Union[str, SSHKey]], *, dry_run: bool = False
+    ) -> SSHKeyDiff:
+        """
+        Make the SSH keys on the Pi exactly *ssh_keys*, and return the
+        :class:`~hostedpi.models.sshkeys.SSHKeyDiff` of the changes made. If *dry_run* is ``True``,
+        return the changes without making them.
+        """
+        ssh_keys = dedupe_ssh_keys(ssh_keys)
+        diff = SSHKeyDiff.compute(await self.get_ssh_keys(), ssh_keys)
+        if diff.changed and not dry_run:
+            await self.set_ssh_keys(ssh_keys if ssh_keys else None)
+        return diff
+
+    async def on(self, *, wait: Union[bool, WaitPolicy] = False) -> Union[bool, None]:
+        """
+        Power the Pi on. If *wait* is ``True`` or a :class:`~hostedpi.models.wait.WaitPolicy`, wait
+        until the Pi has booted, and return its power state.
+
+        :raises HostedPiNotAuthorizedError:
+            If the user is not authorised to access the server
+
+        :raises HostedPiProvisioningError:
+            If the server is still provisioning
+
+        :raises HostedPiServerError:
+            If there is another error accessing the API
+        """
+        await self._power_on_off(on=True)
+        if wait:
+            return await self._wait_until_booted(get_wait_policy(wait))
+
+    async def off(self):
+        """
+        Power the Pi off and return immediately
+
+        :raises HostedPiNotAuthorizedError:
+            If the user is not authorised to access the server
+
+        :raises HostedPiProvisioningError:
+            If the server is still provisioning
+
+        :raises HostedPiServerError:
+            If there is another error accessing the API
+        """
+        await self._power_on_off(on=False)
+
+    async def reboot(self, *, wait: Union[bool, WaitPolicy] = False) -> Union[bool, None]:
+        """
+        Reboot the Pi. If *wait* is ``True`` or a :class:`~hostedpi.models.wait.WaitPolicy`, wait
+        until the Pi has booted, and return its power state.
+
+        :raises HostedPiNotAuthorizedError:
+            If the user is not authorised to access the server
+
+        :raises HostedPiServerError:
+            If there is another error accessing the API
+        """
+        await self._pipeline.request(REBOOT, name=self.name)
+        if wait:
+            return await self._wait_until_booted(get_wait_policy(wait))
+
+    async def cancel(self):
+        """
+        Unprovision the Pi server immediately
+
+        :raises HostedPiNotAuthorizedError:
+            If the user is not authorised to access the server
+
+        :raises HostedPiProvisioningError:
+            If the server is still provisioning
+
+        :raises HostedPiServerError:
+            If there is another error accessing the API
+        """
+        if self._cancelled:
+            logger.warn("This Pi server is already cancelled", name=self.name)
+            return
+
+        status = await self.get_provision_status()
+        if type(status) is not PiInfo:
+            logger.warn("Cannot cancel a server that is still provisioning", name=self.name)
+            return
+
+        await self._pipeline.request(DELETE_SERVER, name=self.name)
+        self._cancelled = True
+
+    async def wait_until_provisioned(self, *, policy: Union[WaitPolicy, None] = None):
+        """
+        Wait for the new Pi to be provisioned, polling according to *policy* (or the default
+        :class:`~hostedpi.models.wait.WaitPolicy` if not provided)
+
+        :raises HostedPiNotAuthorizedError:
+            If the user is not authorised to access the server
+
+        :raises HostedPiServerError:
+            If there is another error accessing the API
+
+        :raises HostedPiTimeoutError:
+            If the Pi is not provisioned within the policy's timeout
+        """
+
+        async def provisioned() -> bool:
+            return type(await self.get_provision_status()) is PiInfo
+
+        await self._wait_until(provisioned, policy)
+
+    async def get_provision_status(self) -> Union[PiInfo, ProvisioningServer, None]:
+        """
+        Send a request to the server creation status endpoint and return the status as either a
+        :class:`~hostedpi.models.mythic.responses.PiInfo` or
+        :class:`~hostedpi.models.mythic.responses.ProvisioningServer` or ``None`` if the status is
+        not yet available.
+
+        :raises HostedPiNotAuthorizedError:
+            If the user is not authorised to access the server
+
+        :raises HostedPiServerError:
+            If there is another error accessing the API
+        """
+        if self._status_url is None:
+            return await self.get_info()
+
+        try:
+            response = await self._pipeline.request(GET_PROVISION_STATUS, url=self._status_url)
+        except TransportError as exc:
+            logger.warn("Temporary error getting server provisioning status", exc=str(exc))
+            return
+
+        status = self._parse_status(response.json())
+        if type(status) is ProvisioningServer:
+            logger.info("Server provisioning in progress", status=status.provision_status)
+            return status
+        if type(status) is PiInfo:
+            self._name = str(response.url).split("/")[-1]
+            logger.info("Server provisioning complete", server_name=self._name)
+            self._info = status
+            self._info_cache.set(self._name, status)
+            self._status_url = None
+            return status
+
+    async def _wait_until_booted(self, policy: Union[WaitPolicy, None]) -> bool:
+        async def booted() -> bool:
+            self._info_cache.invalidate(self.name)
+            return not (await self.get_info()).is_booting
+
+        await self._wait_until(booted, policy)
+        return self._info.power
+
+    async def _wait_until(
+        self, check: Callable[[], Awaitable[bool]], policy: Union[WaitPolicy, None]
+    ):
+        if policy is None:
+            policy = WaitPolicy()
+        deadline = None if policy.timeout is None else monotonic() + policy.timeout
+        for poll, delay in enumerate(policy.delays(), start=1):
+            attributes = {"hostedpi.pi.name": self.name, "hostedpi.wait.poll": poll}
+            with start_span("hostedpi.wait", attributes) as span:
+                ready = await check()
+                span.set_attribute("hostedpi.wait.ready", ready)
+                if ready:
+                    return
+                if deadline is not None:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        logger.info("Timed out waiting for Pi", name=self.name)
+                        raise HostedPiTimeoutError(f"Timed out waiting for {self.name}")
+                    delay = min(delay, remaining)
+                span.set_attribute("hostedpi.wait.sleep", delay)
+                await asyncio.sleep(delay)
+
+    async def _power_on_off(self, *, on: bool):
+        await self._pipeline.request(PUT_POWER, json={"power": on}, name=self.name)
+
+    def _parse_status(self, data: dict) -> Union[PiInfo, ProvisioningServer, None]:
+        """
+        Get the status of an async server creation request
+        """
+        try:
+            return PiInfo.model_validate(data)
+        except ValidationError:
+            pass
+
+        try:
+            return ProvisioningServer.model_validate(data)
+        except ValidationError:
+            logger.warn("Unexpected response from server creation status endpoint")
+            return
@@ -0,0 +1,343 @@
+import asyncio
+from collections.abc import Awaitable, Iterable, Mapping
+from typing import Any, Callable, Union
+
+from pydantic import ValidationError
+
+from ..cache import InfoCache
+from ..endpoints import CREATE_NAMED_SERVER, CREATE_SERVER, GET_IMAGES, GET_SERVERS
+from ..exc import HostedPiUserError, HostedPiValidationError
+from ..keycache import get_key_cache
+from ..keyindex import KeyIndex
+from ..logger import get_logger
+from ..metrics import Metrics
+from ..models.metrics import MetricsSnapshot
+from ..models.mythic.payloads import NewServer
+from ..models.mythic.responses import PiInfoBasic
+from ..models.results import PiResult
+from ..models.specs import Pi3ServerSpec, Pi4ServerSpec
+from ..models.sshkeys import SSHKeyDiff, SSHKeySources
+from ..models.wait import WaitPolicy
+from ..sshkey import SSHKey
+from ..utils import check_named, get_wait_policy
+from .auth import AsyncMythicAuth
+from .pi import AsyncPi
+from .pipeline import AsyncPipeline
+
+
+logger = get_logger()
+
+
+class AsyncPiCloud:
+    """
+    The asyncio counterpart of :class:`~hostedpi.picloud.PiCloud`: a connection to the Mythic
+    Beasts Pi Cloud API for creating and managing cloud Pi servers from an event loop.
+
+    It can be used as an async context manager, which closes the underlying HTTP client on exit:
+
+    .. code-block:: python
+
+        async with AsyncPiCloud() as cloud:
+            pis = await cloud.get_pis()
+
+    :type ssh_keys: :class:`~hostedpi.models.sshkeys.SSHKeySources` or None
+    :param ssh_keys:
+        An instance of :class:`~hostedpi.models.sshkeys.SSHKeySources` containing sources of SSH
+        keys to use when creating new Pis. Keys are collected the first time a Pi is created.
+
+    :type auth: :class:`~hostedpi.aio.auth.AsyncMythicAuth` or None
+    :param auth:
+        An instance of :class:`~hostedpi.aio.auth.AsyncMythicAuth` to use for authentication with
+        the API. If not provided, a default instance will be created.
+    """
+
+    def __init__(
+        self,
+        ssh_keys: Union[SSHKeySources, None] = None,
+        *,
+        auth: Union[AsyncMythicAuth, None] = None,
+    ):
+        if ssh_keys is not None and not isinstance(ssh_keys, SSHKeySources):
+            raise TypeError("ssh_keys must be an instance of SSHKeySources or None")
+        self._ssh_key_sources = ssh_keys
+        self.ssh_keys: Union[set[SSHKey], None] = None
+        if auth is None:
+            auth = AsyncMythicAuth()
+        self._auth = auth
+        self._info_cache = InfoCache(ttl=auth.settings.info_cache_ttl)
+        self._metrics = Metrics()
+        self._pipeline = AsyncPipeline(
+            auth, info_cache=self._info_cache, middleware=[self._metrics.async_middleware]
+        )
+
+    def __repr__(self):
+        return f"<AsyncPiCloud id={self._auth.settings.id}>"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        """
+        Close the underlying HTTP client
+        """
+        await self._auth.aclose()
+
+    @property
+    def info_cache(self) -> InfoCache:
+        """
+        The :class:`~hostedpi.cache.InfoCache` shared by all :class:`~hostedpi.aio.pi.AsyncPi`
+        objects belonging to this cloud
+        """
+        return self._info_cache
+
+    @property
+    def pipeline(self) -> AsyncPipeline:
+        """
+        The :class:`~hostedpi.aio.pipeline.AsyncPipeline` shared by all
+        :class:`~hostedpi.aio.pi.AsyncPi` objects belonging to this cloud, which every request to
+        the API passes through
+        """
+        return self._pipeline
+
+    @property
+    def metrics(self) -> MetricsSnapshot:
+        """
+        A :class:`~hostedpi.models.metrics.MetricsSnapshot` of the requests made by this cloud so
+        far. See :attr:`hostedpi.picloud.PiCloud.metrics`.
+        """
+        return self._metrics.snapshot(
+            token_refreshes=self._auth.refreshes, info_cache=self._info_cache
+        )
+
+    async def get_pis(self) -> dict[str, AsyncPi]:
+        """
+        Return a dict of all Raspberry Pi servers associated with the account, keyed by their
+        names. Each value is an instance of :class:`~hostedpi.aio.pi.AsyncPi`.
+
+        :raises HostedPiNotAuthorizedError:
+            If the user is not authorized to retrieve the list of Pis
+
+        :raises HostedPiServerError:
+            If there is an error retrieving the list from the server
+        """
+        servers = (await self._pipeline.request(GET_SERVERS)).servers
+        return {
+            name: AsyncPi(
+                name,
+                info=info,
+                auth=self._auth,
+                info_cache=self._info_cache,
+                pipeline=self._pipeline,
+            )
+            for name, info in sorted(servers.items())
+        }
+
+    async def create_pi(
+        self,
+        *,
+        name: Union[str, None] = None,
+        spec: Union[Pi3ServerSpec, Pi4ServerSpec],
+        ssh_keys: Union[SSHKeySources, None] = None,
+        wait: Union[bool, WaitPolicy] = False,
+    ) -> AsyncPi:
+        """
+        Provision a new cloud Pi with the specified name, spec and SSH keys, and return a new
+        :class:`~hostedpi.aio.pi.AsyncPi` instance. See :meth:`~hostedpi.picloud.PiCloud.create_pi`
+        for details of the arguments.
+
+        :raises HostedPiValidationError:
+            If the provided name or spec is invalid
+
+        :raises HostedPiInvalidParametersError:
+            If the provided parameters are invalid, such as an unsupported model or disk size
+
+        :raises HostedPiNotAuthorizedError:
+            If the user is not authorized to create a new Pi server
+
+        :raises HostedPiOutOfStockError:
+            If there are no available Pi servers of the requested type
+
+        :raises HostedPiServerError:
+            If there is another error from the server
+        """
+        if not isinstance(spec, (Pi3ServerSpec, Pi4ServerSpec)):
+            raise TypeError("spec must be an instance of Pi3ServerSpec or Pi4ServerSpec")
+
+        if ssh_keys is not None:
+            if not isinstance(ssh_keys, SSHKeySources):
+                raise TypeError("ssh_keys must be an instance of SSHKeySources or None")
+            cache = get_key_cache(self._auth.settings)
+            ssh_keys = await asyncio.to_thread(ssh_keys.collect, cache=cache)
+        else:
+            ssh_keys = await self._get_default_ssh_keys()
+
+        try:
+            data = NewServer(name=name, spec=spec, ssh_keys=ssh_keys)
+        except ValidationError as exc:
+            logger.error(f"Invalid server name or spec: {exc}")
+            raise HostedPiValidationError("Invalid server name or spec") from exc
+
+        num_ssh_keys = len(ssh_keys) if ssh_keys else 0
+        logger.info("Creating new server", name=name, spec=spec, ssh_keys=num_ssh_keys)
+        if name is None:
+            response = await self._pipeline.request(CREATE_SERVER, json=data.payload)
+        else:
+            response = await self._pipeline.request(
+                CREATE_NAMED_SERVER, json=data.payload, name=name
+            )
+
+        status_url = response.headers["Location"]
+        logger.info("Server creation request accepted", status_url=status_url)
+        basic_info = PiInfoBasic.model_validate(spec)
+        pi = AsyncPi(
+            name=name,
+            info=basic_info,
+            auth=self._auth,
+            status_url=status_url,
+            info_cache=self._info_cache,
+            pipeline=self._pipeline,
+        )
+        if wait:
+            await pi.wait_until_provisioned(policy=get_wait_policy(wait))
+        return pi
+
+    async def get_operating_systems(self, *, model: int) -> dict[str, str]:
+        """
+        Return a dict of operating systems supported by the given Pi *model* (3 or 4). See
+        :meth:`~hostedpi.picloud.PiCloud.get_operating_systems`.
+
+        :raises HostedPiUserError:
+            If the provided model is not 3 or 4
+
+        :raises HostedPiServerError:
+            If there is an error retrieving the operating systems from the server
+        """
+        if model not in {3, 4}:
+            raise HostedPiUserError("model must be 3 or 4")
+        return (await self._pipeline.request(GET_IMAGES, model=model)).root
+
+    async def map(
+        self,
+        func: Callable[[AsyncPi], Awaitable[Any]],
+        pis: Iterable[AsyncPi],
+        *,
+        max_workers: Union[int, None] = None,
+    ) -> dict[str, PiResult]:
+        """
+        Await the coroutine function *func* with each of the given *pis* concurrently, and return a
+        dict of :class:`~hostedpi.models.results.PiResult` objects keyed by Pi name, sorted by name.
+        A failure on any individual Pi is recorded in its result rather than raised.
+
+        :type max_workers: int or None
+        :param max_workers:
+            The maximum number of API requests to have in flight at once (keyword-only argument).
+            If not provided, :attr:`~hostedpi.settings.Settings.max_workers` is used.
+
+        :raises HostedPiUserError:
+            If any of the Pis has no name, as its result could not be keyed by name
+        """
+        pis = list(pis)
+        check_named(pis)
+        if max_workers is None:
+            max_workers = self._auth.settings.max_workers
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def run(pi: AsyncPi) -> PiResult:
+            async with semaphore:
+                try:
+                    return PiResult(name=pi.name, value=await func(pi))
+                except Exception as exc:
+                    logger.info("Bulk operation failed", name=pi.name, error=str(exc))
+                    return PiResult(name=pi.name, error=exc)
+
+        results = await asyncio.gather(*(run(pi) for pi in pis))
+        return {result.name: result for result in sorted(results, key=lambda r: r.name)}
+
+    async def bulk_power(
+        self,
+        pis: Iterable[AsyncPi],
+        *,
+        on: bool,
+        max_workers: Union[int, None] = None,
+    ) -> dict[str, PiResult]:
+        """
+        Power the given *pis* on or off concurrently, and return a dict of
+        :class:`~hostedpi.models.results.PiResult` objects keyed by Pi name
+        """
+        if on:
+            return await self.map(AsyncPi.on, pis, max_workers=max_workers)
+        return await self.map(AsyncPi.off, pis, max_workers=max_workers)
+
+    async def bulk_reboot(
+        self,
+        pis: Iterable[AsyncPi],
+        *,
+        max_workers: Union[int, None] = None,
+    ) -> dict[str, PiResult]:
+        """
+        Reboot the given *pis* concurrently, and return a dict of
+        :class:`~hostedpi.models.results.PiResult` objects keyed by Pi name
+        """
+        return await self.map(AsyncPi.reboot, pis, max_workers=max_workers)
+
+    async def bulk_cancel(
+        self,
+        pis: Iterable[AsyncPi],
+        *,
+        max_workers: Union[int, None] = None,
+    ) -> dict[str, PiResult]:
+        """
+        Unprovision the given *pis* concurrently, and return a dict of
+        :class:`~hostedpi.models.results.PiResult` objects keyed by Pi name
+        """
+        return await self.map(AsyncPi.cancel, pis, max_workers=max_workers)
+
+    async def get_key_index(
+        self,
+        pis: Union[Iterable[AsyncPi], None] = None,
+        *,
+        max_workers: Union[int, None] = None,
+    ) -> KeyIndex:
+        """
+        Retrieve the SSH keys of the given *pis* (or all Pis, if not provided) concurrently, and
+        return a :class:`~hostedpi.keyindex.KeyIndex` of which Pis each key is installed on
+        """
+        if pis is None:
+            pis = (await self.get_pis()).values()
+        results = await self.map(AsyncPi.get_ssh_keys, pis, max_workers=max_workers)
+        return KeyIndex.from_results(results)
+
+    async def sync_ssh_keys(
+        self,
+        desired: Mapping[str, Iterable[Union[str, SSHKey]]],
+        *,
+        dry_run: bool = False,
+        max_workers: Union[int, None] = None,
+    ) -> dict[str, PiResult]:
+        """
+        Make the SSH keys on each Pi named in *desired* exactly the keys given for it, concurrently,
+        and return a dict of :class:`~hostedpi.models.results.PiResult` objects keyed by Pi name,
+        whose values are the :class:`~hostedpi.models.sshkeys.SSHKeyDiff` of the changes made
+        """
+        pis = await self.get_pis()
+        results = {
+            name: PiResult(name=name, error=HostedPiUserError(f"Pi server not found: {name}"))
+            for name in desired
+            if name not in pis
+        }
+
+        async def sync(pi: AsyncPi) -> SSHKeyDiff:
+            return await pi.sync_ssh_keys(desired[pi.name], dry_run=dry_run)
+
+        found = [pi for name, pi in pis.items() if name in desired]
+        results.update(await self.map(sync, found, max_workers=max_workers))
+        return dict(sorted(results.items()))
+
+    async def _get_default_ssh_keys(self) -> Union[set[SSHKey], None]:
+        if self._ssh_key_sources is not None and self.ssh_keys is None:
+            cache = get_key_cache(self._auth.settings)
+            self.ssh_keys = await asyncio.to_thread(self._ssh_key_sources.collect, cache=cache)
+        return self.ssh_keys
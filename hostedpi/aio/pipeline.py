@@ -0,0 +1,147 @@
+from collections.abc import Awaitable, Iterable
+from typing import Any, Callable, Union
+
+from httpx import Response
+
+from ..cache import InfoCache
+from ..endpoints import Endpoint
+from ..logger import log_request
+from ..metrics import get_retries
+from ..pipeline import Call, span_attributes
+from ..tracing import start_span
+from .auth import AsyncMythicAuth
+from .utils import check_response
+
+
+AsyncHandler = Callable[[Call], Awaitable[Any]]
+AsyncMiddleware = Callable[[Call, AsyncHandler], Awaitable[Any]]
+
+
+class AsyncPipeline:
+    """
+    The asyncio counterpart of :class:`~hostedpi.pipeline.Pipeline`, which every request made by an
+    :class:`~hostedpi.aio.picloud.AsyncPiCloud` passes through. Middleware are coroutine functions
+    taking the :class:`~hostedpi.pipeline.Call` and the next handler, which they await to continue
+    the request:
+
+    .. code-block:: python
+
+        async def log_calls(call, send):
+            print(call.endpoint.name, call.url)
+            return await send(call)
+
+        cloud.pipeline.use(log_calls)
+
+    :type auth: :class:`~hostedpi.aio.auth.AsyncMythicAuth`
+    :param auth:
+        The authentication used to make requests
+
+    :type info_cache: :class:`~hostedpi.cache.InfoCache` or None
+    :param info_cache:
+        The cache used by endpoints which read or change a Pi's info. If not provided, nothing is
+        cached.
+
+    :type middleware: Iterable[Callable] or None
+    :param middleware:
+        The initial middleware
+    """
+
+    def __init__(
+        self,
+        auth: AsyncMythicAuth,
+        *,
+        info_cache: Union[InfoCache, None] = None,
+        middleware: Union[Iterable[AsyncMiddleware], None] = None,
+    ):
+        self._auth = auth
+        self._api_url = str(auth.settings.api_url)
+        self._info_cache = info_cache
+        self._middleware: list[AsyncMiddleware] = list(middleware or ())
+        self._handler = self._build()
+
+    def __repr__(self):
+        return f"<AsyncPipeline middleware={len(self._middleware)}>"
+
+    @property
+    def middleware(self) -> tuple[AsyncMiddleware, ...]:
+        """
+        The middleware each request passes through, outermost first
+        """
+        return tuple(self._middleware)
+
+    def use(self, middleware: AsyncMiddleware):
+        """
+        Add *middleware* to the pipeline, inside any middleware already added
+        """
+        self._middleware.append(middleware)
+        self._handler = self._build()
+
+    async def request(
+        self,
+        endpoint: Endpoint,
+        *,
+        url: Union[str, None] = None,
+        json: Any = None,
+        **params: Any,
+    ) -> Any:
+        """
+        Send a request to *endpoint* and return the validated response body. See
+        :meth:`~hostedpi.pipeline.Pipeline.request`.
+        """
+        if url is None:
+            url = endpoint.url(self._api_url, **params)
+        call = Call(endpoint, url=url, params=params, json=json)
+        if self._info_cache is not None and endpoint.cache is not None:
+            return await self._cached(call)
+        return await self._handler(call)
+
+    def _build(self) -> AsyncHandler:
+        handler = self._send
+        for middleware in reversed(self._middleware):
+            handler = _bind(middleware, handler)
+        return handler
+
+    async def _cached(self, call: Call) -> Any:
+        name = call.params["name"]
+        if call.endpoint.cache == "read":
+            info = self._info_cache.get(name)
+            if info is None:
+                info = await self._handler(call)
+                if info is not None:
+                    self._info_cache.set(name, info)
+            return info
+        try:
+            return await self._handler(call)
+        finally:
+            self._info_cache.invalidate(name)
+
+    async def _send(self, call: Call) -> Any:
+        kwargs = {"follow_redirects": call.endpoint.follow_redirects}
+        if call.json is not None:
+            kwargs["json"] = call.json
+        with start_span("hostedpi.request", span_attributes(call)) as span:
+            response = await self._auth.request(call.endpoint.method, call.url, **kwargs)
+            call.response = response
+            span.set_attribute("http.response.status_code", response.status_code)
+            span.set_attribute("hostedpi.retries", get_retries(response))
+            log_request(response)
+            return handle_response(call.endpoint, response)
+
+
+def handle_response(endpoint: Endpoint, response: Response) -> Any:
+    """
+    The asyncio counterpart of :func:`~hostedpi.pipeline.handle_response`
+    """
+    if response.status_code in endpoint.ignore:
+        return None
+    check_response(response, endpoint.errors)
+    if endpoint.response_model is None:
+        return response
+    return endpoint.parse(response.json())
+
+
+def _bind(middleware: AsyncMiddleware, handler: AsyncHandler) -> AsyncHandler:
+    async def bound(call: Call) -> Any:
+        return await middleware(call, handler)
+
+    return bound
@@ -0,0 +1,82 @@
+import asyncio
+
+from httpx import (
+    AsyncBaseTransport,
+    AsyncClient,
+    AsyncHTTPTransport,
+    Limits,
+    Request,
+    Response,
+    Timeout,
+    TransportError,
+)
+
+from ..logger import get_logger
+from ..settings import Settings
+from ..transport import RETRY_METHODS, RETRY_STATUSES, get_retry_delay
+
+
+logger = get_logger()
+
+
+class RetryTransport(AsyncBaseTransport):
+    """
+    An :class:`httpx.AsyncBaseTransport` which wraps *transport* and retries idempotent requests
+    (``GET`` and ``PUT``) which fail with a transport error or a 502, 503 or 504 response, with the
+    same backoff as :class:`~hostedpi.transport.HostedPiAdapter`. Once the retries are exhausted,
+    the last response is returned, or the last error raised. The number of retries made is
+    recorded in the ``retries`` extension of the response.
+
+    :type transport: :class:`httpx.AsyncBaseTransport`
+    :param transport:
+        The transport used to send requests
+
+    :type settings: :class:`~hostedpi.settings.Settings`
+    :param settings:
+        The settings giving the number of retries and the backoff between them
+    """
+
+    def __init__(self, transport: AsyncBaseTransport, *, settings: Settings):
+        self._transport = transport
+        self._settings = settings
+
+    async def handle_async_request(self, request: Request) -> Response:
+        if request.method not in RETRY_METHODS:
+            return await self._transport.handle_async_request(request)
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                response = await self._transport.handle_async_request(request)
+            except TransportError as exc:
+                if attempt >= self._settings.max_retries:
+                    raise
+                logger.debug("Retrying request", url=str(request.url), error=str(exc))
+            else:
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or attempt >= self._settings.max_retries
+                ):
+                    response.extensions["retries"] = attempt
+                    return response
+                retry_after = response.headers.get("Retry-After")
+                await response.aclose()
+                logger.debug("Retrying request", url=str(request.url), status=response.status_code)
+            attempt += 1
+            await asyncio.sleep(get_retry_delay(self._settings, attempt, retry_after))
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def make_client(settings: Settings) -> AsyncClient:
+    """
+    Return a new :class:`httpx.AsyncClient` configured from *settings*, with a connection pool of
+    at least :attr:`~hostedpi.settings.Settings.max_workers` connections, default timeouts, and
+    retries of idempotent requests using :class:`RetryTransport`
+    """
+    pool_size = max(settings.pool_size, settings.max_workers)
+    limits = Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    transport = RetryTransport(AsyncHTTPTransport(limits=limits), settings=settings)
+    timeout = Timeout(settings.read_timeout, connect=settings.connect_timeout)
+    return AsyncClient(transport=transport, timeout=timeout, limits=limits)
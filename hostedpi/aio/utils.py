@@ -0,0 +1,17 @@
+from httpx import HTTPStatusError, Response
+
+from ..exc import HostedPiException, HostedPiServerError
+from ..utils import get_error_message
+
+
+def check_response(response: Response, errors: dict[int, type[HostedPiException]]):
+    """
+    Raise the exception from *errors* matching the status code of *response* if it was
+    unsuccessful, or :exc:`~hostedpi.exc.HostedPiServerError` for any other error status
+    """
+    try:
+        response.raise_for_status()
+    except HTTPStatusError as exc:
+        error = get_error_message(exc)
+        exc_class = errors.get(response.status_code, HostedPiServerError)
+        raise exc_class(error) from exc
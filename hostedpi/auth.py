@@ -1,26 +1,46 @@
 from datetime import datetime, timedelta
 from importlib.metadata import version
+from threading import Event, Lock, Thread, current_thread
 from typing import Union
 
 from pydantic import ValidationError
-from requests import HTTPError, Session
-from structlog import get_logger
+from requests import HTTPError, PreparedRequest, RequestException, Response, Session
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
 
 from .exc import MythicAuthenticationError
+from .logger import get_logger
 from .models.mythic.responses import AuthResponse
 from .settings import Settings
+from .tokencache import TokenCache
+from .tracing import start_span
+from .transport import HostedPiAdapter, make_session
 
 
 hostedpi_version = version("hostedpi")
 logger = get_logger()
 
+#: The number of seconds the background token refresher waits after a failed refresh
+BACKGROUND_RETRY_DELAY = 5
 
-class MythicAuth:
+
+class MythicAuth(AuthBase):
     """
     This class handles authentication with the Mythic Beasts Hosted Pi API.
 
     It manages the access token used to authenticate requests to the API, and automatically
-    refreshes it when it expires.
+    refreshes it :attr:`~hostedpi.settings.Settings.token_refresh_skew` seconds before it expires.
+    The token can be used from any number of threads: when it needs refreshing, one thread
+    refreshes it while the others wait for the result. If
+    :attr:`~hostedpi.settings.Settings.token_background_refresh` is enabled, the token is refreshed
+    by a background thread instead, so requests only wait for the authentication endpoint to fetch
+    the first token, or if the background refresh has failed until the token expired.
+
+    It is a :class:`requests.auth.AuthBase`, set as the ``auth`` of the API session, so the
+    ``Authorization`` header is added to each request as it is prepared. The header value is only
+    rebuilt when the token is refreshed. If the API rejects the token with a 401 response, for
+    example because it was revoked, the token is discarded (along with the cached token, if it is
+    the same one), and the request is sent once more with a new token.
 
     :type settings: :class:`~hostedpi.settings.Settings` or None
     :param settings:
@@ -30,12 +50,24 @@ class MythicAuth:
     :type auth_session: :class:`requests.Session` or None
     :param auth_session:
         The session used to make authentication requests. If not provided, defaults to a new
-        :class:`requests.Session`.
+        :class:`requests.Session` using *transport*.
 
     :type api_session: :class:`requests.Session` or None
     :param api_session:
         The session used to make API requests. If not provided, defaults to a new
-        :class:`requests.Session`.
+        :class:`requests.Session` using *transport*.
+
+    :type transport: :class:`requests.adapters.HTTPAdapter` or None
+    :param transport:
+        The adapter mounted on the default sessions, which handles connection pooling, retries and
+        timeouts. If not provided, defaults to a :class:`~hostedpi.transport.HostedPiAdapter`
+        configured from *settings*. It is not mounted on sessions which are provided.
+
+    :type token_cache: :class:`~hostedpi.tokencache.TokenCache` or None
+    :param token_cache:
+        The cache used to share the access token with other processes. If not provided, and
+        :attr:`~hostedpi.settings.Settings.token_cache` is enabled, defaults to the cache for the
+        API ID in *settings*.
 
     .. warning::
         This is for advanced use only. Most users should not need to interact with the
@@ -52,33 +84,62 @@ class MythicAuth:
         settings: Union[Settings, None] = None,
         auth_session: Union[Session, None] = None,
         api_session: Union[Session, None] = None,
+        transport: Union[HTTPAdapter, None] = None,
+        token_cache: Union[TokenCache, None] = None,
     ):
         if settings is None:
             settings = Settings()
-        if auth_session is None:
-            auth_session = Session()
-        if api_session is None:
-            api_session = Session()
+        if auth_session is None or api_session is None:
+            if transport is None:
+                transport = HostedPiAdapter.from_settings(settings)
+            if auth_session is None:
+                auth_session = make_session(settings, adapter=transport)
+            if api_session is None:
+                api_session = make_session(settings, adapter=transport)
+        if token_cache is None and settings.token_cache:
+            token_cache = TokenCache.for_settings(settings)
         self._settings = settings
+        self._token_cache = token_cache
         self._token = None
         self._token_expiry = datetime.now()
-        api_session.headers = {
-            "User-Agent": f"python-hostedpi/{hostedpi_version}",
-        }
+        self._refresh_at = self._token_expiry
+        self._lock = Lock()
+        self._refresher: Union[Thread, None] = None
+        self._stopped = Event()
+        self._authorization = ""
+        self._refreshes = 0
+        # keep the default headers, so responses are still compressed
+        api_session.headers.update({"User-Agent": f"python-hostedpi/{hostedpi_version}"})
+        api_session.auth = self
         self._auth_session = auth_session
         self._api_session = api_session
 
     def __repr__(self):
         return f"<MythicAuth id={self._settings.id}>"
 
+    def __call__(self, request: PreparedRequest) -> PreparedRequest:
+        # reading the token refreshes it if needed, which also updates the header value
+        self.token
+        request.headers["Authorization"] = self._authorization
+        request.register_hook("response", self._handle_401)
+        return request
+
     @property
     def session(self) -> Session:
         """
-        The session used to make requests to the Hosted Pi API
+        The session used to make requests to the Hosted Pi API. Requests made with it are
+        authenticated when they are sent.
         """
-        self._api_session.headers["Authorization"] = f"Bearer {self.token}"
         return self._api_session
 
+    @property
+    def refreshes(self) -> int:
+        """
+        The number of access tokens fetched from the authentication server, not counting tokens
+        loaded from the token cache
+        """
+        return self._refreshes
+
     @property
     def settings(self) -> Settings:
         """
@@ -90,27 +151,141 @@ class MythicAuth:
     def token(self) -> str:
         """
         The access token used to authenticate requests to the API. The token is automatically
-        refreshed when it expires.
+        refreshed shortly before it expires.
+
+        :raises MythicAuthenticationError:
+            If the token needs refreshing, and authentication fails
+        """
+        if self._token_is_fresh():
+            return self._token
+        with self._lock:
+            # another thread may have refreshed the token while we were waiting for the lock
+            if not self._token_is_fresh() and not self._load_cached_token():
+                self._refresh_token()
+        return self._token
+
+    def close(self):
         """
-        if self._token is None or datetime.now() > self._token_expiry:
-            data = {"grant_type": "client_credentials"}
-            creds = (self.settings.id, self.settings.secret.get_secret_value())
-            logger.debug("Authenticating", client_id=self.settings.id)
+        Stop the background token refresher, if it is running. The token is refreshed in the
+        foreground from then on.
+        """
+        self._stopped.set()
+        refresher = self._refresher
+        if refresher is not None:
+            refresher.join()
+            self._refresher = None
+
+    def _handle_401(self, response: Response, **kwargs) -> Response:
+        if response.status_code != 401:
+            return response
+        rejected = response.request.headers.get("Authorization")
+        logger.debug("Token rejected", url=response.url)
+        with self._lock:
+            # another thread may already have replaced the rejected token
+            if rejected == self._authorization:
+                self._discard_token()
+        request = response.request.copy()
+        # the request is only retried once, so the retry's response is not handled again
+        request.hooks["response"] = [
+            hook for hook in request.hooks["response"] if hook != self._handle_401
+        ]
+        request.headers["Authorization"] = f"Bearer {self.token}"
+        # release the connection before sending the request again
+        response.content
+        response.close()
+        retry = response.connection.send(request, **kwargs)
+        retry.history.append(response)
+        retry.request = request
+        return retry
+
+    def _discard_token(self):
+        if self._token_cache is not None:
+            cached = self._token_cache.load()
+            # another process may have cached a new token already
+            if cached is not None and cached[0] == self._token:
+                self._token_cache.clear()
+        self._token = None
+        self._authorization = ""
+        self._token_expiry = self._refresh_at = datetime.now()
+
+    def _token_is_fresh(self) -> bool:
+        if self._token is None:
+            return False
+        now = datetime.now()
+        if now < self._refresh_at:
+            return True
+        # the background refresher will replace the token before it expires
+        return self._refresher is not None and now < self._token_expiry
+
+    def _refresh_token(self):
+        data = {"grant_type": "client_credentials"}
+        creds = (self.settings.id, self.settings.secret.get_secret_value())
+        logger.debug("Authenticating", client_id=self.settings.id)
+        with start_span("hostedpi.auth.refresh", {"hostedpi.client_id": self.settings.id}) as span:
             response = self._auth_session.post(str(self.settings.auth_url), auth=creds, data=data)
+            span.set_attribute("http.response.status_code", response.status_code)
 
-            try:
-                response.raise_for_status()
-            except HTTPError as exc:
-                logger.debug("Failed to authenticate", error=str(exc))
-                raise MythicAuthenticationError("Failed to authenticate") from exc
-
-            try:
-                body = AuthResponse.model_validate(response.json())
-            except ValidationError as exc:
-                logger.debug("Failed to validate auth response", error=str(exc))
-                raise MythicAuthenticationError("Failed to validate auth response") from exc
-
-            self._token = body.access_token
-            self._token_expiry = datetime.now() + timedelta(seconds=body.expires_in)
-            logger.debug("Got token", expires_in=body.expires_in, expires_at=self._token_expiry)
-        return self._token
+        try:
+            response.raise_for_status()
+        except HTTPError as exc:
+            logger.debug("Failed to authenticate", error=str(exc))
+            raise MythicAuthenticationError("Failed to authenticate") from exc
+
+        try:
+            body = AuthResponse.model_validate(response.json())
+        except ValidationError as exc:
+            logger.debug("Failed to validate auth response", error=str(exc))
+            raise MythicAuthenticationError("Failed to validate auth response") from exc
+
+        now = datetime.now()
+        # refresh early, but never before half of the token's lifetime has passed
+        refresh_in = max(body.expires_in - self.settings.token_refresh_skew, body.expires_in / 2)
+        expiry = now + timedelta(seconds=body.expires_in)
+        self._set_token(body.access_token, expiry, now + timedelta(seconds=refresh_in))
+        self._refreshes += 1
+        logger.debug("Got token", expires_in=body.expires_in, expires_at=expiry)
+        if self._token_cache is not None:
+            self._token_cache.save(body.access_token, expiry)
+
+    def _load_cached_token(self) -> bool:
+        if self._token_cache is None:
+            return False
+        cached = self._token_cache.load()
+        if cached is None:
+            return False
+        token, expiry = cached
+        refresh_at = expiry - timedelta(seconds=self.settings.token_refresh_skew)
+        if datetime.now() >= refresh_at:
+            return False
+        self._set_token(token, expiry, refresh_at)
+        logger.debug("Using cached token", expires_at=expiry)
+        return True
+
+    def _set_token(self, token: str, expiry: datetime, refresh_at: datetime):
+        self._authorization = f"Bearer {token}"
+        self._token = token
+        self._token_expiry = expiry
+        self._refresh_at = refresh_at
+        background = self.settings.token_background_refresh and not self._stopped.is_set()
+        if background and self._refresher is None:
+            self._refresher = Thread(target=self._refresh_loop, daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        try:
+            while True:
+                delay = (self._refresh_at - datetime.now()).total_seconds()
+                if self._stopped.wait(max(delay, 0)):
+                    return
+                try:
+                    with self._lock:
+                        if datetime.now() >= self._refresh_at and not self._load_cached_token():
+                            self._refresh_token()
+                except (MythicAuthenticationError, RequestException) as exc:
+                    logger.warning("Background token refresh failed", error=str(exc))
+                    if self._stopped.wait(BACKGROUND_RETRY_DELAY):
+                        return
+        finally:
+            # if the refresher stops for any reason, the token is refreshed in the foreground
+            if self._refresher is current_thread():
+                self._refresher = None
@@ -0,0 +1,93 @@
+from threading import Lock
+from time import monotonic
+from typing import Union
+
+from .models.mythic.responses import PiInfo
+
+
+class InfoCache:
+    """
+    A thread-safe cache of :class:`~hostedpi.models.mythic.responses.PiInfo` objects keyed by Pi
+    name, where each entry expires *ttl* seconds after it was stored. One cache is shared by all
+    :class:`~hostedpi.pi.Pi` objects belonging to a :class:`~hostedpi.picloud.PiCloud`, so any Pi
+    object for a given server benefits from info fetched by another.
+
+    :type ttl: float
+    :param ttl:
+        The number of seconds cached info remains valid for. A value of 0 disables caching.
+    """
+
+    def __init__(self, ttl: float = 10):
+        self._ttl = ttl
+        self._entries: dict[str, tuple[float, PiInfo]] = {}
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def __repr__(self):
+        return f"<InfoCache ttl={self._ttl} entries={len(self._entries)}>"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def ttl(self) -> float:
+        """
+        The number of seconds cached info remains valid for
+        """
+        return self._ttl
+
+    @property
+    def hits(self) -> int:
+        """
+        The number of lookups which were answered from the cache
+        """
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """
+        The number of lookups which were not in the cache, or had expired
+        """
+        return self._misses
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        The proportion of lookups which were answered from the cache, or 0 if there have been no
+        lookups yet
+        """
+        lookups = self._hits + self._misses
+        return self._hits / lookups if lookups else 0.0
+
+    def get(self, name: str) -> Union[PiInfo, None]:
+        """
+        Return the cached info for the Pi *name*, or ``None`` if it is not cached or has expired
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                stored_at, info = entry
+                if monotonic() - stored_at < self._ttl:
+                    self._hits += 1
+                    return info
+                del self._entries[name]
+            self._misses += 1
+
+    def set(self, name: str, info: PiInfo):
+        """
+        Store *info* for the Pi *name*
+        """
+        with self._lock:
+            self._entries[name] = (monotonic(), info)
+
+    def invalidate(self, name: Union[str, None] = None):
+        """
+        Discard the cached info for the Pi *name*, or for all Pis if *name* is ``None``. This should
+        be called after any request which changes the state of a Pi.
+        """
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
@@ -1,6 +1,3 @@
-import rich
-from rich.console import Console
-from rich.live import Live
 from typer import Exit, Typer
 
 from ..exc import HostedPiException
@@ -10,7 +7,6 @@ from .ssh import ssh_app
 
 app = Typer(name="hostedpi", no_args_is_help=True)
 app.add_typer(ssh_app, name="ssh", no_args_is_help=True, help="SSH access management commands")
-console = Console()
 
 
 @app.command("connect", hidden=True)
@@ -33,6 +29,8 @@ def do_images(
     """
     List operating system images available for Raspberry Pi servers
     """
+    import rich
+
     cloud = utils.get_picloud()
     images = cloud.get_operating_systems(model=model)
     table = utils.make_table("ID", "Name")
@@ -64,6 +62,7 @@ def do_table(
     names: arguments.server_names = None,
     filter: options.filter_pattern_pi = None,
     full: options.full_table = False,
+    workers: options.workers = None,
 ):
     """
     List Raspberry Pi server information in a table
@@ -71,7 +70,7 @@ def do_table(
     pis = utils.get_pis(names, filter)
 
     if full:
-        utils.full_pis_table(pis)
+        utils.full_pis_table(pis, max_workers=workers)
     else:
         utils.short_pis_table(pis)
 
@@ -90,6 +89,7 @@ def do_create(
     ssh_import_github: options.ssh_import_github = None,
     ssh_import_launchpad: options.ssh_import_launchpad = None,
     full: options.full_table = False,
+    workers: options.workers = None,
 ):
     """
     Provision one or more new Raspberry Pi servers
@@ -109,114 +109,87 @@ def do_create(
     ssh_import_gh_set = set(ssh_import_github) if ssh_import_github is not None else None
     ssh_import_lp_set = set(ssh_import_launchpad) if ssh_import_launchpad is not None else None
 
-    if names:
-        for name in names:
-            try:
-                utils.create_pi(
-                    name=name,
-                    model=model,
-                    disk=disk,
-                    memory_gb=memory,
-                    cpu_speed=cpu_speed,
-                    os_image=os_image,
-                    wait=wait,
-                    ssh_key_path=ssh_key_path,
-                    github_usernames=ssh_import_gh_set,
-                    launchpad_usernames=ssh_import_lp_set,
-                    full=full,
-                )
-            except HostedPiException as exc:
-                utils.print_exc(exc)
-                continue
-
-    if number:
-        for n in range(number):
-            try:
-                utils.create_pi(
-                    model=model,
-                    disk=disk,
-                    memory_gb=memory,
-                    cpu_speed=cpu_speed,
-                    os_image=os_image,
-                    wait=wait,
-                    ssh_key_path=ssh_key_path,
-                    github_usernames=ssh_import_gh_set,
-                    launchpad_usernames=ssh_import_lp_set,
-                    full=full,
-                )
-            except HostedPiException as exc:
-                utils.print_exc(exc)
-                continue
+    try:
+        utils.create_pis(
+            names=names,
+            number=number,
+            model=model,
+            disk=disk,
+            memory_gb=memory,
+            cpu_speed=cpu_speed,
+            os_image=os_image,
+            wait=wait,
+            ssh_key_path=ssh_key_path,
+            github_usernames=ssh_import_gh_set,
+            launchpad_usernames=ssh_import_lp_set,
+            full=full,
+            max_workers=workers,
+        )
+    except HostedPiException as exc:
+        utils.print_exc(exc)
 
 
 @app.command("status")
-def do_status(names: arguments.server_names = None, filter: options.filter_pattern_pi = None):
+def do_status(
+    names: arguments.server_names = None,
+    filter: options.filter_pattern_pi = None,
+    watch: options.watch = False,
+    interval: options.interval = 5,
+    workers: options.workers = None,
+):
     """
     Get the current status of one or more Raspberry Pi servers
     """
     pis = utils.get_pis(names, filter)
-    table = utils.make_table("Name", "Status")
-    with Live(table, console=console, refresh_per_second=4):
-        for pi in pis:
-            try:
-                table.add_row(pi.name, pi.status)
-            except HostedPiException as exc:
-                utils.print_exc(exc)
-                table.add_row(pi.name, "Error")
-                continue
+    try:
+        utils.status_table(pis, watch=watch, interval=interval, max_workers=workers)
+    except KeyboardInterrupt:
+        pass
 
 
 @app.command("on")
-def do_on(names: arguments.server_names = None, filter: options.filter_pattern_pi = None):
+def do_on(
+    names: arguments.server_names = None,
+    filter: options.filter_pattern_pi = None,
+    workers: options.workers = None,
+):
     """
     Power on one or more Raspberry Pi servers
     """
     pis = utils.get_pis(names, filter)
-    table = utils.make_table("Name", "Status")
-    with Live(table, console=console, refresh_per_second=4):
-        for pi in pis:
-            try:
-                pi.on()
-            except HostedPiException as exc:
-                utils.print_exc(exc)
-                table.add_row(pi.name, "Error")
-                continue
-            table.add_row(pi.name, "Powering on")
+    cloud = utils.get_picloud()
+    results = cloud.bulk_power(pis, on=True, max_workers=workers)
+    utils.bulk_results_table(results, success="Powering on")
 
 
 @app.command("off")
-def do_off(names: arguments.server_names = None, filter: options.filter_pattern_pi = None):
+def do_off(
+    names: arguments.server_names = None,
+    filter: options.filter_pattern_pi = None,
+    workers: options.workers = None,
+):
     """
     Power off one or more Raspberry Pi servers
     """
     pis = utils.get_pis(names, filter)
-    table = utils.make_table("Name", "Status")
-    with Live(table, console=console, refresh_per_second=4):
-        for pi in pis:
-            try:
-                pi.off()
-            except HostedPiException as exc:
-                utils.print_exc(exc)
-                table.add_row(pi.name, "Error")
-                continue
-            table.add_row(pi.name, "Powering off")
+    cloud = utils.get_picloud()
+    results = cloud.bulk_power(pis, on=False, max_workers=workers)
+    utils.bulk_results_table(results, success="Powering off")
 
 
 @app.command("reboot")
-def do_reboot(names: arguments.server_names = None, filter: options.filter_pattern_pi = None):
+def do_reboot(
+    names: arguments.server_names = None,
+    filter: options.filter_pattern_pi = None,
+    workers: options.workers = None,
+):
     """
     Reboot one or more Raspberry Pi servers
     """
     pis = utils.get_pis(names, filter)
-    table = utils.make_table("Name", "Status")
-    with Live(table, console=console, refresh_per_second=4):
-        for pi in pis:
-            try:
-                pi.reboot()
-            except HostedPiException as exc:
-                utils.print_exc(exc)
-                continue
-            table.add_row(pi.name, "Rebooting")
+    cloud = utils.get_picloud()
+    results = cloud.bulk_reboot(pis, max_workers=workers)
+    utils.bulk_results_table(results, success="Rebooting")
 
 
 @app.command("rm", hidden=True)
@@ -225,6 +198,7 @@ def do_cancel(
     names: arguments.server_names = None,
     filter: options.filter_pattern_pi = None,
     yes: options.yes = False,
+    workers: options.workers = None,
 ):
     """
     Unprovision one or more Raspberry Pi servers
@@ -238,13 +212,6 @@ def do_cancel(
         yn = input(f"Are you sure you want to cancel {pis_str}? [y/N] ")
         if yn.lower() != "y":
             raise Exit(1)
-    table = utils.make_table("Name", "Status")
-    with Live(table, console=console, refresh_per_second=4):
-        for pi in pis:
-            try:
-                pi.cancel()
-            except HostedPiException as exc:
-                table.add_row(pi.name, "Failed to cancel")
-                utils.print_exc(exc)
-                continue
-            table.add_row(pi.name, "Cancelled")
+    cloud = utils.get_picloud()
+    results = cloud.bulk_cancel(pis, max_workers=workers)
+    utils.bulk_results_table(results, success="Cancelled", failure="Failed to cancel")
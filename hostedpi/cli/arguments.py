@@ -13,3 +13,11 @@ images_model = Annotated[
     int, Argument(help="Raspberry Pi model number to list images for", min=3, max=4)
 ]
 ssh_key_label = Annotated[str, Argument(help="Label for the SSH key, e.g. 'ben@finn'")]
+ssh_key_manifest = Annotated[
+    Path,
+    Argument(help="Path to a TOML manifest of the SSH keys each Raspberry Pi server should have"),
+]
+ssh_key_query = Annotated[
+    str,
+    Argument(help="Fingerprint, label or import source of the SSH key, e.g. 'gh:bennuttall'"),
+]
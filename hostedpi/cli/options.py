@@ -22,6 +22,12 @@ ssh_import_launchpad = Annotated[
     Union[list[str], None],
     Option("--launchpad", "--lp", help="Launchpad usernames to source SSH keys from"),
 ]
+refresh_keys = Annotated[
+    bool, Option("--refresh", help="Fetch SSH keys again rather than using cached keys")
+]
+dry_run = Annotated[
+    bool, Option("--dry-run", help="Show the changes that would be made without making them")
+]
 ipv6 = Annotated[bool, Option(help="Use the IPv6 connection method")]
 yes = Annotated[bool, Option("--yes", "-y", help="Proceed without confirmation")]
 number = Annotated[Union[int, None], Option(help="Number of Raspberry Pi servers to create", min=1)]
@@ -32,3 +38,8 @@ filter_pattern_pi = Annotated[
 filter_pattern_images = Annotated[
     Union[str, None], Option(help="Search pattern for filtering image names")
 ]
+workers = Annotated[
+    Union[int, None], Option(help="Maximum number of concurrent API requests", min=1)
+]
+watch = Annotated[bool, Option(help="Keep polling and updating the table until interrupted")]
+interval = Annotated[float, Option(help="Number of seconds between polls when watching", min=1)]
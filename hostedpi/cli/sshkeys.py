@@ -1,17 +1,10 @@
-import rich
-from rich.console import Console
-from rich.live import Live
-from rich.table import Table
 from typer import Exit, Typer
 
 from ..exc import HostedPiException
-from ..models.sshkeys import SSHKeySources
-from ..utils import remove_imported_ssh_keys, remove_ssh_keys_by_label
 from . import arguments, options, utils
 
 
 keys_app = Typer()
-console = Console()
 
 
 @keys_app.command("count")
@@ -19,9 +12,11 @@ def do_count(names: arguments.server_names = None, filter: options.filter_patter
     """
     Count the number of SSH keys on one or more Raspberry Pi servers
     """
+    from rich.live import Live
+
     pis = utils.get_pis(names, filter)
     table = utils.make_table("Name", "Keys")
-    with Live(table, console=console, refresh_per_second=4):
+    with Live(table, console=utils.get_console(), refresh_per_second=4):
         for pi in pis:
             try:
                 n = len(pi.ssh_keys)
@@ -63,12 +58,7 @@ def do_list(name: arguments.server_name):
         utils.print_warn(f"No SSH keys found on {pi.name}")
         return
     for key in keys:
-        try:
-            parts = key.split()
-            print(" ".join(parts[2:]))
-        except HostedPiException as exc:
-            utils.print_exc(exc)
-            continue
+        print(key.comment)
 
 
 @keys_app.command("table")
@@ -76,6 +66,9 @@ def do_table(name: arguments.server_name, filter: options.filter_pattern_pi = No
     """
     List the SSH keys on a Raspberry Pi server in a table format
     """
+    import rich
+    from rich.table import Table
+
     pi = utils.get_pi(name)
     if pi is None:
         utils.print_error(f"Pi '{name}' not found")
@@ -84,21 +77,115 @@ def do_table(name: arguments.server_name, filter: options.filter_pattern_pi = No
     table = Table(*headers)
 
     for key in pi.ssh_keys:
-        if filter and not filter.lower() in key.lower():
+        if filter and not filter.lower() in str(key).lower():
             continue
-        label = ""
-        note = ""
-        parts = key.split(" ")
-        key_type = parts[0]
-        if len(parts) > 1:
-            if "@" in parts[2]:
-                label = parts[2]
-                note = " ".join(parts[3:]).removeprefix("# ")
-            else:
-                note = " ".join(parts[2:]).removeprefix("# ")
-
-        table.add_row(key_type, label, note)
+        table.add_row(key.algorithm, key.label or "", key.note)
+
+    rich.print(table)
+
+
+@keys_app.command("where")
+def do_where(
+    query: arguments.ssh_key_query,
+    names: arguments.server_names = None,
+    filter: options.filter_pattern_pi = None,
+    workers: options.workers = None,
+):
+    """
+    Find the Raspberry Pi servers an SSH key is on, by its fingerprint, label or import source
+    """
+    import rich
+
+    index = utils.get_key_index(names, filter, max_workers=workers)
+    matches = index.where(query)
+    if not matches:
+        utils.print_warn(f"No keys matching '{query}' found")
+        return
+    table = utils.make_table("Name", "Type", "Label", "Note", "Fingerprint")
+    for name, keys in matches.items():
+        for key in sorted(keys, key=str):
+            table.add_row(name, key.algorithm, key.label or "", key.note, key.fingerprint)
+    rich.print(table)
+
+
+@keys_app.command("audit")
+def do_audit(
+    names: arguments.server_names = None,
+    filter: options.filter_pattern_pi = None,
+    workers: options.workers = None,
+):
+    """
+    List every SSH key on one or more Raspberry Pi servers, and the servers each is on
+    """
+    import rich
 
+    index = utils.get_key_index(names, filter, max_workers=workers)
+    usage = index.audit()
+    if not usage:
+        utils.print_warn("No SSH keys found")
+        return
+    table = utils.make_table("Fingerprint", "Type", "Labels", "Imported from", "Servers")
+    for key in usage:
+        table.add_row(
+            key.fingerprint,
+            key.algorithm,
+            ", ".join(sorted(key.labels)),
+            ", ".join(sorted(key.import_sources)),
+            ", ".join(sorted(key.pis)),
+        )
+    rich.print(table)
+
+
+@keys_app.command("sync")
+def do_sync(
+    manifest: arguments.ssh_key_manifest,
+    dry_run: options.dry_run = False,
+    refresh: options.refresh_keys = False,
+    workers: options.workers = None,
+):
+    """
+    Make the SSH keys on Raspberry Pi servers match the keys listed for each in a manifest
+    """
+    import rich
+
+    from ..exc import HostedPiKeyImportError
+    from ..models.sshkeys import SSHKeyManifest
+
+    try:
+        sources = SSHKeyManifest.model_validate(utils.load_toml(manifest))
+    except (OSError, ValueError) as exc:
+        utils.print_error(f"Invalid manifest {manifest}: {exc}")
+        raise Exit(1)
+    # syncing with keys missing would remove them, so a failed import stops the sync
+    try:
+        desired = sources.collect(cache=utils.get_key_cache(), refresh=refresh)
+    except HostedPiKeyImportError as exc:
+        for user, error in exc.errors.items():
+            utils.print_error(f"Failed to import keys for {user}: {error}")
+        raise Exit(1)
+    cloud = utils.get_picloud()
+    results = cloud.sync_ssh_keys(desired, dry_run=dry_run, max_workers=workers)
+    table = utils.make_table("Name", "Added", "Removed", "Updated", "Unchanged", "Status")
+    for result in results.values():
+        if not result.ok:
+            utils.print_exc(result.error)
+            table.add_row(result.name, "", "", "", "", "Error")
+            continue
+        diff = result.value
+        if not diff.changed:
+            status = "Up to date"
+        elif dry_run:
+            status = "Would update"
+        else:
+            status = "Updated"
+        table.add_row(
+            result.name,
+            str(len(diff.added)),
+            str(len(diff.removed)),
+            str(len(diff.updated)),
+            str(diff.unchanged),
+            status,
+        )
     rich.print(table)
 
 
@@ -111,6 +198,8 @@ def do_add(
     """
     Add an SSH key to one or more Raspberry Pi servers
     """
+    from ..models.sshkeys import SSHKeySources
+
     pis = utils.get_pis(names, filter)
     ssh_keys = SSHKeySources(ssh_key_path=ssh_key_path)
     for pi in pis:
@@ -168,6 +257,8 @@ def do_remove(
     """
     Remove an SSH key from one or more Raspberry Pi servers
     """
+    from ..utils import remove_ssh_keys_by_label
+
     pis = utils.get_pis(names, filter)
     for pi in pis:
         keys = pi.ssh_keys
@@ -212,18 +303,32 @@ def do_import(
     filter: options.filter_pattern_pi = None,
     github: options.ssh_import_github = None,
     launchpad: options.ssh_import_launchpad = None,
+    refresh: options.refresh_keys = False,
 ):
     """
     Import SSH keys from GitHub and/or Launchpad to one or more Raspberry Pi servers
     """
+    from ..exc import HostedPiKeyImportError
+    from ..models.sshkeys import SSHKeySources
+
     if not github and not launchpad:
         utils.print_error("You must specify at least one source to import from")
         raise Exit(1)
     pis = utils.get_pis(names, filter)
-    ssh_keys = SSHKeySources(
+    sources = SSHKeySources(
         github_usernames=set(github) if github else None,
         launchpad_usernames=set(launchpad) if launchpad else None,
     )
+    # collect the keys once, rather than once per Pi
+    try:
+        keys = sources.collect(cache=utils.get_key_cache(), refresh=refresh)
+    except HostedPiKeyImportError as exc:
+        for user, error in exc.errors.items():
+            utils.print_warn(f"Failed to import keys for {user}: {error}")
+        if not exc.keys:
+            raise Exit(1)
+        keys = exc.keys
+    ssh_keys = SSHKeySources(ssh_keys=keys)
     for pi in pis:
         keys_before = len(pi.ssh_keys)
         try:
@@ -251,6 +356,8 @@ def do_unimport(
     """
     Remove imported SSH keys from one or more Raspberry Pi servers
     """
+    from ..utils import remove_imported_ssh_keys
+
     if not github and not launchpad:
         utils.print_error("You must specify at least one source to unimport from")
         raise Exit(1)
@@ -1,55 +1,81 @@
+import sys
 from functools import cache
 from pathlib import Path
-from typing import Literal, Union
-
-import rich
-from pydantic import ValidationError
-from rich.console import Console
-from rich.live import Live
-from rich.table import Table
-from structlog import get_logger
+from time import sleep
+from typing import TYPE_CHECKING, Literal, Union
 
 from ..exc import HostedPiValidationError
-from ..models.specs import Pi3ServerSpec, Pi4ServerSpec
-from ..models.sshkeys import SSHKeySources
-from ..pi import Pi
-from ..picloud import PiCloud
+from ..logger import get_logger
 from . import format
 
 
+if TYPE_CHECKING:
+    from rich.console import Console
+    from rich.table import Table
+
+    from ..keycache import KeyCache
+    from ..keyindex import KeyIndex
+    from ..models.results import PiResult
+    from ..models.specs import Pi3ServerSpec, Pi4ServerSpec
+    from ..pi import Pi
+    from ..picloud import PiCloud
+
+
+# rich and the API client are imported by the functions which use them, so that the CLI starts
+# quickly, and shell completion and --help do not import them at all
 logger = get_logger()
-console = Console()
 
 
-def make_table(*headers: str) -> Table:
+@cache
+def get_console() -> "Console":
+    from rich.console import Console
+
+    return Console()
+
+
+def make_table(*headers: str) -> "Table":
+    from rich.table import Table
+
     table = Table(show_header=True)
     for header in headers:
         table.add_column(header)
     return table
 
 
-def validate_server_spec(model: Literal[3, 4], data: dict) -> Union[Pi3ServerSpec, Pi4ServerSpec]:
+def validate_server_spec(
+    model: Literal[3, 4], data: dict
+) -> Union["Pi3ServerSpec", "Pi4ServerSpec"]:
+    from ..models.specs import Pi3ServerSpec, Pi4ServerSpec
+
     if model == 3:
         return Pi3ServerSpec.model_validate(data)
     return Pi4ServerSpec.model_validate(data)
 
 
 @cache
-def get_picloud() -> PiCloud:
+def get_picloud() -> "PiCloud":
+    from ..picloud import PiCloud
+
     return PiCloud()
 
 
-def get_pi(name: str) -> Union[Pi, None]:
+def get_key_cache() -> Union["KeyCache", None]:
+    from ..keycache import get_key_cache
+
+    return get_key_cache(get_picloud()._auth.settings)
+
+
+def get_pi(name: str) -> Union["Pi", None]:
     cloud = get_picloud()
-    return cloud.pis.get(name)
+    return cloud.get_pi(name)
 
 
-def get_all_pis() -> list[Pi]:
+def get_all_pis() -> list["Pi"]:
     cloud = get_picloud()
     return list(cloud.pis.values())
 
 
-def get_pis(names: Union[list[str], None], filter: Union[str, None] = None) -> list[Pi]:
+def get_pis(names: Union[list[str], None], filter: Union[str, None] = None) -> list["Pi"]:
     all_pis = get_all_pis()
     if not names:
         return filter_pis(all_pis, filter)
@@ -61,11 +87,36 @@ def get_pis(names: Union[list[str], None], filter: Union[str, None] = None) -> l
     return filter_pis(pis_found, filter)
 
 
-def filter_pis(pis: list[Pi], filter: Union[str, None]) -> list[Pi]:
+def load_toml(path: Path) -> dict:
+    if sys.version_info >= (3, 11):
+        import tomllib
+    else:
+        import tomli as tomllib
+
+    with path.open("rb") as f:
+        return tomllib.load(f)
+
+
+def get_key_index(
+    names: Union[list[str], None],
+    filter: Union[str, None] = None,
+    *,
+    max_workers: Union[int, None] = None,
+) -> "KeyIndex":
+    cloud = get_picloud()
+    index = cloud.get_key_index(get_pis(names, filter), max_workers=max_workers)
+    for exc in index.errors.values():
+        print_exc(exc)
+    return index
+
+
+def filter_pis(pis: list["Pi"], filter: Union[str, None]) -> list["Pi"]:
     return [pi for pi in pis if filter is None or filter.lower() in pi.name.lower()]
 
 
-def short_pis_table(pis: list[Pi]):
+def short_pis_table(pis: list["Pi"]):
+    import rich
+
     table = make_table("Name", "Model", "Memory", "CPU Speed")
 
     for pi in pis:
@@ -78,37 +129,123 @@ def short_pis_table(pis: list[Pi]):
     rich.print(table)
 
 
-def full_pis_table(pis: list[Pi]):
-    headers = [
-        "Name",
-        "Model",
-        "Memory",
-        "CPU Speed",
-        "NIC Speed",
-        "Disk size",
-        "Status",
-        "Initialised keys",
-        "IPv4 SSH port",
+FULL_TABLE_HEADERS = [
+    "Name",
+    "Model",
+    "Memory",
+    "CPU Speed",
+    "NIC Speed",
+    "Disk size",
+    "Status",
+    "Initialised keys",
+    "IPv4 SSH port",
+]
+
+
+def full_pis_table(pis: list["Pi"], *, max_workers: Union[int, None] = None):
+    from rich.live import Live
+
+    # rows start as placeholders and are filled in as each Pi's info arrives, so the table keeps
+    # the order of pis however the requests complete
+    pending = ["[dim]...[/dim]"] * (len(FULL_TABLE_HEADERS) - 1)
+    rows = {pi.name: [pi.name, *pending] for pi in pis}
+    cloud = get_picloud()
+
+    with Live(make_full_table(rows), console=get_console(), refresh_per_second=4) as live:
+        for result in cloud.imap(full_table_row, pis, max_workers=max_workers):
+            if result.ok:
+                rows[result.name] = result.value
+            else:
+                print_exc(result.error)
+                rows[result.name] = [result.name, *["Error"] * len(pending)]
+            live.update(make_full_table(rows))
+
+
+def make_full_table(rows: dict[str, list[str]]) -> "Table":
+    from rich.table import Table
+
+    table = Table(*FULL_TABLE_HEADERS)
+    for row in rows.values():
+        table.add_row(*row)
+    return table
+
+
+def full_table_row(pi: "Pi") -> list[str]:
+    from ..utils import get_status
+
+    # fetch the info once and read every column from it, rather than via the Pi's properties
+    info = pi.info
+    return [
+        pi.name,
+        info.model_full or "",
+        format.memory(pi.memory_gb),
+        format.cpu_speed(pi.cpu_speed),
+        format.nic_speed(info.nic_speed),
+        format.disk_size(info.disk_size),
+        get_status(info),
+        format.boolean(info.initialised_keys),
+        str(info.ssh_port),
     ]
-    table = Table(*headers)
-
-    with Live(table, console=console, refresh_per_second=4):
-        for pi in pis:
-            table.add_row(
-                pi.name,
-                pi.model_full,
-                format.memory(pi.memory_gb),
-                format.cpu_speed(pi.cpu_speed),
-                format.nic_speed(pi.nic_speed),
-                format.disk_size(pi.disk_size),
-                pi.status,
-                format.boolean(pi.initialised_keys),
-                str(pi.ipv4_ssh_port),
-            )
-
-
-def create_pi(
+
+
+def status_table(
+    pis: list["Pi"], *, watch: bool, interval: float, max_workers: Union[int, None] = None
+):
+    from rich.live import Live
+    from rich.markup import escape
+
+    statuses = {pi.name: "[dim]...[/dim]" for pi in pis}
+    cloud = get_picloud()
+
+    with Live(make_status_table(statuses), console=get_console(), auto_refresh=False) as live:
+        while True:
+            for result in cloud.imap(get_pi_status, pis, max_workers=max_workers):
+                if result.ok:
+                    status = result.value
+                else:
+                    status = f"[red]Error: {escape(str(result.error))}[/red]"
+                # only redraw the table when a status has actually changed, and only report an
+                # error when it first appears, rather than on every refresh while watching
+                if statuses[result.name] != status:
+                    if not result.ok:
+                        print_exc(result.error)
+                    statuses[result.name] = status
+                    live.update(make_status_table(statuses), refresh=True)
+            if not watch:
+                break
+            sleep(interval)
+            cloud.info_cache.invalidate()
+
+
+def make_status_table(statuses: dict[str, str]) -> "Table":
+    table = make_table("Name", "Status")
+    for name, status in statuses.items():
+        table.add_row(name, status)
+    return table
+
+
+def get_pi_status(pi: "Pi") -> str:
+    return pi.status
+
+
+def bulk_results_table(results: dict[str, "PiResult"], *, success: str, failure: str = "Error"):
+    import rich
+
+    table = make_table("Name", "Status")
+
+    for result in results.values():
+        if result.ok:
+            table.add_row(result.name, success)
+        else:
+            print_exc(result.error)
+            table.add_row(result.name, failure)
+    rich.print(table)
+
+
+def create_pis(
     *,
+    names: Union[list[str], None],
+    number: Union[int, None],
     model: int,
     disk: int,
     memory_gb: Union[int, None],
@@ -119,8 +256,13 @@ def create_pi(
     github_usernames: Union[set[str], None],
     launchpad_usernames: Union[set[str], None],
     full: bool,
-    name: Union[str, None] = None,
+    max_workers: Union[int, None] = None,
 ):
+    from pydantic import ValidationError
+    from rich.progress import Progress
+
+    from ..models.sshkeys import SSHKeySources
+
     data = {
         "disk": disk,
         "memory_gb": memory_gb,
@@ -140,17 +282,40 @@ def create_pi(
     except ValidationError as exc:
         raise HostedPiValidationError(f"Invalid server spec: {exc}") from exc
 
+    if names:
+        specs = {name: spec for name in names}
+    else:
+        specs = [spec] * number
+
     cloud = get_picloud()
-    pi = cloud.create_pi(name=name, spec=spec, ssh_keys=ssh_keys, wait=wait)
+    description = "Provisioning" if wait else "Sending requests"
+    with Progress(console=get_console(), transient=True) as progress:
+        task = progress.add_task(description, total=len(specs))
+        results = cloud.create_pis(
+            specs,
+            ssh_keys=ssh_keys,
+            wait=wait,
+            max_workers=max_workers,
+            callback=lambda result: progress.advance(task),
+        )
+
+    pis = []
+    for result in results:
+        if result.ok:
+            pis.append(result.value)
+        else:
+            print_exc(result.error)
 
+    if not pis:
+        return
     if full:
-        print_success("Server provisioned")
-        full_pis_table([pi])
+        print_success(f"{len(pis)} server(s) provisioned")
+        full_pis_table(pis, max_workers=max_workers)
     elif wait:
-        print_success("Server provisioned")
-        short_pis_table([pi])
+        print_success(f"{len(pis)} server(s) provisioned")
+        short_pis_table(pis)
     else:
-        print_success("Server provision request accepted")
+        print_success(f"{len(pis)} server provision request(s) accepted")
 
 
 def print_exc(exc: Exception):
@@ -159,12 +324,12 @@ def print_exc(exc: Exception):
 
 
 def print_error(error: str):
-    console.print(f"[red]{error}[/red]")
+    get_console().print(f"[red]{error}[/red]")
 
 
 def print_success(message: str):
-    console.print(f"[green]{message}[/green]")
+    get_console().print(f"[green]{message}[/green]")
 
 
 def print_warn(message: str):
-    console.print(f"[yellow]{message}[/yellow]")
+    get_console().print(f"[yellow]{message}[/yellow]")
@@ -0,0 +1,219 @@
+import urllib.parse
+from typing import Any, Literal, Union
+
+from pydantic import BaseModel, ConfigDict
+
+from .exc import (
+    HostedPiException,
+    HostedPiInvalidParametersError,
+    HostedPiNameExistsError,
+    HostedPiNotAuthorizedError,
+    HostedPiOutOfStockError,
+    HostedPiProvisioningError,
+)
+from .models.mythic.responses import (
+    PiImagesResponse,
+    PiInfo,
+    ServersResponse,
+    SpecsResponse,
+    SSHKeysResponse,
+)
+
+
+class Endpoint(BaseModel):
+    """
+    The declaration of a Hosted Pi API endpoint: how to build its URL, which status codes map to
+    which exceptions, and what the response contains. Requests to an endpoint are made through a
+    :class:`~hostedpi.pipeline.Pipeline` (or :class:`~hostedpi.aio.pipeline.AsyncPipeline`), which
+    uses the declaration to handle the response.
+
+    :type name: str
+    :param name:
+        A short identifier for the endpoint, used in logs and by middleware
+
+    :type method: str
+    :param method:
+        The HTTP method: ``GET``, ``PUT``, ``POST`` or ``DELETE``
+
+    :type path: str or None
+    :param path:
+        The path of the endpoint relative to :attr:`~hostedpi.settings.Settings.api_url`, with
+        ``{placeholders}`` for parameters. If ``None``, the full URL is given with each request.
+
+    :type errors: dict[int, type[HostedPiException]]
+    :param errors:
+        The exception raised for each error status code. Any other error status raises
+        :exc:`~hostedpi.exc.HostedPiServerError`.
+
+    :type ignore: frozenset[int]
+    :param ignore:
+        Error status codes which are not errors for this endpoint. A request which receives one
+        returns ``None``.
+
+    :type response_model: type[pydantic.BaseModel] or None
+    :param response_model:
+        The model the response body is validated with. If ``None``, the response itself is
+        returned.
+
+    :type cache: str or None
+    :param cache:
+        How the endpoint uses the :class:`~hostedpi.cache.InfoCache`: ``"read"`` if it fetches a
+        Pi's info, which can be answered from the cache; ``"invalidate"`` if it changes a Pi's
+        state, so its cached info must be discarded; or ``None``.
+
+    :type follow_redirects: bool
+    :param follow_redirects:
+        Whether redirects are followed. Defaults to ``True``, as :mod:`requests` does for all
+        requests.
+
+    :type docs: str or None
+    :param docs:
+        The URL of the endpoint's documentation
+    """
+
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+    name: str
+    method: Literal["GET", "PUT", "POST", "DELETE"]
+    path: Union[str, None] = None
+    errors: dict[int, type[HostedPiException]] = {}
+    ignore: frozenset[int] = frozenset()
+    response_model: Union[type[BaseModel], None] = None
+    cache: Union[Literal["read", "invalidate"], None] = None
+    follow_redirects: bool = True
+    docs: Union[str, None] = None
+
+    def url(self, api_url: str, **params: Any) -> str:
+        """
+        Return the full URL of the endpoint, with its path relative to *api_url* and its
+        placeholders filled from *params*
+        """
+        if self.path is None:
+            raise ValueError(f"The {self.name} endpoint requires a full URL")
+        return urllib.parse.urljoin(api_url, self.path.format(**params))
+
+    def parse(self, data: Any) -> Any:
+        """
+        Validate the response body *data* with :attr:`response_model`
+        """
+        return self.response_model.model_validate(data)
+
+
+DOCS = "https://www.mythic-beasts.com/support/api/raspberry-pi"
+
+SERVER_ERRORS = {403: HostedPiNotAuthorizedError, 409: HostedPiProvisioningError}
+
+CREATE_ERRORS = {
+    400: HostedPiInvalidParametersError,
+    403: HostedPiNotAuthorizedError,
+    409: HostedPiNameExistsError,
+    503: HostedPiOutOfStockError,
+}
+
+GET_SERVERS = Endpoint(
+    name="get_servers",
+    method="GET",
+    path="servers",
+    errors={403: HostedPiNotAuthorizedError},
+    response_model=ServersResponse,
+    docs=f"{DOCS}#ep-get-piservers",
+)
+
+GET_SERVER = Endpoint(
+    name="get_server",
+    method="GET",
+    path="servers/{name}",
+    errors=SERVER_ERRORS,
+    response_model=PiInfo,
+    cache="read",
+    docs=f"{DOCS}#ep-get-piserversidentifier",
+)
+
+FIND_SERVER = GET_SERVER.model_copy(update={"name": "find_server", "ignore": frozenset({404})})
+
+CREATE_SERVER = Endpoint(
+    name="create_server",
+    method="POST",
+    path="servers",
+    errors=CREATE_ERRORS,
+    docs=f"{DOCS}#ep-post-piservers",
+)
+
+CREATE_NAMED_SERVER = Endpoint(
+    name="create_named_server",
+    method="POST",
+    path="servers/{name}",
+    errors=CREATE_ERRORS,
+    docs=f"{DOCS}#ep-post-piserversidentifier",
+)
+
+DELETE_SERVER = Endpoint(
+    name="delete_server",
+    method="DELETE",
+    path="servers/{name}",
+    errors=SERVER_ERRORS,
+    cache="invalidate",
+    docs=f"{DOCS}#ep-delete-piserversidentifier",
+)
+
+GET_SSH_KEYS = Endpoint(
+    name="get_ssh_keys",
+    method="GET",
+    path="servers/{name}/ssh-key",
+    errors=SERVER_ERRORS,
+    response_model=SSHKeysResponse,
+    docs=f"{DOCS}#ep-get-piserversidentifierssh-key",
+)
+
+PUT_SSH_KEYS = Endpoint(
+    name="put_ssh_keys",
+    method="PUT",
+    path="servers/{name}/ssh-key",
+    errors=SERVER_ERRORS,
+    cache="invalidate",
+    docs=f"{DOCS}#ep-put-piserversidentifierssh-key",
+)
+
+PUT_POWER = Endpoint(
+    name="put_power",
+    method="PUT",
+    path="servers/{name}/power",
+    errors=SERVER_ERRORS,
+    cache="invalidate",
+    docs=f"{DOCS}#ep-put-piserversidentifierpower",
+)
+
+REBOOT = Endpoint(
+    name="reboot",
+    method="POST",
+    path="servers/{name}/reboot",
+    errors={403: HostedPiNotAuthorizedError},
+    # the server is already being rebooted
+    ignore=frozenset({409}),
+    cache="invalidate",
+    docs=f"{DOCS}#ep-post-piserversidentifierreboot",
+)
+
+GET_PROVISION_STATUS = Endpoint(
+    name="get_provision_status",
+    method="GET",
+    errors={403: HostedPiNotAuthorizedError},
+    docs=f"{DOCS}#ep-get-queuepitask",
+)
+
+GET_MODELS = Endpoint(
+    name="get_models",
+    method="GET",
+    path="models",
+    errors={403: HostedPiNotAuthorizedError},
+    response_model=SpecsResponse,
+    docs=f"{DOCS}#ep-get-pimodels",
+)
+
+GET_IMAGES = Endpoint(
+    name="get_images",
+    method="GET",
+    path="images/{model}",
+    response_model=PiImagesResponse,
+    docs=f"{DOCS}#ep-get-piimagesmodel",
+)
@@ -1,3 +1,6 @@
+from .sshkey import SSHKey
+
+
 class HostedPiException(Exception):
     "Base class for all exceptions in the hostedpi module"
 
@@ -36,3 +39,20 @@ class HostedPiProvisioningError(HostedPiServerError):
 
 class HostedPiNameExistsError(HostedPiServerError):
     "Exception raised when a Pi with the specified name already exists"
+
+
+class HostedPiTimeoutError(HostedPiException, TimeoutError):
+    "Exception raised when a Pi does not reach the state being waited for within the timeout"
+
+
+class HostedPiKeyImportError(HostedPiException):
+    """
+    Exception raised when SSH keys cannot be imported from some of the GitHub or Launchpad users
+    requested. The keys collected from the other sources are available as :attr:`keys`, and the
+    error for each failed source (such as ``gh:username``) as :attr:`errors`.
+    """
+
+    def __init__(self, message: str, *, keys: set[SSHKey], errors: dict[str, Exception]):
+        super().__init__(message)
+        self.keys = keys
+        self.errors = errors
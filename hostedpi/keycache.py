@@ -0,0 +1,128 @@
+import hashlib
+from pathlib import Path
+from time import time
+from typing import Union
+
+from pydantic import BaseModel, ValidationError
+
+from .logger import get_logger
+from .settings import Settings
+from .tokencache import get_cache_dir, write_cache_file
+
+
+logger = get_logger()
+
+#: The default number of seconds cached keys may be used for when GitHub or Launchpad is
+#: unavailable
+KEY_CACHE_MAX_AGE = 86400
+
+
+class CachedKeys(BaseModel):
+    """
+    The SSH keys fetched from a URL, stored in a :class:`KeyCache` along with the validators used
+    to revalidate them
+    """
+
+    keys: list[str]
+    etag: Union[str, None] = None
+    last_modified: Union[str, None] = None
+    fetched_at: float
+
+
+class KeyCache:
+    """
+    A directory of the SSH keys last fetched from each GitHub or Launchpad URL. Before keys are
+    fetched again, the cached ``ETag`` and ``Last-Modified`` validators are sent with the request
+    so that unchanged keys are not downloaded again. If the request fails because the server is
+    unavailable or too slow, the cached keys are used instead, as long as they were fetched or
+    revalidated within *max_age* seconds.
+
+    Use :func:`get_key_cache` to get the cache configured by the
+    :class:`~hostedpi.settings.Settings`.
+
+    :type directory: pathlib.Path
+    :param directory:
+        The directory the cache files are kept in
+
+    :type max_age: float
+    :param max_age:
+        The number of seconds cached keys may be used for when the server is unavailable
+    """
+
+    def __init__(self, directory: Path, *, max_age: float = KEY_CACHE_MAX_AGE):
+        self._directory = directory
+        self._max_age = max_age
+
+    def __repr__(self):
+        return f"<KeyCache directory={self._directory} max_age={self._max_age}>"
+
+    @property
+    def directory(self) -> Path:
+        """
+        The directory the cache files are kept in
+        """
+        return self._directory
+
+    @property
+    def max_age(self) -> float:
+        """
+        The number of seconds cached keys may be used for when the server is unavailable
+        """
+        return self._max_age
+
+    def path(self, url: str) -> Path:
+        """
+        Return the path of the cache file for *url*
+        """
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+        return self._directory / f"keys-{digest}.json"
+
+    def load(self, url: str) -> Union[CachedKeys, None]:
+        """
+        Return the keys cached for *url*, or ``None`` if there are none or the file cannot be read
+        """
+        path = self.path(url)
+        try:
+            data = path.read_text()
+        except OSError:
+            return None
+        try:
+            return CachedKeys.model_validate_json(data)
+        except ValidationError:
+            logger.debug("Ignoring invalid key cache", path=str(path))
+            return None
+
+    def save(self, url: str, cached: CachedKeys):
+        """
+        Store the keys fetched from *url*. Failure to write the file is logged and otherwise
+        ignored.
+        """
+        path = self.path(url)
+        try:
+            write_cache_file(path, cached.model_dump_json())
+        except OSError as exc:
+            logger.debug("Failed to write key cache", path=str(path), error=str(exc))
+
+    def is_usable(self, cached: CachedKeys) -> bool:
+        """
+        Return whether *cached* was fetched or revalidated within :attr:`max_age` seconds
+        """
+        return time() - cached.fetched_at <= self._max_age
+
+    def clear(self):
+        """
+        Remove all cached keys
+        """
+        for path in self._directory.glob("keys-*.json"):
+            path.unlink(missing_ok=True)
+
+
+def get_key_cache(settings: Settings) -> Union[KeyCache, None]:
+    """
+    Return the :class:`KeyCache` in :func:`~hostedpi.tokencache.get_cache_dir`, with the maximum
+    age given by :attr:`~hostedpi.settings.Settings.key_cache_max_age`, or ``None`` if
+    :attr:`~hostedpi.settings.Settings.key_cache` is not enabled in *settings*
+    """
+    if not settings.key_cache:
+        return None
+    return KeyCache(get_cache_dir(), max_age=settings.key_cache_max_age)
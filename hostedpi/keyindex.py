@@ -0,0 +1,159 @@
+from collections.abc import Iterable, Mapping
+from typing import Union
+
+from pydantic import BaseModel, ConfigDict
+
+from .exc import HostedPiUserError
+from .models.results import PiResult
+from .sshkey import SSHKey
+
+
+class KeyUsage(BaseModel):
+    """
+    Where one SSH key is installed across a fleet of Pis, as returned by :meth:`KeyIndex.audit`
+
+    :type fingerprint: str
+    :param fingerprint: The SHA256 fingerprint of the key
+
+    :type algorithm: str
+    :param algorithm: The key algorithm, e.g. ``ssh-ed25519``
+
+    :type labels: frozenset[str]
+    :param labels: The labels the key has on any of the Pis, e.g. ``user@hostname``
+
+    :type import_sources: frozenset[str]
+    :param import_sources: Where the key was imported from on any of the Pis, e.g. ``gh:username``
+
+    :type pis: frozenset[str]
+    :param pis: The names of the Pis the key is installed on
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    fingerprint: str
+    algorithm: str
+    labels: frozenset[str] = frozenset()
+    import_sources: frozenset[str] = frozenset()
+    pis: frozenset[str] = frozenset()
+
+
+class KeyIndex:
+    """
+    An index of the SSH keys installed on a fleet of Pis, which maps each key's fingerprint to the
+    names of the Pis it is installed on, and each Pi's name to its keys. Keys can also be looked up
+    by label or import source, without requesting the keys of each Pi again.
+
+    Use :meth:`~hostedpi.picloud.PiCloud.get_key_index` to build the index for a fleet.
+
+    :type keys: Mapping[str, Iterable[SSHKey or str]]
+    :param keys:
+        The SSH keys installed on each Pi, keyed by Pi name
+
+    :type errors: Mapping[str, Exception] or None
+    :param errors:
+        The exception raised when retrieving the keys of each Pi that could not be indexed, keyed
+        by Pi name (keyword-only argument)
+    """
+
+    def __init__(
+        self,
+        keys: Mapping[str, Iterable[Union[SSHKey, str]]],
+        *,
+        errors: Union[Mapping[str, Exception], None] = None,
+    ):
+        self._keys: dict[str, frozenset[SSHKey]] = {}
+        self._pis: dict[str, set[str]] = {}
+        self._lookup: dict[str, dict[str, set[SSHKey]]] = {}
+        self._usage: dict[str, tuple[str, set[str], set[str]]] = {}
+        self._errors = dict(sorted((errors or {}).items()))
+        for name, pi_keys in sorted(keys.items()):
+            pi_keys = frozenset(map(SSHKey.parse, pi_keys))
+            self._keys[name] = pi_keys
+            for key in pi_keys:
+                self._pis.setdefault(key.fingerprint, set()).add(name)
+                algorithm, labels, import_sources = self._usage.setdefault(
+                    key.fingerprint, (key.algorithm, set(), set())
+                )
+                for term in (key.fingerprint, key.label, key.import_source):
+                    if term:
+                        self._lookup.setdefault(term, {}).setdefault(name, set()).add(key)
+                if key.label:
+                    labels.add(key.label)
+                if key.import_source:
+                    import_sources.add(key.import_source)
+
+    @classmethod
+    def from_results(cls, results: Mapping[str, PiResult]) -> "KeyIndex":
+        """
+        Build an index from the :class:`~hostedpi.models.results.PiResult` of retrieving the SSH
+        keys of each Pi, such as those returned by :meth:`~hostedpi.picloud.PiCloud.map`
+
+        :raises HostedPiUserError:
+            If any of the results is for a Pi without a name
+        """
+        if any(name is None or result.name is None for name, result in results.items()):
+            raise HostedPiUserError("Cannot index the SSH keys of a Pi without a name")
+        return cls(
+            {name: result.value for name, result in results.items() if result.ok},
+            errors={name: result.error for name, result in results.items() if not result.ok},
+        )
+
+    def __repr__(self):
+        return f"<KeyIndex pis={len(self._keys)} keys={len(self._pis)}>"
+
+    def __len__(self):
+        return len(self._pis)
+
+    def __contains__(self, key: Union[SSHKey, str]):
+        return SSHKey.parse(key).fingerprint in self._pis
+
+    @property
+    def keys(self) -> dict[str, frozenset[SSHKey]]:
+        """
+        The SSH keys installed on each indexed Pi, keyed by Pi name
+        """
+        return dict(self._keys)
+
+    @property
+    def pis(self) -> dict[str, frozenset[str]]:
+        """
+        The names of the Pis each SSH key is installed on, keyed by the key's fingerprint
+        """
+        return {fingerprint: frozenset(names) for fingerprint, names in self._pis.items()}
+
+    @property
+    def errors(self) -> dict[str, Exception]:
+        """
+        The exception raised when retrieving the keys of each Pi that could not be indexed, keyed by
+        Pi name
+        """
+        return dict(self._errors)
+
+    def where(self, query: Union[SSHKey, str]) -> dict[str, frozenset[SSHKey]]:
+        """
+        Return the keys matching *query* on each Pi that has any, keyed by Pi name. *query* may be
+        a key's SHA256 fingerprint (e.g. ``SHA256:nThbg6kX...``), a label (e.g.
+        ``user@hostname``), an import source (e.g. ``gh:username``), or an
+        :class:`~hostedpi.sshkey.SSHKey`.
+        """
+        if isinstance(query, SSHKey):
+            query = query.fingerprint
+        matches = self._lookup.get(query, {})
+        return {name: frozenset(keys) for name, keys in matches.items()}
+
+    def audit(self) -> list[KeyUsage]:
+        """
+        Return a :class:`KeyUsage` for each distinct SSH key in the index, the keys installed on the
+        most Pis first
+        """
+        usage = [
+            KeyUsage(
+                fingerprint=fingerprint,
+                algorithm=algorithm,
+                labels=frozenset(labels),
+                import_sources=frozenset(import_sources),
+                pis=frozenset(self._pis[fingerprint]),
+            )
+            for fingerprint, (algorithm, labels, import_sources) in self._usage.items()
+        ]
+        return sorted(usage, key=lambda u: (-len(u.pis), u.fingerprint))
@@ -1,38 +1,197 @@
 import json
+import logging
 import os
+import re
+import warnings
+from typing import TYPE_CHECKING, Any, Literal, Union
 
-import structlog
-from requests import Response
-from structlog import get_logger
+
+if TYPE_CHECKING:
+    from requests import Response
 
 
 log_level = os.getenv("HOSTEDPI_LOG_LEVEL", "ERROR")
-structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(log_level))
+
+LOG_BODY_MODES = ("full", "truncate", "none")
+DEFAULT_LOG_BODY = "truncate"
+DEFAULT_LOG_BODY_LIMIT = 500
+
+# the base64 part of an OpenSSH public key, which follows the key type
+SSH_KEY_PATTERN = re.compile(r"((?:ssh|ecdsa|sk)-[\w@.-]+ )[A-Za-z0-9+/]{8,}([A-Za-z0-9+/]{8}=*)")
+
+METHOD_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "warn": logging.WARNING,
+    "error": logging.ERROR,
+    "exception": logging.ERROR,
+    "critical": logging.CRITICAL,
+}
+
+
+def get_level(name: str) -> int:
+    """
+    Return the numeric logging level for *name*, which is a level name such as ``DEBUG`` or a
+    number
+    """
+    if name.isdigit():
+        return int(name)
+    level = logging.getLevelName(name.upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Invalid log level: {name}")
+    return level
+
+
+def get_log_body(value: Union[str, None]) -> Literal["full", "truncate", "none"]:
+    """
+    Return the body logging mode for *value*, the value of ``HOSTEDPI_LOG_BODY``. If it is not set
+    this returns ``truncate``, and if it is not a valid mode this warns and returns ``truncate``.
+    """
+    if value is None:
+        return DEFAULT_LOG_BODY
+    mode = value.strip().lower()
+    if mode not in LOG_BODY_MODES:
+        warnings.warn(
+            f"Invalid HOSTEDPI_LOG_BODY {value!r}, expected one of {', '.join(LOG_BODY_MODES)}; "
+            f"using {DEFAULT_LOG_BODY!r}"
+        )
+        return DEFAULT_LOG_BODY
+    return mode
+
+
+def get_log_body_limit(value: Union[str, None]) -> int:
+    """
+    Return the body length limit for *value*, the value of ``HOSTEDPI_LOG_BODY_LIMIT``. If it is
+    not set this returns 500, and if it is not a non-negative integer this warns and returns 500.
+    """
+    if value is None:
+        return DEFAULT_LOG_BODY_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        warnings.warn(
+            f"Invalid HOSTEDPI_LOG_BODY_LIMIT {value!r}, expected a non-negative integer; "
+            f"using {DEFAULT_LOG_BODY_LIMIT}"
+        )
+        return DEFAULT_LOG_BODY_LIMIT
+    return limit
+
+
+level = get_level(log_level)
+
+#: How request and response bodies are logged at debug level: ``full`` logs them in full,
+#: ``truncate`` logs up to :data:`log_body_limit` characters, and ``none`` logs only their size
+log_body = get_log_body(os.getenv("HOSTEDPI_LOG_BODY"))
+
+#: The number of characters of each body logged when :data:`log_body` is ``truncate``
+log_body_limit = get_log_body_limit(os.getenv("HOSTEDPI_LOG_BODY_LIMIT"))
+
+
+class LazyLogger:
+    """
+    A logger which only imports :mod:`structlog` when something is logged at or above
+    :data:`log_level`. Calls below that level do nothing, so importing *hostedpi* and making
+    requests does not import structlog at all with the default level.
+
+    The global structlog configuration is never changed: the logger is wrapped with its own
+    filtering wrapper class, and otherwise uses whatever processors and logger factory the
+    application has configured.
+    """
+
+    __slots__ = ("_logger",)
+
+    def __init__(self):
+        self._logger = None
+
+    def __repr__(self):
+        return f"<LazyLogger level={logging.getLevelName(level)}>"
+
+    def __getattr__(self, name: str) -> Any:
+        if METHOD_LEVELS.get(name, level) < level:
+            return _discard
+        if self._logger is None:
+            self._logger = _wrap_logger()
+        return getattr(self._logger, name)
+
+    def is_enabled_for(self, method_level: int) -> bool:
+        """
+        Return whether messages at *method_level* are logged
+        """
+        return method_level >= level
+
+
+def get_logger() -> LazyLogger:
+    """
+    Return a :class:`LazyLogger`
+    """
+    return LazyLogger()
+
+
 logger = get_logger()
 
 
-def log_request(response: Response):
+def log_request(response: "Response"):
     """
-    Log the request and response
+    Log the request and response at debug level. If debug logging is disabled, this returns
+    without reading either body. SSH keys in either body are always redacted.
     """
+    if not logger.is_enabled_for(logging.DEBUG):
+        return
     logger.debug(
         "Sent request",
         url=response.url,
         method=response.request.method,
         status_code=response.status_code,
-        body=json.loads(_get_response_body(response)) if response.request.body else "",
+        body=format_body(_get_request_body(response)),
     )
+    logger.debug("Received response", body=format_body(response.text))
 
-    try:
-        response_body = response.json()
-    except Exception:
-        response_body = response.text
-    logger.debug("Received response", body=response_body)
-
-
-def _get_response_body(response: Response) -> str:
-    if response.request.body:
-        if isinstance(response.request.body, bytes):
-            return response.request.body.decode("utf-8")
-        return response.request.body
-    return ""
+
+def format_body(body: Union[str, bytes, None]) -> Any:
+    """
+    Return *body* as it should be logged according to :data:`log_body`, with any SSH keys in it
+    redacted
+    """
+    if not body:
+        return ""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    if log_body == "none":
+        return f"<{len(body)} characters>"
+    body = redact_ssh_keys(body)
+    if log_body == "full":
+        try:
+            return json.loads(body)
+        except ValueError:
+            return body
+    if len(body) > log_body_limit:
+        return f"{body[:log_body_limit]}... ({len(body) - log_body_limit} more characters)"
+    return body
+
+
+def redact_ssh_keys(text: str) -> str:
+    """
+    Replace the key material of any SSH public keys in *text* with its last 8 characters, leaving
+    the key type and comment
+    """
+    return SSH_KEY_PATTERN.sub(r"\1...\2", text)
+
+
+def _get_request_body(response: "Response") -> Union[str, bytes, None]:
+    # requests calls the request payload "body", httpx calls it "content"
+    return getattr(response.request, "body", None) or getattr(response.request, "content", None)
+
+
+def _discard(*args, **kwargs):
+    pass
+
+
+def _wrap_logger():
+    import structlog
+
+    # the logger factory and processors are looked up from the configuration when the logger is
+    # first used, so configuring structlog after importing hostedpi still applies
+    return structlog.wrap_logger(None, wrapper_class=structlog.make_filtering_bound_logger(level))
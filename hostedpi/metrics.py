@@ -0,0 +1,228 @@
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Union
+
+from .models.metrics import EndpointMetrics, LatencyHistogram, MetricsSnapshot
+
+
+if TYPE_CHECKING:
+    from .cache import InfoCache
+    from .pipeline import Call, Handler
+
+
+#: The upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _EndpointRecord:
+    __slots__ = ("requests", "retries", "errors", "bucket_counts", "sum")
+
+    def __init__(self, buckets: int):
+        self.requests = 0
+        self.retries = 0
+        self.errors: dict[str, int] = {}
+        # the last count is for requests slower than the largest bucket
+        self.bucket_counts = [0] * (buckets + 1)
+        self.sum = 0.0
+
+
+class Metrics:
+    """
+    Records the number of requests to each :class:`~hostedpi.endpoints.Endpoint`, the time they
+    took, the retries made by the transport and the errors by status code. It is used as pipeline
+    middleware: :meth:`middleware` for a :class:`~hostedpi.pipeline.Pipeline`, and
+    :meth:`async_middleware` for an :class:`~hostedpi.aio.pipeline.AsyncPipeline`.
+
+    Each :class:`~hostedpi.picloud.PiCloud` records metrics for its own pipeline, available as
+    :attr:`~hostedpi.picloud.PiCloud.metrics`.
+
+    :type buckets: tuple[float, ...]
+    :param buckets:
+        The upper bounds in seconds of the latency histogram buckets, in ascending order. Defaults
+        to :data:`LATENCY_BUCKETS`.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self._buckets = tuple(buckets)
+        self._lock = Lock()
+        self._endpoints: dict[str, _EndpointRecord] = {}
+
+    def __repr__(self):
+        return f"<Metrics endpoints={len(self._endpoints)}>"
+
+    def middleware(self, call: "Call", send: "Handler") -> Any:
+        """
+        Pipeline middleware which records each request
+        """
+        start = perf_counter()
+        error = None
+        try:
+            return send(call)
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self.record(call, perf_counter() - start, error)
+
+    async def async_middleware(self, call: "Call", send) -> Any:
+        """
+        Asyncio pipeline middleware which records each request
+        """
+        start = perf_counter()
+        error = None
+        try:
+            return await send(call)
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self.record(call, perf_counter() - start, error)
+
+    def record(self, call: "Call", duration: float, error: Union[Exception, None] = None):
+        """
+        Record a request which took *duration* seconds, and failed with *error* if it is not
+        ``None``
+        """
+        retries = get_retries(call.response)
+        with self._lock:
+            record = self._endpoints.get(call.endpoint.name)
+            if record is None:
+                record = self._endpoints[call.endpoint.name] = _EndpointRecord(len(self._buckets))
+            record.requests += 1
+            record.retries += retries
+            record.bucket_counts[bisect_left(self._buckets, duration)] += 1
+            record.sum += duration
+            if error is not None:
+                key = get_error_key(call.response, error)
+                record.errors[key] = record.errors.get(key, 0) + 1
+
+    def snapshot(
+        self, *, token_refreshes: int = 0, info_cache: Union["InfoCache", None] = None
+    ) -> MetricsSnapshot:
+        """
+        Return a :class:`~hostedpi.models.metrics.MetricsSnapshot` of the metrics recorded so far,
+        including *token_refreshes* and the hit and miss counts of *info_cache*
+        """
+        with self._lock:
+            endpoints = {
+                name: self._endpoint_metrics(record) for name, record in self._endpoints.items()
+            }
+        snapshot = MetricsSnapshot(endpoints=endpoints, token_refreshes=token_refreshes)
+        if info_cache is None:
+            return snapshot
+        return snapshot.model_copy(
+            update={
+                "cache_hits": info_cache.hits,
+                "cache_misses": info_cache.misses,
+                "cache_hit_ratio": info_cache.hit_ratio,
+            }
+        )
+
+    def reset(self):
+        """
+        Discard the metrics recorded so far
+        """
+        with self._lock:
+            self._endpoints.clear()
+
+    def _endpoint_metrics(self, record: _EndpointRecord) -> EndpointMetrics:
+        buckets = {}
+        total = 0
+        for bound, count in zip(self._buckets, record.bucket_counts):
+            total += count
+            buckets[bound] = total
+        latency = LatencyHistogram(buckets=buckets, count=record.requests, sum=record.sum)
+        return EndpointMetrics(
+            requests=record.requests,
+            retries=record.retries,
+            errors=dict(record.errors),
+            latency=latency,
+        )
+
+
+def get_retries(response: Any) -> int:
+    """
+    Return the number of times the transport retried the request which returned *response*
+    """
+    if response is None:
+        return 0
+    # httpx responses are given the count by RetryTransport, requests responses carry urllib3's
+    # retry history
+    extensions = getattr(response, "extensions", None)
+    if isinstance(extensions, dict):
+        return extensions.get("retries", 0)
+    try:
+        return len(response.raw.retries.history)
+    except (AttributeError, TypeError):
+        return 0
+
+
+def get_error_key(response: Any, error: Exception) -> str:
+    """
+    Return the status code of *response* if it is an error status, or otherwise the name of the
+    *error*, such as ``ConnectionError``
+    """
+    status_code = getattr(response, "status_code", None)
+    if isinstance(status_code, int) and status_code >= 400:
+        return str(status_code)
+    return type(error).__name__
+
+
+def escape_label_value(value: str) -> str:
+    """
+    Return *value* escaped for use as a label value in the Prometheus text exposition format, in
+    which backslashes, double quotes and line feeds must be escaped
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(snapshot: MetricsSnapshot, *, prefix: str = "hostedpi") -> str:
+    """
+    Return *snapshot* in the Prometheus text exposition format, for example to serve from a
+    ``/metrics`` endpoint or write to a node exporter textfile. Label values are escaped as the
+    format requires.
+    """
+    lines = []
+
+    def metric(name: str, kind: str, help: str):
+        lines.append(f"# HELP {prefix}_{name} {help}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+    def sample(name: str, value: Union[int, float], **labels: str):
+        if labels:
+            label_text = ",".join(
+                f'{key}="{escape_label_value(label)}"' for key, label in labels.items()
+            )
+            lines.append(f"{prefix}_{name}{{{label_text}}} {value}")
+        else:
+            lines.append(f"{prefix}_{name} {value}")
+
+    endpoints = sorted(snapshot.endpoints.items())
+    metric("requests_total", "counter", "Requests to the Mythic Beasts API")
+    for name, endpoint in endpoints:
+        sample("requests_total", endpoint.requests, endpoint=name)
+    metric("request_retries_total", "counter", "Retries of requests to the API")
+    for name, endpoint in endpoints:
+        sample("request_retries_total", endpoint.retries, endpoint=name)
+    metric("request_errors_total", "counter", "Failed requests to the API")
+    for name, endpoint in endpoints:
+        for status, count in sorted(endpoint.errors.items()):
+            sample("request_errors_total", count, endpoint=name, status=status)
+    metric("request_duration_seconds", "histogram", "Time taken by requests to the API")
+    for name, endpoint in endpoints:
+        latency = endpoint.latency
+        for bound, count in sorted(latency.buckets.items()):
+            sample("request_duration_seconds_bucket", count, endpoint=name, le=str(bound))
+        sample("request_duration_seconds_bucket", latency.count, endpoint=name, le="+Inf")
+        sample("request_duration_seconds_sum", latency.sum, endpoint=name)
+        sample("request_duration_seconds_count", latency.count, endpoint=name)
+    metric("token_refreshes_total", "counter", "Access tokens fetched")
+    sample("token_refreshes_total", snapshot.token_refreshes)
+    metric("info_cache_hits_total", "counter", "Pi info cache hits")
+    sample("info_cache_hits_total", snapshot.cache_hits)
+    metric("info_cache_misses_total", "counter", "Pi info cache misses")
+    sample("info_cache_misses_total", snapshot.cache_misses)
+    metric("info_cache_hit_ratio", "gauge", "Proportion of Pi info lookups answered from cache")
+    sample("info_cache_hit_ratio", snapshot.cache_hit_ratio)
+    return "\n".join(lines) + "\n"
@@ -1,3 +1,6 @@
+from .metrics import EndpointMetrics, LatencyHistogram, MetricsSnapshot
 from .mythic.responses import PiInfo, PiInfoBasic
+from .results import PiResult
 from .specs import Pi3ServerSpec, Pi4ServerSpec
-from .sshkeys import SSHKeySources
+from .sshkeys import SSHKeyDiff, SSHKeyManifest, SSHKeySources
+from .wait import WaitPolicy
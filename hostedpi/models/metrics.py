@@ -0,0 +1,83 @@
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class LatencyHistogram(BaseModel):
+    """
+    The distribution of the time taken by requests to an endpoint, in seconds
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    buckets: dict[float, int] = Field(
+        description="The number of requests which took at most each number of seconds"
+    )
+    count: int = Field(default=0, description="The number of requests")
+    sum: float = Field(default=0.0, description="The total number of seconds taken by requests")
+
+    @property
+    def mean(self) -> float:
+        """
+        The mean number of seconds taken by a request, or 0 if there have been no requests
+        """
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        Return an estimate of the *q* quantile (between 0 and 1) of the time taken by requests: the
+        upper bound of the bucket it falls in, or infinity if it is beyond the largest bucket.
+        Returns 0 if there have been no requests.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, count in sorted(self.buckets.items()):
+            if count >= rank:
+                return bound
+        return float("inf")
+
+
+class EndpointMetrics(BaseModel):
+    """
+    The metrics recorded for requests to one :class:`~hostedpi.endpoints.Endpoint`
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    requests: int = Field(default=0, description="The number of requests")
+    retries: int = Field(default=0, description="The number of retries made by the transport")
+    errors: dict[str, int] = Field(
+        default_factory=dict,
+        description="The number of failed requests, keyed by status code or exception name",
+    )
+    latency: LatencyHistogram = Field(description="The time taken by requests")
+
+
+class MetricsSnapshot(BaseModel):
+    """
+    The metrics recorded by a :class:`~hostedpi.picloud.PiCloud` at one point in time, as returned
+    by :attr:`~hostedpi.picloud.PiCloud.metrics`
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    endpoints: dict[str, EndpointMetrics] = Field(
+        default_factory=dict, description="The metrics for each endpoint, keyed by endpoint name"
+    )
+    token_refreshes: int = Field(default=0, description="The number of access tokens fetched")
+    cache_hits: int = Field(default=0, description="The number of info cache hits")
+    cache_misses: int = Field(default=0, description="The number of info cache misses")
+    cache_hit_ratio: float = Field(default=0.0, description="The proportion of cache hits")
+
+    @property
+    def requests(self) -> int:
+        """
+        The total number of requests to all endpoints
+        """
+        return sum(endpoint.requests for endpoint in self.endpoints.values())
+
+    @property
+    def errors(self) -> int:
+        """
+        The total number of failed requests to all endpoints
+        """
+        return sum(sum(endpoint.errors.values()) for endpoint in self.endpoints.values())
@@ -25,9 +25,9 @@ class NewServer(BaseModel):
     @field_validator("ssh_keys", mode="before")
     @classmethod
     def validate_ssh_keys(cls, v):
-        if v == set():
+        if not v:
             return None
-        return v
+        return {str(key) for key in v}
 
     @property
     def payload(self) -> dict:
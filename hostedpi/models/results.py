@@ -0,0 +1,34 @@
+from typing import Any, Union
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class PiResult(BaseModel):
+    """
+    The outcome of an operation performed on a single Pi as part of a bulk operation, such as
+    :meth:`~hostedpi.picloud.PiCloud.bulk_power`
+
+    :type name: str | None
+    :param name: The name of the Pi the operation was performed on
+
+    :type value: Any
+    :param value: The value returned by the operation, if it succeeded
+
+    :type error: Exception | None
+    :param error: The exception raised by the operation, if it failed
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    name: Union[str, None] = Field(description="The name of the Pi")
+    value: Any = Field(default=None, description="The value returned by the operation")
+    error: Union[Exception, None] = Field(
+        default=None, description="The exception raised by the operation"
+    )
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether or not the operation succeeded
+        """
+        return self.error is None
@@ -1,16 +1,19 @@
+from collections.abc import Iterable
 from typing import Union
 
-from pydantic import BaseModel, Field, FilePath
+from pydantic import BaseModel, ConfigDict, Field, FilePath, field_validator
 
-from ..utils import collect_ssh_keys
+from ..keycache import KeyCache
+from ..sshkey import SSHKey
+from ..utils import KEY_IMPORT_TIMEOUT, KEY_IMPORT_WORKERS, collect_ssh_keys
 
 
 class SSHKeySources(BaseModel):
     """
     Sources for SSH keys to be added to Pi servers
 
-    :type ssh_keys: set[str] | None
-    :param ssh_keys: Set of SSH key strings
+    :type ssh_keys: set[str | SSHKey] | None
+    :param ssh_keys: Set of SSH keys, as strings or :class:`~hostedpi.sshkey.SSHKey`
 
     :type ssh_key_path: :class:`~pathlib.Path` | None
     :param ssh_key_path: Path to an SSH key file
@@ -34,15 +37,181 @@ class SSHKeySources(BaseModel):
         default=None, description="Set of Launchpad usernames to collect SSH keys for"
     )
 
-    def collect(self) -> Union[set[str], None]:
+    @field_validator("ssh_keys", mode="before")
+    @classmethod
+    def validate_ssh_keys(cls, v):
+        if v is None or isinstance(v, str):
+            return v
+        return {str(key) for key in v}
+
+    def collect(
+        self,
+        *,
+        timeout: tuple[float, float] = KEY_IMPORT_TIMEOUT,
+        max_workers: int = KEY_IMPORT_WORKERS,
+        cache: Union[KeyCache, None] = None,
+        refresh: bool = False,
+    ) -> Union[set[SSHKey], None]:
         """
-        Collect SSH keys from various sources, and return them as a set of strings which can be
-        added to a Pi by setting :attr:`~hostedpi.pi.Pi.ssh_keys`.
+        Collect SSH keys from various sources, and return them as a set of
+        :class:`~hostedpi.sshkey.SSHKey` which can be added to a Pi by setting
+        :attr:`~hostedpi.pi.Pi.ssh_keys`. A key found in more than one source is only returned once.
+
+        The keys of GitHub and Launchpad users are requested concurrently over a shared connection
+        pool, up to *max_workers* users at a time.
+
+        :type timeout: tuple[float, float]
+        :param timeout:
+            The connect and read timeouts in seconds of the request for each user's keys
+            (keyword-only argument)
+
+        :type max_workers: int
+        :param max_workers:
+            The maximum number of users whose keys are requested concurrently (keyword-only
+            argument)
+
+        :type cache: :class:`~hostedpi.keycache.KeyCache` or None
+        :param cache:
+            The cache the keys of GitHub and Launchpad users are stored in (keyword-only argument).
+            Cached keys are revalidated rather than downloaded again, and used if GitHub or
+            Launchpad is unavailable. If not provided, keys are not cached; see
+            :func:`~hostedpi.keycache.get_key_cache`.
+
+        :type refresh: bool
+        :param refresh:
+            If ``True``, keys previously fetched from GitHub and Launchpad and stored in *cache*
+            are not used (keyword-only argument)
+
+        :raises HostedPiKeyImportError:
+            If the keys of any of the users could not be retrieved. The keys collected from the
+            other sources are available as its :attr:`~hostedpi.exc.HostedPiKeyImportError.keys`.
         """
         keys = collect_ssh_keys(
             ssh_keys=self.ssh_keys,
             ssh_key_path=self.ssh_key_path,
             github_usernames=self.github_usernames,
             launchpad_usernames=self.launchpad_usernames,
+            timeout=timeout,
+            max_workers=max_workers,
+            cache=cache,
+            refresh=refresh,
         )
         return keys if keys else None
+
+
+class SSHKeyManifest(BaseModel):
+    """
+    The SSH keys each Pi should have, as read from a manifest file by the
+    :doc:`../cli/ssh/keys/sync` command. Each Pi's keys are given as
+    :class:`SSHKeySources`, for example in TOML:
+
+    .. code-block:: toml
+
+        [pis.mypi]
+        ssh_keys = ["ssh-ed25519 AAAAC3Nza... ben@finn"]
+        github_usernames = ["bennuttall"]
+
+    :type pis: dict[str, SSHKeySources]
+    :param pis: The sources of the SSH keys each Pi should have, keyed by Pi name
+
+    :raises pydantic_core.ValidationError:
+        If the manifest is invalid
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    pis: dict[str, SSHKeySources] = Field(
+        default_factory=dict, description="The sources of the SSH keys for each Pi"
+    )
+
+    @field_validator("pis", mode="before")
+    @classmethod
+    def validate_pis(cls, v):
+        # a misspelt source would otherwise be ignored, and the Pi's keys removed
+        if isinstance(v, dict):
+            for name, sources in v.items():
+                if isinstance(sources, dict):
+                    unknown = sources.keys() - SSHKeySources.model_fields.keys()
+                    if unknown:
+                        raise ValueError(f"Unknown SSH key sources for {name}: {sorted(unknown)}")
+        return v
+
+    def collect(
+        self,
+        *,
+        timeout: tuple[float, float] = KEY_IMPORT_TIMEOUT,
+        max_workers: int = KEY_IMPORT_WORKERS,
+        cache: Union[KeyCache, None] = None,
+        refresh: bool = False,
+    ) -> dict[str, set[SSHKey]]:
+        """
+        Collect the SSH keys of each Pi, as in :meth:`SSHKeySources.collect`, and return them keyed
+        by Pi name. Pis with the same sources share the keys collected for them.
+
+        :raises HostedPiKeyImportError:
+            If the keys of any of the GitHub or Launchpad users could not be retrieved
+        """
+        collected: dict[str, set[SSHKey]] = {}
+        keys = {}
+        for name, sources in self.pis.items():
+            key = sources.model_dump_json()
+            if key not in collected:
+                collected[key] = (
+                    sources.collect(
+                        timeout=timeout, max_workers=max_workers, cache=cache, refresh=refresh
+                    )
+                    or set()
+                )
+            keys[name] = collected[key]
+        return keys
+
+
+class SSHKeyDiff(BaseModel):
+    """
+    The changes needed to make the SSH keys on a Pi match the keys it should have, as returned by
+    :meth:`~hostedpi.picloud.PiCloud.sync_ssh_keys`
+
+    :type added: frozenset[SSHKey]
+    :param added: The keys which are not yet on the Pi
+
+    :type removed: frozenset[SSHKey]
+    :param removed: The keys on the Pi which should not be
+
+    :type updated: frozenset[SSHKey]
+    :param updated: The keys on the Pi whose comments should be changed, with their new comments
+
+    :type unchanged: int
+    :param unchanged: The number of keys already on the Pi as they should be
+    """
+
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+    added: frozenset[SSHKey] = frozenset()
+    removed: frozenset[SSHKey] = frozenset()
+    updated: frozenset[SSHKey] = frozenset()
+    unchanged: int = 0
+
+    @classmethod
+    def compute(
+        cls, current: Iterable[Union[str, SSHKey]], desired: Iterable[Union[str, SSHKey]]
+    ) -> "SSHKeyDiff":
+        """
+        Return the changes needed to turn the *current* keys into the *desired* keys
+        """
+        current = {key: key for key in map(SSHKey.parse, current)}
+        desired = set(map(SSHKey.parse, desired))
+        kept = {key for key in desired if key in current}
+        updated = {key for key in kept if str(key) != str(current[key])}
+        return cls(
+            added=frozenset(desired - kept),
+            removed=frozenset(current.keys() - desired),
+            updated=frozenset(updated),
+            unchanged=len(kept) - len(updated),
+        )
+
+    @property
+    def changed(self) -> bool:
+        """
+        Whether the keys on the Pi need to be changed
+        """
+        return bool(self.added or self.removed or self.updated)
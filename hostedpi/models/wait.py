@@ -0,0 +1,63 @@
+from collections.abc import Iterator
+from random import uniform
+from typing import Union
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+
+class WaitPolicy(BaseModel):
+    """
+    How to poll the API while waiting for a Pi to be provisioned or to boot. The first poll is made
+    immediately, and the interval before each subsequent poll starts at *interval* and is multiplied
+    by *multiplier* each time, up to *max_interval*. Each interval is randomly varied by up to
+    *jitter* (a proportion of the interval) to avoid many Pis being polled in lockstep.
+
+    A policy can be passed as the *wait* argument of any method which waits, for example:
+
+    .. code-block:: python
+
+        pi.reboot(wait=WaitPolicy(interval=2, timeout=300))
+
+    :type interval: float
+    :param interval: Seconds to wait before the second poll. Defaults to 1.
+
+    :type multiplier: float
+    :param multiplier: Factor the interval grows by after each poll. Defaults to 1.5.
+
+    :type max_interval: float
+    :param max_interval: Maximum number of seconds between polls. Defaults to 10.
+
+    :type jitter: float
+    :param jitter: Proportion by which each interval is randomly varied. Defaults to 0.1.
+
+    :type timeout: float | None
+    :param timeout:
+        Seconds after which to give up waiting and raise
+        :exc:`~hostedpi.exc.HostedPiTimeoutError`. Defaults to None, which waits indefinitely.
+
+    :raises pydantic_core.ValidationError:
+        If the policy is invalid
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    interval: float = Field(default=1, gt=0, description="Seconds before the second poll")
+    multiplier: float = Field(default=1.5, ge=1, description="Factor the interval grows by")
+    max_interval: float = Field(default=10, gt=0, description="Maximum seconds between polls")
+    jitter: float = Field(default=0.1, ge=0, lt=1, description="Random variation of intervals")
+    timeout: Union[float, None] = Field(default=None, gt=0, description="Seconds to wait in total")
+
+    @model_validator(mode="after")
+    def validate_max_interval(self):
+        if self.max_interval < self.interval:
+            raise ValueError("max_interval must not be less than interval")
+        return self
+
+    def delays(self) -> Iterator[float]:
+        """
+        Yield the successive intervals between polls, with jitter applied
+        """
+        delay = self.interval
+        while True:
+            yield delay * uniform(1 - self.jitter, 1 + self.jitter)
+            delay = min(delay * self.multiplier, self.max_interval)
@@ -1,35 +1,39 @@
-import urllib.parse
-from datetime import datetime, timezone
+from collections.abc import Iterable
 from functools import cached_property
 from ipaddress import IPv6Address, IPv6Network
-from time import sleep
 from typing import Union
 
 from pydantic import ValidationError
-from requests import ConnectionError, HTTPError, Session
-from structlog import get_logger
+from requests import ConnectionError, Session, Timeout
 
 from .auth import MythicAuth
-from .exc import (
-    HostedPiNotAuthorizedError,
-    HostedPiProvisioningError,
-    HostedPiServerError,
-    HostedPiUserError,
+from .cache import InfoCache
+from .endpoints import (
+    DELETE_SERVER,
+    GET_PROVISION_STATUS,
+    GET_SERVER,
+    GET_SSH_KEYS,
+    PUT_POWER,
+    PUT_SSH_KEYS,
+    REBOOT,
 )
-from .logger import log_request
-from .models.mythic.responses import (
-    PiInfo,
-    PiInfoBasic,
-    ProvisioningServer,
-    SSHKeysResponse,
-)
-from .models.sshkeys import SSHKeySources
+from .exc import HostedPiUserError
+from .keycache import get_key_cache
+from .logger import get_logger
+from .models.mythic.responses import PiInfo, PiInfoBasic, ProvisioningServer
+from .models.sshkeys import SSHKeyDiff, SSHKeySources
+from .models.wait import WaitPolicy
+from .pipeline import Pipeline
+from .sshkey import SSHKey
 from .utils import (
     dedupe_ssh_keys,
-    get_error_message,
+    get_boot_progress,
+    get_status,
+    get_wait_policy,
     remove_imported_ssh_keys,
     remove_ssh_keys_by_label,
 )
+from .waiter import Waiter
 
 
 logger = get_logger()
@@ -59,6 +63,9 @@ class Pi:
         info: PiInfoBasic,
         auth: Union[MythicAuth, None] = None,
         status_url: Union[str, None] = None,
+        info_cache: Union[InfoCache, None] = None,
+        waiter: Union[Waiter, None] = None,
+        pipeline: Union[Pipeline, None] = None,
     ):
         self._name = name
         self._model = info.model
@@ -67,10 +74,17 @@ class Pi:
         if auth is None:
             auth = MythicAuth()
         self._auth = auth
-        self._api_url = str(auth.settings.api_url)
         self._cancelled = False
+        if info_cache is None:
+            info_cache = InfoCache(ttl=auth.settings.info_cache_ttl)
+        self._info_cache = info_cache
+        if waiter is None:
+            waiter = Waiter(max_workers=auth.settings.max_workers)
+        self._waiter = waiter
+        if pipeline is None:
+            pipeline = Pipeline(auth, info_cache=info_cache)
+        self._pipeline = pipeline
         self._info: Union[PiInfoBasic, PiInfo, None] = None
-        self._last_fetched_info: Union[datetime, None] = None
         self._status_url: Union[str, None] = status_url
 
     def __repr__(self):
@@ -88,12 +102,20 @@ class Pi:
         """
         return self._auth.session
 
+    @property
+    def info_cache(self) -> InfoCache:
+        """
+        The :class:`~hostedpi.cache.InfoCache` holding this Pi's info, which is shared with the
+        other Pis belonging to the same :class:`~hostedpi.picloud.PiCloud`
+        """
+        return self._info_cache
+
     @property
     def info(self) -> PiInfo:
         """
         The full Pi information as a :class:`~hostedpi.models.mythic.responses.PiInfo` object.
-        Always fetches the latest information from the API when this is called (with a cache timeout
-        of 10 seconds).
+        Fetches the latest information from the API unless it is held in :attr:`info_cache`, where
+        it is kept for :attr:`~hostedpi.settings.Settings.info_cache_ttl` seconds (10 by default).
 
         :raises HostedPiUserError:
             If the Pi has not been initialised with a name yet, or if the name is ``None``
@@ -108,8 +130,7 @@ class Pi:
         :raises HostedPiServerError:
             If there is another error retrieving the Pi information from the API
         """
-        if self._info is None:
-            self._get_info()
+        self._get_info()
         return self._info
 
     @property
@@ -175,13 +196,7 @@ class Pi:
         powered off).
         """
         self._get_info()
-        if self.provision_status != "live":
-            return f"Provisioning: {self.provision_status}"
-        if self.info.is_booting:
-            return f"Booting: {self.boot_progress}"
-        if self.power:
-            return "Powered on"
-        return "Powered off"
+        return get_status(self.info)
 
     @property
     def boot_progress(self) -> str:
@@ -189,9 +204,7 @@ class Pi:
         A string representing the Pi's boot progress. Can be ``booted``, ``powered off`` or a
         particular stage of the boot process if currently booting.
         """
-        if self.info.boot_progress:
-            return self.info.boot_progress
-        return "booted" if self.power else "powered off"
+        return get_boot_progress(self.info)
 
     @property
     def initialised_keys(self) -> bool:
@@ -332,10 +345,12 @@ class Pi:
         return f"https://www.{self.hostname}"
 
     @property
-    def ssh_keys(self) -> set[str]:
+    def ssh_keys(self) -> set[SSHKey]:
         """
         Retrieve the SSH keys on the Pi, or use assignment to update them. Property value is a set
-        of strings. Assigned value should also be a set of strings, or None to unset.
+        of :class:`~hostedpi.sshkey.SSHKey`, so keys can be added with set operations such as
+        ``pi.ssh_keys |= keys``. Assigned value should be a set of :class:`~hostedpi.sshkey.SSHKey`
+        or strings, or None to unset.
 
         :raises HostedPiNotAuthorizedError:
             If the user is not authorised to access the server
@@ -347,53 +362,23 @@ class Pi:
             If there is another error accessing the API
 
         """
-        # https://www.mythic-beasts.com/support/api/raspberry-pi#ep-get-piserversidentifierssh-key
-        url = urllib.parse.urljoin(self._api_url, f"servers/{self.name}/ssh-key")
-        response = self.session.get(url)
-        log_request(response)
-
-        try:
-            response.raise_for_status()
-        except HTTPError as exc:
-            error = get_error_message(exc)
-            if response.status_code == 403:
-                raise HostedPiNotAuthorizedError(error) from exc
-            if response.status_code == 409:
-                raise HostedPiProvisioningError(error) from exc
-            raise HostedPiServerError(error) from exc
-
-        data = SSHKeysResponse.model_validate(response.json())
-
+        data = self._pipeline.request(GET_SSH_KEYS, name=self.name)
         return dedupe_ssh_keys(data.keys)
 
     @ssh_keys.setter
-    def ssh_keys(self, ssh_keys: Union[set[str], None]):
-        # https://www.mythic-beasts.com/support/api/raspberry-pi#ep-put-piserversidentifierssh-key
-        url = urllib.parse.urljoin(self._api_url, f"servers/{self.name}/ssh-key")
-
+    def ssh_keys(self, ssh_keys: Union[Iterable[Union[str, SSHKey]], None]):
         if ssh_keys is None:
             data = {"ssh_key": ""}
         else:
-            data = {"ssh_key": "\r\n".join(dedupe_ssh_keys(ssh_keys))}
+            data = {"ssh_key": "\r\n".join(map(str, dedupe_ssh_keys(ssh_keys)))}
 
-        response = self.session.put(url, json=data)
-        log_request(response)
+        self._pipeline.request(PUT_SSH_KEYS, json=data, name=self.name)
 
-        try:
-            response.raise_for_status()
-        except HTTPError as exc:
-            error = get_error_message(exc)
-            if response.status_code == 403:
-                raise HostedPiNotAuthorizedError(error) from exc
-            if response.status_code == 409:
-                raise HostedPiProvisioningError(error) from exc
-            raise HostedPiServerError(error) from exc
-
-    def on(self, *, wait: bool = False) -> Union[bool, None]:
+    def on(self, *, wait: Union[bool, WaitPolicy] = False) -> Union[bool, None]:
         """
         Power the Pi on. If *wait* is ``False`` (the default), return immediately. If *wait* is
-        ``True``, wait until the power on request is completed, and return ``True`` on success, and
-        ``False`` on failure.
+        ``True`` or a :class:`~hostedpi.models.wait.WaitPolicy`, wait until the power on request is
+        completed, and return ``True`` on success, and ``False`` on failure.
 
         :raises HostedPiNotAuthorizedError:
             If the user is not authorised to access the server
@@ -403,11 +388,13 @@ class Pi:
 
         :raises HostedPiServerError:
             If there is another error accessing the API
+
+        :raises HostedPiTimeoutError:
+            If *wait* is a policy with a timeout, and the Pi has not booted within it
         """
         self._power_on_off(on=True)
         if wait:
-            while self.info.is_booting:
-                sleep(10)
+            self._waiter.wait_for(self, Pi._is_booted, policy=get_wait_policy(wait))
             return self.power
 
     def off(self):
@@ -425,11 +412,11 @@ class Pi:
         """
         self._power_on_off(on=False)
 
-    def reboot(self, *, wait: bool = False):
+    def reboot(self, *, wait: Union[bool, WaitPolicy] = False):
         """
         Reboot the Pi. If *wait* is ``False`` (the default), return ``None`` immediately. If *wait*
-        is ``True``, wait until the reboot request is completed, and return ``True`` on success, and
-        ``False`` on failure.
+        is ``True`` or a :class:`~hostedpi.models.wait.WaitPolicy`, wait until the reboot request is
+        completed, and return ``True`` on success, and ``False`` on failure.
 
         .. note::
             Note that if *wait* is ``False``, you can poll for the boot status while rebooting by
@@ -441,27 +428,13 @@ class Pi:
 
         :raises HostedPiServerError:
             If there is another error accessing the API
-        """
-        # https://www.mythic-beasts.com/support/api/raspberry-pi#ep-post-piserversidentifierreboot
-        url = urllib.parse.urljoin(self._api_url, f"servers/{self.name}/reboot")
-        response = self.session.post(url)
-        log_request(response)
-
-        try:
-            response.raise_for_status()
-        except HTTPError as exc:
-            if response.status_code == 409:
-                # The server is already being rebooted
-                pass
-            else:
-                error = get_error_message(exc)
-                if response.status_code == 403:
-                    raise HostedPiNotAuthorizedError(error) from exc
-                raise HostedPiServerError(error) from exc
 
+        :raises HostedPiTimeoutError:
+            If *wait* is a policy with a timeout, and the Pi has not booted within it
+        """
+        self._pipeline.request(REBOOT, name=self.name)
         if wait:
-            while self.info.is_booting:
-                sleep(5)
+            self._waiter.wait_for(self, Pi._is_booted, policy=get_wait_policy(wait))
             return self.power
 
     def cancel(self):
@@ -477,7 +450,6 @@ class Pi:
         :raises HostedPiServerError:
             If there is another error accessing the API
         """
-        # https://www.mythic-beasts.com/support/api/raspberry-pi#ep-delete-piserversidentifier
         if self._cancelled:
             logger.warn("This Pi server is already cancelled", name=self.name)
             return
@@ -488,29 +460,20 @@ class Pi:
             logger.warn("Cannot cancel a server that is still provisioning", name=self.name)
             return
 
-        url = urllib.parse.urljoin(self._api_url, f"servers/{self.name}")
-        response = self.session.delete(url)
-        log_request(response)
-
-        try:
-            response.raise_for_status()
-        except HTTPError as exc:
-            error = get_error_message(exc)
-            if response.status_code == 403:
-                raise HostedPiNotAuthorizedError(error) from exc
-            if response.status_code == 409:
-                raise HostedPiProvisioningError(error) from exc
-            raise HostedPiServerError(error) from exc
-
+        self._pipeline.request(DELETE_SERVER, name=self.name)
         self._cancelled = True
 
-    def add_ssh_keys(self, ssh_keys: SSHKeySources) -> set[str]:
+    def add_ssh_keys(self, ssh_keys: SSHKeySources) -> set[SSHKey]:
         """
         Add SSH keys to the Pi from the specified sources.
 
         :type ssh_keys: SSHKeySources
         :param ssh_keys: The sources to find keys to add to the Pi
 
+        :raises HostedPiKeyImportError:
+            If the keys of any GitHub or Launchpad users could not be retrieved, in which case no
+            keys are added
+
         :raises HostedPiNotAuthorizedError:
             If the user is not authorised to access the server
 
@@ -520,7 +483,7 @@ class Pi:
         :raises HostedPiServerError:
             If there is another error accessing the API
         """
-        keys = ssh_keys.collect()
+        keys = ssh_keys.collect(cache=get_key_cache(self._auth.settings))
         if keys:
             self.ssh_keys |= keys
         return self.ssh_keys
@@ -530,7 +493,7 @@ class Pi:
         *,
         github_usernames: Union[set[str], None] = None,
         launchpad_usernames: Union[set[str], None] = None,
-    ) -> set[str]:
+    ) -> set[SSHKey]:
         """
         Remove SSH keys that were imported from GitHub or Launchpad, and return the remaining set of
         keys.
@@ -564,7 +527,7 @@ class Pi:
         self.ssh_keys = ssh_keys
         return self.ssh_keys
 
-    def remove_ssh_keys(self, label: Union[str, None] = None) -> set[str]:
+    def remove_ssh_keys(self, label: Union[str, None] = None) -> set[SSHKey]:
         """
         Remove an SSH key from the Pi that has a specific label (e.g. ``user@hostname``) and return
         the remaining set of keys. If *label* is ``None``, all keys will be removed.
@@ -587,21 +550,56 @@ class Pi:
             self.ssh_keys = remove_ssh_keys_by_label(self.ssh_keys, label)
         return self.ssh_keys
 
-    def wait_until_provisioned(self):
+    def sync_ssh_keys(
+        self, ssh_keys: Iterable[Union[str, SSHKey]], *, dry_run: bool = False
+    ) -> SSHKeyDiff:
+        """
+        Make the SSH keys on the Pi exactly *ssh_keys*, and return the
+        :class:`~hostedpi.models.sshkeys.SSHKeyDiff` of the changes made. The keys are only
+        replaced if they differ from *ssh_keys*, including in their comments.
+
+        :type ssh_keys: Iterable[SSHKey or str]
+        :param ssh_keys: The keys the Pi should have
+
+        :type dry_run: bool
+        :param dry_run:
+            If ``True``, return the changes that would be made without making them (keyword-only
+            argument)
+
+        :raises HostedPiNotAuthorizedError:
+            If the user is not authorised to access the server
+
+        :raises HostedPiProvisioningError:
+            If the Pi is still provisioning
+
+        :raises HostedPiServerError:
+            If there is another error accessing the API
+        """
+        ssh_keys = dedupe_ssh_keys(ssh_keys)
+        diff = SSHKeyDiff.compute(self.ssh_keys, ssh_keys)
+        if diff.changed and not dry_run:
+            self.ssh_keys = ssh_keys if ssh_keys else None
+        return diff
+
+    def wait_until_provisioned(self, *, policy: Union[WaitPolicy, None] = None):
         """
         Wait for the new Pi to be provisioned
 
+        :type policy: :class:`~hostedpi.models.wait.WaitPolicy` or None
+        :param policy:
+            How often to poll the provisioning status, and how long to wait for (keyword-only
+            argument). If not provided, the waiter's default policy is used.
+
         :raises HostedPiNotAuthorizedError:
             If the user is not authorised to access the server
 
         :raises HostedPiServerError:
             If there is another error accessing the API
+
+        :raises HostedPiTimeoutError:
+            If the Pi is not provisioned within the policy's timeout
         """
-        while True:
-            pi_info = self.get_provision_status()
-            if type(pi_info) is PiInfo:
-                return
-            sleep(5)
+        self._waiter.wait_for(self, Pi._is_provisioned, policy=policy)
 
     def get_provision_status(self) -> Union[PiInfo, ProvisioningServer, None]:
         """
@@ -619,23 +617,12 @@ class Pi:
         if self._status_url is None:
             return self.info
 
-        # https://www.mythic-beasts.com/support/api/raspberry-pi#ep-get-queuepitask
         try:
-            response = self.session.get(self._status_url)
-        except ConnectionError as exc:
+            response = self._pipeline.request(GET_PROVISION_STATUS, url=self._status_url)
+        except (ConnectionError, Timeout) as exc:
             logger.warn("Temporary error getting server provisioning status", exc=str(exc))
             return
 
-        try:
-            response.raise_for_status()
-        except HTTPError as exc:
-            error = get_error_message(exc)
-            if response.status_code == 403:
-                raise HostedPiNotAuthorizedError(error) from exc
-            raise HostedPiServerError(error) from exc
-
-        log_request(response)
-
         status = self._parse_status(response.json())
         if type(status) is ProvisioningServer:
             logger.info("Server provisioning in progress", status=status.provision_status)
@@ -644,56 +631,31 @@ class Pi:
             self._name = response.request.url.split("/")[-1]
             logger.info("Server provisioning complete", server_name=self._name)
             self._info = status
-            self._last_fetched_info = datetime.now(timezone.utc)
+            self._info_cache.set(self._name, status)
             self._status_url = None
             return status
 
+    def _is_provisioned(self) -> bool:
+        return type(self.get_provision_status()) is PiInfo
+
+    def _is_booted(self) -> bool:
+        self._info_cache.invalidate(self.name)
+        return not self.info.is_booting
+
     def _get_info(self):
         """
-        Fetch the full Pi information from the API, or return immediately if the last fetch was
-        less than 10 seconds ago.
+        Fetch the full Pi information from the API, or use the cached information if it was
+        fetched within the cache TTL.
         """
         if self.name is None:
             raise HostedPiUserError("Cannot fetch info for a Pi without a name")
-        now = datetime.now(timezone.utc)
-        if self._last_fetched_info is not None:
-            if (now - self._last_fetched_info).total_seconds() < 10:
-                return
-        # https://www.mythic-beasts.com/support/api/raspberry-pi#ep-get-piserversidentifier
-        url = urllib.parse.urljoin(self._api_url, f"servers/{self.name}")
-        response = self.session.get(url)
-        log_request(response)
-
-        try:
-            response.raise_for_status()
-        except HTTPError as exc:
-            error = get_error_message(exc)
-            if response.status_code == 403:
-                raise HostedPiNotAuthorizedError(error) from exc
-            if response.status_code == 409:
-                raise HostedPiProvisioningError(error) from exc
-            raise HostedPiServerError(error) from exc
-
-        self._info = PiInfo.model_validate(response.json())
+        self._info = self._pipeline.request(GET_SERVER, name=self.name)
 
     def _power_on_off(self, *, on: bool):
-        # https://www.mythic-beasts.com/support/api/raspberry-pi#ep-put-piserversidentifierpower
-        url = urllib.parse.urljoin(self._api_url, f"servers/{self.name}/power")
         data = {
             "power": on,
         }
-        response = self.session.put(url, json=data)
-        log_request(response)
-
-        try:
-            response.raise_for_status()
-        except HTTPError as exc:
-            error = get_error_message(exc)
-            if response.status_code == 403:
-                raise HostedPiNotAuthorizedError(error) from exc
-            if response.status_code == 409:
-                raise HostedPiProvisioningError(error) from exc
-            raise HostedPiServerError(error) from exc
+        self._pipeline.request(PUT_POWER, json=data, name=self.name)
 
     def _parse_status(self, data: dict) -> Union[PiInfo, ProvisioningServer, None]:
         """
@@ -1,33 +1,39 @@
-import urllib.parse
-from typing import Union
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from functools import partial
+from operator import attrgetter
+from typing import Any, Callable, Union
 
 from pydantic import ValidationError
-from requests import HTTPError, Session
-from structlog import get_logger
+from requests import Session
 
 from .auth import MythicAuth
-from .exc import (
-    HostedPiInvalidParametersError,
-    HostedPiNameExistsError,
-    HostedPiNotAuthorizedError,
-    HostedPiOutOfStockError,
-    HostedPiServerError,
-    HostedPiUserError,
-    HostedPiValidationError,
+from .cache import InfoCache
+from .endpoints import (
+    CREATE_NAMED_SERVER,
+    CREATE_SERVER,
+    FIND_SERVER,
+    GET_IMAGES,
+    GET_MODELS,
+    GET_SERVERS,
 )
-from .logger import log_request
+from .exc import HostedPiUserError, HostedPiValidationError
+from .keycache import get_key_cache
+from .keyindex import KeyIndex
+from .logger import get_logger
+from .metrics import Metrics
+from .models.metrics import MetricsSnapshot
 from .models.mythic.payloads import NewServer
-from .models.mythic.responses import (
-    PiImagesResponse,
-    PiInfoBasic,
-    ServerSpec,
-    ServersResponse,
-    SpecsResponse,
-)
+from .models.mythic.responses import PiInfoBasic, ServerSpec
+from .models.results import PiResult
 from .models.specs import Pi3ServerSpec, Pi4ServerSpec
-from .models.sshkeys import SSHKeySources
+from .models.sshkeys import SSHKeyDiff, SSHKeySources
+from .models.wait import WaitPolicy
 from .pi import Pi
-from .utils import get_error_message
+from .pipeline import Pipeline
+from .sshkey import SSHKey
+from .utils import check_named, dedupe_ssh_keys, get_wait_policy
+from .waiter import Waiter
 
 
 logger = get_logger()
@@ -60,14 +66,21 @@ class PiCloud:
         auth: Union[MythicAuth, None] = None,
     ):
         self.ssh_keys = None
-        if ssh_keys is not None:
-            if not isinstance(ssh_keys, SSHKeySources):
-                raise TypeError("ssh_keys must be an instance of SSHKeySources or None")
-            self.ssh_keys = ssh_keys.collect()
+        if ssh_keys is not None and not isinstance(ssh_keys, SSHKeySources):
+            raise TypeError("ssh_keys must be an instance of SSHKeySources or None")
         if auth is None:
             auth = MythicAuth()
         self._auth = auth
+        if ssh_keys is not None:
+            self.ssh_keys = ssh_keys.collect(cache=get_key_cache(auth.settings))
         self._api_url = str(auth.settings.api_url)
+        self._info_cache = InfoCache(ttl=auth.settings.info_cache_ttl)
+        self._metrics = Metrics()
+        self._pipeline = Pipeline(
+            auth, info_cache=self._info_cache, middleware=[self._metrics.middleware]
+        )
+        self._waiter = Waiter(max_workers=auth.settings.max_workers)
+        self._pis: Union[dict[str, Pi], None] = None
 
     def __repr__(self):
         return f"<PiCloud id={self._auth._settings.id}>"
@@ -76,22 +89,73 @@ class PiCloud:
     def session(self) -> Session:
         return self._auth.session
 
+    @property
+    def info_cache(self) -> InfoCache:
+        """
+        The :class:`~hostedpi.cache.InfoCache` shared by all :class:`~hostedpi.pi.Pi` objects
+        belonging to this cloud, which can be used to inspect cache hit and miss counts, or to
+        invalidate cached information
+        """
+        return self._info_cache
+
+    @property
+    def pipeline(self) -> Pipeline:
+        """
+        The :class:`~hostedpi.pipeline.Pipeline` shared by all :class:`~hostedpi.pi.Pi` objects
+        belonging to this cloud, which every request to the API passes through. Middleware added
+        to it applies to every request.
+        """
+        return self._pipeline
+
+    @property
+    def metrics(self) -> MetricsSnapshot:
+        """
+        A :class:`~hostedpi.models.metrics.MetricsSnapshot` of the requests made by this cloud and
+        its :class:`~hostedpi.pi.Pi` objects so far: the number of requests, retries and errors
+        and the latency of each endpoint, along with the number of token refreshes and the info
+        cache hit ratio. Use :func:`~hostedpi.metrics.to_prometheus` to export it.
+        """
+        return self._metrics.snapshot(
+            token_refreshes=self._auth.refreshes, info_cache=self._info_cache
+        )
+
+    @property
+    def waiter(self) -> Waiter:
+        """
+        The :class:`~hostedpi.waiter.Waiter` shared by all :class:`~hostedpi.pi.Pi` objects
+        belonging to this cloud, which polls every Pi being waited on together
+        """
+        return self._waiter
+
     @property
     def pis(self) -> dict[str, Pi]:
         """
         A dict of all Raspberry Pi servers associated with the account, keyed by their names.
         Each value is an instance of :class:`~hostedpi.pi.Pi` representing the server.
 
+        The list of servers is fetched from the API the first time this is accessed, and reused
+        after that. Call :meth:`~hostedpi.picloud.PiCloud.refresh` to fetch it again.
+
         :raises HostedPiNotAuthorizedError:
             If the user is not authorized to retrieve the list of Pis
 
         :raises HostedPiServerError:
             If there is an error retrieving the list from the server
         """
-        servers = self._get_pis()
-        return {
-            name: Pi(name, info=info, auth=self._auth) for name, info in sorted(servers.items())
-        }
+        if self._pis is None:
+            servers = self._get_pis()
+            self._pis = {
+                name: Pi(
+                    name,
+                    info=info,
+                    auth=self._auth,
+                    info_cache=self._info_cache,
+                    waiter=self._waiter,
+                    pipeline=self._pipeline,
+                )
+                for name, info in servers.items()
+            }
+        return {name: pi for name, pi in sorted(self._pis.items()) if not pi._cancelled}
 
     @property
     def ipv4_ssh_config(self) -> str:
@@ -109,13 +173,61 @@ class PiCloud:
         """
         return "\n".join(pi.ipv6_ssh_config for pi in self.pis.values())
 
+    def get_pi(self, name: str) -> Union[Pi, None]:
+        """
+        Return the :class:`~hostedpi.pi.Pi` with the given *name*, or ``None`` if there is no such
+        server in the account. Unlike looking the server up in
+        :attr:`~hostedpi.picloud.PiCloud.pis`, this only fetches the requested server from the API
+        (or nothing at all, if the server list has already been fetched).
+
+        :type name: str
+        :param name:
+            The name of the Pi server
+
+        :raises HostedPiNotAuthorizedError:
+            If the user is not authorized to access the server
+
+        :raises HostedPiProvisioningError:
+            If the server is still being provisioned
+
+        :raises HostedPiServerError:
+            If there is another error accessing the API
+        """
+        if self._pis is not None:
+            pi = self._pis.get(name)
+            if pi is not None and not pi._cancelled:
+                return pi
+
+        info = self._pipeline.request(FIND_SERVER, name=name)
+        if info is None:
+            return None
+        pi = Pi(
+            name,
+            info=info,
+            auth=self._auth,
+            info_cache=self._info_cache,
+            waiter=self._waiter,
+            pipeline=self._pipeline,
+        )
+        if self._pis is not None:
+            self._pis[name] = pi
+        return pi
+
+    def refresh(self):
+        """
+        Discard the list of servers and all cached Pi information, so that they are fetched from
+        the API again the next time they are needed
+        """
+        self._pis = None
+        self._info_cache.invalidate()
+
     def create_pi(
         self,
         *,
         name: Union[str, None] = None,
         spec: Union[Pi3ServerSpec, Pi4ServerSpec],
         ssh_keys: Union[SSHKeySources, None] = None,
-        wait: bool = False,
+        wait: Union[bool, WaitPolicy] = False,
     ) -> Pi:
         """
         Provision a new cloud Pi with the specified name, model, disk size and SSH keys. Return a
@@ -137,14 +249,14 @@ class PiCloud:
             keys to use when creating a new Pi. If not provided, no SSH keys will be added on
             creation.
 
-        :type wait: bool
+        :type wait: bool or :class:`~hostedpi.models.wait.WaitPolicy`
         :param wait:
-            If True, the method will return immediately after the server creation request is
-            accepted, without waiting for the server to be provisioned. The returned
+            If False (the default), the method will return immediately after the server creation
+            request is accepted, without waiting for the server to be provisioned. The returned
             :class:`~hostedpi.pi.Pi` instance will not be fully initialised and will not be able to
-            perform actions until the server is ready. If False, the method will wait for the server
-            to be provisioned before returning the :class:`~hostedpi.pi.Pi` instance. Default is
-            False.
+            perform actions until the server is ready. If True, or a
+            :class:`~hostedpi.models.wait.WaitPolicy`, the method will wait for the server to be
+            provisioned before returning the :class:`~hostedpi.pi.Pi` instance.
 
         .. note::
             If any SSH keys are provided on class initialisation, they will be used here but are
@@ -169,62 +281,126 @@ class PiCloud:
 
         :raises HostedPiServerError:
             If there is another error from the server
-        """
-        if name is None:
-            # https://www.mythic-beasts.com/support/api/raspberry-pi#ep-post-piservers
-            url = urllib.parse.urljoin(self._api_url, "servers")
-        else:
-            # https://www.mythic-beasts.com/support/api/raspberry-pi#ep-post-piserversidentifier
-            url = urllib.parse.urljoin(self._api_url, f"servers/{name}")
 
+        :raises HostedPiTimeoutError:
+            If *wait* is a policy with a timeout, and the server is not provisioned within it
+        """
         if not isinstance(spec, (Pi3ServerSpec, Pi4ServerSpec)):
             raise TypeError("spec must be an instance of Pi3ServerSpec or Pi4ServerSpec")
+        ssh_keys = self._collect_ssh_keys(ssh_keys)
+        pi = self._create_pi(name=name, spec=spec, ssh_keys=ssh_keys)
+        if wait:
+            pi.wait_until_provisioned(policy=get_wait_policy(wait))
+        return pi
 
-        if ssh_keys is not None:
-            if not isinstance(ssh_keys, SSHKeySources):
-                raise TypeError("ssh_keys must be an instance of SSHKeySources or None")
-            ssh_keys = ssh_keys.collect()
-        else:
-            ssh_keys = self.ssh_keys
-
-        try:
-            data = NewServer(name=name, spec=spec, ssh_keys=ssh_keys)
-        except ValidationError as exc:
-            logger.error(f"Invalid server name or spec: {exc}")
-            raise HostedPiValidationError("Invalid server name or spec") from exc
-
-        num_ssh_keys = len(ssh_keys) if ssh_keys else 0
-        logger.info("Creating new server", name=name, spec=spec, ssh_keys=num_ssh_keys)
-        response = self.session.post(url, json=data.payload)
-        log_request(response)
-
-        try:
-            response.raise_for_status()
-        except HTTPError as exc:
-            error = get_error_message(exc)
-            if response.status_code == 400:
-                raise HostedPiInvalidParametersError(error) from exc
-            if response.status_code == 403:
-                raise HostedPiNotAuthorizedError(error) from exc
-            if response.status_code == 409:
-                raise HostedPiNameExistsError(error) from exc
-            if response.status_code == 503:
-                raise HostedPiOutOfStockError(error) from exc
-            raise HostedPiServerError(error) from exc
+    def create_pis(
+        self,
+        specs: Union[
+            Mapping[str, Union[Pi3ServerSpec, Pi4ServerSpec]],
+            Iterable[Union[Pi3ServerSpec, Pi4ServerSpec]],
+        ],
+        *,
+        ssh_keys: Union[SSHKeySources, None] = None,
+        wait: Union[bool, WaitPolicy] = False,
+        max_workers: Union[int, None] = None,
+        callback: Union[Callable[[PiResult], Any], None] = None,
+    ) -> list[PiResult]:
+        """
+        Provision a batch of new cloud Pis. All of the creation requests are sent concurrently, and
+        if *wait* is True, the provisioning status of every new Pi is then polled in a single shared
+        loop until they are all provisioned. Return a list of
+        :class:`~hostedpi.models.results.PiResult` objects in the same order as *specs*, each
+        holding the new :class:`~hostedpi.pi.Pi` instance or the error which prevented it from
+        being created. A failure on any individual Pi does not prevent the rest being created.
+
+        :type specs: Mapping[str, Pi3ServerSpec or Pi4ServerSpec] or
+            Iterable[Pi3ServerSpec or Pi4ServerSpec]
+        :param specs:
+            A mapping of server names to the spec of each Pi to provision, or an iterable of specs
+            to provision Pis with automatically generated names
 
-        status_url = response.headers["Location"]
+        :type ssh_keys: :class:`~hostedpi.models.sshkeys.SSHKeySources` or None
+        :param ssh_keys:
+            An instance of :class:`~hostedpi.models.sshkeys.SSHKeySources` containing sources of SSH
+            keys to add to every new Pi (keyword-only argument). The keys are collected once for
+            the whole batch.
 
-        logger.info("Server creation request accepted", status_url=status_url)
-        basic_info = PiInfoBasic.model_validate(spec)
-        pi = Pi(
-            name=name,
-            info=basic_info,
-            auth=self._auth,
-            status_url=status_url,
-        )
-        if wait:
-            pi.wait_until_provisioned()
-        return pi
+        :type wait: bool or :class:`~hostedpi.models.wait.WaitPolicy`
+        :param wait:
+            If True, or a :class:`~hostedpi.models.wait.WaitPolicy`, wait for all of the Pis to be
+            provisioned before returning (keyword-only argument). Default is False. If the policy
+            has a timeout, Pis which are not provisioned within it have a
+            :exc:`~hostedpi.exc.HostedPiTimeoutError` result.
+
+        :type max_workers: int or None
+        :param max_workers:
+            The maximum number of API requests to make concurrently (keyword-only argument). If not
+            provided, :attr:`~hostedpi.settings.Settings.max_workers` is used.
+
+        :type callback: Callable or None
+        :param callback:
+            A function called with each :class:`~hostedpi.models.results.PiResult` as soon as that
+            Pi has been created (or provisioned, if *wait* is True) or has failed, which can be used
+            to report progress (keyword-only argument)
+        """
+        if isinstance(specs, Mapping):
+            requests = list(specs.items())
+        else:
+            requests = [(None, spec) for spec in specs]
+        for _, spec in requests:
+            if not isinstance(spec, (Pi3ServerSpec, Pi4ServerSpec)):
+                raise TypeError("spec must be an instance of Pi3ServerSpec or Pi4ServerSpec")
+        if not requests:
+            return []
+        ssh_keys = self._collect_ssh_keys(ssh_keys)
+        if max_workers is None:
+            max_workers = self._auth.settings.max_workers
+
+        results: list[Union[PiResult, None]] = [None] * len(requests)
+        pending: dict[int, Pi] = {}
+
+        def finish(i: int, result: PiResult):
+            results[i] = result
+            if callback is not None:
+                callback(result)
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(requests))) as executor:
+            futures = {
+                executor.submit(self._create_pi, name=name, spec=spec, ssh_keys=ssh_keys): i
+                for i, (name, spec) in enumerate(requests)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                name = requests[i][0]
+                try:
+                    pi = future.result()
+                except Exception as exc:
+                    logger.info("Server creation failed", name=name, error=str(exc))
+                    finish(i, PiResult(name=name, error=exc))
+                else:
+                    if wait:
+                        pending[i] = pi
+                    else:
+                        finish(i, PiResult(name=name, value=pi))
+
+        def provisioned(i: int, future: Future):
+            pi = pending[i]
+            try:
+                future.result()
+            except Exception as exc:
+                logger.info("Server provisioning failed", name=pi.name, error=str(exc))
+                finish(i, PiResult(name=pi.name, error=exc))
+            else:
+                finish(i, PiResult(name=pi.name, value=pi))
+
+        futures = []
+        for i, pi in pending.items():
+            future = self._waiter.add(pi, Pi._is_provisioned, policy=get_wait_policy(wait))
+            future.add_done_callback(partial(provisioned, i))
+            futures.append(future)
+        self._waiter.wait(futures)
+
+        return results
 
     def get_operating_systems(self, *, model: int) -> dict[str, str]:
         """
@@ -243,20 +419,283 @@ class PiCloud:
         :raises HostedPiServerError:
             If there is an error retrieving the operating systems from the server
         """
-        # https://www.mythic-beasts.com/support/api/raspberry-pi#ep-get-piimagesmodel
         if model not in {3, 4}:
             raise HostedPiUserError("model must be 3 or 4")
-        url = urllib.parse.urljoin(self._api_url, f"images/{model}")
-        response = self.session.get(url)
-        log_request(response)
+        return self._pipeline.request(GET_IMAGES, model=model).root
+
+    def map(
+        self,
+        func: Callable[[Pi], Any],
+        pis: Iterable[Union[Pi, str]],
+        *,
+        max_workers: Union[int, None] = None,
+    ) -> dict[str, PiResult]:
+        """
+        Call *func* with each of the given *pis* concurrently, and return a dict of
+        :class:`~hostedpi.models.results.PiResult` objects keyed by Pi name, sorted by name. A
+        failure on any individual Pi is recorded in its result rather than raised, so one failure
+        does not prevent the operation being performed on the rest.
+
+        :type func: Callable
+        :param func:
+            A function which takes a :class:`~hostedpi.pi.Pi` as its only argument
+
+        :type pis: Iterable[Pi or str]
+        :param pis:
+            The Pis to perform the operation on, given as :class:`~hostedpi.pi.Pi` instances or
+            server names
+
+        :type max_workers: int or None
+        :param max_workers:
+            The maximum number of API requests to make concurrently (keyword-only argument). If not
+            provided, :attr:`~hostedpi.settings.Settings.max_workers` is used.
+
+        :raises HostedPiUserError:
+            If any of the Pis has no name, as its result could not be keyed by name
+        """
+        pis = list(pis)
+        check_named(pis)
+        results = self.imap(func, pis, max_workers=max_workers)
+        return {result.name: result for result in sorted(results, key=lambda r: r.name)}
 
+    def imap(
+        self,
+        func: Callable[[Pi], Any],
+        pis: Iterable[Union[Pi, str]],
+        *,
+        max_workers: Union[int, None] = None,
+    ) -> Iterator[PiResult]:
+        """
+        Like :meth:`~hostedpi.picloud.PiCloud.map`, but yield each
+        :class:`~hostedpi.models.results.PiResult` as soon as it is available, in order of
+        completion.
+        """
+        pis = list(pis)
+        names = [pi for pi in pis if isinstance(pi, str)]
+        if names:
+            all_pis = self.pis
+            found = []
+            for pi in pis:
+                if not isinstance(pi, str):
+                    found.append(pi)
+                elif pi in all_pis:
+                    found.append(all_pis[pi])
+                else:
+                    yield PiResult(name=pi, error=HostedPiUserError(f"Pi server not found: {pi}"))
+            pis = found
+        if not pis:
+            return
+
+        if max_workers is None:
+            max_workers = self._auth.settings.max_workers
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pis))) as executor:
+            futures = {executor.submit(func, pi): pi for pi in pis}
+            for future in as_completed(futures):
+                pi = futures[future]
+                try:
+                    value = future.result()
+                except Exception as exc:
+                    logger.info("Bulk operation failed", name=pi.name, error=str(exc))
+                    yield PiResult(name=pi.name, error=exc)
+                else:
+                    yield PiResult(name=pi.name, value=value)
+
+    def bulk_power(
+        self,
+        pis: Iterable[Union[Pi, str]],
+        *,
+        on: bool,
+        max_workers: Union[int, None] = None,
+    ) -> dict[str, PiResult]:
+        """
+        Power the given *pis* on or off concurrently, and return a dict of
+        :class:`~hostedpi.models.results.PiResult` objects keyed by Pi name.
+
+        :type pis: Iterable[Pi or str]
+        :param pis:
+            The Pis to power on or off, given as :class:`~hostedpi.pi.Pi` instances or server names
+
+        :type on: bool
+        :param on:
+            ``True`` to power the Pis on, ``False`` to power them off (keyword-only argument)
+
+        :type max_workers: int or None
+        :param max_workers:
+            The maximum number of API requests to make concurrently (keyword-only argument)
+
+        :raises HostedPiUserError:
+            If any of the Pis has no name
+        """
+        if on:
+            return self.map(Pi.on, pis, max_workers=max_workers)
+        return self.map(Pi.off, pis, max_workers=max_workers)
+
+    def bulk_reboot(
+        self,
+        pis: Iterable[Union[Pi, str]],
+        *,
+        max_workers: Union[int, None] = None,
+    ) -> dict[str, PiResult]:
+        """
+        Reboot the given *pis* concurrently, and return a dict of
+        :class:`~hostedpi.models.results.PiResult` objects keyed by Pi name.
+
+        :type pis: Iterable[Pi or str]
+        :param pis:
+            The Pis to reboot, given as :class:`~hostedpi.pi.Pi` instances or server names
+
+        :type max_workers: int or None
+        :param max_workers:
+            The maximum number of API requests to make concurrently (keyword-only argument)
+
+        :raises HostedPiUserError:
+            If any of the Pis has no name
+        """
+        return self.map(Pi.reboot, pis, max_workers=max_workers)
+
+    def bulk_cancel(
+        self,
+        pis: Iterable[Union[Pi, str]],
+        *,
+        max_workers: Union[int, None] = None,
+    ) -> dict[str, PiResult]:
+        """
+        Unprovision the given *pis* concurrently, and return a dict of
+        :class:`~hostedpi.models.results.PiResult` objects keyed by Pi name.
+
+        :type pis: Iterable[Pi or str]
+        :param pis:
+            The Pis to cancel, given as :class:`~hostedpi.pi.Pi` instances or server names
+
+        :type max_workers: int or None
+        :param max_workers:
+            The maximum number of API requests to make concurrently (keyword-only argument)
+
+        :raises HostedPiUserError:
+            If any of the Pis has no name
+        """
+        return self.map(Pi.cancel, pis, max_workers=max_workers)
+
+    def get_key_index(
+        self,
+        pis: Union[Iterable[Union[Pi, str]], None] = None,
+        *,
+        max_workers: Union[int, None] = None,
+    ) -> KeyIndex:
+        """
+        Retrieve the SSH keys of the given *pis* concurrently, and return a
+        :class:`~hostedpi.keyindex.KeyIndex` of which Pis each key is installed on. Pis whose keys
+        could not be retrieved are recorded in its :attr:`~hostedpi.keyindex.KeyIndex.errors`.
+
+        :type pis: Iterable[Pi or str] or None
+        :param pis:
+            The Pis to index, given as :class:`~hostedpi.pi.Pi` instances or server names. If not
+            provided, all Pis are indexed.
+
+        :type max_workers: int or None
+        :param max_workers:
+            The maximum number of API requests to make concurrently (keyword-only argument)
+
+        :raises HostedPiUserError:
+            If any of the Pis has no name
+        """
+        if pis is None:
+            pis = self.pis.values()
+        return KeyIndex.from_results(self.map(attrgetter("ssh_keys"), pis, max_workers=max_workers))
+
+    def sync_ssh_keys(
+        self,
+        desired: Mapping[str, Iterable[Union[str, SSHKey]]],
+        *,
+        dry_run: bool = False,
+        max_workers: Union[int, None] = None,
+    ) -> dict[str, PiResult]:
+        """
+        Make the SSH keys on each Pi named in *desired* exactly the keys given for it, and return a
+        dict of :class:`~hostedpi.models.results.PiResult` objects keyed by Pi name, whose values
+        are the :class:`~hostedpi.models.sshkeys.SSHKeyDiff` of the changes made to each Pi.
+
+        The Pis are synced concurrently, as in :meth:`~hostedpi.picloud.PiCloud.map`. The keys on
+        each Pi are compared with the keys it should have, and only Pis whose keys differ are
+        updated. Pis not named in *desired* are left alone.
+
+        .. note::
+
+            The API has no way to update keys only if they have not changed since they were read,
+            so each Pi's keys are read immediately before they are replaced, which keeps the time
+            for another client to change them in between as short as possible.
+
+        :type desired: Mapping[str, Iterable[SSHKey or str]]
+        :param desired:
+            The keys each Pi should have, keyed by Pi name. A Pi given no keys will have all of its
+            keys removed.
+
+        :type dry_run: bool
+        :param dry_run:
+            If ``True``, return the changes that would be made without making them (keyword-only
+            argument)
+
+        :type max_workers: int or None
+        :param max_workers:
+            The maximum number of Pis to sync concurrently (keyword-only argument)
+        """
+        desired = {name: dedupe_ssh_keys(keys) for name, keys in desired.items()}
+
+        def sync(pi: Pi) -> SSHKeyDiff:
+            return pi.sync_ssh_keys(desired[pi.name], dry_run=dry_run)
+
+        return self.map(sync, desired, max_workers=max_workers)
+
+    def _collect_ssh_keys(self, ssh_keys: Union[SSHKeySources, None]) -> Union[set[SSHKey], None]:
+        """
+        Collect the keys from *ssh_keys*, or return the keys given on initialisation if it is
+        ``None``
+        """
+        if ssh_keys is None:
+            return self.ssh_keys
+        if not isinstance(ssh_keys, SSHKeySources):
+            raise TypeError("ssh_keys must be an instance of SSHKeySources or None")
+        return ssh_keys.collect(cache=get_key_cache(self._auth.settings))
+
+    def _create_pi(
+        self,
+        *,
+        name: Union[str, None],
+        spec: Union[Pi3ServerSpec, Pi4ServerSpec],
+        ssh_keys: Union[set[SSHKey], None],
+    ) -> Pi:
+        """
+        Send the request to provision a new Pi with the already collected *ssh_keys*, and return a
+        new :class:`~hostedpi.pi.Pi` instance without waiting for it to be provisioned
+        """
         try:
-            response.raise_for_status()
-        except HTTPError as exc:
-            error = get_error_message(exc)
-            raise HostedPiServerError(error) from exc
+            data = NewServer(name=name, spec=spec, ssh_keys=ssh_keys)
+        except ValidationError as exc:
+            logger.error(f"Invalid server name or spec: {exc}")
+            raise HostedPiValidationError("Invalid server name or spec") from exc
 
-        return PiImagesResponse.model_validate(response.json()).root
+        num_ssh_keys = len(ssh_keys) if ssh_keys else 0
+        logger.info("Creating new server", name=name, spec=spec, ssh_keys=num_ssh_keys)
+        if name is None:
+            response = self._pipeline.request(CREATE_SERVER, json=data.payload)
+        else:
+            response = self._pipeline.request(CREATE_NAMED_SERVER, json=data.payload, name=name)
+        status_url = response.headers["Location"]
+
+        logger.info("Server creation request accepted", status_url=status_url)
+        # the new server's name may not be known yet, so the server list must be fetched again
+        self._pis = None
+        basic_info = PiInfoBasic.model_validate(spec)
+        pi = Pi(
+            name=name,
+            info=basic_info,
+            auth=self._auth,
+            status_url=status_url,
+            info_cache=self._info_cache,
+            waiter=self._waiter,
+            pipeline=self._pipeline,
+        )
+        return pi
 
     def _get_available_specs(self) -> list[ServerSpec]:
         """
@@ -265,39 +704,10 @@ class PiCloud:
         :raises HostedPiServerError:
             If there is an error retrieving the specifications from the server
         """
-        # https://www.mythic-beasts.com/support/api/raspberry-pi#ep-get-pimodels
-        url = urllib.parse.urljoin(self._api_url, "models")
-        response = self.session.get(url)
-        log_request(response)
-
-        try:
-            response.raise_for_status()
-        except HTTPError as exc:
-            error = get_error_message(exc)
-            if response.status_code == 403:
-                raise HostedPiNotAuthorizedError(error) from exc
-            raise HostedPiServerError(error) from exc
-
-        data = SpecsResponse.model_validate(response.json())
-        return data.models
+        return self._pipeline.request(GET_MODELS).models
 
     def _get_pis(self) -> dict[str, PiInfoBasic]:
         """
         Retrieve all Raspberry Pi servers associated with the account
         """
-        # https://www.mythic-beasts.com/support/api/raspberry-pi#ep-get-piservers
-        url = urllib.parse.urljoin(self._api_url, "servers")
-
-        response = self.session.get(url)
-        log_request(response)
-
-        try:
-            response.raise_for_status()
-        except HTTPError as exc:
-            error = get_error_message(exc)
-            if response.status_code == 403:
-                raise HostedPiNotAuthorizedError(error) from exc
-            raise HostedPiServerError(error) from exc
-
-        response = ServersResponse.model_validate(response.json())
-        return response.servers
+        return self._pipeline.request(GET_SERVERS).servers
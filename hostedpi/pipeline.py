@@ -0,0 +1,251 @@
+from collections.abc import Iterable
+from time import perf_counter
+from typing import Any, Callable, Union
+
+from requests import HTTPError, Response
+
+from .auth import MythicAuth
+from .cache import InfoCache
+from .endpoints import Endpoint
+from .exc import HostedPiServerError
+from .logger import get_logger, log_request
+from .metrics import get_retries
+from .tracing import start_span
+from .utils import get_error_message
+
+
+logger = get_logger()
+
+
+class Call:
+    """
+    A single request to an :class:`~hostedpi.endpoints.Endpoint`, as seen by middleware
+
+    :type endpoint: :class:`~hostedpi.endpoints.Endpoint`
+    :param endpoint:
+        The endpoint being requested
+
+    :type url: str
+    :param url:
+        The full URL of the request
+
+    :type params: dict
+    :param params:
+        The parameters the URL was built from, such as the Pi ``name``
+
+    :type json: Any
+    :param json:
+        The request body, or ``None``
+
+    Once a response has been received, it is available to middleware as :attr:`response`.
+    """
+
+    __slots__ = ("endpoint", "url", "params", "json", "response")
+
+    def __init__(self, endpoint: Endpoint, *, url: str, params: dict[str, Any], json: Any = None):
+        self.endpoint = endpoint
+        self.url = url
+        self.params = params
+        self.json = json
+        #: The response to the request, or ``None`` if it has not been received
+        self.response = None
+
+    def __repr__(self):
+        return f"<Call endpoint={self.endpoint.name} url={self.url}>"
+
+
+Handler = Callable[[Call], Any]
+Middleware = Callable[[Call, Handler], Any]
+
+
+class Pipeline:
+    """
+    The path every request to the API takes. :meth:`request` sends a request to an
+    :class:`~hostedpi.endpoints.Endpoint` and handles the response according to its declaration:
+    the response is logged, error statuses are raised as the endpoint's exceptions, and the body is
+    validated with its response model.
+
+    Each request passes through the pipeline's middleware on the way. A middleware is a callable
+    taking the :class:`Call` and the next handler in the chain, which it calls to continue the
+    request and whose result it returns. Exceptions raised further down the chain propagate through
+    it. Middleware can be added with :meth:`use`; the first added is the outermost:
+
+    .. code-block:: python
+
+        def log_slow_requests(call, send):
+            start = time.perf_counter()
+            try:
+                return send(call)
+            finally:
+                if time.perf_counter() - start > 1:
+                    print(f"{call.endpoint.name} was slow")
+
+        cloud.pipeline.use(log_slow_requests)
+
+    Requests answered from the :class:`~hostedpi.cache.InfoCache` do not reach the middleware.
+
+    Each :class:`~hostedpi.picloud.PiCloud` has a pipeline, available as
+    :attr:`~hostedpi.picloud.PiCloud.pipeline`, which is shared by all of its
+    :class:`~hostedpi.pi.Pi` objects.
+
+    :type auth: :class:`~hostedpi.auth.MythicAuth`
+    :param auth:
+        The authentication used to make requests
+
+    :type info_cache: :class:`~hostedpi.cache.InfoCache` or None
+    :param info_cache:
+        The cache used by endpoints which read or change a Pi's info. If not provided, nothing is
+        cached.
+
+    :type middleware: Iterable[Callable] or None
+    :param middleware:
+        The initial middleware
+    """
+
+    def __init__(
+        self,
+        auth: MythicAuth,
+        *,
+        info_cache: Union[InfoCache, None] = None,
+        middleware: Union[Iterable[Middleware], None] = None,
+    ):
+        self._auth = auth
+        self._api_url = str(auth.settings.api_url)
+        self._info_cache = info_cache
+        self._middleware: list[Middleware] = list(middleware or ())
+        self._handler = self._build()
+
+    def __repr__(self):
+        return f"<Pipeline middleware={len(self._middleware)}>"
+
+    @property
+    def middleware(self) -> tuple[Middleware, ...]:
+        """
+        The middleware each request passes through, outermost first
+        """
+        return tuple(self._middleware)
+
+    def use(self, middleware: Middleware):
+        """
+        Add *middleware* to the pipeline, inside any middleware already added
+        """
+        self._middleware.append(middleware)
+        self._handler = self._build()
+
+    def request(
+        self,
+        endpoint: Endpoint,
+        *,
+        url: Union[str, None] = None,
+        json: Any = None,
+        **params: Any,
+    ) -> Any:
+        """
+        Send a request to *endpoint* and return the validated response body, or the response
+        itself if the endpoint has no response model. Returns ``None`` if the response status is
+        one the endpoint ignores.
+
+        :type url: str or None
+        :param url:
+            The full URL to request. If not provided, it is built from the endpoint's path and
+            *params*.
+
+        :type json: Any
+        :param json:
+            The request body
+
+        :raises HostedPiException:
+            The exception declared by the endpoint for an error status, or
+            :exc:`~hostedpi.exc.HostedPiServerError` for any other error status
+        """
+        if url is None:
+            url = endpoint.url(self._api_url, **params)
+        call = Call(endpoint, url=url, params=params, json=json)
+        if self._info_cache is not None and endpoint.cache is not None:
+            return self._cached(call)
+        return self._handler(call)
+
+    def _build(self) -> Handler:
+        handler = self._send
+        for middleware in reversed(self._middleware):
+            handler = _bind(middleware, handler)
+        return handler
+
+    def _cached(self, call: Call) -> Any:
+        name = call.params["name"]
+        if call.endpoint.cache == "read":
+            info = self._info_cache.get(name)
+            if info is None:
+                info = self._handler(call)
+                if info is not None:
+                    self._info_cache.set(name, info)
+            return info
+        try:
+            return self._handler(call)
+        finally:
+            self._info_cache.invalidate(name)
+
+    def _send(self, call: Call) -> Any:
+        send = getattr(self._auth.session, call.endpoint.method.lower())
+        kwargs = {"allow_redirects": call.endpoint.follow_redirects}
+        if call.json is not None:
+            kwargs["json"] = call.json
+        with start_span("hostedpi.request", span_attributes(call)) as span:
+            response = send(call.url, **kwargs)
+            call.response = response
+            span.set_attribute("http.response.status_code", response.status_code)
+            span.set_attribute("hostedpi.retries", get_retries(response))
+            log_request(response)
+            return handle_response(call.endpoint, response)
+
+
+def handle_response(endpoint: Endpoint, response: Response) -> Any:
+    """
+    Raise the exception declared by *endpoint* if *response* has an error status, otherwise return
+    the response body validated with the endpoint's response model, or the response itself if it
+    has none
+    """
+    if response.status_code in endpoint.ignore:
+        return None
+    try:
+        response.raise_for_status()
+    except HTTPError as exc:
+        error = get_error_message(exc)
+        exc_class = endpoint.errors.get(response.status_code, HostedPiServerError)
+        raise exc_class(error) from exc
+    if endpoint.response_model is None:
+        return response
+    return endpoint.parse(response.json())
+
+
+def span_attributes(call: Call) -> dict[str, Any]:
+    """
+    Return the attributes of the tracing span of *call*
+    """
+    attributes = {
+        "hostedpi.endpoint": call.endpoint.name,
+        "http.request.method": call.endpoint.method,
+        "url.full": call.url,
+    }
+    if "name" in call.params:
+        attributes["hostedpi.pi.name"] = call.params["name"]
+    return attributes
+
+
+def log_timing(call: Call, send: Handler) -> Any:
+    """
+    Middleware which logs the time taken by each request at debug level
+    """
+    start = perf_counter()
+    try:
+        return send(call)
+    finally:
+        duration = perf_counter() - start
+        logger.debug("Request timing", endpoint=call.endpoint.name, duration=round(duration, 4))
+
+
+def _bind(middleware: Middleware, handler: Handler) -> Handler:
+    def bound(call: Call) -> Any:
+        return middleware(call, handler)
+
+    return bound
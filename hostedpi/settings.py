@@ -24,6 +24,67 @@ class Settings(BaseSettings):
         The base URL for the API. This is used to make requests to the API endpoints.
         Defaults to "https://api.mythic-beasts.com/beta/pi/".
 
+    :type max_workers: int
+    :param max_workers:
+        The maximum number of API requests to make concurrently when performing operations on
+        multiple Pis at once. Defaults to 8.
+
+    :type info_cache_ttl: float
+    :param info_cache_ttl:
+        The number of seconds Pi information fetched from the API is cached for. Set to 0 to
+        disable caching. Defaults to 10.
+
+    :type pool_size: int
+    :param pool_size:
+        The number of persistent connections kept open to the API. The pool is never smaller than
+        *max_workers*. Defaults to 16.
+
+    :type max_retries: int
+    :param max_retries:
+        The maximum number of times an idempotent request (``GET`` or ``PUT``) is retried after a
+        connection error or a 502, 503 or 504 response. Set to 0 to disable retries. Defaults to 3.
+
+    :type retry_backoff: float
+    :param retry_backoff:
+        The backoff factor in seconds between retries, which doubles after each retry. A
+        ``Retry-After`` header sent by the server takes precedence. Defaults to 0.5.
+
+    :type connect_timeout: float
+    :param connect_timeout:
+        The number of seconds to wait to connect to the API. Defaults to 5.
+
+    :type read_timeout: float
+    :param read_timeout:
+        The number of seconds to wait for the API to respond. Defaults to 30.
+
+    :type token_refresh_skew: float
+    :param token_refresh_skew:
+        The number of seconds before the access token expires that it is refreshed, so that no
+        request is sent with a token which expires in flight. Defaults to 60.
+
+    :type token_background_refresh: bool
+    :param token_background_refresh:
+        Whether to refresh the access token in a background thread before it expires, so that
+        requests never wait for the authentication endpoint once the first token has been fetched.
+        Defaults to ``False``.
+
+    :type token_cache: bool
+    :param token_cache:
+        Whether to store the access token in a file in the user's cache directory, so that other
+        processes using the same API ID reuse it until it expires rather than authenticating again.
+        Defaults to ``False``.
+
+    :type key_cache: bool
+    :param key_cache:
+        Whether to store SSH keys imported from GitHub and Launchpad in files in the user's cache
+        directory, so that they are revalidated rather than downloaded again, and used if GitHub or
+        Launchpad is unavailable. Defaults to ``False``.
+
+    :type key_cache_max_age: float
+    :param key_cache_max_age:
+        The number of seconds cached SSH keys are used for when GitHub or Launchpad is
+        unavailable. Defaults to 86400 (one day).
+
     :raises pydantic_core.ValidationError:
         If the provided settings are invalid or missing required fields.
     """
@@ -40,6 +101,63 @@ class Settings(BaseSettings):
         default="https://api.mythic-beasts.com/beta/pi/",
         description="The API URL",
     )
+    max_workers: int = Field(
+        default=8,
+        ge=1,
+        description="The maximum number of concurrent API requests for bulk operations",
+    )
+    info_cache_ttl: float = Field(
+        default=10,
+        ge=0,
+        description="The number of seconds Pi information is cached for",
+    )
+    pool_size: int = Field(
+        default=16,
+        ge=1,
+        description="The number of persistent connections kept open to the API",
+    )
+    max_retries: int = Field(
+        default=3,
+        ge=0,
+        description="The maximum number of retries of a failed idempotent request",
+    )
+    retry_backoff: float = Field(
+        default=0.5,
+        ge=0,
+        description="The backoff factor in seconds between retries",
+    )
+    connect_timeout: float = Field(
+        default=5,
+        gt=0,
+        description="The number of seconds to wait to connect to the API",
+    )
+    read_timeout: float = Field(
+        default=30,
+        gt=0,
+        description="The number of seconds to wait for the API to respond",
+    )
+    token_refresh_skew: float = Field(
+        default=60,
+        ge=0,
+        description="The number of seconds before expiry that the access token is refreshed",
+    )
+    token_background_refresh: bool = Field(
+        default=False,
+        description="Whether to refresh the access token in a background thread",
+    )
+    token_cache: bool = Field(
+        default=False,
+        description="Whether to share the access token between processes in a cache file",
+    )
+    key_cache: bool = Field(
+        default=False,
+        description="Whether to cache SSH keys imported from GitHub and Launchpad in files",
+    )
+    key_cache_max_age: float = Field(
+        default=86400,
+        ge=0,
+        description="The number of seconds cached SSH keys are used for when the server is down",
+    )
 
     @field_validator("api_url", mode="before")
     @classmethod
@@ -0,0 +1,163 @@
+import binascii
+import hashlib
+from base64 import b64decode, b64encode
+from typing import Union
+
+
+#: The comment marker ssh-import-id adds to the keys it imports, followed by ``source:username``
+IMPORT_TAG = "# ssh-import-id "
+
+
+class SSHKey:
+    """
+    An SSH public key, as found in an ``authorized_keys`` file: the key algorithm, the
+    base64-encoded key blob, and an optional comment (e.g. ``user@hostname``). The line is parsed
+    once when the key is created, and the key is immutable.
+
+    Keys compare equal and hash the same if they have the same algorithm and blob, whatever their
+    comments, so a set of keys never holds the same key twice. :class:`str` returns the full line.
+
+    :type line: str
+    :param line: The key, e.g. ``ssh-ed25519 AAAAC3Nza... user@hostname``
+
+    :raises ValueError:
+        If *line* is empty
+    """
+
+    __slots__ = (
+        "_algorithm",
+        "_blob",
+        "_comment",
+        "_label",
+        "_import_source",
+        "_fingerprint",
+        "_hash",
+    )
+
+    def __init__(self, line: str):
+        parts = line.strip().split(maxsplit=2)
+        if not parts:
+            raise ValueError("SSH key must not be empty")
+        algorithm = parts[0]
+        blob = parts[1] if len(parts) > 1 else ""
+        comment = parts[2] if len(parts) > 2 else ""
+        words = comment.split(maxsplit=1)
+        label = words[0] if words and "@" in words[0] else None
+        _, tag, import_source = comment.rpartition(IMPORT_TAG)
+        set_slot = object.__setattr__
+        set_slot(self, "_algorithm", algorithm)
+        set_slot(self, "_blob", blob)
+        set_slot(self, "_comment", comment)
+        set_slot(self, "_label", label)
+        set_slot(self, "_import_source", import_source.strip() if tag else None)
+        set_slot(self, "_fingerprint", _fingerprint(blob))
+        set_slot(self, "_hash", hash((algorithm, blob)))
+
+    @classmethod
+    def parse(cls, key: Union[str, "SSHKey"]) -> "SSHKey":
+        """
+        Return *key* parsed as an :class:`SSHKey`, or *key* itself if it is one already
+        """
+        return key if isinstance(key, SSHKey) else cls(key)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __reduce__(self):
+        return (self.__class__, (str(self),))
+
+    def __eq__(self, other):
+        if not isinstance(other, SSHKey):
+            return NotImplemented
+        return self._algorithm == other._algorithm and self._blob == other._blob
+
+    def __hash__(self):
+        return self._hash
+
+    def __str__(self):
+        line = f"{self._algorithm} {self._blob}".rstrip()
+        return f"{line} {self._comment}" if self._comment else line
+
+    def __repr__(self):
+        return f"<SSHKey {self._algorithm} {self._fingerprint} comment={self._comment!r}>"
+
+    @property
+    def algorithm(self) -> str:
+        """
+        The key algorithm, e.g. ``ssh-ed25519``
+        """
+        return self._algorithm
+
+    @property
+    def blob(self) -> str:
+        """
+        The base64-encoded key material
+        """
+        return self._blob
+
+    @property
+    def comment(self) -> str:
+        """
+        Everything on the line after the key material, or an empty string if there is nothing
+        """
+        return self._comment
+
+    @property
+    def label(self) -> Union[str, None]:
+        """
+        The label at the start of the comment (e.g. ``user@hostname``), or ``None`` if the comment
+        does not start with one
+        """
+        return self._label
+
+    @property
+    def note(self) -> str:
+        """
+        The rest of the comment after the :attr:`label`, without any leading ``#``
+        """
+        note = self._comment.removeprefix(self._label or "").strip()
+        return note.removeprefix("# ")
+
+    @property
+    def import_source(self) -> Union[str, None]:
+        """
+        Where the key was imported from by ssh-import-id, as ``source:username`` (e.g.
+        ``gh:username``), or ``None`` if it was not imported
+        """
+        return self._import_source
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        The SHA256 fingerprint of the key material, in the format shown by ``ssh-keygen -l`` (e.g.
+        ``SHA256:nThbg6kXUpJWGl7E1IGOCspRomTxdCARLviKw6E5SY8``)
+        """
+        return self._fingerprint
+
+    def with_comment(self, comment: str) -> "SSHKey":
+        """
+        Return a copy of the key with its comment replaced by *comment*
+        """
+        return self.__class__(f"{self._algorithm} {self._blob} {comment}")
+
+    def with_import_source(self, source: str, username: str) -> "SSHKey":
+        """
+        Return a copy of the key with a comment tagging it as imported from *username* on *source*
+        (``gh`` or ``lp``), as ssh-import-id does
+        """
+        return self.with_comment(f"{self._comment} {IMPORT_TAG}{source}:{username}".strip())
+
+
+def _fingerprint(blob: str) -> str:
+    """
+    Return the SHA256 fingerprint of *blob*, or of the text of *blob* if it is not valid base64
+    """
+    try:
+        data = b64decode(blob, validate=True)
+    except binascii.Error:
+        data = blob.encode("utf-8")
+    digest = b64encode(hashlib.sha256(data).digest()).decode("ascii").rstrip("=")
+    return f"SHA256:{digest}"
@@ -0,0 +1,567 @@
+import base64
+import json
+import re
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from threading import Lock, Thread
+from time import monotonic, sleep
+from typing import Any, Callable, Union
+
+from .settings import Settings
+
+
+#: The status, JSON body and headers of a response from the fake API
+Reply = tuple[int, Any, dict[str, str]]
+
+PROVISIONING = {"error": "Server provisioning"}
+NOT_FOUND = {"error": "Server not found"}
+OUT_OF_STOCK = {"error": "We do not have any servers of the specified type available"}
+
+
+def make_pi_info(n: int, *, model: int = 4, memory: int = 4096, cpu_speed: int = 1500) -> dict:
+    """
+    Return the details the API returns for the *n*-th Pi in a fleet, with a unique SSH port and
+    IPv6 addresses
+    """
+    return {
+        "model": model,
+        "model_full": "4B" if model == 4 else "3B",
+        "memory": memory,
+        "cpu_speed": cpu_speed,
+        "disk_size": 10,
+        "nic_speed": 1000 if model == 4 else 100,
+        "status": "live",
+        "is_booting": False,
+        "boot_progress": None,
+        "power": True,
+        "ssh_port": 5000 + n,
+        "ip": f"2a00:1098:8:64::{n:x}",
+        "ip_routed": f"2a00:1098:{8 + n // 256:x}:{n % 256:x}00::/56",
+        "initialised_keys": True,
+        "location": "CLL",
+    }
+
+
+class Fault:
+    """
+    An error response injected with :meth:`FakeMythicAPI.inject_error`
+    """
+
+    __slots__ = ("status", "error", "endpoint", "remaining", "headers")
+
+    def __init__(
+        self,
+        status: int,
+        error: str,
+        endpoint: Union[str, None],
+        remaining: int,
+        headers: dict[str, str],
+    ):
+        self.status = status
+        self.error = error
+        self.endpoint = endpoint
+        self.remaining = remaining
+        self.headers = headers
+
+    def __repr__(self):
+        return f"<Fault status={self.status} endpoint={self.endpoint} remaining={self.remaining}>"
+
+
+class FakeMythicAPI:
+    """
+    A local fake of the Mythic Beasts authentication and Hosted Pi APIs, served over HTTP in a
+    background thread, for testing code which uses *hostedpi* without making requests to Mythic
+    Beasts. Requests go through the real session, transport and pipeline.
+
+    The fake starts with a fleet of *size* Pis named ``pi0``, ``pi1`` and so on, and implements:
+
+    * Access tokens, which expire after *token_expires_in* seconds. If *client_id* and *secret* are
+      given, authentication with any other credentials fails.
+    * Provisioning: a new Pi's status URL reports that it is provisioning for *provision_polls*
+      polls before redirecting to the Pi's details, and until then any request for the Pi fails
+      with 409 "Server provisioning".
+    * Booting: a Pi which has been provisioned, powered on or rebooted reports that it is booting
+      for *boot_polls* requests for its details.
+    * Stock: if *stock* is given, only that many Pis can be created, after which creating a Pi
+      fails with 503.
+    * Rate limiting: if *rate_limit* is given, API requests beyond that many per second fail with
+      429 and a ``Retry-After`` header.
+
+    Every request is delayed by *latency* seconds to simulate the round trip to the real API, and
+    other errors can be scripted with :meth:`inject_error`. Use it as a context manager and
+    configure a client with :meth:`settings`:
+
+    .. code-block:: python
+
+        from hostedpi import MythicAuth, PiCloud
+        from hostedpi.testing import FakeMythicAPI
+
+        with FakeMythicAPI(size=1000, latency=0.02) as api:
+            cloud = PiCloud(auth=MythicAuth(settings=api.settings()))
+            print(len(cloud.pis))
+
+    :type size: int
+    :param size: The number of Pis in the initial fleet. Defaults to 10.
+
+    :type latency: float
+    :param latency: Seconds each request is delayed by. Defaults to 0.
+
+    :type provision_polls: int
+    :param provision_polls:
+        The number of polls for which a new Pi reports that it is provisioning. Defaults to 1.
+
+    :type boot_polls: int
+    :param boot_polls:
+        The number of requests for which a Pi reports that it is booting. Defaults to 1.
+
+    :type stock: int or None
+    :param stock: The number of Pis which can be created, or None for no limit (the default)
+
+    :type rate_limit: int or None
+    :param rate_limit:
+        The maximum number of API requests per second, or None for no limit (the default)
+
+    :type token_expires_in: int
+    :param token_expires_in: Seconds until each access token expires. Defaults to 3600.
+
+    :type client_id: str or None
+    :param client_id: The API ID to accept, or None to accept any credentials (the default)
+
+    :type secret: str or None
+    :param secret: The API secret to accept with *client_id*
+    """
+
+    def __init__(
+        self,
+        *,
+        size: int = 10,
+        latency: float = 0.0,
+        provision_polls: int = 1,
+        boot_polls: int = 1,
+        stock: Union[int, None] = None,
+        rate_limit: Union[int, None] = None,
+        token_expires_in: int = 3600,
+        client_id: Union[str, None] = None,
+        secret: Union[str, None] = None,
+    ):
+        self.latency = latency
+        self.provision_polls = provision_polls
+        self.boot_polls = boot_polls
+        self.stock = stock
+        self.rate_limit = rate_limit
+        self.token_expires_in = token_expires_in
+        self.client_id = client_id
+        self.secret = secret
+        #: The details of each Pi, keyed by name, in the form the API returns them
+        self.servers: dict[str, dict] = {}
+        #: The SSH keys on each Pi, keyed by name, as a newline-separated string
+        self.ssh_keys: dict[str, str] = {}
+        #: The number of requests received, keyed by endpoint name, as in :mod:`hostedpi.endpoints`
+        self.requests: Counter = Counter()
+        self._provisioning: dict[str, int] = {}
+        self._booting: dict[str, int] = {}
+        self._queue: dict[int, str] = {}
+        self._tokens: dict[str, float] = {}
+        self._faults: list[Fault] = []
+        self._recent: deque[float] = deque()
+        self._ids = count()
+        self._lock = Lock()
+        self._server: Union[_Server, None] = None
+        self._thread: Union[Thread, None] = None
+        for _ in range(size):
+            self.add_server()
+
+    def __repr__(self):
+        return f"<FakeMythicAPI url={self.url} servers={len(self.servers)}>"
+
+    def __enter__(self) -> "FakeMythicAPI":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        """
+        The base URL of the server, which is empty until it is started
+        """
+        if self._server is None:
+            return ""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def auth_url(self) -> str:
+        """
+        The URL of the authentication endpoint, for :attr:`~hostedpi.settings.Settings.auth_url`
+        """
+        return f"{self.url}/login"
+
+    @property
+    def api_url(self) -> str:
+        """
+        The base URL of the Pi API, for :attr:`~hostedpi.settings.Settings.api_url`
+        """
+        return f"{self.url}/pi/"
+
+    def settings(self, **kwargs) -> Settings:
+        """
+        Return :class:`~hostedpi.settings.Settings` for a client of this server. Any other settings
+        can be given as keyword arguments.
+        """
+        kwargs.setdefault("id", self.client_id or "fake")
+        kwargs.setdefault("secret", self.secret or "fake")
+        return Settings(auth_url=self.auth_url, api_url=self.api_url, **kwargs)
+
+    def start(self):
+        """
+        Start serving in a background thread
+        """
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.api = self
+        # a short poll interval, so that stopping the server is quick
+        self._thread = Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the server
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+    def add_server(
+        self,
+        name: Union[str, None] = None,
+        *,
+        model: int = 4,
+        memory: int = 4096,
+        cpu_speed: int = 1500,
+        provisioning: bool = False,
+    ) -> str:
+        """
+        Add a Pi to the fleet and return its name, which is generated if *name* is not given. If
+        *provisioning* is ``True``, the Pi is still being provisioned for
+        :attr:`provision_polls` polls.
+        """
+        with self._lock:
+            n = next(self._ids)
+            if name is None:
+                name = f"pi{n}"
+            if model == 3:
+                memory, cpu_speed = 1024, 1200
+            self.servers[name] = make_pi_info(n, model=model, memory=memory, cpu_speed=cpu_speed)
+            self.ssh_keys.setdefault(name, "")
+            if provisioning:
+                self.servers[name]["status"] = "Provisioning"
+                self._provisioning[name] = self.provision_polls
+            return name
+
+    def inject_error(
+        self,
+        status: int,
+        *,
+        error: str = "Error",
+        endpoint: Union[str, None] = None,
+        count: int = 1,
+        headers: Union[dict[str, str], None] = None,
+    ):
+        """
+        Respond to the next *count* requests with *status* and *error*. If *endpoint* is given,
+        only requests to the endpoint with that name (as in :mod:`hostedpi.endpoints`, or
+        ``login``) are affected.
+        """
+        with self._lock:
+            self._faults.append(Fault(status, error, endpoint, count, headers or {}))
+
+    def is_provisioning(self, name: str) -> bool:
+        """
+        Return whether the Pi *name* is still being provisioned
+        """
+        return name in self._provisioning
+
+    def handle(self, method: str, path: str, headers: dict[str, str], body: Any) -> Reply:
+        """
+        Return the status, JSON body and headers of the response to a request
+        """
+        endpoint, route, params = self._route(method, path)
+        if endpoint is None:
+            return 404, {"error": "Not found"}, {}
+        with self._lock:
+            self.requests[endpoint] += 1
+            fault = self._take_fault(endpoint)
+            if fault is not None:
+                return fault.status, {"error": fault.error}, fault.headers
+            if endpoint != "login":
+                if not self._is_authorised(headers.get("Authorization", "")):
+                    return 401, {"error": "Invalid or expired access token"}, {}
+                if self._is_rate_limited():
+                    return 429, {"error": "Rate limit exceeded"}, {"Retry-After": "1"}
+                provisioning = self._provisioning.get(params.get("name")) is not None
+                if provisioning and endpoint != "create_named_server":
+                    return 409, PROVISIONING, {}
+            return route(self, body, headers, **params)
+
+    def _route(
+        self, method: str, path: str
+    ) -> tuple[Union[str, None], Union[Callable, None], dict[str, str]]:
+        for route_method, pattern, endpoint, route in ROUTES:
+            if route_method == method:
+                match = pattern.fullmatch(path)
+                if match is not None:
+                    return endpoint, route, match.groupdict()
+        return None, None, {}
+
+    def _take_fault(self, endpoint: str) -> Union[Fault, None]:
+        for fault in self._faults:
+            if fault.endpoint is None or fault.endpoint == endpoint:
+                fault.remaining -= 1
+                if fault.remaining <= 0:
+                    self._faults.remove(fault)
+                return fault
+        return None
+
+    def _is_authorised(self, authorization: str) -> bool:
+        token = authorization.removeprefix("Bearer ")
+        expiry = self._tokens.get(token)
+        return expiry is not None and monotonic() < expiry
+
+    def _is_rate_limited(self) -> bool:
+        if self.rate_limit is None:
+            return False
+        now = monotonic()
+        while self._recent and self._recent[0] <= now - 1:
+            self._recent.popleft()
+        if len(self._recent) >= self.rate_limit:
+            return True
+        self._recent.append(now)
+        return False
+
+    def _start_booting(self, name: str):
+        if self.boot_polls > 0:
+            info = self.servers[name]
+            info["is_booting"] = True
+            info["boot_progress"] = "Booting"
+            self._booting[name] = self.boot_polls
+
+    def _login(self, body: Any, headers: dict[str, str]) -> Reply:
+        if self.client_id is not None:
+            expected = f"{self.client_id}:{self.secret}".encode("utf-8")
+            authorization = headers.get("Authorization", "").removeprefix("Basic ")
+            try:
+                credentials = base64.b64decode(authorization, validate=True)
+            except ValueError:
+                credentials = b""
+            if credentials != expected:
+                return 401, {"error": "invalid_client"}, {}
+        token = f"fake-token-{next(self._ids)}"
+        self._tokens[token] = monotonic() + self.token_expires_in
+        return 200, {"access_token": token, "expires_in": self.token_expires_in}, {}
+
+    def _get_servers(self, body: Any, headers: dict[str, str]) -> Reply:
+        servers = {
+            name: {key: info[key] for key in ("model", "memory", "cpu_speed")}
+            for name, info in self.servers.items()
+        }
+        return 200, {"servers": servers}, {}
+
+    def _get_server(self, body: Any, headers: dict[str, str], name: str) -> Reply:
+        info = self.servers.get(name)
+        if info is None:
+            return 404, NOT_FOUND, {}
+        if name in self._booting:
+            self._booting[name] -= 1
+            if self._booting[name] < 0:
+                del self._booting[name]
+                info["is_booting"] = False
+                info["boot_progress"] = None
+        return 200, info, {}
+
+    def _create_server(
+        self, body: Any, headers: dict[str, str], name: Union[str, None] = None
+    ) -> Reply:
+        if name is not None and name in self.servers:
+            return 409, {"error": "Server name already exists"}, {}
+        if self.stock is not None:
+            if self.stock <= 0:
+                return 503, OUT_OF_STOCK, {}
+            self.stock -= 1
+        n = next(self._ids)
+        if name is None:
+            name = f"pi{n}"
+        model = body.get("model", 4)
+        info = make_pi_info(
+            n, model=model, memory=body.get("memory", 1024), cpu_speed=body.get("cpu_speed", 1200)
+        )
+        info["status"] = "Provisioning"
+        self.servers[name] = info
+        self.ssh_keys[name] = body.get("ssh_key", "").replace("\r\n", "\n")
+        self._provisioning[name] = self.provision_polls
+        queue_id = next(self._ids)
+        self._queue[queue_id] = name
+        return 202, {}, {"Location": f"{self.url}/queue/pi/{queue_id}"}
+
+    def _delete_server(self, body: Any, headers: dict[str, str], name: str) -> Reply:
+        if self.servers.pop(name, None) is None:
+            return 404, NOT_FOUND, {}
+        self.ssh_keys.pop(name, None)
+        self._booting.pop(name, None)
+        return 200, {}, {}
+
+    def _get_ssh_keys(self, body: Any, headers: dict[str, str], name: str) -> Reply:
+        if name not in self.servers:
+            return 404, NOT_FOUND, {}
+        return 200, {"ssh_key": self.ssh_keys.get(name, "")}, {}
+
+    def _put_ssh_keys(self, body: Any, headers: dict[str, str], name: str) -> Reply:
+        if name not in self.servers:
+            return 404, NOT_FOUND, {}
+        self.ssh_keys[name] = (body or {}).get("ssh_key", "").replace("\r\n", "\n")
+        return 200, {"ssh_key": self.ssh_keys[name]}, {}
+
+    def _put_power(self, body: Any, headers: dict[str, str], name: str) -> Reply:
+        info = self.servers.get(name)
+        if info is None:
+            return 404, NOT_FOUND, {}
+        power = bool(body["power"])
+        if power and not info["power"]:
+            info["power"] = True
+            self._start_booting(name)
+        elif not power:
+            info["power"] = False
+            info["is_booting"] = False
+            info["boot_progress"] = None
+            self._booting.pop(name, None)
+        return 200, {}, {}
+
+    def _reboot(self, body: Any, headers: dict[str, str], name: str) -> Reply:
+        info = self.servers.get(name)
+        if info is None:
+            return 404, NOT_FOUND, {}
+        if name in self._booting:
+            return 409, {"error": "Server already rebooting"}, {}
+        info["power"] = True
+        self._start_booting(name)
+        return 200, {}, {}
+
+    def _get_provision_status(self, body: Any, headers: dict[str, str], id: str) -> Reply:
+        name = self._queue.get(int(id))
+        if name is None or name not in self.servers:
+            return 404, {"error": "Task not found"}, {}
+        if name in self._provisioning:
+            if self._provisioning[name] > 0:
+                self._provisioning[name] -= 1
+                return 200, {"status": "Provisioning"}, {}
+            del self._provisioning[name]
+            self.servers[name]["status"] = "live"
+            self._start_booting(name)
+        return 303, {}, {"Location": f"{self.api_url}servers/{name}"}
+
+    def _get_models(self, body: Any, headers: dict[str, str]) -> Reply:
+        models = [
+            {"model": 3, "memory": 1024, "cpu_speed": 1200, "nic_speed": 100},
+            {"model": 4, "memory": 4096, "cpu_speed": 1500, "nic_speed": 1000},
+            {"model": 4, "memory": 8192, "cpu_speed": 2000, "nic_speed": 1000},
+        ]
+        return 200, {"models": models}, {}
+
+    def _get_images(self, body: Any, headers: dict[str, str], model: str) -> Reply:
+        return 200, {"rpi-bookworm-arm64": "Raspberry Pi OS Bookworm (64 bit)"}, {}
+
+
+NAME = r"(?P<name>[a-z0-9-]+)"
+
+# method, path, endpoint name and handler of each route
+ROUTES = [
+    ("POST", re.compile(r"/login"), "login", FakeMythicAPI._login),
+    ("GET", re.compile(r"/pi/servers"), "get_servers", FakeMythicAPI._get_servers),
+    ("POST", re.compile(r"/pi/servers"), "create_server", FakeMythicAPI._create_server),
+    ("GET", re.compile(rf"/pi/servers/{NAME}"), "get_server", FakeMythicAPI._get_server),
+    (
+        "POST",
+        re.compile(rf"/pi/servers/{NAME}"),
+        "create_named_server",
+        FakeMythicAPI._create_server,
+    ),
+    ("DELETE", re.compile(rf"/pi/servers/{NAME}"), "delete_server", FakeMythicAPI._delete_server),
+    (
+        "GET",
+        re.compile(rf"/pi/servers/{NAME}/ssh-key"),
+        "get_ssh_keys",
+        FakeMythicAPI._get_ssh_keys,
+    ),
+    (
+        "PUT",
+        re.compile(rf"/pi/servers/{NAME}/ssh-key"),
+        "put_ssh_keys",
+        FakeMythicAPI._put_ssh_keys,
+    ),
+    ("PUT", re.compile(rf"/pi/servers/{NAME}/power"), "put_power", FakeMythicAPI._put_power),
+    ("POST", re.compile(rf"/pi/servers/{NAME}/reboot"), "reboot", FakeMythicAPI._reboot),
+    (
+        "GET",
+        re.compile(r"/queue/pi/(?P<id>\d+)"),
+        "get_provision_status",
+        FakeMythicAPI._get_provision_status,
+    ),
+    ("GET", re.compile(r"/pi/models"), "get_models", FakeMythicAPI._get_models),
+    ("GET", re.compile(r"/pi/images/(?P<model>\d+)"), "get_images", FakeMythicAPI._get_images),
+]
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # enough for every worker of a bulk operation to connect at once
+    request_queue_size = 1024
+    api: FakeMythicAPI
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # keep connections alive, as the real API does, so the client's connection pool is used
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.respond()
+
+    def do_PUT(self):
+        self.respond()
+
+    def do_POST(self):
+        self.respond()
+
+    def do_DELETE(self):
+        self.respond()
+
+    def respond(self):
+        api = self.server.api
+        length = int(self.headers.get("Content-Length") or 0)
+        data = self.rfile.read(length) if length else b""
+        try:
+            body = json.loads(data) if data else None
+        except ValueError:
+            # the authentication request is form encoded
+            body = None
+        if api.latency:
+            sleep(api.latency)
+        path = self.path.split("?")[0]
+        status, content, headers = api.handle(self.command, path, dict(self.headers), body)
+        payload = json.dumps(content).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,127 @@
+import hashlib
+import os
+from datetime import datetime
+from pathlib import Path
+from threading import get_ident
+from typing import Union
+
+from pydantic import BaseModel, ValidationError
+
+from .logger import get_logger
+from .settings import Settings
+
+
+logger = get_logger()
+
+
+class CachedToken(BaseModel):
+    """
+    An access token stored in a :class:`TokenCache`
+    """
+
+    access_token: str
+    expires_at: float
+
+
+def get_cache_dir() -> Path:
+    """
+    Return the directory *hostedpi* caches files in: ``hostedpi`` within ``$XDG_CACHE_HOME``, or
+    within ``~/.cache`` if it is not set
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "hostedpi"
+
+
+def write_cache_file(path: Path, data: str):
+    """
+    Replace the file at *path* with *data*, creating its directory if needed. The file is only
+    readable by the current user, and is replaced atomically, so a concurrent reader sees either
+    the old contents or the new ones.
+
+    :raises OSError:
+        If the file cannot be written
+    """
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{get_ident()}.tmp")
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+
+
+class TokenCache:
+    """
+    A file holding an access token, so that it can be reused by other processes until it expires
+    rather than each process authenticating again. The file is only readable by the current user.
+
+    Use :meth:`for_settings` to get the cache for an API ID. :class:`~hostedpi.auth.MythicAuth`
+    uses it when :attr:`~hostedpi.settings.Settings.token_cache` is enabled.
+
+    :type path: pathlib.Path
+    :param path:
+        The path of the cache file
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+
+    def __repr__(self):
+        return f"<TokenCache path={self._path}>"
+
+    @property
+    def path(self) -> Path:
+        """
+        The path of the cache file
+        """
+        return self._path
+
+    @classmethod
+    def for_settings(cls, settings: Settings) -> "TokenCache":
+        """
+        Return the cache for the API ID and authentication URL in *settings*, stored in
+        :func:`get_cache_dir`
+        """
+        key = f"{settings.id}\n{settings.auth_url}".encode("utf-8")
+        digest = hashlib.sha256(key).hexdigest()[:16]
+        return cls(get_cache_dir() / f"token-{digest}.json")
+
+    def load(self) -> Union[tuple[str, datetime], None]:
+        """
+        Return the cached token and its expiry time, or ``None`` if there is no cached token or the
+        file cannot be read
+        """
+        try:
+            data = self._path.read_text()
+        except OSError:
+            return None
+        try:
+            cached = CachedToken.model_validate_json(data)
+        except ValidationError:
+            logger.debug("Ignoring invalid token cache", path=str(self._path))
+            return None
+        return cached.access_token, datetime.fromtimestamp(cached.expires_at)
+
+    def save(self, token: str, expiry: datetime):
+        """
+        Store *token*, which expires at *expiry*. The file is replaced atomically, so a concurrent
+        :meth:`load` sees either the old token or the new one. Failure to write the file is logged
+        and otherwise ignored.
+        """
+        cached = CachedToken(access_token=token, expires_at=expiry.timestamp())
+        try:
+            write_cache_file(self._path, cached.model_dump_json())
+        except OSError as exc:
+            logger.debug("Failed to write token cache", path=str(self._path), error=str(exc))
+
+    def clear(self):
+        """
+        Remove the cached token
+        """
+        self._path.unlink(missing_ok=True)
@@ -0,0 +1,83 @@
+from contextlib import AbstractContextManager
+from typing import Any, Protocol, Union
+
+
+class Span(Protocol):
+    """
+    The part of a span used by *hostedpi*, which :class:`opentelemetry.trace.Span` provides
+    """
+
+    def set_attribute(self, key: str, value: Any) -> None: ...
+
+
+class Tracer(Protocol):
+    """
+    The part of a tracer used by *hostedpi*, which :class:`opentelemetry.trace.Tracer` provides.
+    :meth:`start_as_current_span` returns a context manager which starts a span, makes it the
+    current span until the context exits, and ends it. If the context exits with an exception, the
+    tracer is expected to record it on the span.
+    """
+
+    def start_as_current_span(
+        self, name: str, *, attributes: Union[dict[str, Any], None] = None
+    ) -> AbstractContextManager[Span]: ...
+
+
+class NoopSpan:
+    """
+    The span used when tracing is disabled, which is its own context manager and ignores its
+    attributes
+    """
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "<NoopSpan>"
+
+    def __enter__(self) -> "NoopSpan":
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+_tracer: Union[Tracer, None] = None
+
+
+def set_tracer(tracer: Union[Tracer, None]):
+    """
+    Trace the token refreshes, API requests and wait loop iterations of every
+    :class:`~hostedpi.picloud.PiCloud` with *tracer*, or disable tracing if it is ``None``. For
+    example, to trace with OpenTelemetry:
+
+    .. code-block:: python
+
+        from opentelemetry import trace
+        from hostedpi.tracing import set_tracer
+
+        set_tracer(trace.get_tracer("hostedpi"))
+    """
+    global _tracer
+    _tracer = tracer
+
+
+def get_tracer() -> Union[Tracer, None]:
+    """
+    Return the tracer set with :func:`set_tracer`, or ``None`` if tracing is disabled
+    """
+    return _tracer
+
+
+def start_span(name: str, attributes: dict[str, Any]) -> AbstractContextManager[Span]:
+    """
+    Return a context manager which starts a span called *name* with *attributes* if tracing is
+    enabled, or :data:`NOOP_SPAN` if it is not
+    """
+    if _tracer is None:
+        return NOOP_SPAN
+    return _tracer.start_as_current_span(name, attributes=attributes)
@@ -0,0 +1,150 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Union
+
+from requests import PreparedRequest, Response, Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .settings import Settings
+
+
+#: The methods which are retried after a failed request. POST and DELETE are never retried, as the
+#: server may have acted on the original request.
+RETRY_METHODS = frozenset({"GET", "PUT"})
+
+#: The response status codes which are retried
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+#: The longest delay between retries, in seconds
+RETRY_MAX_BACKOFF = 60
+
+
+class HostedPiAdapter(HTTPAdapter):
+    """
+    A :class:`requests.adapters.HTTPAdapter` configured for the Hosted Pi API. It keeps a pool of
+    persistent connections large enough for concurrent bulk operations, retries idempotent requests
+    (``GET`` and ``PUT``) which fail with a connection error or a 502, 503 or 504 response, and
+    applies a default timeout to every request made without one.
+
+    Use :meth:`from_settings` to create an adapter configured from
+    :class:`~hostedpi.settings.Settings`, or :func:`make_session` to create a session with it
+    mounted.
+
+    :type timeout: tuple[float, float]
+    :param timeout:
+        The default ``(connect, read)`` timeout in seconds
+
+    All other arguments are passed to :class:`~requests.adapters.HTTPAdapter`.
+    """
+
+    def __init__(self, *, timeout: tuple[float, float], **kwargs):
+        self._timeout = timeout
+        super().__init__(**kwargs)
+
+    def __repr__(self):
+        return (
+            f"<HostedPiAdapter pool_size={self._pool_maxsize} "
+            f"max_retries={self.max_retries.total} timeout={self._timeout}>"
+        )
+
+    @property
+    def timeout(self) -> tuple[float, float]:
+        """
+        The default ``(connect, read)`` timeout in seconds
+        """
+        return self._timeout
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "HostedPiAdapter":
+        """
+        Return a new adapter configured from *settings*. The connection pool holds at least
+        :attr:`~hostedpi.settings.Settings.max_workers` connections, so concurrent bulk operations
+        never have to wait for or discard a connection.
+        """
+        pool_size = max(settings.pool_size, settings.max_workers)
+        return cls(
+            timeout=(settings.connect_timeout, settings.read_timeout),
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=get_retry(settings),
+        )
+
+    def send(self, request: PreparedRequest, timeout=None, **kwargs) -> Response:
+        if timeout is None:
+            timeout = self._timeout
+        return super().send(request, timeout=timeout, **kwargs)
+
+
+class HostedPiRetry(Retry):
+    """
+    A :class:`urllib3.util.Retry` whose backoff never exceeds :data:`RETRY_MAX_BACKOFF` seconds.
+    The cap is applied here rather than with the ``backoff_max`` argument, which urllib3 1.26 does
+    not accept.
+    """
+
+    def get_backoff_time(self) -> float:
+        return min(super().get_backoff_time(), RETRY_MAX_BACKOFF)
+
+
+def get_retry(settings: Settings) -> Retry:
+    """
+    Return a :class:`urllib3.util.Retry` which retries idempotent requests up to
+    :attr:`~hostedpi.settings.Settings.max_retries` times with exponential backoff, honouring any
+    ``Retry-After`` header sent by the server. Once the retries are exhausted, the last response is
+    returned rather than raised, so it is handled like any other error response.
+    """
+    return HostedPiRetry(
+        total=settings.max_retries,
+        allowed_methods=RETRY_METHODS,
+        status_forcelist=RETRY_STATUSES,
+        backoff_factor=settings.retry_backoff,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def get_retry_delay(
+    settings: Settings, attempt: int, retry_after: Union[str, None] = None
+) -> float:
+    """
+    Return the number of seconds to wait before retry number *attempt* (counting from 1), using
+    the ``Retry-After`` header value *retry_after* if the server sent one. This matches the backoff
+    of :func:`get_retry`, for clients which cannot use it.
+    """
+    if retry_after is not None:
+        delay = parse_retry_after(retry_after)
+        if delay is not None:
+            return delay
+    if attempt <= 1:
+        return 0
+    return min(settings.retry_backoff * 2 ** (attempt - 1), RETRY_MAX_BACKOFF)
+
+
+def parse_retry_after(value: str) -> Union[float, None]:
+    """
+    Return the number of seconds given by the ``Retry-After`` header *value*, which may be a
+    number of seconds or an HTTP date, or ``None`` if it cannot be parsed
+    """
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
+
+
+def make_session(settings: Settings, *, adapter: Union[HTTPAdapter, None] = None) -> Session:
+    """
+    Return a new :class:`requests.Session` with *adapter* mounted for all HTTP and HTTPS requests.
+    If *adapter* is not provided, a :class:`HostedPiAdapter` configured from *settings* is used.
+    """
+    if adapter is None:
+        adapter = HostedPiAdapter.from_settings(settings)
+    session = Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
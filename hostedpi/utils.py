@@ -1,102 +1,245 @@
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
 from pathlib import Path
-from typing import Literal, Union
+from time import time
+from typing import Any, Literal, Union
 
-import requests
-from requests.exceptions import HTTPError
-from structlog import get_logger
+from requests import Session
+from requests.adapters import HTTPAdapter
+from requests.exceptions import HTTPError, RequestException
 
-from .logger import log_request
-from .models.mythic.responses import ErrorResponse
+from .exc import HostedPiKeyImportError, HostedPiUserError
+from .keycache import CachedKeys, KeyCache
+from .logger import get_logger, log_request
+from .models.mythic.responses import ErrorResponse, PiInfo
+from .models.wait import WaitPolicy
+from .sshkey import SSHKey
 
 
 logger = get_logger()
 
+#: The connect and read timeouts in seconds of each request for a user's SSH keys
+KEY_IMPORT_TIMEOUT = (5.0, 10.0)
+
+#: The maximum number of users whose SSH keys are requested concurrently
+KEY_IMPORT_WORKERS = 8
+
+#: The URL of a user's SSH keys and the separator between them, for each import source
+KEY_IMPORT_URLS = {
+    "gh": ("https://github.com/{username}.keys", "\n"),
+    "lp": ("https://launchpad.net/~{username}/+sshkeys", "\r\n\n"),
+}
+
 
 def ssh_import_id(
     *,
     github_username: Union[str, None] = None,
     launchpad_username: Union[str, None] = None,
-) -> set[str]:
+    session: Union[Session, None] = None,
+    timeout: tuple[float, float] = KEY_IMPORT_TIMEOUT,
+    cache: Union[KeyCache, None] = None,
+    refresh: bool = False,
+) -> set[SSHKey]:
     """
-    Returns a set of SSH keys imported from GitHub and/or Launchpad
+    Returns a set of SSH keys imported from GitHub and/or Launchpad. If *cache* is provided, such
+    as the :class:`~hostedpi.keycache.KeyCache` returned by
+    :func:`~hostedpi.keycache.get_key_cache`, the keys are stored in it; if *refresh* is ``True``,
+    the cached keys are not used.
     """
+    kwargs = {"session": session, "timeout": timeout, "cache": cache, "refresh": refresh}
     keys = set()
     if github_username is not None:
-        url = f"https://github.com/{github_username}.keys"
-        sep = "\n"
-        keys |= {
-            _add_ssh_import_tag(key, "gh", github_username) for key in fetch_keys_from_url(url, sep)
-        }
+        keys |= import_user_keys("gh", github_username, **kwargs)
     if launchpad_username is not None:
-        url = f"https://launchpad.net/~{launchpad_username}/+sshkeys"
-        sep = "\r\n\n"
-        keys |= {
-            _add_ssh_import_tag(key, "lp", launchpad_username)
-            for key in fetch_keys_from_url(url, sep)
-        }
+        keys |= import_user_keys("lp", launchpad_username, **kwargs)
+    return keys
+
 
+def import_user_keys(
+    source: Literal["gh", "lp"],
+    username: str,
+    *,
+    session: Union[Session, None] = None,
+    timeout: tuple[float, float] = KEY_IMPORT_TIMEOUT,
+    cache: Union[KeyCache, None] = None,
+    refresh: bool = False,
+) -> set[SSHKey]:
+    """
+    Return the SSH keys of *username* on GitHub (if *source* is ``gh``) or Launchpad (if *source*
+    is ``lp``), tagged with where they were imported from
+    """
+    url, sep = KEY_IMPORT_URLS[source]
+    keys = fetch_keys_from_url(
+        url.format(username=username),
+        sep,
+        session=session,
+        timeout=timeout,
+        cache=cache,
+        refresh=refresh,
+    )
+    return {SSHKey(key).with_import_source(source, username) for key in keys if key.strip()}
+
+
+def fetch_keys_from_url(
+    url: str,
+    sep: str,
+    *,
+    session: Union[Session, None] = None,
+    timeout: tuple[float, float] = KEY_IMPORT_TIMEOUT,
+    cache: Union[KeyCache, None] = None,
+    refresh: bool = False,
+) -> set[str]:
+    """
+    Retrieve keys from *url* and return a set of keys. The request is made with *session*, or the
+    session returned by :func:`get_key_session` if not provided, and fails if the connection or a
+    read takes longer than the *timeout* in seconds.
+
+    If *cache* is provided, the keys are stored in it. Keys cached by an earlier call are
+    revalidated rather than downloaded again, and are returned if the server is unavailable and
+    they are no older than the cache's :attr:`~hostedpi.keycache.KeyCache.max_age`. If *refresh* is
+    ``True``, cached keys are not used.
+    """
+    if session is None:
+        session = get_key_session()
+    cached = None if cache is None or refresh else cache.load(url)
+    headers = {}
+    if cached is not None:
+        if cached.etag is not None:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified is not None:
+            headers["If-Modified-Since"] = cached.last_modified
+    try:
+        response = session.get(url, timeout=timeout, headers=headers)
+        log_request(response)
+        if cached is not None and response.status_code == 304:
+            cache.save(url, cached.model_copy(update={"fetched_at": time()}))
+            return set(cached.keys)
+        response.raise_for_status()
+    except RequestException as exc:
+        if cached is not None and is_unavailable(exc) and cache.is_usable(cached):
+            logger.warning("Using cached SSH keys", url=url, error=str(exc))
+            return set(cached.keys)
+        raise
+    keys = set(response.text.strip().split(sep))
+    if cache is not None:
+        cached = CachedKeys(
+            keys=sorted(keys),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            fetched_at=time(),
+        )
+        cache.save(url, cached)
     return keys
 
 
-def fetch_keys_from_url(url: str, sep: str) -> set[str]:
+def is_unavailable(exc: RequestException) -> bool:
+    """
+    Return whether *exc* means the server could not be reached, took too long to respond, or
+    responded with a server error, rather than rejecting the request
+    """
+    if isinstance(exc, HTTPError):
+        status_code = exc.response.status_code if exc.response is not None else 0
+        return status_code >= 500 or status_code == 429
+    return True
+
+
+@cache
+def get_key_session() -> Session:
     """
-    Retrieve keys from *url* and return a set of keys
+    Return the session used to request SSH keys from GitHub and Launchpad, which keeps a pool of
+    connections to each for up to :data:`KEY_IMPORT_WORKERS` concurrent requests
     """
-    response = requests.get(url)
-    log_request(response)
-    response.raise_for_status()
-    return set(response.text.strip().split(sep))
+    session = Session()
+    adapter = HTTPAdapter(pool_connections=len(KEY_IMPORT_URLS), pool_maxsize=KEY_IMPORT_WORKERS)
+    session.mount("https://", adapter)
+    return session
 
 
 def collect_ssh_keys(
     *,
-    ssh_keys: Union[set[str], None] = None,
+    ssh_keys: Union[Iterable[Union[str, SSHKey]], None] = None,
     ssh_key_path: Union[Path, None] = None,
     github_usernames: Union[set[str], None] = None,
     launchpad_usernames: Union[set[str], None] = None,
-) -> set[str]:
+    timeout: tuple[float, float] = KEY_IMPORT_TIMEOUT,
+    max_workers: int = KEY_IMPORT_WORKERS,
+    cache: Union[KeyCache, None] = None,
+    refresh: bool = False,
+) -> set[SSHKey]:
     """
-    Collect and combine SSH keys from any of various sources
+    Collect and combine SSH keys from any of various sources. The keys of GitHub and Launchpad
+    users are requested concurrently, up to *max_workers* at a time, each with its own *timeout*.
+    They are stored in *cache* as in :func:`ssh_import_id`; if *refresh* is ``True``, the cached
+    keys are not used.
+
+    :raises HostedPiKeyImportError:
+        If the keys of any of the users could not be retrieved, once all of the other sources have
+        been collected
     """
-    ssh_keys_set = set()
+    ssh_keys_list: list[Union[str, SSHKey]] = []
     if ssh_keys:
-        ssh_keys_set |= ssh_keys
+        ssh_keys_list.extend(ssh_keys)
     if ssh_key_path:
-        ssh_keys_set |= {ssh_key_path.read_text().strip()}
-    if github_usernames:
-        for username in github_usernames:
-            ssh_keys_set |= ssh_import_id(github_username=username)
-    if launchpad_usernames:
-        for username in launchpad_usernames:
-            ssh_keys_set |= ssh_import_id(launchpad_username=username)
-    return dedupe_ssh_keys(ssh_keys_set)
+        ssh_keys_list.append(ssh_key_path.read_text().strip())
+    users = [("gh", username) for username in sorted(github_usernames or ())]
+    users += [("lp", username) for username in sorted(launchpad_usernames or ())]
+    errors: dict[str, Exception] = {}
+    if users:
+        kwargs = {
+            "session": get_key_session(),
+            "timeout": timeout,
+            "cache": cache,
+            "refresh": refresh,
+        }
 
+        def import_keys(user: tuple[str, str]) -> Union[set[SSHKey], Exception]:
+            source, username = user
+            try:
+                return import_user_keys(source, username, **kwargs)
+            except RequestException as exc:
+                return exc
 
-def dedupe_ssh_keys(ssh_keys: set[str]) -> set[str]:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(users))) as executor:
+            for (source, username), result in zip(users, executor.map(import_keys, users)):
+                if isinstance(result, Exception):
+                    logger.debug("Failed to import SSH keys", user=f"{source}:{username}")
+                    errors[f"{source}:{username}"] = result
+                else:
+                    ssh_keys_list.extend(result)
+    keys = dedupe_ssh_keys(ssh_keys_list)
+    if errors:
+        raise HostedPiKeyImportError(
+            f"Failed to import SSH keys for {', '.join(errors)}", keys=keys, errors=errors
+        )
+    return keys
+
+
+def dedupe_ssh_keys(ssh_keys: Iterable[Union[str, SSHKey]]) -> set[SSHKey]:
     """
-    Deduplicate SSH keys by removing any duplicates that are identical except for the comment at the
-    end of the key
+    Return the set of :class:`~hostedpi.sshkey.SSHKey` in *ssh_keys*. Where the same key appears
+    more than once with different comments, the one with the most words in its comment is kept, so
+    that labels and import tags are not thrown away.
     """
 
-    def keysort(key: str) -> int:
-        return (-key.count(" "), key)
-
-    # sort keys by the number of spaces so we don't throw away any additional comments
-    sorted_keys = sorted(ssh_keys, key=keysort)
+    def rank(key: SSHKey) -> tuple[int, str]:
+        return (-len(key.comment.split()), str(key))
 
-    actual_keys = set()  # without comments
-    unique_keys = set()  # with comments (returned)
+    unique_keys: dict[SSHKey, SSHKey] = {}
+    for key in map(SSHKey.parse, ssh_keys):
+        kept = unique_keys.setdefault(key, key)
+        if rank(key) < rank(kept):
+            unique_keys[key] = key
+    return set(unique_keys.values())
 
-    for key in sorted_keys:
-        # Split the key into the actual key and the comment
-        parts = key.split()
-        actual_key = " ".join(parts[:2])
-        if actual_key not in actual_keys:
-            # Only add unique keys to the return set
-            unique_keys.add(key)
-            actual_keys.add(actual_key)
 
-    return unique_keys
+def check_named(pis: Iterable[Any]):
+    """
+    Raise :exc:`~hostedpi.exc.HostedPiUserError` if any of *pis*, given as Pi objects or server
+    names, has no name, so that results keyed by Pi name are never lost
+    """
+    if any(not isinstance(pi, str) and pi.name is None for pi in pis):
+        raise HostedPiUserError("Bulk operations are not supported for Pis without a name")
 
 
 def get_error_message(exc: HTTPError) -> str:
@@ -113,43 +256,52 @@ def get_error_message(exc: HTTPError) -> str:
     return ErrorResponse.model_validate(data).error
 
 
-def remove_ssh_keys_by_label(ssh_keys: set[str], label: str) -> set[str]:
+def get_status(info: PiInfo) -> str:
     """
-    Remove SSH keys that have a specific label (e.g. ``user@hostname``)
+    Return a string representing a Pi's current status (provisioning, booting, live, powered on or
+    powered off) from its info
     """
-    if label:
-        return {key for key in ssh_keys if _extract_ssh_key_label(key) != label}
-    return ssh_keys
+    if info.provision_status != "live":
+        return f"Provisioning: {info.provision_status}"
+    if info.is_booting:
+        return f"Booting: {get_boot_progress(info)}"
+    if info.power:
+        return "Powered on"
+    return "Powered off"
 
 
-def remove_imported_ssh_keys(
-    ssh_keys: set[str], source: Literal["gh", "lp"], username: str
-) -> set[str]:
+def get_boot_progress(info: PiInfo) -> str:
     """
-    Remove SSH keys that were imported from a specific source (GitHub or Launchpad)
+    Return a string representing a Pi's boot progress from its info
     """
-    return {key for key in ssh_keys if not _is_imported_ssh_key(key, source, username)}
+    if info.boot_progress:
+        return info.boot_progress
+    return "booted" if info.power else "powered off"
 
 
-def _extract_ssh_key_label(key: str) -> Union[str, None]:
+def get_wait_policy(wait: Union[bool, WaitPolicy]) -> Union[WaitPolicy, None]:
     """
-    Try to extract the label (e.g. ``user@hostname``) from an SSH key string, otherwise return None
+    Return the policy given as a *wait* argument, or ``None`` (meaning the default policy) if *wait*
+    is simply ``True``
     """
-    parts = key.split(" ")
-    if len(parts) > 2 and "@" in parts[2]:
-        return parts[2]
+    return wait if isinstance(wait, WaitPolicy) else None
 
 
-def _is_imported_ssh_key(key: str, source: Literal["gh", "lp"], username: str) -> bool:
+def remove_ssh_keys_by_label(ssh_keys: Iterable[Union[str, SSHKey]], label: str) -> set[SSHKey]:
     """
-    Check if the SSH key was imported from a specific source (GitHub or Launchpad) and username
+    Remove SSH keys that have a specific label (e.g. ``user@hostname``)
     """
-    import_comment = f"# ssh-import-id {source}:{username}"
-    return key.endswith(import_comment)
+    keys = set(map(SSHKey.parse, ssh_keys))
+    if label:
+        return {key for key in keys if key.label != label}
+    return keys
 
 
-def _add_ssh_import_tag(key: str, source: str, username: str) -> str:
+def remove_imported_ssh_keys(
+    ssh_keys: Iterable[Union[str, SSHKey]], source: Literal["gh", "lp"], username: str
+) -> set[SSHKey]:
     """
-    Add a tag to the SSH key to indicate it was imported
+    Remove SSH keys that were imported from a specific source (GitHub or Launchpad)
     """
-    return f"{key} # ssh-import-id {source}:{username}"
+    import_source = f"{source}:{username}"
+    return {key for key in map(SSHKey.parse, ssh_keys) if key.import_source != import_source}
@@ -0,0 +1,244 @@
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from contextvars import copy_context
+from threading import Condition
+from time import monotonic, sleep
+from typing import TYPE_CHECKING, Callable, Union
+
+from .exc import HostedPiTimeoutError, HostedPiUserError
+from .logger import get_logger
+from .models.wait import WaitPolicy
+from .tracing import Span, start_span
+
+
+if TYPE_CHECKING:
+    from .pi import Pi
+
+
+logger = get_logger()
+
+
+class _Registration:
+    __slots__ = ("pi", "check", "future", "interval", "delays", "next_poll", "deadline", "polls")
+
+    def __init__(
+        self,
+        pi: "Pi",
+        check: Callable[["Pi"], bool],
+        future: Future,
+        *,
+        interval: float,
+        delays: Iterator[float],
+        next_poll: float,
+        deadline: Union[float, None],
+    ):
+        self.pi = pi
+        self.check = check
+        self.future = future
+        self.interval = interval
+        self.delays = delays
+        self.next_poll = next_poll
+        self.deadline = deadline
+        self.polls = 0
+
+
+class Waiter:
+    """
+    A shared poller which waits for any number of Pis to reach a given state. Pis are registered
+    with :meth:`add`, which returns a :class:`~concurrent.futures.Future` for each one, and all
+    registered Pis are polled together in concurrent batches. The interval between polls of each
+    Pi follows a :class:`~hostedpi.models.wait.WaitPolicy`, so the time taken to wait for a whole
+    fleet depends on how long the slowest Pi takes rather than on the number of Pis.
+
+    Polling is driven by whichever thread calls :meth:`wait`; if another thread is already driving
+    the poller, the calling thread waits for its own futures to be resolved instead.
+
+    Each :class:`~hostedpi.picloud.PiCloud` has a waiter, available as
+    :attr:`~hostedpi.picloud.PiCloud.waiter`, which is shared by all of its
+    :class:`~hostedpi.pi.Pi` objects.
+
+    :type max_workers: int
+    :param max_workers:
+        The maximum number of Pis to poll concurrently
+
+    :type policy: :class:`~hostedpi.models.wait.WaitPolicy` or None
+    :param policy:
+        The policy used for Pis registered without their own. If not provided, the defaults of
+        :class:`~hostedpi.models.wait.WaitPolicy` are used.
+    """
+
+    def __init__(self, *, max_workers: int = 8, policy: Union[WaitPolicy, None] = None):
+        if policy is None:
+            policy = WaitPolicy()
+        self._max_workers = max_workers
+        self._policy = policy
+        self._registrations: list[_Registration] = []
+        self._condition = Condition()
+        self._driving = False
+
+    def __repr__(self):
+        return f"<Waiter pending={len(self)}>"
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._registrations)
+
+    @property
+    def policy(self) -> WaitPolicy:
+        """
+        The :class:`~hostedpi.models.wait.WaitPolicy` used for Pis registered without their own
+        """
+        return self._policy
+
+    def add(
+        self,
+        pi: "Pi",
+        check: Callable[["Pi"], bool],
+        *,
+        policy: Union[WaitPolicy, None] = None,
+    ) -> Future:
+        """
+        Register *pi* to be polled with *check*, a function which takes the Pi and returns ``True``
+        once it has reached the desired state. Return a :class:`~concurrent.futures.Future` which
+        resolves to the Pi when *check* returns ``True``, or to the exception raised by *check*.
+        Callbacks can be attached with :meth:`~concurrent.futures.Future.add_done_callback`.
+
+        The Pi is not polled until :meth:`wait` is called.
+
+        :type policy: :class:`~hostedpi.models.wait.WaitPolicy` or None
+        :param policy:
+            The policy to poll the Pi with. If it has a timeout, the future fails with
+            :exc:`~hostedpi.exc.HostedPiTimeoutError` once it expires. If not provided, the
+            waiter's :attr:`policy` is used.
+        """
+        if policy is None:
+            policy = self._policy
+        now = monotonic()
+        registration = _Registration(
+            pi,
+            check,
+            Future(),
+            interval=policy.interval,
+            delays=policy.delays(),
+            next_poll=now,
+            deadline=None if policy.timeout is None else now + policy.timeout,
+        )
+        with self._condition:
+            self._registrations.append(registration)
+        return registration.future
+
+    def wait(self, futures: Iterable[Future]):
+        """
+        Poll the registered Pis until all of the given *futures* are done. Any of the *futures*
+        which are pending but were not returned by :meth:`add` would never be resolved, so they
+        fail with :exc:`~hostedpi.exc.HostedPiUserError` instead.
+        """
+        futures = list(futures)
+        while True:
+            with self._condition:
+                while self._driving and not _all_done(futures):
+                    self._condition.wait()
+                if _all_done(futures):
+                    return
+                self._driving = True
+            try:
+                return self._drive(futures)
+            finally:
+                with self._condition:
+                    self._driving = False
+                    self._condition.notify_all()
+
+    def wait_for(
+        self,
+        pi: "Pi",
+        check: Callable[["Pi"], bool],
+        *,
+        policy: Union[WaitPolicy, None] = None,
+    ) -> "Pi":
+        """
+        Register *pi* with :meth:`add` and wait until *check* returns ``True``, then return the Pi
+
+        :raises HostedPiTimeoutError:
+            If the Pi does not reach the desired state within the policy's timeout
+        """
+        future = self.add(pi, check, policy=policy)
+        self.wait([future])
+        return future.result()
+
+    def _drive(self, futures: list[Future]):
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            while not _all_done(futures):
+                with self._condition:
+                    registrations = list(self._registrations)
+                _fail_orphans(futures, registrations)
+                if not registrations:
+                    return
+                with start_span(
+                    "hostedpi.wait", {"hostedpi.wait.pending": len(registrations)}
+                ) as span:
+                    self._step(executor, registrations, span)
+                with self._condition:
+                    self._registrations = [r for r in self._registrations if not r.future.done()]
+                    self._condition.notify_all()
+
+    def _step(self, executor: ThreadPoolExecutor, registrations: list[_Registration], span: Span):
+        target = min(registration.next_poll for registration in registrations)
+        delay = target - monotonic()
+        if delay > 0:
+            span.set_attribute("hostedpi.wait.sleep", delay)
+            sleep(delay)
+        now = max(target, monotonic())
+        # polls which are due within half of the shortest interval of each other are made as one
+        # batch, rather than jitter splitting them into separate rounds
+        window = now + min(registration.interval for registration in registrations) / 2
+        due = [r for r in registrations if r.next_poll <= window]
+        span.set_attribute("hostedpi.wait.polls", len(due))
+        # each poll runs in a copy of this thread's context, so its span is a child of this one
+        contexts = [copy_context() for _ in due]
+        list(executor.map(lambda r, context: context.run(self._poll, r, now), due, contexts))
+
+    def _poll(self, registration: _Registration, now: float):
+        future = registration.future
+        if future.done():
+            return
+        if registration.deadline is not None and now >= registration.deadline:
+            logger.info("Timed out waiting for Pi", name=registration.pi.name)
+            error = f"Timed out waiting for {registration.pi.name}"
+            future.set_exception(HostedPiTimeoutError(error))
+            return
+        registration.polls += 1
+        attributes = {
+            "hostedpi.pi.name": registration.pi.name,
+            "hostedpi.wait.poll": registration.polls,
+        }
+        with start_span("hostedpi.wait.poll", attributes) as span:
+            try:
+                ready = registration.check(registration.pi)
+            except Exception as exc:
+                span.set_attribute("error.type", type(exc).__name__)
+                future.set_exception(exc)
+                return
+            span.set_attribute("hostedpi.wait.ready", ready)
+        if ready:
+            future.set_result(registration.pi)
+            return
+        registration.next_poll = now + next(registration.delays)
+        if registration.deadline is not None:
+            registration.next_poll = min(registration.next_poll, registration.deadline)
+
+
+def _all_done(futures: list[Future]) -> bool:
+    return all(future.done() for future in futures)
+
+
+def _fail_orphans(futures: list[Future], registrations: list[_Registration]):
+    # registrations are only removed once their futures are done, so a pending future without one
+    # was not returned by this waiter and would never be resolved
+    registered = {registration.future for registration in registrations}
+    for future in futures:
+        if not future.done() and future not in registered:
+            try:
+                future.set_exception(HostedPiUserError("Future is not registered with this waiter"))
+            except InvalidStateError:
+                # the future was resolved elsewhere in the meantime
+                pass
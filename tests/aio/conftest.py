@@ -0,0 +1,42 @@
+import httpx
+import pytest
+
+from hostedpi.aio import AsyncMythicAuth
+
+
+class FakeAPI:
+    """
+    Routes requests to canned responses, keyed by method and URL, and records the requests sent
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+
+    def add(self, method: str, url: str, *responses: httpx.Response):
+        self.routes.setdefault((method, url), []).extend(responses)
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        responses = self.routes[(request.method, str(request.url))]
+        if len(responses) > 1:
+            return responses.pop(0)
+        return responses[0]
+
+    def sent(self, method: str, url: str) -> list[httpx.Request]:
+        return [r for r in self.requests if r.method == method and str(r.url) == url]
+
+
+@pytest.fixture
+def fake_api(auth_url) -> FakeAPI:
+    api = FakeAPI()
+    api.add(
+        "POST", auth_url, httpx.Response(200, json={"access_token": "foobar", "expires_in": 3600})
+    )
+    return api
+
+
+@pytest.fixture
+def async_auth(settings, fake_api) -> AsyncMythicAuth:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake_api))
+    return AsyncMythicAuth(settings=settings, client=client)
@@ -0,0 +1,51 @@
+import asyncio
+
+import httpx
+import pytest
+
+from hostedpi.exc import MythicAuthenticationError
+
+
+def test_async_auth_repr(async_auth):
+    assert repr(async_auth) == "<AsyncMythicAuth id=test_id>"
+
+
+def test_async_auth_token(async_auth, fake_api, auth_url):
+    async def main():
+        assert await async_auth.get_token() == "foobar"
+        assert await async_auth.get_token() == "foobar"
+
+    asyncio.run(main())
+    assert len(fake_api.sent("POST", auth_url)) == 1
+
+
+def test_async_auth_token_single_flight(async_auth, fake_api, auth_url):
+    async def main():
+        return await asyncio.gather(*(async_auth.get_token() for _ in range(10)))
+
+    tokens = asyncio.run(main())
+    assert tokens == ["foobar"] * 10
+    assert len(fake_api.sent("POST", auth_url)) == 1
+
+
+def test_async_auth_request_header(async_auth, fake_api, api_url):
+    fake_api.add("GET", api_url + "models", httpx.Response(200, json={"models": []}))
+
+    asyncio.run(async_auth.request("GET", api_url + "models"))
+    request = fake_api.sent("GET", api_url + "models")[0]
+    assert request.headers["Authorization"] == "Bearer foobar"
+    assert request.headers["User-Agent"].startswith("python-hostedpi/")
+
+
+def test_async_auth_server_error(async_auth, fake_api, auth_url):
+    fake_api.routes[("POST", auth_url)] = [httpx.Response(500)]
+
+    with pytest.raises(MythicAuthenticationError):
+        asyncio.run(async_auth.get_token())
+
+
+def test_async_auth_invalid_response(async_auth, fake_api, auth_url):
+    fake_api.routes[("POST", auth_url)] = [httpx.Response(200, json={"error": "Invalid"})]
+
+    with pytest.raises(MythicAuthenticationError):
+        asyncio.run(async_auth.get_token())
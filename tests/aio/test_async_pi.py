@@ -0,0 +1,158 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from hostedpi.aio import AsyncPi
+from hostedpi.exc import (
+    HostedPiProvisioningError,
+    HostedPiServerError,
+    HostedPiTimeoutError,
+    HostedPiUserError,
+)
+from hostedpi.models import WaitPolicy
+from hostedpi.tracing import set_tracer
+
+
+@pytest.fixture(autouse=True)
+def patch_async_sleep():
+    with patch("hostedpi.aio.pi.asyncio.sleep"):
+        yield
+
+
+@pytest.fixture
+def pi_url(mythic_servers_url, pi_name) -> str:
+    return f"{mythic_servers_url}/{pi_name}"
+
+
+@pytest.fixture
+def async_pi(pi_name, pi_info_basic, async_auth) -> AsyncPi:
+    return AsyncPi(pi_name, info=pi_info_basic, auth=async_auth)
+
+
+def test_async_pi_init(async_pi):
+    assert async_pi.name == "test-pi"
+    assert async_pi.model == 3
+    assert async_pi.memory_gb == 1
+    assert async_pi.info is None
+    assert async_pi.ipv6_ssh_command == "ssh root@test-pi.hostedpi.com"
+    assert repr(async_pi) == "<AsyncPi name=test-pi model=3>"
+
+
+def test_async_pi_get_info(async_pi, fake_api, pi_url, pi_info_json):
+    fake_api.add("GET", pi_url, httpx.Response(200, json=pi_info_json))
+
+    async def main():
+        await async_pi.get_info()
+        return await async_pi.get_status(), await async_pi.get_ipv4_ssh_command()
+
+    status, command = asyncio.run(main())
+    assert status == "Powered on"
+    assert command == "ssh -p 5100 root@ssh.test-pi.hostedpi.com"
+    assert len(fake_api.sent("GET", pi_url)) == 1
+
+
+def test_async_pi_get_info_without_name(pi_info_basic, async_auth):
+    pi = AsyncPi(None, info=pi_info_basic, auth=async_auth)
+    with pytest.raises(HostedPiUserError):
+        asyncio.run(pi.get_info())
+
+
+def test_async_pi_get_info_409(async_pi, fake_api, pi_url):
+    fake_api.add("GET", pi_url, httpx.Response(409, json={"error": "Server provisioning"}))
+    with pytest.raises(HostedPiProvisioningError):
+        asyncio.run(async_pi.get_info())
+
+
+def test_async_pi_ssh_keys(async_pi, fake_api, pi_url):
+    keys_json = {"ssh_key": "ssh-rsa AAA\r\nssh-rsa BBB ben@finn\r\n"}
+    fake_api.add("GET", f"{pi_url}/ssh-key", httpx.Response(200, json=keys_json))
+    fake_api.add("PUT", f"{pi_url}/ssh-key", httpx.Response(200, json={}))
+
+    async def main():
+        return await async_pi.remove_ssh_keys("ben@finn")
+
+    keys = asyncio.run(main())
+    assert {str(key) for key in keys} == {"ssh-rsa AAA"}
+    request = fake_api.sent("PUT", f"{pi_url}/ssh-key")[0]
+    assert request.content == b'{"ssh_key":"ssh-rsa AAA"}'
+
+
+def test_async_pi_reboot_with_wait(async_pi, fake_api, pi_url, pi_info_json):
+    booting_json = dict(pi_info_json, is_booting=True, boot_progress="booting")
+    fake_api.add("POST", f"{pi_url}/reboot", httpx.Response(409, json={}))
+    fake_api.add(
+        "GET",
+        pi_url,
+        httpx.Response(200, json=booting_json),
+        httpx.Response(200, json=pi_info_json),
+    )
+
+    assert asyncio.run(async_pi.reboot(wait=True)) is True
+    assert len(fake_api.sent("GET", pi_url)) == 2
+
+
+def test_async_pi_on_wait_timeout(async_pi, fake_api, pi_url, pi_info_json):
+    booting_json = dict(pi_info_json, is_booting=True, boot_progress="booting")
+    fake_api.add("PUT", f"{pi_url}/power", httpx.Response(200, json={}))
+    fake_api.add("GET", pi_url, httpx.Response(200, json=booting_json))
+    policy = WaitPolicy(jitter=0, timeout=5)
+
+    with patch("hostedpi.aio.pi.monotonic") as monotonic:
+        monotonic.return_value = 0
+
+        async def sleep(delay):
+            monotonic.return_value += delay
+
+        with patch("hostedpi.aio.pi.asyncio.sleep", sleep):
+            with pytest.raises(HostedPiTimeoutError):
+                asyncio.run(async_pi.on(wait=policy))
+    # polls at 0, 1, 2.5, 4.75 and 5 seconds
+    assert len(fake_api.sent("GET", pi_url)) == 5
+
+
+def test_async_pi_off_error_500(async_pi, fake_api, pi_url):
+    fake_api.add("PUT", f"{pi_url}/power", httpx.Response(500, text="Server error"))
+    with pytest.raises(HostedPiServerError):
+        asyncio.run(async_pi.off())
+
+
+def test_async_pi_cancel(async_pi, fake_api, pi_url, pi_info_json):
+    fake_api.add("GET", pi_url, httpx.Response(200, json=pi_info_json))
+    fake_api.add("DELETE", pi_url, httpx.Response(200, json={}))
+
+    asyncio.run(async_pi.cancel())
+    asyncio.run(async_pi.cancel())
+    assert len(fake_api.sent("DELETE", pi_url)) == 1
+    assert repr(async_pi) == "<AsyncPi name=test-pi cancelled>"
+
+
+def test_async_pi_reboot_traced(async_pi, fake_api, pi_url, pi_info_json):
+    booting_json = dict(pi_info_json, is_booting=True, boot_progress="booting")
+    fake_api.add("POST", f"{pi_url}/reboot", httpx.Response(409, json={}))
+    fake_api.add(
+        "GET",
+        pi_url,
+        httpx.Response(200, json=booting_json),
+        httpx.Response(200, json=pi_info_json),
+    )
+    tracer = MagicMock()
+    set_tracer(tracer)
+    try:
+        asyncio.run(async_pi.reboot(wait=True))
+    finally:
+        set_tracer(None)
+
+    spans = [(call.args[0], call.kwargs["attributes"]) for call in tracer.method_calls]
+    waits = [attributes for name, attributes in spans if name == "hostedpi.wait"]
+    assert waits == [
+        {"hostedpi.pi.name": "test-pi", "hostedpi.wait.poll": 1},
+        {"hostedpi.pi.name": "test-pi", "hostedpi.wait.poll": 2},
+    ]
+    requests = [attributes for name, attributes in spans if name == "hostedpi.request"]
+    assert [attributes["hostedpi.endpoint"] for attributes in requests] == [
+        "reboot",
+        "get_server",
+        "get_server",
+    ]
@@ -0,0 +1,197 @@
+import asyncio
+from unittest.mock import Mock, patch
+
+import httpx
+import pytest
+
+from hostedpi.aio import AsyncPiCloud
+from hostedpi.exc import (
+    HostedPiNameExistsError,
+    HostedPiNotAuthorizedError,
+    HostedPiOutOfStockError,
+    HostedPiUserError,
+)
+from hostedpi.models import Pi3ServerSpec
+
+
+@pytest.fixture(autouse=True)
+def patch_async_sleep():
+    with patch("hostedpi.aio.pi.asyncio.sleep"):
+        yield
+
+
+@pytest.fixture
+def servers_json():
+    return {
+        "servers": {
+            "pi2": {"model": 4, "memory": 4096, "cpu_speed": 1500},
+            "pi1": {"model": 3, "memory": 1024, "cpu_speed": 1200},
+        }
+    }
+
+
+def test_async_picloud_repr(async_auth):
+    cloud = AsyncPiCloud(auth=async_auth)
+    assert repr(cloud) == "<AsyncPiCloud id=test_id>"
+
+
+def test_async_picloud_bad_ssh_keys(async_auth):
+    with pytest.raises(TypeError):
+        AsyncPiCloud(ssh_keys="foo", auth=async_auth)
+
+
+def test_async_get_pis(async_auth, fake_api, mythic_servers_url, servers_json):
+    fake_api.add("GET", mythic_servers_url, httpx.Response(200, json=servers_json))
+
+    async def main():
+        async with AsyncPiCloud(auth=async_auth) as cloud:
+            return await cloud.get_pis()
+
+    pis = asyncio.run(main())
+    assert list(pis) == ["pi1", "pi2"]
+    assert pis["pi1"].model == 3
+    assert pis["pi2"].memory_gb == 4
+
+
+def test_async_get_pis_error_403(async_auth, fake_api, mythic_servers_url):
+    fake_api.add("GET", mythic_servers_url, httpx.Response(403, json={"error": "Nope"}))
+    cloud = AsyncPiCloud(auth=async_auth)
+
+    with pytest.raises(HostedPiNotAuthorizedError):
+        asyncio.run(cloud.get_pis())
+
+
+def test_async_get_operating_systems(async_auth, fake_api, api_url):
+    images = {"rpi-bookworm-arm64": "Raspberry Pi OS Bookworm (64 bit)"}
+    fake_api.add("GET", api_url + "images/4", httpx.Response(200, json=images))
+    cloud = AsyncPiCloud(auth=async_auth)
+
+    assert asyncio.run(cloud.get_operating_systems(model=4)) == images
+    with pytest.raises(HostedPiUserError):
+        asyncio.run(cloud.get_operating_systems(model=5))
+
+
+def test_async_create_pi_with_wait(
+    async_auth, fake_api, mythic_servers_url, mythic_async_location, pi_info_json
+):
+    fake_api.add(
+        "POST",
+        f"{mythic_servers_url}/pi3",
+        httpx.Response(202, headers={"Location": mythic_async_location}),
+    )
+    fake_api.add(
+        "GET",
+        mythic_async_location,
+        httpx.Response(200, json={"status": "Provisioning"}),
+        httpx.Response(303, headers={"Location": f"{mythic_servers_url}/pi3"}),
+    )
+    fake_api.add("GET", f"{mythic_servers_url}/pi3", httpx.Response(200, json=pi_info_json))
+    cloud = AsyncPiCloud(auth=async_auth)
+
+    pi = asyncio.run(cloud.create_pi(name="pi3", spec=Pi3ServerSpec(), wait=True))
+    assert pi.name == "pi3"
+    assert pi.info.model_full == "3B"
+    assert repr(pi) == "<AsyncPi name=pi3 model=3B>"
+
+
+@pytest.mark.parametrize(
+    "status_code, exc_class",
+    [
+        (403, HostedPiNotAuthorizedError),
+        (409, HostedPiNameExistsError),
+        (503, HostedPiOutOfStockError),
+    ],
+)
+def test_async_create_pi_errors(async_auth, fake_api, mythic_servers_url, status_code, exc_class):
+    fake_api.add("POST", f"{mythic_servers_url}/pi3", httpx.Response(status_code, json={}))
+    cloud = AsyncPiCloud(auth=async_auth)
+
+    with pytest.raises(exc_class):
+        asyncio.run(cloud.create_pi(name="pi3", spec=Pi3ServerSpec()))
+
+
+def test_async_bulk_power(async_auth, fake_api, mythic_servers_url, servers_json):
+    fake_api.add("GET", mythic_servers_url, httpx.Response(200, json=servers_json))
+    fake_api.add("PUT", f"{mythic_servers_url}/pi1/power", httpx.Response(200, json={}))
+    fake_api.add("PUT", f"{mythic_servers_url}/pi2/power", httpx.Response(403, json={}))
+
+    async def main():
+        cloud = AsyncPiCloud(auth=async_auth)
+        pis = await cloud.get_pis()
+        return await cloud.bulk_power(pis.values(), on=True, max_workers=1)
+
+    results = asyncio.run(main())
+    assert results["pi1"].ok
+    assert isinstance(results["pi2"].error, HostedPiNotAuthorizedError)
+    request = fake_api.sent("PUT", f"{mythic_servers_url}/pi1/power")[0]
+    assert request.content == b'{"power":true}'
+
+
+def test_async_bulk_unnamed_pi(async_auth, fake_api, mythic_servers_url, servers_json):
+    fake_api.add("GET", mythic_servers_url, httpx.Response(200, json=servers_json))
+
+    async def main():
+        cloud = AsyncPiCloud(auth=async_auth)
+        pis = await cloud.get_pis()
+        unnamed = Mock()
+        unnamed.name = None
+        return await cloud.bulk_reboot([pis["pi1"], unnamed])
+
+    with pytest.raises(HostedPiUserError):
+        asyncio.run(main())
+    assert not fake_api.sent("POST", f"{mythic_servers_url}/pi1/reboot")
+
+
+def test_async_key_index(async_auth, fake_api, mythic_servers_url, servers_json):
+    fake_api.add("GET", mythic_servers_url, httpx.Response(200, json=servers_json))
+    keys_json = {"ssh_key": "ssh-rsa AAA ben@finn\r\n"}
+    fake_api.add("GET", f"{mythic_servers_url}/pi1/ssh-key", httpx.Response(200, json=keys_json))
+    fake_api.add("GET", f"{mythic_servers_url}/pi2/ssh-key", httpx.Response(403, json={}))
+
+    async def main():
+        cloud = AsyncPiCloud(auth=async_auth)
+        return await cloud.get_key_index()
+
+    index = asyncio.run(main())
+    assert {name: len(keys) for name, keys in index.where("ben@finn").items()} == {"pi1": 1}
+    assert isinstance(index.errors["pi2"], HostedPiNotAuthorizedError)
+
+
+def test_async_sync_ssh_keys(async_auth, fake_api, mythic_servers_url, servers_json):
+    fake_api.add("GET", mythic_servers_url, httpx.Response(200, json=servers_json))
+    keys_json = {"ssh_key": "ssh-rsa AAA ben@finn\r\nssh-rsa BBB\r\n"}
+    fake_api.add("GET", f"{mythic_servers_url}/pi1/ssh-key", httpx.Response(200, json=keys_json))
+    fake_api.add("GET", f"{mythic_servers_url}/pi2/ssh-key", httpx.Response(200, json=keys_json))
+    fake_api.add("PUT", f"{mythic_servers_url}/pi1/ssh-key", httpx.Response(200, json={}))
+
+    async def main():
+        cloud = AsyncPiCloud(auth=async_auth)
+        desired = {
+            "pi1": {"ssh-rsa AAA ben@finn"},
+            "pi2": {"ssh-rsa AAA ben@finn", "ssh-rsa BBB"},
+            "pi3": set(),
+        }
+        return await cloud.sync_ssh_keys(desired)
+
+    results = asyncio.run(main())
+    assert list(results) == ["pi1", "pi2", "pi3"]
+    assert len(results["pi1"].value.removed) == 1
+    assert not results["pi2"].value.changed
+    assert isinstance(results["pi3"].error, HostedPiUserError)
+    [request] = fake_api.sent("PUT", f"{mythic_servers_url}/pi1/ssh-key")
+    assert request.content == b'{"ssh_key":"ssh-rsa AAA ben@finn"}'
+    assert fake_api.sent("PUT", f"{mythic_servers_url}/pi2/ssh-key") == []
+
+
+def test_async_picloud_metrics(async_auth, fake_api, mythic_servers_url, servers_json):
+    fake_api.add("GET", mythic_servers_url, httpx.Response(200, json=servers_json))
+
+    async def main():
+        async with AsyncPiCloud(auth=async_auth) as cloud:
+            await cloud.get_pis()
+            return cloud.metrics
+
+    snapshot = asyncio.run(main())
+    assert snapshot.endpoints["get_servers"].requests == 1
+    assert snapshot.endpoints["get_servers"].errors == {}
+    assert snapshot.token_refreshes == 1
@@ -0,0 +1,86 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from hostedpi.aio.pipeline import AsyncPipeline
+from hostedpi.cache import InfoCache
+from hostedpi.endpoints import FIND_SERVER, GET_SERVER, PUT_POWER, REBOOT
+from hostedpi.exc import HostedPiProvisioningError
+from hostedpi.models.mythic.responses import PiInfo
+
+
+def test_async_pipeline_request(async_auth, fake_api, api_url, pi_info_json):
+    fake_api.add("GET", api_url + "servers/test-pi", httpx.Response(200, json=pi_info_json))
+    pipeline = AsyncPipeline(async_auth, info_cache=InfoCache())
+
+    async def main():
+        first = await pipeline.request(GET_SERVER, name="test-pi")
+        second = await pipeline.request(GET_SERVER, name="test-pi")
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert isinstance(first, PiInfo)
+    assert second is first
+    assert len(fake_api.sent("GET", api_url + "servers/test-pi")) == 1
+
+
+def test_async_pipeline_follows_redirects(async_auth, fake_api, api_url, pi_info_json):
+    fake_api.add(
+        "GET",
+        api_url + "servers/test-pi",
+        httpx.Response(301, headers={"Location": api_url + "servers/moved-pi"}),
+    )
+    fake_api.add("GET", api_url + "servers/moved-pi", httpx.Response(200, json=pi_info_json))
+    pipeline = AsyncPipeline(async_auth)
+    info = asyncio.run(pipeline.request(GET_SERVER, name="test-pi"))
+    assert isinstance(info, PiInfo)
+    assert len(fake_api.sent("GET", api_url + "servers/moved-pi")) == 1
+
+
+def test_async_pipeline_errors(async_auth, fake_api, api_url):
+    fake_api.add(
+        "PUT",
+        api_url + "servers/test-pi/power",
+        httpx.Response(409, json={"error": "Server provisioning"}),
+    )
+    with pytest.raises(HostedPiProvisioningError):
+        asyncio.run(AsyncPipeline(async_auth).request(PUT_POWER, json={}, name="test-pi"))
+
+
+def test_async_pipeline_ignored_status(async_auth, fake_api, api_url):
+    fake_api.add("GET", api_url + "servers/test-pi", httpx.Response(404))
+    fake_api.add("POST", api_url + "servers/test-pi/reboot", httpx.Response(409))
+    pipeline = AsyncPipeline(async_auth)
+    assert asyncio.run(pipeline.request(FIND_SERVER, name="test-pi")) is None
+    assert asyncio.run(pipeline.request(REBOOT, name="test-pi")) is None
+
+
+def test_async_pipeline_logs_ignored_status(async_auth, fake_api, api_url):
+    fake_api.add("GET", api_url + "servers/test-pi", httpx.Response(404))
+    pipeline = AsyncPipeline(async_auth)
+    with patch("hostedpi.aio.pipeline.log_request") as log_request:
+        assert asyncio.run(pipeline.request(FIND_SERVER, name="test-pi")) is None
+    log_request.assert_called_once()
+    assert log_request.call_args[0][0].status_code == 404
+
+
+def test_async_pipeline_middleware(async_auth, fake_api, api_url):
+    fake_api.add("PUT", api_url + "servers/test-pi/power", httpx.Response(200))
+    seen = []
+
+    async def outer(call, send):
+        seen.append("outer")
+        return await send(call)
+
+    async def inner(call, send):
+        seen.append(call.endpoint.name)
+        return await send(call)
+
+    pipeline = AsyncPipeline(async_auth, middleware=[outer])
+    pipeline.use(inner)
+    assert repr(pipeline) == "<AsyncPipeline middleware=2>"
+    assert pipeline.middleware == (outer, inner)
+    asyncio.run(pipeline.request(PUT_POWER, json={"power": True}, name="test-pi"))
+    assert seen == ["outer", "put_power"]
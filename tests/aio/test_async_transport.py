@@ -0,0 +1,94 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from hostedpi.aio import AsyncMythicAuth
+from hostedpi.aio.transport import RetryTransport, make_client
+
+
+@pytest.fixture(autouse=True)
+def patch_async_sleep():
+    with patch("hostedpi.aio.transport.asyncio.sleep", new=AsyncMock()) as sleep:
+        yield sleep
+
+
+def make_retry_client(settings, fake_api) -> httpx.AsyncClient:
+    transport = RetryTransport(httpx.MockTransport(fake_api), settings=settings)
+    return httpx.AsyncClient(transport=transport)
+
+
+def get(client: httpx.AsyncClient, method: str, url: str) -> httpx.Response:
+    async def main():
+        async with client:
+            return await client.request(method, url)
+
+    return asyncio.run(main())
+
+
+def test_retry_get(settings, fake_api, api_url, patch_async_sleep):
+    fake_api.add(
+        "GET",
+        api_url + "models",
+        httpx.Response(503),
+        httpx.Response(502, headers={"Retry-After": "4"}),
+        httpx.Response(200),
+    )
+    response = get(make_retry_client(settings, fake_api), "GET", api_url + "models")
+    assert response.status_code == 200
+    assert len(fake_api.sent("GET", api_url + "models")) == 3
+    assert response.extensions["retries"] == 2
+    assert [call.args[0] for call in patch_async_sleep.await_args_list] == [0, 4]
+
+
+def test_retries_exhausted(settings, fake_api, api_url):
+    settings.max_retries = 2
+    fake_api.add("PUT", api_url + "servers/pi1/power", httpx.Response(504))
+    response = get(make_retry_client(settings, fake_api), "PUT", api_url + "servers/pi1/power")
+    assert response.status_code == 504
+    assert len(fake_api.sent("PUT", api_url + "servers/pi1/power")) == 3
+    assert response.extensions["retries"] == 2
+
+
+def test_no_retry_post(settings, fake_api, api_url):
+    fake_api.add("POST", api_url + "servers/pi1", httpx.Response(503))
+    response = get(make_retry_client(settings, fake_api), "POST", api_url + "servers/pi1")
+    assert response.status_code == 503
+    assert len(fake_api.sent("POST", api_url + "servers/pi1")) == 1
+
+
+def test_retry_transport_error(settings, api_url):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(200)
+
+    response = get(make_retry_client(settings, handler), "GET", api_url + "models")
+    assert response.status_code == 200
+    assert len(calls) == 2
+
+
+def test_transport_error_exhausted(settings, api_url):
+    settings.max_retries = 0
+
+    def handler(request):
+        raise httpx.ConnectError("connection refused")
+
+    with pytest.raises(httpx.ConnectError):
+        get(make_retry_client(settings, handler), "GET", api_url + "models")
+
+
+def test_make_client(settings):
+    client = make_client(settings)
+    assert isinstance(client._transport, RetryTransport)
+    assert client.timeout.connect == 5
+    assert client.timeout.read == 30
+
+
+def test_async_auth_default_client(settings):
+    auth = AsyncMythicAuth(settings=settings)
+    assert isinstance(auth.client._transport, RetryTransport)
@@ -4,24 +4,31 @@ import pytest
 from requests import HTTPError
 from typer.testing import CliRunner
 
-from hostedpi.cli import app
+from hostedpi.cli import app, utils
+from hostedpi.exc import HostedPiServerError
+from hostedpi.models.results import PiResult
 from hostedpi.pi import Pi
+from hostedpi.sshkey import SSHKey
 
 
 runner = CliRunner()
 
 
 @pytest.fixture(autouse=True)
-def mock_get_picloud():
+def mock_get_picloud(settings):
     with patch("hostedpi.cli.utils.get_picloud") as get_picloud:
+        get_picloud.return_value._auth.settings = settings
         yield get_picloud
 
 
 @pytest.fixture(autouse=True)
-def mock_utils_requests():
-    with patch("hostedpi.utils.requests") as requests:
-        requests.get.return_value.json.return_value = {}
-        yield requests
+def mock_key_session():
+    with patch("hostedpi.utils.get_key_session") as get_key_session:
+        session = get_key_session.return_value
+        session.get.return_value = Mock(
+            status_code=200, text="ssh-rsa foo\nssh-rsa bar", headers={}
+        )
+        yield session
 
 
 @pytest.fixture(autouse=True)
@@ -113,16 +120,112 @@ def test_table():
     assert result.exit_code == 0
 
 
+def test_table_full(mock_get_picloud, mock_pi, pi_name):
+    cloud = mock_get_picloud.return_value
+    cloud.imap.return_value = [PiResult(name=pi_name, value=[pi_name] + ["x"] * 8)]
+    result = runner.invoke(app, ["table", "--full", "--workers", "4"])
+    assert result.exit_code == 0
+    assert cloud.imap.call_args[0][1] == [mock_pi]
+    assert cloud.imap.call_args[1] == {"max_workers": 4}
+
+
+def test_table_full_error(mock_get_picloud, pi_name):
+    cloud = mock_get_picloud.return_value
+    cloud.imap.return_value = [PiResult(name=pi_name, error=HostedPiServerError("error"))]
+    result = runner.invoke(app, ["table", "--full"])
+    assert result.exit_code == 0
+    assert "Error" in result.output
+
+
+def test_full_table_row(pi_name, pi_info_full):
+    pi = Mock(info=pi_info_full, memory_gb=1, cpu_speed=1200)
+    pi.name = pi_name
+    row = utils.full_table_row(pi)
+    assert row == [
+        pi_name,
+        "3B",
+        "1 GB",
+        "1.2 GHz",
+        "100 Mbps",
+        "10 GB",
+        "Powered on",
+        "No",
+        "5100",
+    ]
+
+
 def test_create():
     result = runner.invoke(app, ["create", "--model", "3"])
     assert result.exit_code == 0
 
 
+def test_create_number(mock_get_picloud, mock_pi):
+    cloud = mock_get_picloud.return_value
+    cloud.create_pis.return_value = [PiResult(name=None, value=mock_pi)] * 3
+    result = runner.invoke(app, ["create", "--model", "3", "--number", "3", "--wait"])
+    assert result.exit_code == 0
+    specs = cloud.create_pis.call_args[0][0]
+    assert len(specs) == 3
+    assert cloud.create_pis.call_args[1]["wait"] is True
+    assert "3 server(s) provisioned" in result.output
+
+
+def test_create_names(mock_get_picloud, mock_pi):
+    cloud = mock_get_picloud.return_value
+    cloud.create_pis.return_value = [
+        PiResult(name="pi1", value=mock_pi),
+        PiResult(name="pi2", error=HostedPiServerError("error")),
+    ]
+    result = runner.invoke(app, ["create", "pi1", "pi2", "--model", "4", "--workers", "2"])
+    assert result.exit_code == 0
+    assert list(cloud.create_pis.call_args[0][0]) == ["pi1", "pi2"]
+    assert cloud.create_pis.call_args[1]["max_workers"] == 2
+    assert "1 server provision request(s) accepted" in result.output
+
+
 def test_status(pi_name):
     result = runner.invoke(app, ["status", pi_name])
     assert result.exit_code == 0
 
 
+def test_status_error(mock_get_picloud, pi_name):
+    cloud = mock_get_picloud.return_value
+    cloud.imap.return_value = [PiResult(name=pi_name, error=HostedPiServerError("error"))]
+    result = runner.invoke(app, ["status", pi_name])
+    assert result.exit_code == 0
+    assert "Error" in result.output
+
+
+def test_status_watch(mock_get_picloud, pi_name):
+    cloud = mock_get_picloud.return_value
+    cloud.imap.side_effect = [
+        [PiResult(name=pi_name, value="Booting")],
+        [PiResult(name=pi_name, value="Powered on")],
+    ]
+    with patch("hostedpi.cli.utils.sleep") as sleep:
+        sleep.side_effect = [None, KeyboardInterrupt]
+        result = runner.invoke(app, ["status", pi_name, "--watch", "--interval", "2"])
+    assert result.exit_code == 0
+    assert cloud.imap.call_count == 2
+    assert sleep.call_args[0][0] == 2
+    assert cloud.info_cache.invalidate.call_count == 1
+    assert "Powered on" in result.output
+
+
+def test_status_watch_error(mock_get_picloud, pi_name):
+    cloud = mock_get_picloud.return_value
+    error = HostedPiServerError("Server [error]")
+    cloud.imap.side_effect = [[PiResult(name=pi_name, error=error)]] * 3
+    with patch("hostedpi.cli.utils.sleep") as sleep, patch("hostedpi.cli.utils.print_exc") as exc:
+        sleep.side_effect = [None, None, KeyboardInterrupt]
+        result = runner.invoke(app, ["status", pi_name, "--watch"])
+    assert result.exit_code == 0
+    assert cloud.imap.call_count == 3
+    # the error is shown in the Pi's row, and reported once rather than on every refresh
+    assert "Error: Server [error]" in result.output
+    exc.assert_called_once_with(error)
+
+
 def test_on(pi_name):
     result = runner.invoke(app, ["on", pi_name])
     assert result.exit_code == 0
@@ -188,6 +291,137 @@ def test_ssh_keys_table(pi_name):
     assert result.exit_code == 0
 
 
+def test_ssh_keys_table_comments(pi_name, mock_pi):
+    mock_pi.ssh_keys = {
+        SSHKey("ssh-rsa AAA"),
+        SSHKey("ssh-rsa BBB ben@finn # ssh-import-id gh:ben"),
+        SSHKey("ssh-ed25519 CCC laptop key"),
+    }
+    with patch("hostedpi.cli.utils.get_pi", return_value=mock_pi):
+        result = runner.invoke(app, ["ssh", "keys", "table", pi_name])
+        assert result.exit_code == 0
+        assert "ben@finn" in result.output
+        assert "ssh-import-id gh:ben" in result.output
+        assert "laptop key" in result.output
+        result = runner.invoke(app, ["ssh", "keys", "list", pi_name])
+        assert result.exit_code == 0
+        assert "ben@finn # ssh-import-id gh:ben" in result.output
+
+
+@pytest.fixture()
+def key_index(mock_get_picloud):
+    from hostedpi.keyindex import KeyIndex
+
+    index = KeyIndex(
+        {
+            "pi1": {"ssh-rsa AAA ben@finn # ssh-import-id gh:ben", "ssh-rsa BBB dave@home"},
+            "pi2": {"ssh-rsa AAA ben@jake"},
+        },
+        errors={"pi3": HostedPiServerError("Server error")},
+    )
+    mock_get_picloud.return_value.get_key_index.return_value = index
+    return index
+
+
+def test_ssh_keys_where(key_index, mock_get_picloud, mock_pi):
+    result = runner.invoke(app, ["ssh", "keys", "where", "gh:ben", "--workers", "2"])
+    assert result.exit_code == 0
+    assert "pi1" in result.output
+    assert "pi2" not in result.output
+    mock_get_picloud.return_value.get_key_index.assert_called_once_with([mock_pi], max_workers=2)
+    fingerprint = SSHKey("ssh-rsa AAA").fingerprint
+    result = runner.invoke(app, ["ssh", "keys", "where", fingerprint])
+    assert result.exit_code == 0
+    assert "pi1" in result.output
+    assert "ben@jake" in result.output
+
+
+def test_ssh_keys_where_not_found(key_index):
+    result = runner.invoke(app, ["ssh", "keys", "where", "alice@home"])
+    assert result.exit_code == 0
+    assert "No keys matching 'alice@home' found" in result.output
+
+
+def test_ssh_keys_audit(key_index):
+    result = runner.invoke(app, ["ssh", "keys", "audit"])
+    assert result.exit_code == 0
+    assert "pi1, pi2" in result.output
+    assert "dave@home" in result.output
+
+
+def test_ssh_keys_audit_empty(mock_get_picloud):
+    from hostedpi.keyindex import KeyIndex
+
+    mock_get_picloud.return_value.get_key_index.return_value = KeyIndex({})
+    result = runner.invoke(app, ["ssh", "keys", "audit"])
+    assert result.exit_code == 0
+    assert "No SSH keys found" in result.output
+
+
+@pytest.fixture()
+def manifest_path(tmp_path) -> str:
+    path = tmp_path / "keys.toml"
+    path.write_text(
+        "[pis.pi1]\n"
+        'ssh_keys = ["ssh-rsa AAA ben@finn"]\n'
+        'github_usernames = ["ben"]\n'
+        "[pis.pi2]\n"
+        'ssh_keys = ["ssh-rsa AAA ben@finn"]\n'
+    )
+    return str(path)
+
+
+def test_ssh_keys_sync(mock_get_picloud, mock_key_session, manifest_path):
+    from hostedpi.models.sshkeys import SSHKeyDiff
+
+    cloud = mock_get_picloud.return_value
+    cloud.sync_ssh_keys.return_value = {
+        "pi1": PiResult(name="pi1", value=SSHKeyDiff(added={SSHKey("ssh-rsa foo")}, unchanged=1)),
+        "pi2": PiResult(name="pi2", value=SSHKeyDiff(unchanged=1)),
+        "pi3": PiResult(name="pi3", error=HostedPiServerError("Server error")),
+    }
+    result = runner.invoke(app, ["ssh", "keys", "sync", manifest_path, "--workers", "2"])
+    assert result.exit_code == 0
+    assert "Updated" in result.output
+    assert "Up to date" in result.output
+    [desired] = cloud.sync_ssh_keys.call_args.args
+    assert {name: sorted(map(str, keys)) for name, keys in desired.items()} == {
+        "pi1": [
+            "ssh-rsa AAA ben@finn",
+            "ssh-rsa bar # ssh-import-id gh:ben",
+            "ssh-rsa foo # ssh-import-id gh:ben",
+        ],
+        "pi2": ["ssh-rsa AAA ben@finn"],
+    }
+    assert cloud.sync_ssh_keys.call_args.kwargs == {"dry_run": False, "max_workers": 2}
+    result = runner.invoke(app, ["ssh", "keys", "sync", manifest_path, "--dry-run"])
+    assert result.exit_code == 0
+    assert "Would update" in result.output
+    assert cloud.sync_ssh_keys.call_args.kwargs["dry_run"]
+
+
+def test_ssh_keys_sync_invalid_manifest(mock_get_picloud, tmp_path):
+    path = tmp_path / "keys.toml"
+    path.write_text('[pis.pi1]\ngithub = ["ben"]\n')
+    result = runner.invoke(app, ["ssh", "keys", "sync", str(path)])
+    assert result.exit_code == 1
+    assert "Invalid manifest" in result.output
+    path.write_text("[pis.pi1\n")
+    result = runner.invoke(app, ["ssh", "keys", "sync", str(path)])
+    assert result.exit_code == 1
+    result = runner.invoke(app, ["ssh", "keys", "sync", str(tmp_path / "missing.toml")])
+    assert result.exit_code == 1
+    mock_get_picloud.return_value.sync_ssh_keys.assert_not_called()
+
+
+def test_ssh_keys_sync_import_failure(mock_get_picloud, mock_key_session, manifest_path):
+    mock_key_session.get.side_effect = HTTPError("404 Client Error")
+    result = runner.invoke(app, ["ssh", "keys", "sync", manifest_path])
+    assert result.exit_code == 1
+    assert "Failed to import keys for gh:ben" in result.output
+    mock_get_picloud.return_value.sync_ssh_keys.assert_not_called()
+
+
 def test_ssh_keys_add(ssh_key_path, pi_name):
     result = runner.invoke(app, ["ssh", "keys", "add", ssh_key_path, pi_name])
     assert result.exit_code == 0
@@ -208,9 +442,66 @@ def test_ssh_keys_purge(pi_name):
     assert result.exit_code == 0
 
 
-def test_ssh_keys_import(pi_name):
+def test_ssh_keys_import(pi_name, mock_pi, mock_key_session):
     result = runner.invoke(app, ["ssh", "keys", "import", pi_name, "--github", "bennuttall"])
     assert result.exit_code == 0
+    # the keys are fetched once, rather than once per Pi
+    mock_key_session.get.assert_called_once_with(
+        "https://github.com/bennuttall.keys", timeout=(5.0, 10.0), headers={}
+    )
+    [ssh_keys] = mock_pi.add_ssh_keys.call_args.args
+    assert ssh_keys.ssh_keys == {
+        "ssh-rsa foo # ssh-import-id gh:bennuttall",
+        "ssh-rsa bar # ssh-import-id gh:bennuttall",
+    }
+
+
+def test_ssh_keys_import_no_key_cache(pi_name, mock_key_session, cache_home):
+    mock_key_session.get.return_value.headers = {"ETag": '"abc"'}
+    runner.invoke(app, ["ssh", "keys", "import", pi_name, "--github", "bennuttall"])
+    result = runner.invoke(app, ["ssh", "keys", "import", pi_name, "--gh", "bennuttall"])
+    assert result.exit_code == 0
+    # the key cache is opt-in, so the keys are neither stored nor revalidated
+    assert mock_key_session.get.call_args.kwargs["headers"] == {}
+    assert not list(cache_home.glob("hostedpi/keys-*.json"))
+
+
+def test_ssh_keys_import_refresh(pi_name, mock_key_session, settings):
+    settings.key_cache = True
+    mock_key_session.get.return_value.headers = {"ETag": '"abc"'}
+    runner.invoke(app, ["ssh", "keys", "import", pi_name, "--github", "bennuttall"])
+    result = runner.invoke(app, ["ssh", "keys", "import", pi_name, "--gh", "bennuttall"])
+    assert result.exit_code == 0
+    assert mock_key_session.get.call_args.kwargs["headers"] == {"If-None-Match": '"abc"'}
+    result = runner.invoke(
+        app, ["ssh", "keys", "import", pi_name, "--gh", "bennuttall", "--refresh"]
+    )
+    assert result.exit_code == 0
+    assert mock_key_session.get.call_args.kwargs["headers"] == {}
+
+
+def test_ssh_keys_import_partial_failure(pi_name, mock_pi, mock_key_session):
+    def get(url, **kwargs):
+        if "launchpad" in url:
+            raise HTTPError("404 Client Error")
+        return Mock(status_code=200, text="ssh-rsa foo", headers={})
+
+    mock_key_session.get.side_effect = get
+    result = runner.invoke(
+        app, ["ssh", "keys", "import", pi_name, "--github", "ben", "--launchpad", "nobody"]
+    )
+    assert result.exit_code == 0
+    assert "Failed to import keys for lp:nobody" in result.output
+    [ssh_keys] = mock_pi.add_ssh_keys.call_args.args
+    assert ssh_keys.ssh_keys == {"ssh-rsa foo # ssh-import-id gh:ben"}
+
+
+def test_ssh_keys_import_failure(pi_name, mock_pi, mock_key_session):
+    mock_key_session.get.side_effect = HTTPError("404 Client Error")
+    result = runner.invoke(app, ["ssh", "keys", "import", pi_name, "--github", "nobody"])
+    assert result.exit_code == 1
+    assert "Failed to import keys for gh:nobody" in result.output
+    mock_pi.add_ssh_keys.assert_not_called()
 
 
 def test_ssh_keys_unimport(pi_name):
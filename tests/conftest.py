@@ -18,6 +18,15 @@ def unset_hostedpi_env(monkeypatch):
     monkeypatch.delenv("HOSTEDPI_LOG_LEVEL", raising=False)
     monkeypatch.delenv("HOSTEDPI_AUTH_URL", raising=False)
     monkeypatch.delenv("HOSTEDPI_API_URL", raising=False)
+    monkeypatch.delenv("HOSTEDPI_KEY_CACHE", raising=False)
+    monkeypatch.delenv("HOSTEDPI_KEY_CACHE_MAX_AGE", raising=False)
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    # keep the key and token caches out of the real cache directory
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    return tmp_path / "cache"
 
 
 @pytest.fixture
@@ -27,19 +36,13 @@ def mock_dt() -> datetime:
 
 @pytest.fixture(autouse=True)
 def patch_sleep():
-    with patch("hostedpi.pi.sleep"):
+    with patch("hostedpi.waiter.sleep"):
         yield
 
 
 @pytest.fixture(autouse=True)
 def patch_log_request():
-    with patch("hostedpi.picloud.log_request"):
-        yield
-
-
-@pytest.fixture(autouse=True)
-def patch_log_request_pi():
-    with patch("hostedpi.pi.log_request"):
+    with patch("hostedpi.pipeline.log_request"):
         yield
 
 
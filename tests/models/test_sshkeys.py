@@ -0,0 +1,70 @@
+from unittest.mock import patch
+
+import pytest
+from pydantic import ValidationError
+
+from hostedpi.models import SSHKeyDiff, SSHKeyManifest
+from hostedpi.sshkey import SSHKey
+
+
+def test_ssh_key_diff():
+    diff = SSHKeyDiff.compute(
+        {"ssh-rsa AAA ben@finn", "ssh-rsa BBB", "ssh-rsa CCC"},
+        {SSHKey("ssh-rsa AAA ben@jake"), "ssh-rsa BBB", "ssh-rsa DDD"},
+    )
+    assert diff.added == {SSHKey("ssh-rsa DDD")}
+    assert diff.removed == {SSHKey("ssh-rsa CCC")}
+    assert [str(key) for key in diff.updated] == ["ssh-rsa AAA ben@jake"]
+    assert diff.unchanged == 1
+    assert diff.changed
+
+
+def test_ssh_key_diff_unchanged():
+    diff = SSHKeyDiff.compute({"ssh-rsa AAA ben@finn"}, {"ssh-rsa AAA ben@finn"})
+    assert diff == SSHKeyDiff(unchanged=1)
+    assert not diff.changed
+    assert not SSHKeyDiff.compute(set(), set()).changed
+
+
+def test_ssh_key_manifest(tmp_path):
+    key_path = tmp_path / "id_ed25519.pub"
+    key_path.write_text("ssh-ed25519 CCC dave@home\n")
+    manifest = SSHKeyManifest.model_validate(
+        {
+            "pis": {
+                "pi1": {"ssh_keys": ["ssh-rsa AAA ben@finn"], "github_usernames": ["ben"]},
+                "pi2": {"ssh_keys": ["ssh-rsa AAA ben@finn"], "github_usernames": ["ben"]},
+                "pi3": {"ssh_key_path": str(key_path)},
+                "pi4": {},
+            }
+        }
+    )
+
+    def collect(*, ssh_keys, ssh_key_path, **kwargs):
+        keys = set(ssh_keys or ())
+        if ssh_key_path:
+            keys.add(ssh_key_path.read_text())
+        return {SSHKey(key) for key in keys}
+
+    with patch("hostedpi.models.sshkeys.collect_ssh_keys", side_effect=collect) as collect_ssh_keys:
+        keys = manifest.collect(refresh=True)
+    # pis with the same sources share the keys collected for them
+    assert collect_ssh_keys.call_count == 3
+    assert collect_ssh_keys.call_args.kwargs["refresh"]
+    assert keys["pi1"] is keys["pi2"]
+    assert keys["pi1"] == {SSHKey("ssh-rsa AAA")}
+    assert keys["pi3"] == {SSHKey("ssh-ed25519 CCC")}
+    assert keys["pi4"] == set()
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"pi": {"pi1": {}}},
+        {"pis": {"pi1": {"github": ["ben"]}}},
+        {"pis": {"pi1": {"ssh_keys": "ssh-rsa AAA"}}},
+    ],
+)
+def test_ssh_key_manifest_invalid(data):
+    with pytest.raises(ValidationError):
+        SSHKeyManifest.model_validate(data)
@@ -0,0 +1,45 @@
+from itertools import islice
+
+import pytest
+from pydantic import ValidationError
+
+from hostedpi.models.wait import WaitPolicy
+
+
+def test_wait_policy_defaults():
+    policy = WaitPolicy()
+    assert policy.interval == 1
+    assert policy.multiplier == 1.5
+    assert policy.max_interval == 10
+    assert policy.jitter == 0.1
+    assert policy.timeout is None
+
+
+def test_wait_policy_delays():
+    policy = WaitPolicy(interval=2, multiplier=2, max_interval=10, jitter=0)
+    assert list(islice(policy.delays(), 5)) == [2, 4, 8, 10, 10]
+
+
+def test_wait_policy_delays_jitter():
+    policy = WaitPolicy(interval=10, max_interval=10, jitter=0.5)
+    for delay in islice(policy.delays(), 20):
+        assert 5 <= delay <= 15
+
+
+def test_wait_policy_invalid():
+    with pytest.raises(ValidationError):
+        WaitPolicy(interval=0)
+    with pytest.raises(ValidationError):
+        WaitPolicy(multiplier=0.5)
+    with pytest.raises(ValidationError):
+        WaitPolicy(jitter=1)
+    with pytest.raises(ValidationError):
+        WaitPolicy(timeout=0)
+    with pytest.raises(ValidationError):
+        WaitPolicy(interval=20, max_interval=10)
+
+
+def test_wait_policy_frozen():
+    policy = WaitPolicy()
+    with pytest.raises(ValidationError):
+        policy.timeout = 10
@@ -1,14 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from time import monotonic, sleep
 from unittest.mock import Mock, patch
 
 import pytest
-from requests import HTTPError
+from requests import ConnectionError, HTTPError, Request, Session
+from requests.hooks import dispatch_hook
 
 from hostedpi.auth import MythicAuth
 from hostedpi.exc import MythicAuthenticationError
 from hostedpi.settings import Settings
 
 
+def authorization(auth: MythicAuth) -> str:
+    request = auth(Request("GET", "http://localhost/").prepare())
+    return request.headers["Authorization"]
+
+
 @pytest.fixture
 def auth_id_2() -> str:
     return "test_id_2"
@@ -73,11 +81,11 @@ def test_auth_with_default_settings(
 
     assert auth.token == "foobar"
     assert auth._token_expiry == mock_dt + timedelta(seconds=3600)
-    assert auth.session.headers["Authorization"] == "Bearer foobar"
+    assert authorization(auth) == "Bearer foobar"
 
     mock_datetime.now.return_value = mock_dt + timedelta(seconds=3601)
     assert auth.token == "barfoo"
-    assert auth.session.headers["Authorization"] == "Bearer barfoo"
+    assert authorization(auth) == "Bearer barfoo"
 
     assert auth._auth_session.post.call_count == 2
     assert auth._auth_session.post.call_args_list[0][0][0] == auth_url
@@ -95,11 +103,11 @@ def test_auth_with_different_settings(
 
     assert auth_2.token == "foobar"
     assert auth_2._token_expiry == mock_dt + timedelta(seconds=3600)
-    assert auth_2.session.headers["Authorization"] == "Bearer foobar"
+    assert authorization(auth_2) == "Bearer foobar"
 
     mock_datetime.now.return_value = mock_dt + timedelta(seconds=3601)
     assert auth_2.token == "barfoo"
-    assert auth_2.session.headers["Authorization"] == "Bearer barfoo"
+    assert authorization(auth_2) == "Bearer barfoo"
 
     assert auth_2._auth_session.post.call_count == 2
     assert auth_2._auth_session.post.call_args_list[0][0][0] == auth_url_2
@@ -118,3 +126,246 @@ def test_auth_with_invalid_response(auth, auth_response_with_invalid_body):
 
     with pytest.raises(MythicAuthenticationError):
         auth.token
+
+
+def test_auth_session_keeps_default_headers(settings, auth_response):
+    auth = MythicAuth(settings=settings, auth_session=Mock(post=Mock(return_value=auth_response)))
+    session = auth.session
+    assert session.auth is auth
+    assert "gzip" in session.headers["Accept-Encoding"]
+    assert session.headers["User-Agent"].startswith("python-hostedpi/")
+    assert "Authorization" not in session.headers
+
+    request = session.prepare_request(Request("GET", "http://localhost/servers"))
+    assert request.headers["Authorization"] == "Bearer foobar"
+    assert "gzip" in request.headers["Accept-Encoding"]
+
+
+def test_auth_session_does_not_authenticate(auth):
+    assert isinstance(auth.session, Mock)
+    auth._auth_session.post.assert_not_called()
+
+
+def test_auth_header_built_on_refresh(auth):
+    assert authorization(auth) == "Bearer foobar"
+    header = auth._authorization
+    assert authorization(auth) is header
+    auth._auth_session.post.assert_called_once()
+
+
+def unauthorized(request) -> Mock:
+    return Mock(status_code=401, request=request, url=request.url, history=[])
+
+
+def test_auth_401_retries_with_new_token(auth, auth_response, auth_response_2):
+    auth._auth_session.post.side_effect = [auth_response, auth_response_2]
+    request = auth(Request("GET", "http://localhost/servers").prepare())
+    assert request.headers["Authorization"] == "Bearer foobar"
+    response = unauthorized(request)
+    retry = Mock(status_code=200, history=[])
+    response.connection.send.return_value = retry
+
+    assert dispatch_hook("response", request.hooks, response, timeout=5) is retry
+    response.close.assert_called_once()
+    sent, kwargs = response.connection.send.call_args
+    assert sent[0].headers["Authorization"] == "Bearer barfoo"
+    assert kwargs == {"timeout": 5}
+    assert retry.request is sent[0]
+    assert retry.history == [response]
+    assert auth.token == "barfoo"
+    assert auth._auth_session.post.call_count == 2
+
+    # the retried request is not retried again
+    failed = unauthorized(sent[0])
+    assert dispatch_hook("response", sent[0].hooks, failed) is failed
+    failed.connection.send.assert_not_called()
+    assert auth._auth_session.post.call_count == 2
+
+
+def test_auth_401_token_already_replaced(auth, auth_response, auth_response_2):
+    auth._auth_session.post.side_effect = [auth_response, auth_response_2]
+    request = auth(Request("GET", "http://localhost/servers").prepare())
+    auth._refresh_token()
+    response = unauthorized(request)
+
+    dispatch_hook("response", request.hooks, response)
+    sent = response.connection.send.call_args.args[0]
+    assert sent.headers["Authorization"] == "Bearer barfoo"
+    assert auth._auth_session.post.call_count == 2
+
+
+def test_auth_ignores_other_responses(auth):
+    request = auth(Request("GET", "http://localhost/servers").prepare())
+    response = Mock(status_code=403, request=request)
+    assert dispatch_hook("response", request.hooks, response) is response
+    response.connection.send.assert_not_called()
+    assert auth.token == "foobar"
+
+
+def test_auth_header_error(auth, auth_response_with_server_error):
+    auth._auth_session.post.return_value = auth_response_with_server_error
+    session = Session()
+    session.auth = auth
+    with pytest.raises(MythicAuthenticationError):
+        session.prepare_request(Request("GET", "http://localhost/servers"))
+
+
+@patch("hostedpi.auth.datetime")
+def test_auth_refreshes_before_expiry(mock_datetime, mock_dt, auth, auth_response, auth_response_2):
+    mock_datetime.now.return_value = mock_dt
+    auth._auth_session.post.side_effect = [auth_response, auth_response_2]
+
+    assert auth.token == "foobar"
+    assert auth._refresh_at == mock_dt + timedelta(seconds=3540)
+
+    mock_datetime.now.return_value = mock_dt + timedelta(seconds=3539)
+    assert auth.token == "foobar"
+    mock_datetime.now.return_value = mock_dt + timedelta(seconds=3540)
+    assert auth.token == "barfoo"
+    assert auth._auth_session.post.call_count == 2
+
+
+@patch("hostedpi.auth.datetime")
+def test_auth_refresh_skew_short_lived_token(mock_datetime, mock_dt, auth):
+    mock_datetime.now.return_value = mock_dt
+    auth._auth_session.post.return_value = Mock(
+        status_code=200,
+        json=Mock(return_value={"access_token": "foobar", "expires_in": 30}),
+    )
+
+    assert auth.token == "foobar"
+    # a token which lives for less than the skew is used for half of its lifetime
+    assert auth._refresh_at == mock_dt + timedelta(seconds=15)
+
+
+@patch("hostedpi.auth.datetime")
+def test_auth_configured_refresh_skew(mock_datetime, mock_dt, settings, auth_response):
+    settings.token_refresh_skew = 600
+    auth = MythicAuth(
+        settings=settings,
+        auth_session=Mock(post=Mock(return_value=auth_response)),
+        api_session=Mock(),
+    )
+    mock_datetime.now.return_value = mock_dt
+
+    assert auth.token == "foobar"
+    assert auth._refresh_at == mock_dt + timedelta(seconds=3000)
+
+
+def test_auth_refresh_single_flight(auth, auth_response):
+    def slow_post(*args, **kwargs):
+        sleep(0.1)
+        return auth_response
+
+    auth._auth_session.post.side_effect = slow_post
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        tokens = list(executor.map(lambda i: auth.token, range(10)))
+
+    assert tokens == ["foobar"] * 10
+    assert auth._auth_session.post.call_count == 1
+
+
+def test_auth_background_refresh(settings):
+    settings.token_background_refresh = True
+    responses = iter(
+        Mock(
+            status_code=200,
+            json=Mock(return_value={"access_token": f"token{i}", "expires_in": 1}),
+        )
+        for i in range(100)
+    )
+    auth = MythicAuth(
+        settings=settings,
+        auth_session=Mock(post=Mock(side_effect=lambda *args, **kwargs: next(responses))),
+        api_session=Mock(),
+    )
+    try:
+        assert auth.token == "token0"
+        deadline = monotonic() + 5
+        while auth._auth_session.post.call_count < 2 and monotonic() < deadline:
+            sleep(0.01)
+        assert auth._auth_session.post.call_count >= 2
+        assert auth.token != "token0"
+    finally:
+        auth.close()
+    assert auth._refresher is None
+    calls = auth._auth_session.post.call_count
+    sleep(0.3)
+    assert auth._auth_session.post.call_count == calls
+
+
+@patch("hostedpi.auth.datetime")
+def test_auth_background_refresh_serves_current_token(mock_datetime, mock_dt, auth):
+    # while the background refresher is running, a token due for refresh is still used until it
+    # expires, rather than blocking the caller
+    mock_datetime.now.return_value = mock_dt
+    auth._token = "foobar"
+    auth._refresh_at = mock_dt - timedelta(seconds=1)
+    auth._token_expiry = mock_dt + timedelta(seconds=59)
+    auth._refresher = Mock()
+
+    assert auth.token == "foobar"
+    auth._auth_session.post.assert_not_called()
+
+
+def test_auth_background_refresh_failure(settings, auth_response_with_server_error):
+    settings.token_background_refresh = True
+    ok = Mock(
+        status_code=200,
+        json=Mock(return_value={"access_token": "foobar", "expires_in": 1}),
+    )
+    auth = MythicAuth(
+        settings=settings,
+        auth_session=Mock(post=Mock(side_effect=[ok, auth_response_with_server_error, ok])),
+        api_session=Mock(),
+    )
+    with patch("hostedpi.auth.BACKGROUND_RETRY_DELAY", 0.01):
+        try:
+            assert auth.token == "foobar"
+            deadline = monotonic() + 5
+            while auth._auth_session.post.call_count < 3 and monotonic() < deadline:
+                sleep(0.01)
+            assert auth._auth_session.post.call_count == 3
+        finally:
+            auth.close()
+
+
+def test_auth_background_refresh_connection_error(settings):
+    settings.token_background_refresh = True
+    responses = [
+        Mock(status_code=200, json=Mock(return_value={"access_token": "token0", "expires_in": 1})),
+        ConnectionError("refused"),
+        Mock(status_code=200, json=Mock(return_value={"access_token": "token1", "expires_in": 60})),
+    ]
+    auth = MythicAuth(
+        settings=settings, auth_session=Mock(post=Mock(side_effect=responses)), api_session=Mock()
+    )
+    with patch("hostedpi.auth.BACKGROUND_RETRY_DELAY", 0.01):
+        try:
+            assert auth.token == "token0"
+            deadline = monotonic() + 5
+            while auth._auth_session.post.call_count < 3 and monotonic() < deadline:
+                sleep(0.01)
+            assert auth._auth_session.post.call_count == 3
+            # the refresher survived the connection error and refreshed the token
+            assert auth._refresher.is_alive()
+            assert auth.token == "token1"
+        finally:
+            auth.close()
+
+
+def test_auth_background_refresher_exit_clears_refresher(settings, auth_response):
+    settings.token_background_refresh = True
+    auth = MythicAuth(
+        settings=settings,
+        auth_session=Mock(post=Mock(return_value=auth_response)),
+        api_session=Mock(),
+    )
+    with patch.object(auth._stopped, "wait", side_effect=RuntimeError("boom")):
+        with patch("threading.excepthook"):
+            assert auth.token == "foobar"
+            deadline = monotonic() + 5
+            while auth._refresher is not None and monotonic() < deadline:
+                sleep(0.01)
+    # the token is refreshed in the foreground once the refresher has stopped
+    assert auth._refresher is None
@@ -0,0 +1,68 @@
+from unittest.mock import patch
+
+import pytest
+
+from hostedpi.cache import InfoCache
+
+
+@pytest.fixture
+def mock_monotonic():
+    with patch("hostedpi.cache.monotonic") as monotonic:
+        monotonic.return_value = 100.0
+        yield monotonic
+
+
+def test_info_cache_init():
+    cache = InfoCache()
+    assert cache.ttl == 10
+    assert len(cache) == 0
+    assert cache.hits == 0
+    assert cache.misses == 0
+    assert cache.hit_ratio == 0.0
+    assert repr(cache) == "<InfoCache ttl=10 entries=0>"
+
+
+def test_info_cache_miss():
+    cache = InfoCache()
+    assert cache.get("pi1") is None
+    assert cache.hits == 0
+    assert cache.misses == 1
+
+
+def test_info_cache_hit(pi_info_full, mock_monotonic):
+    cache = InfoCache()
+    cache.set("pi1", pi_info_full)
+    assert len(cache) == 1
+    mock_monotonic.return_value = 109.0
+    assert cache.get("pi1") is pi_info_full
+    assert cache.get("pi2") is None
+    assert cache.hits == 1
+    assert cache.misses == 1
+    assert cache.hit_ratio == 0.5
+
+
+def test_info_cache_expired(pi_info_full, mock_monotonic):
+    cache = InfoCache(ttl=5)
+    cache.set("pi1", pi_info_full)
+    mock_monotonic.return_value = 105.0
+    assert cache.get("pi1") is None
+    assert cache.misses == 1
+    assert len(cache) == 0
+
+
+def test_info_cache_disabled(pi_info_full):
+    cache = InfoCache(ttl=0)
+    cache.set("pi1", pi_info_full)
+    assert cache.get("pi1") is None
+
+
+def test_info_cache_invalidate(pi_info_full):
+    cache = InfoCache()
+    cache.set("pi1", pi_info_full)
+    cache.set("pi2", pi_info_full)
+    cache.invalidate("pi1")
+    cache.invalidate("pi3")
+    assert cache.get("pi1") is None
+    assert cache.get("pi2") is pi_info_full
+    cache.invalidate()
+    assert len(cache) == 0
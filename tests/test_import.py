@@ -0,0 +1,52 @@
+import subprocess
+import sys
+
+import pytest
+
+import hostedpi
+
+
+# modules which must not be imported until they are needed
+HEAVY_MODULES = {"requests", "pydantic", "pydantic_settings", "structlog", "rich", "httpx"}
+
+
+def import_times(module: str) -> dict[str, int]:
+    """
+    Import *module* in a new interpreter with ``-X importtime`` and return the cumulative import
+    time in microseconds of each module imported
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", ["hostedpi", "hostedpi.cli"])
+def test_import_time(module, record_property):
+    times = import_times(module)
+    record_property("import_time_us", times[module])
+    imported = {name.split(".")[0] for name in times}
+    assert not imported & HEAVY_MODULES
+
+
+def test_lazy_attributes():
+    from hostedpi.picloud import PiCloud
+    from hostedpi.settings import Settings
+
+    assert hostedpi.PiCloud is PiCloud
+    assert hostedpi.Settings is Settings
+    assert set(hostedpi.__all__) <= set(dir(hostedpi))
+
+
+def test_lazy_attributes_unknown():
+    with pytest.raises(AttributeError):
+        hostedpi.NotAThing
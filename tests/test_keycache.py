@@ -0,0 +1,209 @@
+import stat
+from unittest.mock import Mock, patch
+
+import pytest
+from pydantic import ValidationError
+from requests.exceptions import ConnectionError, HTTPError, ReadTimeout
+
+from hostedpi.keycache import KEY_CACHE_MAX_AGE, CachedKeys, KeyCache, get_key_cache
+from hostedpi.settings import Settings
+from hostedpi.utils import fetch_keys_from_url, is_unavailable, ssh_import_id
+
+
+URL = "https://github.com/testuser.keys"
+
+
+@pytest.fixture(autouse=True)
+def patch_log_request():
+    with patch("hostedpi.utils.log_request"):
+        yield
+
+
+@pytest.fixture
+def key_cache(tmp_path) -> KeyCache:
+    return KeyCache(tmp_path / "keys", max_age=100)
+
+
+@pytest.fixture
+def mock_time():
+    with patch("hostedpi.keycache.time") as keycache_time, patch("hostedpi.utils.time") as time:
+        time.return_value = keycache_time.return_value = 1000.0
+        yield time, keycache_time
+
+
+def response(status_code=200, text="", headers=None) -> Mock:
+    response = Mock(status_code=status_code, text=text, headers=headers or {})
+    if status_code >= 400:
+        response.raise_for_status.side_effect = HTTPError(f"{status_code} Error", response=response)
+    return response
+
+
+def fetch(session, key_cache, **kwargs) -> set[str]:
+    return fetch_keys_from_url(URL, "\n", session=session, cache=key_cache, **kwargs)
+
+
+def test_get_key_cache(cache_home, settings):
+    assert get_key_cache(settings) is None
+    settings.key_cache = True
+    key_cache = get_key_cache(settings)
+    assert key_cache.directory == cache_home / "hostedpi"
+    assert key_cache.max_age == KEY_CACHE_MAX_AGE
+    settings.key_cache_max_age = 60
+    assert get_key_cache(settings).max_age == 60
+
+
+def test_key_cache_settings_from_env(monkeypatch):
+    monkeypatch.setenv("HOSTEDPI_KEY_CACHE", "true")
+    monkeypatch.setenv("HOSTEDPI_KEY_CACHE_MAX_AGE", "60")
+    settings = Settings(id="test_id", secret="test_secret")
+    assert settings.key_cache
+    assert settings.key_cache_max_age == 60
+
+
+@pytest.mark.parametrize("max_age", ["a day", "-1", "nan"])
+def test_key_cache_settings_invalid_max_age(monkeypatch, max_age):
+    monkeypatch.setenv("HOSTEDPI_KEY_CACHE_MAX_AGE", max_age)
+    with pytest.raises(ValidationError, match="key_cache_max_age"):
+        Settings(id="test_id", secret="test_secret")
+
+
+def test_key_cache_save_load(key_cache):
+    assert repr(key_cache) == f"<KeyCache directory={key_cache.directory} max_age=100>"
+    assert key_cache.load(URL) is None
+    cached = CachedKeys(keys=["ssh-rsa foo"], etag='"abc"', fetched_at=1000.0)
+    key_cache.save(URL, cached)
+    assert key_cache.load(URL) == cached
+    assert key_cache.load("https://github.com/other.keys") is None
+    path = key_cache.path(URL)
+    assert path.parent == key_cache.directory
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    key_cache.clear()
+    assert key_cache.load(URL) is None
+
+
+def test_key_cache_invalid(key_cache):
+    key_cache.path(URL).parent.mkdir(parents=True)
+    key_cache.path(URL).write_text("not json")
+    assert key_cache.load(URL) is None
+
+
+def test_key_cache_save_fails(tmp_path):
+    (tmp_path / "file").write_text("")
+    key_cache = KeyCache(tmp_path / "file")
+    key_cache.save(URL, CachedKeys(keys=[], fetched_at=0))
+    assert key_cache.load(URL) is None
+
+
+def test_key_cache_is_usable(key_cache, mock_time):
+    assert key_cache.is_usable(CachedKeys(keys=[], fetched_at=900.0))
+    assert not key_cache.is_usable(CachedKeys(keys=[], fetched_at=899.0))
+
+
+def test_fetch_keys_stores_validators(key_cache, mock_time):
+    session = Mock()
+    headers = {"ETag": '"abc"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"}
+    session.get.return_value = response(text="ssh-rsa foo\nssh-rsa bar", headers=headers)
+    assert fetch(session, key_cache) == {"ssh-rsa foo", "ssh-rsa bar"}
+    session.get.assert_called_once_with(URL, timeout=(5.0, 10.0), headers={})
+    assert key_cache.load(URL) == CachedKeys(
+        keys=["ssh-rsa bar", "ssh-rsa foo"],
+        etag='"abc"',
+        last_modified="Wed, 01 Jan 2025 00:00:00 GMT",
+        fetched_at=1000.0,
+    )
+
+
+def test_fetch_keys_not_modified(key_cache, mock_time):
+    key_cache.save(
+        URL,
+        CachedKeys(keys=["ssh-rsa foo"], etag='"abc"', last_modified="yesterday", fetched_at=500.0),
+    )
+    session = Mock()
+    session.get.return_value = response(304)
+    assert fetch(session, key_cache) == {"ssh-rsa foo"}
+    session.get.assert_called_once_with(
+        URL,
+        timeout=(5.0, 10.0),
+        headers={"If-None-Match": '"abc"', "If-Modified-Since": "yesterday"},
+    )
+    # revalidating the keys makes them usable for another max_age seconds
+    assert key_cache.load(URL).fetched_at == 1000.0
+
+
+def test_fetch_keys_modified(key_cache, mock_time):
+    key_cache.save(URL, CachedKeys(keys=["ssh-rsa old"], etag='"abc"', fetched_at=500.0))
+    session = Mock()
+    session.get.return_value = response(text="ssh-rsa new", headers={"ETag": '"def"'})
+    assert fetch(session, key_cache) == {"ssh-rsa new"}
+    assert key_cache.load(URL).etag == '"def"'
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        ReadTimeout("timed out"),
+        ConnectionError("refused"),
+        HTTPError(response=Mock(status_code=503)),
+    ],
+)
+def test_fetch_keys_stale(key_cache, mock_time, error):
+    key_cache.save(URL, CachedKeys(keys=["ssh-rsa foo"], etag='"abc"', fetched_at=950.0))
+    session = Mock()
+    session.get.side_effect = error
+    assert fetch(session, key_cache) == {"ssh-rsa foo"}
+
+
+def test_fetch_keys_stale_server_error(key_cache, mock_time):
+    key_cache.save(URL, CachedKeys(keys=["ssh-rsa foo"], fetched_at=950.0))
+    session = Mock()
+    session.get.return_value = response(502)
+    assert fetch(session, key_cache) == {"ssh-rsa foo"}
+
+
+def test_fetch_keys_too_stale(key_cache, mock_time):
+    key_cache.save(URL, CachedKeys(keys=["ssh-rsa foo"], fetched_at=800.0))
+    session = Mock()
+    session.get.side_effect = ReadTimeout("timed out")
+    with pytest.raises(ReadTimeout):
+        fetch(session, key_cache)
+
+
+def test_fetch_keys_not_found(key_cache, mock_time):
+    # a user who no longer exists is not served from the cache
+    key_cache.save(URL, CachedKeys(keys=["ssh-rsa foo"], fetched_at=950.0))
+    session = Mock()
+    session.get.return_value = response(404)
+    with pytest.raises(HTTPError):
+        fetch(session, key_cache)
+
+
+def test_fetch_keys_refresh(key_cache, mock_time):
+    key_cache.save(URL, CachedKeys(keys=["ssh-rsa old"], etag='"abc"', fetched_at=950.0))
+    session = Mock()
+    session.get.side_effect = ReadTimeout("timed out")
+    with pytest.raises(ReadTimeout):
+        fetch(session, key_cache, refresh=True)
+    session.get.side_effect = None
+    session.get.return_value = response(text="ssh-rsa new")
+    assert fetch(session, key_cache, refresh=True) == {"ssh-rsa new"}
+    session.get.assert_called_with(URL, timeout=(5.0, 10.0), headers={})
+    assert key_cache.load(URL).keys == ["ssh-rsa new"]
+
+
+def test_ssh_import_id_cached(key_cache):
+    session = Mock()
+    session.get.return_value = response(text="ssh-rsa foo", headers={"ETag": '"abc"'})
+    keys = ssh_import_id(github_username="testuser", session=session, cache=key_cache)
+    assert {str(key) for key in keys} == {"ssh-rsa foo # ssh-import-id gh:testuser"}
+    session.get.return_value = response(304)
+    assert ssh_import_id(github_username="testuser", session=session, cache=key_cache) == keys
+    assert session.get.call_args.kwargs["headers"] == {"If-None-Match": '"abc"'}
+
+
+def test_is_unavailable():
+    assert is_unavailable(ReadTimeout())
+    assert is_unavailable(ConnectionError())
+    assert is_unavailable(HTTPError(response=Mock(status_code=500)))
+    assert is_unavailable(HTTPError(response=Mock(status_code=429)))
+    assert not is_unavailable(HTTPError(response=Mock(status_code=404)))
+    assert not is_unavailable(HTTPError())
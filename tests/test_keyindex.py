@@ -0,0 +1,112 @@
+import pytest
+
+from hostedpi.exc import HostedPiNotAuthorizedError, HostedPiUserError
+from hostedpi.keyindex import KeyIndex, KeyUsage
+from hostedpi.models.results import PiResult
+from hostedpi.sshkey import SSHKey
+
+
+ALICE = SSHKey("ssh-ed25519 AAAA alice@laptop # ssh-import-id gh:alice")
+ALICE_OLD = SSHKey("ssh-rsa BBBB alice@laptop")
+BOB = SSHKey("ssh-rsa CCCC bob@home")
+
+
+@pytest.fixture
+def index() -> KeyIndex:
+    return KeyIndex(
+        {
+            "pi2": {ALICE, "ssh-rsa CCCC bob@work"},
+            "pi1": {ALICE, ALICE_OLD, BOB},
+            "pi3": set(),
+        },
+        errors={"pi4": HostedPiNotAuthorizedError("Not authorised")},
+    )
+
+
+def test_key_index(index):
+    assert repr(index) == "<KeyIndex pis=3 keys=3>"
+    assert len(index) == 3
+    assert list(index.keys) == ["pi1", "pi2", "pi3"]
+    assert index.keys["pi1"] == {ALICE, ALICE_OLD, BOB}
+    assert index.keys["pi3"] == frozenset()
+    assert index.pis == {
+        ALICE.fingerprint: {"pi1", "pi2"},
+        ALICE_OLD.fingerprint: {"pi1"},
+        BOB.fingerprint: {"pi1", "pi2"},
+    }
+    assert list(index.errors) == ["pi4"]
+    assert ALICE in index
+    assert "ssh-rsa BBBB" in index
+    assert SSHKey("ssh-rsa DDDD") not in index
+
+
+def test_key_index_where_fingerprint(index):
+    assert index.where(ALICE_OLD.fingerprint) == {"pi1": {ALICE_OLD}}
+    assert index.where(ALICE) == {"pi1": {ALICE}, "pi2": {ALICE}}
+    assert index.where("SHA256:unknown") == {}
+
+
+def test_key_index_where_label(index):
+    assert index.where("alice@laptop") == {"pi1": {ALICE, ALICE_OLD}, "pi2": {ALICE}}
+    # the same key has a different label on each Pi
+    where_bob = index.where("bob@work")
+    assert where_bob == {"pi2": {BOB}}
+    assert [str(key) for key in where_bob["pi2"]] == ["ssh-rsa CCCC bob@work"]
+    assert index.where("bob@home") == {"pi1": {BOB}}
+
+
+def test_key_index_where_import_source(index):
+    assert index.where("gh:alice") == {"pi1": {ALICE}, "pi2": {ALICE}}
+    assert index.where("lp:alice") == {}
+
+
+def test_key_index_audit(index):
+    assert index.audit() == [
+        KeyUsage(
+            fingerprint=fingerprint,
+            algorithm=algorithm,
+            labels=labels,
+            import_sources=import_sources,
+            pis=pis,
+        )
+        for fingerprint, algorithm, labels, import_sources, pis in sorted(
+            [
+                (
+                    ALICE.fingerprint,
+                    "ssh-ed25519",
+                    {"alice@laptop"},
+                    {"gh:alice"},
+                    {"pi1", "pi2"},
+                ),
+                (BOB.fingerprint, "ssh-rsa", {"bob@home", "bob@work"}, set(), {"pi1", "pi2"}),
+                (ALICE_OLD.fingerprint, "ssh-rsa", {"alice@laptop"}, set(), {"pi1"}),
+            ],
+            key=lambda row: (-len(row[4]), row[0]),
+        )
+    ]
+
+
+def test_key_index_from_results():
+    error = HostedPiNotAuthorizedError("Not authorised")
+    index = KeyIndex.from_results(
+        {
+            "pi1": PiResult(name="pi1", value={ALICE}),
+            "pi2": PiResult(name="pi2", error=error),
+        }
+    )
+    assert index.keys == {"pi1": {ALICE}}
+    assert index.errors == {"pi2": error}
+
+
+def test_key_index_from_results_unnamed():
+    with pytest.raises(HostedPiUserError):
+        KeyIndex.from_results({None: PiResult(name=None, value={ALICE})})
+    with pytest.raises(HostedPiUserError):
+        KeyIndex.from_results({"pi1": PiResult(name=None, value={ALICE})})
+
+
+def test_key_index_empty():
+    index = KeyIndex({})
+    assert len(index) == 0
+    assert index.audit() == []
+    assert index.errors == {}
@@ -0,0 +1,172 @@
+import importlib
+import json
+import logging
+from unittest.mock import Mock, PropertyMock, patch
+
+import pytest
+import structlog
+import structlog.testing
+
+from hostedpi import logger as hostedpi_logger
+from hostedpi.logger import (
+    LazyLogger,
+    format_body,
+    get_level,
+    get_log_body,
+    get_log_body_limit,
+    log_request,
+    redact_ssh_keys,
+)
+
+
+ED25519_KEY = "ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIGJ5dGVzYnl0ZXNieXRlc2J5dGVzYnl0ZXM user@host"
+
+
+@pytest.fixture
+def mock_logger():
+    with patch("hostedpi.logger.logger") as logger:
+        logger.is_enabled_for.return_value = True
+        yield logger
+
+
+def test_log_request_disabled():
+    response = Mock()
+    text = PropertyMock(side_effect=AssertionError("body read"))
+    type(response).text = text
+    log_request(response)
+    text.assert_not_called()
+    response.json.assert_not_called()
+
+
+def test_log_request_enabled(mock_logger):
+    response = Mock(
+        url="https://api.mythic-beasts.com/beta/pi/servers/pi1/power",
+        status_code=200,
+        text='{"power": true}',
+        request=Mock(method="PUT", body=b'{"power": true}'),
+    )
+    log_request(response)
+    sent, received = mock_logger.debug.call_args_list
+    assert sent.kwargs["method"] == "PUT"
+    assert sent.kwargs["status_code"] == 200
+    assert sent.kwargs["body"] == '{"power": true}'
+    assert received.kwargs["body"] == '{"power": true}'
+    response.json.assert_not_called()
+
+
+def test_log_request_redacts_ssh_keys(mock_logger):
+    body = json.dumps({"ssh_key": ED25519_KEY})
+    response = Mock(text=body, request=Mock(method="PUT", body=body))
+    log_request(response)
+    for call in mock_logger.debug.call_args_list:
+        assert "AAAAC3NzaC1lZDI1NTE5" not in call.kwargs["body"]
+        assert "user@host" in call.kwargs["body"]
+
+
+def test_redact_ssh_keys():
+    text = f"{ED25519_KEY}\nssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQC7abc== bob@x"
+    assert redact_ssh_keys(text) == (
+        "ssh-ed25519 ...zYnl0ZXM user@host\nssh-rsa ...BAQC7abc== bob@x"
+    )
+
+
+def test_redact_ssh_keys_leaves_other_text():
+    assert redact_ssh_keys("ssh-rsa is a key type") == "ssh-rsa is a key type"
+
+
+def test_format_body_empty():
+    assert format_body(None) == ""
+    assert format_body(b"") == ""
+
+
+def test_format_body_truncate(monkeypatch):
+    monkeypatch.setattr(hostedpi_logger, "log_body", "truncate")
+    monkeypatch.setattr(hostedpi_logger, "log_body_limit", 10)
+    assert format_body("short") == "short"
+    assert format_body(b"a" * 25) == "aaaaaaaaaa... (15 more characters)"
+
+
+def test_format_body_full(monkeypatch):
+    monkeypatch.setattr(hostedpi_logger, "log_body", "full")
+    assert format_body('{"servers": {}}') == {"servers": {}}
+    assert format_body("not json") == "not json"
+    assert format_body(json.dumps({"ssh_key": ED25519_KEY})) == {
+        "ssh_key": "ssh-ed25519 ...zYnl0ZXM user@host"
+    }
+
+
+def test_format_body_none(monkeypatch):
+    monkeypatch.setattr(hostedpi_logger, "log_body", "none")
+    assert format_body(ED25519_KEY) == f"<{len(ED25519_KEY)} characters>"
+
+
+def test_get_level():
+    assert get_level("ERROR") == logging.ERROR
+    assert get_level("debug") == logging.DEBUG
+    assert get_level("15") == 15
+    with pytest.raises(ValueError):
+        get_level("loud")
+
+
+def test_get_log_body():
+    assert get_log_body(None) == "truncate"
+    assert get_log_body("FULL") == "full"
+    assert get_log_body("none") == "none"
+    with pytest.warns(UserWarning, match="HOSTEDPI_LOG_BODY 'ful'"):
+        assert get_log_body("ful") == "truncate"
+
+
+def test_get_log_body_limit():
+    assert get_log_body_limit(None) == 500
+    assert get_log_body_limit("100") == 100
+    assert get_log_body_limit("0") == 0
+    with pytest.warns(UserWarning, match="HOSTEDPI_LOG_BODY_LIMIT 'lots'"):
+        assert get_log_body_limit("lots") == 500
+    with pytest.warns(UserWarning, match="HOSTEDPI_LOG_BODY_LIMIT '-1'"):
+        assert get_log_body_limit("-1") == 500
+
+
+def test_import_with_invalid_log_body_env(monkeypatch):
+    monkeypatch.setenv("HOSTEDPI_LOG_BODY", "ful")
+    monkeypatch.setenv("HOSTEDPI_LOG_BODY_LIMIT", "1k")
+    with pytest.warns(UserWarning) as record:
+        module = importlib.reload(hostedpi_logger)
+    try:
+        assert len(record) == 2
+        assert module.log_body == "truncate"
+        assert module.log_body_limit == 500
+    finally:
+        monkeypatch.undo()
+        importlib.reload(hostedpi_logger)
+
+
+def test_lazy_logger_below_level():
+    logger = LazyLogger()
+    with patch("hostedpi.logger._wrap_logger") as wrap_logger:
+        logger.debug("not logged", foo=1)
+        logger.info("not logged")
+    wrap_logger.assert_not_called()
+    assert not logger.is_enabled_for(logging.DEBUG)
+    assert logger.is_enabled_for(logging.ERROR)
+    assert repr(logger) == "<LazyLogger level=ERROR>"
+
+
+def test_lazy_logger_at_level():
+    logger = LazyLogger()
+    with patch("hostedpi.logger._wrap_logger") as wrap_logger:
+        logger.error("logged", foo=1)
+        logger.critical("also logged")
+    wrap_logger.assert_called_once()
+    bound = wrap_logger.return_value
+    bound.error.assert_called_once_with("logged", foo=1)
+    bound.critical.assert_called_once_with("also logged")
+
+
+def test_lazy_logger_keeps_structlog_config():
+    config = structlog.get_config()
+    logger = LazyLogger()
+    # the application's structlog configuration is used, rather than replaced
+    with structlog.testing.capture_logs() as logs:
+        logger.error("logged", foo=1)
+    assert logs == [{"event": "logged", "foo": 1, "log_level": "error"}]
+    assert structlog.get_config() == config
@@ -0,0 +1,179 @@
+from unittest.mock import Mock, patch
+
+import pytest
+from requests import ConnectionError
+
+from hostedpi import MythicAuth, PiCloud
+from hostedpi.cache import InfoCache
+from hostedpi.endpoints import GET_SERVER, GET_SERVERS
+from hostedpi.exc import HostedPiProvisioningError, HostedPiServerError
+from hostedpi.metrics import (
+    Metrics,
+    escape_label_value,
+    get_error_key,
+    get_retries,
+    to_prometheus,
+)
+from hostedpi.models.metrics import EndpointMetrics, LatencyHistogram, MetricsSnapshot
+from hostedpi.pipeline import Call
+from hostedpi.testing import FakeMythicAPI
+
+
+@pytest.fixture
+def mock_perf_counter():
+    with patch("hostedpi.metrics.perf_counter") as perf_counter:
+        yield perf_counter
+
+
+def make_call(endpoint=GET_SERVERS, response=None) -> Call:
+    call = Call(endpoint, url="https://example.com/", params={})
+    call.response = response
+    return call
+
+
+def test_metrics_empty():
+    metrics = Metrics()
+    assert repr(metrics) == "<Metrics endpoints=0>"
+    snapshot = metrics.snapshot()
+    assert snapshot.endpoints == {}
+    assert snapshot.requests == 0
+    assert snapshot.errors == 0
+    assert snapshot.cache_hit_ratio == 0.0
+
+
+def test_metrics_middleware(mock_perf_counter):
+    metrics = Metrics(buckets=(0.1, 1.0))
+    mock_perf_counter.side_effect = [0.0, 0.05, 1.0, 1.5, 2.0, 5.0]
+    for _ in range(3):
+        assert metrics.middleware(make_call(), lambda call: "ok") == "ok"
+
+    endpoint = metrics.snapshot().endpoints["get_servers"]
+    assert endpoint.requests == 3
+    assert endpoint.retries == 0
+    assert endpoint.errors == {}
+    assert endpoint.latency.buckets == {0.1: 1, 1.0: 2}
+    assert endpoint.latency.count == 3
+    assert endpoint.latency.sum == pytest.approx(3.55)
+
+
+def test_metrics_middleware_errors():
+    metrics = Metrics()
+    response = Mock(status_code=503)
+
+    def send(call):
+        call.response = response
+        raise HostedPiServerError("Service unavailable")
+
+    def fail(call):
+        raise ConnectionError("connection refused")
+
+    for handler in (send, send, fail):
+        with pytest.raises(Exception):
+            metrics.middleware(make_call(GET_SERVER), handler)
+
+    snapshot = metrics.snapshot()
+    assert snapshot.endpoints["get_server"].errors == {"503": 2, "ConnectionError": 1}
+    assert snapshot.requests == 3
+    assert snapshot.errors == 3
+
+
+def test_metrics_reset():
+    metrics = Metrics()
+    metrics.record(make_call(), 0.1)
+    assert metrics.snapshot().requests == 1
+    metrics.reset()
+    assert metrics.snapshot().requests == 0
+
+
+def test_metrics_snapshot_cache():
+    cache = InfoCache()
+    cache.get("pi1")
+    cache.set("pi1", Mock())
+    cache.get("pi1")
+    snapshot = Metrics().snapshot(token_refreshes=2, info_cache=cache)
+    assert snapshot.token_refreshes == 2
+    assert snapshot.cache_hits == 1
+    assert snapshot.cache_misses == 1
+    assert snapshot.cache_hit_ratio == 0.5
+
+
+def test_get_retries():
+    assert get_retries(None) == 0
+    response = Mock(spec=["raw"])
+    response.raw.retries.history = ("first", "second")
+    assert get_retries(response) == 2
+    response.raw.retries = None
+    assert get_retries(response) == 0
+    assert get_retries(Mock(extensions={"retries": 3})) == 3
+    assert get_retries(Mock(extensions={})) == 0
+
+
+def test_get_error_key():
+    error = HostedPiServerError("Error")
+    assert get_error_key(Mock(status_code=409), error) == "409"
+    assert get_error_key(Mock(status_code=200), error) == "HostedPiServerError"
+    assert get_error_key(None, ConnectionError()) == "ConnectionError"
+
+
+def test_latency_histogram():
+    latency = LatencyHistogram(buckets={0.1: 2, 0.5: 3, 1.0: 4}, count=5, sum=2.5)
+    assert latency.mean == 0.5
+    assert latency.quantile(0.4) == 0.1
+    assert latency.quantile(0.5) == 0.5
+    assert latency.quantile(0.8) == 1.0
+    assert latency.quantile(0.99) == float("inf")
+    empty = LatencyHistogram(buckets={0.1: 0})
+    assert empty.mean == 0.0
+    assert empty.quantile(0.5) == 0.0
+
+
+def test_to_prometheus():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.record(make_call(), 0.05)
+    metrics.record(make_call(response=Mock(status_code=503)), 0.5, HostedPiServerError("Error"))
+    text = to_prometheus(metrics.snapshot(token_refreshes=1), prefix="pis")
+    lines = text.splitlines()
+    assert "# TYPE pis_requests_total counter" in lines
+    assert 'pis_requests_total{endpoint="get_servers"} 2' in lines
+    assert 'pis_request_errors_total{endpoint="get_servers",status="503"} 1' in lines
+    assert "# TYPE pis_request_duration_seconds histogram" in lines
+    assert 'pis_request_duration_seconds_bucket{endpoint="get_servers",le="0.1"} 1' in lines
+    assert 'pis_request_duration_seconds_bucket{endpoint="get_servers",le="1.0"} 2' in lines
+    assert 'pis_request_duration_seconds_bucket{endpoint="get_servers",le="+Inf"} 2' in lines
+    assert 'pis_request_duration_seconds_count{endpoint="get_servers"} 2' in lines
+    assert "pis_token_refreshes_total 1" in lines
+    assert "pis_info_cache_hit_ratio 0.0" in lines
+    assert text.endswith("\n")
+
+
+def test_escape_label_value():
+    assert escape_label_value("get_servers") == "get_servers"
+    assert escape_label_value('a\\b"c\nd') == 'a\\\\b\\"c\\nd'
+
+
+def test_to_prometheus_escapes_labels():
+    endpoint = EndpointMetrics(requests=1, latency=LatencyHistogram(buckets={}))
+    snapshot = MetricsSnapshot(endpoints={'get_"servers"\\\n': endpoint})
+    lines = to_prometheus(snapshot).splitlines()
+    assert 'hostedpi_requests_total{endpoint="get_\\"servers\\"\\\\\\n"} 1' in lines
+
+
+def test_picloud_metrics():
+    with FakeMythicAPI(size=2) as api:
+        cloud = PiCloud(auth=MythicAuth(settings=api.settings(max_retries=2)))
+        api.inject_error(503, endpoint="get_servers")
+        cloud.pis
+        api.inject_error(409, error="Provisioning", endpoint="get_server")
+        with pytest.raises(HostedPiProvisioningError):
+            cloud.pis["pi0"].info
+        cloud.pis["pi1"].info
+        cloud.pis["pi1"].info
+
+        snapshot = cloud.metrics
+        assert snapshot.endpoints["get_servers"].requests == 1
+        assert snapshot.endpoints["get_servers"].retries == 1
+        assert snapshot.endpoints["get_server"].errors == {"409": 1}
+        assert snapshot.token_refreshes == 1
+        assert snapshot.cache_hits == 1
+        assert snapshot.cache_misses == 2
+        assert 'hostedpi_requests_total{endpoint="get_servers"} 1' in to_prometheus(snapshot)
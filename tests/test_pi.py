@@ -4,15 +4,18 @@ from unittest.mock import Mock, patch
 import pytest
 from requests.exceptions import ConnectionError
 
-from hostedpi.exc import HostedPiUserError
-from hostedpi.models.sshkeys import SSHKeySources
-from hostedpi.pi import (
+from hostedpi.cache import InfoCache
+from hostedpi.exc import (
     HostedPiNotAuthorizedError,
     HostedPiProvisioningError,
     HostedPiServerError,
+    HostedPiTimeoutError,
     HostedPiUserError,
-    Pi,
 )
+from hostedpi.models.sshkeys import SSHKeySources
+from hostedpi.models.wait import WaitPolicy
+from hostedpi.pi import Pi
+from hostedpi.waiter import Waiter
 
 
 @pytest.fixture
@@ -220,6 +223,33 @@ def test_pi_get_info(pi_name, pi_info_basic, auth, pi_info_response, pi_info_ful
     assert pi.url_ssl == "https://www.test-pi.hostedpi.com"
 
 
+def test_pi_get_info_cached(pi_name, pi_info_basic, auth, pi_info_response):
+    pi = Pi(name=pi_name, info=pi_info_basic, auth=auth)
+    auth._api_session.get.return_value = pi_info_response
+    assert pi.power
+    assert pi.ipv4_ssh_port == 5100
+    assert auth._api_session.get.call_count == 1
+    assert pi.info_cache.hits == 1
+    assert pi.info_cache.misses == 1
+
+
+def test_pi_get_info_shared_cache(pi_name, pi_info_basic, auth, pi_info_response):
+    cache = InfoCache()
+    pi1 = Pi(name=pi_name, info=pi_info_basic, auth=auth, info_cache=cache)
+    pi2 = Pi(name=pi_name, info=pi_info_basic, auth=auth, info_cache=cache)
+    auth._api_session.get.return_value = pi_info_response
+    assert pi1.info == pi2.info
+    assert auth._api_session.get.call_count == 1
+
+
+def test_pi_get_info_cache_disabled(pi_name, pi_info_basic, auth, pi_info_response):
+    pi = Pi(name=pi_name, info=pi_info_basic, auth=auth, info_cache=InfoCache(ttl=0))
+    auth._api_session.get.return_value = pi_info_response
+    assert pi.power
+    assert pi.power
+    assert auth._api_session.get.call_count == 2
+
+
 def test_pi_get_info_installing(pi_name, pi_info_basic, auth, pi_info_installing_response, api_url):
     pi = Pi(name=pi_name, info=pi_info_basic, auth=auth)
     auth._api_session.get.return_value = pi_info_installing_response
@@ -294,7 +324,7 @@ def test_get_ssh_keys(pi_name, pi_info_basic, auth, three_ssh_keys_response):
     pi = Pi(name=pi_name, info=pi_info_basic, auth=auth)
     auth._api_session.get.return_value = three_ssh_keys_response
     keys = pi.ssh_keys
-    assert keys == {"ssh-rsa AAA", "ssh-rsa BBB", "ssh-rsa CCC"}
+    assert {str(key) for key in keys} == {"ssh-rsa AAA", "ssh-rsa BBB", "ssh-rsa CCC"}
 
 
 def test_set_ssh_keys_403(pi_name, pi_info_basic, auth, error_403):
@@ -394,6 +424,16 @@ def test_power_on_pi(pi_name, pi_info_basic, auth, api_url):
     assert json_payload == {"power": True}
 
 
+def test_power_on_pi_invalidates_cache(pi_name, pi_info_basic, auth, pi_info_response):
+    pi = Pi(name=pi_name, info=pi_info_basic, auth=auth)
+    auth._api_session.get.return_value = pi_info_response
+    assert pi.power
+    pi.on()
+    assert len(pi.info_cache) == 0
+    assert pi.power
+    assert auth._api_session.get.call_count == 2
+
+
 def test_power_on_pi_error_403(pi_name, pi_info_basic, auth, error_403):
     pi = Pi(name=pi_name, info=pi_info_basic, auth=auth)
     auth._api_session.put.return_value = error_403
@@ -418,6 +458,45 @@ def test_power_on_pi_error_500(pi_name, pi_info_basic, auth, error_500):
     assert auth._api_session.put.call_count == 1
 
 
+def test_power_on_pi_wait(
+    pi_name, pi_info_basic, auth, api_url, pi_info_booting_response, pi_info_response
+):
+    pi = Pi(name=pi_name, info=pi_info_basic, auth=auth)
+    auth._api_session.get.side_effect = [
+        pi_info_booting_response,
+        pi_info_booting_response,
+        pi_info_response,
+    ]
+    assert pi.on(wait=True) is True
+    assert auth._api_session.put.call_count == 1
+    assert auth._api_session.get.call_count == 3
+    assert auth._api_session.get.call_args[0][0] == api_url + "servers/test-pi"
+
+
+def test_power_on_pi_wait_timeout(pi_name, pi_info_basic, auth, pi_info_booting_response):
+    pi = Pi(name=pi_name, info=pi_info_basic, auth=auth)
+    auth._api_session.get.return_value = pi_info_booting_response
+    policy = WaitPolicy(jitter=0, timeout=5)
+    with patch("hostedpi.waiter.monotonic") as monotonic, patch("hostedpi.waiter.sleep") as sleep:
+        monotonic.return_value = 0
+        sleep.side_effect = lambda delay: setattr(
+            monotonic, "return_value", monotonic.return_value + delay
+        )
+        with pytest.raises(HostedPiTimeoutError):
+            pi.on(wait=policy)
+    assert auth._api_session.get.call_count == 4
+
+
+def test_reboot_pi_wait(pi_name, pi_info_basic, auth, pi_info_booting_response, pi_info_response):
+    waiter = Waiter()
+    pi = Pi(name=pi_name, info=pi_info_basic, auth=auth, waiter=waiter)
+    auth._api_session.get.side_effect = [pi_info_booting_response, pi_info_response]
+    with patch.object(waiter, "wait_for", wraps=waiter.wait_for) as wait_for:
+        assert pi.reboot(wait=True) is True
+    assert wait_for.call_count == 1
+    assert auth._api_session.get.call_count == 2
+
+
 # def test_power_on_pi_with_wait(
 #     pi_info_basic, auth, api_url, pi_info_booting_response, pi_info_response
 # ):
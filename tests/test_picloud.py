@@ -8,11 +8,14 @@ from hostedpi.exc import (
     HostedPiNameExistsError,
     HostedPiNotAuthorizedError,
     HostedPiOutOfStockError,
+    HostedPiProvisioningError,
     HostedPiServerError,
     HostedPiUserError,
     HostedPiValidationError,
 )
+from hostedpi.keycache import KeyCache
 from hostedpi.models import Pi3ServerSpec, Pi4ServerSpec
+from hostedpi.models.sshkeys import SSHKeySources
 from hostedpi.picloud import PiCloud
 
 
@@ -165,7 +168,7 @@ def test_picloud_init_with_api_url(auth_2, api_url_2):
 def test_picloud_init_with_ssh_keys(auth, ssh_keys, collected_ssh_keys):
     cloud = PiCloud(ssh_keys, auth=auth)
     assert repr(cloud) == "<PiCloud id=test_id>"
-    assert cloud.ssh_keys == collected_ssh_keys
+    assert {str(key) for key in cloud.ssh_keys} == collected_ssh_keys
 
 
 def test_picloud_init_with_bad_ssh_keys(auth):
@@ -229,6 +232,50 @@ def test_get_pis(auth, pis_response):
     assert pi2.cpu_speed == 1500
 
 
+def test_get_pis_shared_info_cache(auth, pis_response, pi_info_response):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = pis_response
+    pi1, pi2 = cloud.pis.values()
+    assert pi1.info_cache is cloud.info_cache
+    assert pi2.info_cache is cloud.info_cache
+    auth._api_session.get.return_value = pi_info_response
+    assert pi1.power
+    cloud.info_cache.set("pi2", pi1.info)
+    assert pi2.power
+    assert auth._api_session.get.call_count == 2
+    assert cloud.info_cache.hits == 2
+
+
+def test_get_pis_memoised(auth, pis_response):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = pis_response
+    pis1 = cloud.pis
+    pis2 = cloud.pis
+    assert auth._api_session.get.call_count == 1
+    assert pis1 == pis2
+    assert pis1["pi1"] is pis2["pi1"]
+
+
+def test_get_pis_refresh(auth, pis_response, pi_info_full):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = pis_response
+    pi1 = cloud.pis["pi1"]
+    cloud.info_cache.set("pi1", pi_info_full)
+    cloud.refresh()
+    assert len(cloud.info_cache) == 0
+    assert cloud.pis["pi1"] is not pi1
+    assert auth._api_session.get.call_count == 2
+
+
+def test_get_pis_excludes_cancelled(auth, pis_response):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = pis_response
+    cloud.pis["pi1"]._cancelled = True
+    assert list(cloud.pis) == ["pi2"]
+    auth._api_session.get.return_value = Mock(status_code=404)
+    assert cloud.get_pi("pi1") is None
+
+
 def test_get_pis_error_403(auth, error_403):
     cloud = PiCloud(auth=auth)
     auth._api_session.get.return_value = error_403
@@ -275,6 +322,63 @@ def test_create_pi3_with_name(
     assert pi.cpu_speed == 1200
 
 
+def test_create_pi_refreshes_pis(auth, pis_response, create_pi_response, default_pi3_spec):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = pis_response
+    assert len(cloud.pis) == 2
+    auth._api_session.post.return_value = create_pi_response
+    cloud.create_pi(name="pi3", spec=default_pi3_spec)
+    assert len(cloud.pis) == 2
+    assert auth._api_session.get.call_count == 2
+
+
+def test_get_pi(auth, pi_info_response, pi_info_full, api_url):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = pi_info_response
+    pi = cloud.get_pi("test-pi")
+    assert auth._api_session.get.call_count == 1
+    assert auth._api_session.get.call_args[0][0] == api_url + "servers/test-pi"
+    assert pi.name == "test-pi"
+    assert pi.info == pi_info_full
+    assert auth._api_session.get.call_count == 1
+    assert cloud.info_cache.hits == 1
+
+
+def test_get_pi_from_pis(auth, pis_response):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = pis_response
+    pi1 = cloud.pis["pi1"]
+    assert cloud.get_pi("pi1") is pi1
+    assert auth._api_session.get.call_count == 1
+
+
+def test_get_pi_not_found(auth):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = Mock(status_code=404)
+    assert cloud.get_pi("test-pi") is None
+
+
+def test_get_pi_error_403(auth, error_403):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = error_403
+    with pytest.raises(HostedPiNotAuthorizedError):
+        cloud.get_pi("test-pi")
+
+
+def test_get_pi_error_409(auth, error_409_provisioning):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = error_409_provisioning
+    with pytest.raises(HostedPiProvisioningError):
+        cloud.get_pi("test-pi")
+
+
+def test_get_pi_error_500(auth, error_500):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = error_500
+    with pytest.raises(HostedPiServerError):
+        cloud.get_pi("test-pi")
+
+
 def test_create_pi3_with_no_name(
     auth, create_pi_response, default_pi3_spec, mythic_servers_url, mythic_async_location
 ):
@@ -444,6 +548,129 @@ def test_create_pi_bad_ssh_keys(auth, pi3_name, default_pi3_spec):
         cloud.create_pi(name=pi3_name, spec=default_pi3_spec, ssh_keys="foo")
 
 
+@pytest.fixture
+def create_pis_post(mythic_async_location):
+    def post(url, json, **kwargs):
+        name = url.split("/")[-1]
+        return Mock(status_code=202, headers={"Location": f"{mythic_async_location}/{name}"})
+
+    return post
+
+
+def test_collect_ssh_keys_key_cache(auth, settings, cache_home):
+    sources = SSHKeySources(github_usernames={"testuser"})
+    cloud = PiCloud(auth=auth)
+    with patch.object(SSHKeySources, "collect", return_value=set()) as collect:
+        cloud._collect_ssh_keys(sources)
+        assert collect.call_args.kwargs["cache"] is None
+        settings.key_cache = True
+        cloud._collect_ssh_keys(sources)
+    cache = collect.call_args.kwargs["cache"]
+    assert isinstance(cache, KeyCache)
+    assert cache.directory == cache_home / "hostedpi"
+
+
+def test_create_pis(auth, create_pis_post, default_pi3_spec, ssh_keys, collected_ssh_keys):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.post.side_effect = create_pis_post
+    with patch.object(SSHKeySources, "collect", return_value=collected_ssh_keys) as collect:
+        results = cloud.create_pis(
+            {"pi1": default_pi3_spec, "pi2": default_pi3_spec}, ssh_keys=ssh_keys
+        )
+    assert collect.call_count == 1
+    assert auth._api_session.post.call_count == 2
+    assert auth._api_session.get.call_count == 0
+    assert [result.name for result in results] == ["pi1", "pi2"]
+    assert all(result.ok for result in results)
+    assert results[0].value.name == "pi1"
+    assert results[1].value.name == "pi2"
+
+
+def test_create_pis_unnamed(auth, create_pi_response, default_pi3_spec, default_pi4_spec):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.post.return_value = create_pi_response
+    results = cloud.create_pis([default_pi3_spec, default_pi4_spec])
+    assert auth._api_session.post.call_count == 2
+    assert [result.name for result in results] == [None, None]
+    assert [result.value.model for result in results] == [3, 4]
+
+
+def test_create_pis_none(auth):
+    cloud = PiCloud(auth=auth)
+    assert cloud.create_pis({}) == []
+    assert auth._api_session.post.call_count == 0
+
+
+def test_create_pis_bad_spec(auth, default_pi3_spec):
+    cloud = PiCloud(auth=auth)
+    with pytest.raises(TypeError):
+        cloud.create_pis([default_pi3_spec, "foo"])
+    assert auth._api_session.post.call_count == 0
+
+
+def test_create_pis_partial_failure(auth, create_pis_post, default_pi3_spec, error_503):
+    cloud = PiCloud(auth=auth)
+
+    def post(url, json, **kwargs):
+        if url.endswith("pi2"):
+            return error_503
+        return create_pis_post(url, json, **kwargs)
+
+    auth._api_session.post.side_effect = post
+    callback = Mock()
+    results = cloud.create_pis(
+        {"pi1": default_pi3_spec, "pi2": default_pi3_spec}, callback=callback
+    )
+    assert results[0].ok
+    assert not results[1].ok
+    assert isinstance(results[1].error, HostedPiOutOfStockError)
+    assert callback.call_count == 2
+
+
+def test_create_pis_with_wait(
+    auth,
+    create_pis_post,
+    default_pi3_spec,
+    mythic_async_location,
+    mythic_servers_url,
+    pi_info_json,
+    provision_status_provisioning,
+    provision_status_installing,
+    error_500,
+):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.post.side_effect = create_pis_post
+
+    def pi_info(name):
+        return Mock(
+            status_code=200,
+            json=Mock(return_value=pi_info_json),
+            request=Mock(url=f"{mythic_servers_url}/{name}"),
+        )
+
+    statuses = {
+        f"{mythic_async_location}/pi1": iter([provision_status_provisioning, pi_info("pi1")]),
+        f"{mythic_async_location}/pi2": iter(
+            [provision_status_provisioning, provision_status_installing, pi_info("pi2")]
+        ),
+        f"{mythic_async_location}/pi3": iter([provision_status_provisioning, error_500]),
+    }
+    auth._api_session.get.side_effect = lambda url, **kwargs: next(statuses[url])
+    callback = Mock()
+    specs = {"pi1": default_pi3_spec, "pi2": default_pi3_spec, "pi3": default_pi3_spec}
+    with patch("hostedpi.waiter.sleep") as sleep:
+        results = cloud.create_pis(specs, wait=True, callback=callback)
+    assert sleep.call_count == 2
+    assert auth._api_session.get.call_count == 7
+    assert [result.name for result in results] == ["pi1", "pi2", "pi3"]
+    assert results[0].ok
+    assert results[1].ok
+    assert isinstance(results[2].error, HostedPiServerError)
+    assert results[1].value.info.power
+    finished = [call[0][0].name for call in callback.call_args_list]
+    assert finished[-1] == "pi2"
+
+
 def test_create_pi_error_400(auth, error_400, default_pi3_spec, pi3_name):
     cloud = PiCloud(auth=auth)
     auth._api_session.post.return_value = error_400
@@ -553,3 +780,122 @@ def test_get_ipv6_ssh_config(auth, pis_response, pi_info_response, pi_info_respo
     assert lines[3] == "Host pi2"
     assert lines[4] == "    user root"
     assert lines[5] == "    hostname pi2.hostedpi.com"
+
+
+def test_map(auth, pis_response):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = pis_response
+    pis = cloud.pis.values()
+
+    results = cloud.map(lambda pi: pi.memory_mb, pis)
+
+    assert list(results) == ["pi1", "pi2"]
+    assert results["pi1"].ok
+    assert results["pi1"].value == 1024
+    assert results["pi2"].ok
+    assert results["pi2"].value == 4096
+
+
+def test_map_by_name(auth, pis_response):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = pis_response
+
+    results = cloud.map(lambda pi: pi.cpu_speed, ["pi2", "pi3"], max_workers=1)
+
+    assert list(results) == ["pi2", "pi3"]
+    assert results["pi2"].value == 1500
+    assert not results["pi3"].ok
+    assert isinstance(results["pi3"].error, HostedPiUserError)
+
+
+def test_map_unnamed_pi(auth, pis_response):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = pis_response
+    unnamed = Mock()
+    unnamed.name = None
+    func = Mock()
+
+    with pytest.raises(HostedPiUserError):
+        cloud.map(func, [cloud.pis["pi2"], unnamed])
+    with pytest.raises(HostedPiUserError):
+        cloud.bulk_reboot([unnamed])
+    func.assert_not_called()
+    unnamed.reboot.assert_not_called()
+
+
+def test_map_no_pis(auth):
+    cloud = PiCloud(auth=auth)
+    assert cloud.map(lambda pi: pi.name, []) == {}
+    assert not auth._api_session.get.called
+
+
+def test_bulk_power_on(auth, pis_response, api_url):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = pis_response
+    pis = cloud.pis.values()
+
+    results = cloud.bulk_power(pis, on=True)
+
+    assert all(result.ok for result in results.values())
+    assert auth._api_session.put.call_count == 2
+    urls = {call[0][0] for call in auth._api_session.put.call_args_list}
+    assert urls == {api_url + "servers/pi1/power", api_url + "servers/pi2/power"}
+    for call in auth._api_session.put.call_args_list:
+        assert call[1]["json"] == {"power": True}
+
+
+def test_bulk_power_off(auth, pis_response):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = pis_response
+    pis = cloud.pis.values()
+
+    results = cloud.bulk_power(pis, on=False)
+
+    assert all(result.ok for result in results.values())
+    assert auth._api_session.put.call_count == 2
+    for call in auth._api_session.put.call_args_list:
+        assert call[1]["json"] == {"power": False}
+
+
+def test_bulk_power_partial_failure(auth, pis_response, error_403, api_url):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = pis_response
+    pis = cloud.pis.values()
+
+    def put(url, **kwargs):
+        if url == api_url + "servers/pi1/power":
+            return error_403
+        return Mock(status_code=200)
+
+    auth._api_session.put.side_effect = put
+    results = cloud.bulk_power(pis, on=True)
+
+    assert not results["pi1"].ok
+    assert isinstance(results["pi1"].error, HostedPiNotAuthorizedError)
+    assert results["pi2"].ok
+
+
+def test_bulk_reboot(auth, pis_response, api_url):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = pis_response
+    pis = cloud.pis.values()
+
+    results = cloud.bulk_reboot(pis)
+
+    assert all(result.ok for result in results.values())
+    assert auth._api_session.post.call_count == 2
+    urls = {call[0][0] for call in auth._api_session.post.call_args_list}
+    assert urls == {api_url + "servers/pi1/reboot", api_url + "servers/pi2/reboot"}
+
+
+def test_bulk_cancel(auth, pis_response, pi_info_response, api_url):
+    cloud = PiCloud(auth=auth)
+    auth._api_session.get.return_value = pis_response
+    pis = list(cloud.pis.values())
+    auth._api_session.get.return_value = pi_info_response
+
+    results = cloud.bulk_cancel(pis)
+
+    assert all(result.ok for result in results.values())
+    assert auth._api_session.delete.call_count == 2
+    assert all(pi._cancelled for pi in pis)
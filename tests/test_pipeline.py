@@ -0,0 +1,199 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from hostedpi.cache import InfoCache
+from hostedpi.endpoints import (
+    FIND_SERVER,
+    GET_PROVISION_STATUS,
+    GET_SERVER,
+    PUT_POWER,
+    REBOOT,
+    Endpoint,
+)
+from hostedpi.exc import HostedPiProvisioningError, HostedPiServerError
+from hostedpi.models.mythic.responses import PiInfo
+from hostedpi.pipeline import Call, Pipeline, log_timing
+
+
+def test_endpoint_url(api_url):
+    assert GET_SERVER.url(api_url, name="test-pi") == api_url + "servers/test-pi"
+
+
+def test_endpoint_url_without_path(api_url):
+    with pytest.raises(ValueError):
+        GET_PROVISION_STATUS.url(api_url)
+
+
+def test_endpoint_is_frozen():
+    with pytest.raises(Exception):
+        GET_SERVER.method = "PUT"
+
+
+def test_pipeline_repr(auth):
+    assert repr(Pipeline(auth)) == "<Pipeline middleware=0>"
+
+
+def test_pipeline_request(auth, api_url, pi_info_response):
+    auth._api_session.get.return_value = pi_info_response
+    pipeline = Pipeline(auth)
+    info = pipeline.request(GET_SERVER, name="test-pi")
+    assert isinstance(info, PiInfo)
+    auth._api_session.get.assert_called_once_with(api_url + "servers/test-pi", allow_redirects=True)
+
+
+def test_pipeline_request_json(auth, api_url):
+    pipeline = Pipeline(auth)
+    pipeline.request(PUT_POWER, json={"power": True}, name="test-pi")
+    auth._api_session.put.assert_called_once_with(
+        api_url + "servers/test-pi/power", allow_redirects=True, json={"power": True}
+    )
+
+
+def test_pipeline_request_url(auth, mythic_async_location):
+    response = Mock(status_code=200)
+    auth._api_session.get.return_value = response
+    pipeline = Pipeline(auth)
+    assert pipeline.request(GET_PROVISION_STATUS, url=mythic_async_location) is response
+    auth._api_session.get.assert_called_once_with(mythic_async_location, allow_redirects=True)
+
+
+def test_pipeline_request_no_redirects(auth, api_url, pi_info_response):
+    endpoint = GET_SERVER.model_copy(update={"follow_redirects": False})
+    auth._api_session.get.return_value = pi_info_response
+    Pipeline(auth).request(endpoint, name="test-pi")
+    auth._api_session.get.assert_called_once_with(
+        api_url + "servers/test-pi", allow_redirects=False
+    )
+
+
+def test_pipeline_declared_error(auth, error_409_provisioning):
+    auth._api_session.get.return_value = error_409_provisioning
+    with pytest.raises(HostedPiProvisioningError):
+        Pipeline(auth).request(GET_SERVER, name="test-pi")
+
+
+def test_pipeline_undeclared_error(auth, error_500):
+    auth._api_session.get.return_value = error_500
+    with pytest.raises(HostedPiServerError):
+        Pipeline(auth).request(GET_SERVER, name="test-pi")
+
+
+def test_pipeline_ignored_status(auth):
+    auth._api_session.get.return_value = Mock(status_code=404)
+    assert Pipeline(auth).request(FIND_SERVER, name="test-pi") is None
+    auth._api_session.post.return_value = Mock(status_code=409)
+    assert Pipeline(auth).request(REBOOT, name="test-pi") is None
+
+
+def test_pipeline_logs_response(auth, pi_info_response):
+    auth._api_session.get.return_value = pi_info_response
+    with patch("hostedpi.pipeline.log_request") as log_request:
+        Pipeline(auth).request(GET_SERVER, name="test-pi")
+    log_request.assert_called_once_with(pi_info_response)
+
+
+def test_pipeline_cache_read(auth, pi_info_response):
+    auth._api_session.get.return_value = pi_info_response
+    cache = InfoCache()
+    pipeline = Pipeline(auth, info_cache=cache)
+    info = pipeline.request(GET_SERVER, name="test-pi")
+    assert pipeline.request(GET_SERVER, name="test-pi") is info
+    assert cache.get("test-pi") is info
+    assert auth._api_session.get.call_count == 1
+
+
+def test_pipeline_cache_ignored_status(auth):
+    auth._api_session.get.return_value = Mock(status_code=404)
+    cache = InfoCache()
+    assert Pipeline(auth, info_cache=cache).request(FIND_SERVER, name="test-pi") is None
+    assert len(cache) == 0
+
+
+def test_pipeline_cache_invalidate(auth, pi_info_full, error_409_provisioning):
+    cache = InfoCache()
+    pipeline = Pipeline(auth, info_cache=cache)
+    cache.set("test-pi", pi_info_full)
+    pipeline.request(PUT_POWER, json={"power": True}, name="test-pi")
+    assert cache.get("test-pi") is None
+
+    # the cache is invalidated even if the request fails
+    cache.set("test-pi", pi_info_full)
+    auth._api_session.put.return_value = error_409_provisioning
+    with pytest.raises(HostedPiProvisioningError):
+        pipeline.request(PUT_POWER, json={"power": True}, name="test-pi")
+    assert cache.get("test-pi") is None
+
+
+def test_pipeline_middleware_order(auth):
+    seen = []
+
+    def middleware(label):
+        def handle(call, send):
+            seen.append(f"{label} before")
+            result = send(call)
+            seen.append(f"{label} after")
+            return result
+
+        return handle
+
+    pipeline = Pipeline(auth, middleware=[middleware("outer")])
+    pipeline.use(middleware("inner"))
+    assert len(pipeline.middleware) == 2
+    pipeline.request(PUT_POWER, json={"power": False}, name="test-pi")
+    assert seen == ["outer before", "inner before", "inner after", "outer after"]
+
+
+def test_pipeline_middleware_sees_call(auth, api_url):
+    calls = []
+
+    def record(call, send):
+        calls.append(call)
+        return send(call)
+
+    Pipeline(auth, middleware=[record]).request(PUT_POWER, json={"power": True}, name="test-pi")
+    [call] = calls
+    assert call.endpoint is PUT_POWER
+    assert call.url == api_url + "servers/test-pi/power"
+    assert call.params == {"name": "test-pi"}
+    assert call.json == {"power": True}
+    assert repr(call) == f"<Call endpoint=put_power url={api_url}servers/test-pi/power>"
+
+
+def test_pipeline_middleware_short_circuit(auth):
+    pipeline = Pipeline(auth, middleware=[lambda call, send: "stubbed"])
+    assert pipeline.request(PUT_POWER, json={"power": True}, name="test-pi") == "stubbed"
+    auth._api_session.put.assert_not_called()
+
+
+def test_pipeline_middleware_sees_errors(auth, error_500):
+    auth._api_session.get.return_value = error_500
+    errors = []
+
+    def record_errors(call, send):
+        try:
+            return send(call)
+        except HostedPiServerError as exc:
+            errors.append(exc)
+            raise
+
+    with pytest.raises(HostedPiServerError):
+        Pipeline(auth, middleware=[record_errors]).request(GET_SERVER, name="test-pi")
+    assert len(errors) == 1
+
+
+def test_pipeline_cache_hits_skip_middleware(auth, pi_info_full):
+    middleware = Mock(side_effect=lambda call, send: send(call))
+    cache = InfoCache()
+    cache.set("test-pi", pi_info_full)
+    pipeline = Pipeline(auth, info_cache=cache, middleware=[middleware])
+    assert pipeline.request(GET_SERVER, name="test-pi") is pi_info_full
+    middleware.assert_not_called()
+
+
+def test_log_timing():
+    call = Call(Endpoint(name="test", method="GET", path="test"), url="http://x/test", params={})
+    with patch("hostedpi.pipeline.logger") as logger:
+        assert log_timing(call, lambda call: "result") == "result"
+    assert logger.debug.call_args.kwargs["endpoint"] == "test"
+    assert logger.debug.call_args.kwargs["duration"] >= 0
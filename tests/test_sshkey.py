@@ -0,0 +1,107 @@
+import pickle
+from copy import copy
+
+import pytest
+
+from hostedpi.sshkey import SSHKey
+
+
+ED25519 = "AAAAC3NzaC1lZDI1NTE5AAAAIOMqqnkVzrm0SdG6UOoqKLsabgH5C9okWi0dh2l9GKJl"
+
+
+def test_sshkey_parse():
+    key = SSHKey(f"ssh-ed25519 {ED25519} ben@finn # ssh-import-id gh:ben")
+    assert key.algorithm == "ssh-ed25519"
+    assert key.blob == ED25519
+    assert key.comment == "ben@finn # ssh-import-id gh:ben"
+    assert key.label == "ben@finn"
+    assert key.note == "ssh-import-id gh:ben"
+    assert key.import_source == "gh:ben"
+    assert str(key) == f"ssh-ed25519 {ED25519} ben@finn # ssh-import-id gh:ben"
+    assert repr(key) == (
+        f"<SSHKey ssh-ed25519 {key.fingerprint} comment='ben@finn # ssh-import-id gh:ben'>"
+    )
+
+
+def test_sshkey_parse_no_comment():
+    key = SSHKey("  ssh-rsa AAA\n")
+    assert key.comment == ""
+    assert key.label is None
+    assert key.note == ""
+    assert key.import_source is None
+    assert str(key) == "ssh-rsa AAA"
+
+
+def test_sshkey_parse_unlabelled_comment():
+    key = SSHKey("ssh-rsa AAA # ssh-import-id lp:dave")
+    assert key.label is None
+    assert key.note == "ssh-import-id lp:dave"
+    assert key.import_source == "lp:dave"
+    key = SSHKey("ssh-rsa AAA laptop key")
+    assert key.label is None
+    assert key.note == "laptop key"
+
+
+def test_sshkey_parse_algorithm_only():
+    key = SSHKey("ssh-rsa")
+    assert key.algorithm == "ssh-rsa"
+    assert key.blob == ""
+    assert str(key) == "ssh-rsa"
+
+
+def test_sshkey_empty():
+    with pytest.raises(ValueError):
+        SSHKey(" ")
+
+
+def test_sshkey_parse_classmethod():
+    key = SSHKey("ssh-rsa AAA")
+    assert SSHKey.parse(key) is key
+    assert SSHKey.parse("ssh-rsa AAA") == key
+
+
+def test_sshkey_fingerprint():
+    # matches ssh-keygen -l
+    key = SSHKey(f"ssh-ed25519 {ED25519}")
+    assert key.fingerprint == "SHA256:+DiY3wvvV6TuJJhbpZisF/zLDA0zPMSvHdkr4UvCOqU"
+    # invalid base64 still has a fingerprint
+    assert SSHKey("ssh-rsa foo").fingerprint.startswith("SHA256:")
+
+
+def test_sshkey_equality():
+    key = SSHKey("ssh-rsa AAA ben@finn")
+    assert key == SSHKey("ssh-rsa AAA dave@home")
+    assert hash(key) == hash(SSHKey("ssh-rsa AAA"))
+    assert key != SSHKey("ssh-rsa BBB ben@finn")
+    assert key != SSHKey("ssh-dss AAA ben@finn")
+    assert key != "ssh-rsa AAA ben@finn"
+    assert len({key, SSHKey("ssh-rsa AAA"), SSHKey("ssh-rsa BBB")}) == 2
+
+
+def test_sshkey_immutable():
+    key = SSHKey("ssh-rsa AAA ben@finn")
+    with pytest.raises(AttributeError):
+        key.comment = "dave@home"
+    with pytest.raises(AttributeError):
+        key._comment = "dave@home"
+    with pytest.raises(AttributeError):
+        del key._blob
+    with pytest.raises(AttributeError):
+        key.__dict__
+
+
+def test_sshkey_copy_pickle():
+    key = SSHKey("ssh-rsa AAA ben@finn")
+    for other in (copy(key), pickle.loads(pickle.dumps(key))):
+        assert other == key
+        assert str(other) == str(key)
+
+
+def test_sshkey_with_comment():
+    key = SSHKey("ssh-rsa AAA ben@finn")
+    assert str(key.with_comment("dave@home")) == "ssh-rsa AAA dave@home"
+    assert str(key.with_import_source("gh", "ben")) == "ssh-rsa AAA ben@finn # ssh-import-id gh:ben"
+    assert str(SSHKey("ssh-rsa AAA").with_import_source("lp", "ben")) == (
+        "ssh-rsa AAA # ssh-import-id lp:ben"
+    )
+    assert str(key) == "ssh-rsa AAA ben@finn"
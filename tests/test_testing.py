@@ -0,0 +1,220 @@
+import pytest
+import requests
+
+from hostedpi import MythicAuth, Pi4ServerSpec, PiCloud, WaitPolicy
+from hostedpi.exc import (
+    HostedPiNameExistsError,
+    HostedPiOutOfStockError,
+    HostedPiProvisioningError,
+    HostedPiServerError,
+    MythicAuthenticationError,
+)
+from hostedpi.sshkey import SSHKey
+from hostedpi.testing import FakeMythicAPI, make_pi_info
+
+
+POLICY = WaitPolicy(interval=0.01, max_interval=0.01, jitter=0, timeout=10)
+
+
+@pytest.fixture
+def api():
+    with FakeMythicAPI(size=3) as api:
+        yield api
+
+
+@pytest.fixture
+def cloud(api) -> PiCloud:
+    return PiCloud(auth=MythicAuth(settings=api.settings(info_cache_ttl=0)))
+
+
+def test_fake_api_settings(api):
+    settings = api.settings(max_workers=4)
+    assert str(settings.auth_url) == api.auth_url
+    assert str(settings.api_url) == api.api_url
+    assert settings.max_workers == 4
+    assert repr(api) == f"<FakeMythicAPI url={api.url} servers=3>"
+
+
+def test_fake_api_not_started():
+    api = FakeMythicAPI(size=0)
+    assert api.url == ""
+    api.stop()
+
+
+def test_fake_api_list(api, cloud):
+    assert sorted(cloud.pis) == ["pi0", "pi1", "pi2"]
+    pi = cloud.pis["pi1"]
+    assert pi.info.ssh_port == 5001
+    assert pi.status == "Powered on"
+    assert api.requests["get_servers"] == 1
+    assert api.requests["login"] == 1
+
+
+def test_fake_api_large_fleet():
+    with FakeMythicAPI(size=2000) as api:
+        cloud = PiCloud(auth=MythicAuth(settings=api.settings()))
+        assert len(cloud.pis) == 2000
+        assert cloud.pis["pi1999"].info.ipv6_network != cloud.pis["pi0"].info.ipv6_network
+
+
+def test_fake_api_requires_token(api):
+    response = requests.get(api.api_url + "servers")
+    assert response.status_code == 401
+
+
+def test_fake_api_credentials():
+    with FakeMythicAPI(size=1, client_id="me", secret="s3cret") as api:
+        assert len(PiCloud(auth=MythicAuth(settings=api.settings())).pis) == 1
+        auth = MythicAuth(settings=api.settings(secret="wrong"))
+        with pytest.raises(MythicAuthenticationError):
+            auth.token
+
+
+def test_fake_api_token_expiry():
+    with FakeMythicAPI(size=1, token_expires_in=0) as api:
+        auth = MythicAuth(settings=api.settings())
+        with pytest.raises(HostedPiServerError):
+            PiCloud(auth=auth).pis
+
+
+def test_fake_api_provisioning(api, cloud):
+    pi = cloud.create_pi(name="new-pi", spec=Pi4ServerSpec())
+    assert api.is_provisioning("new-pi")
+    with pytest.raises(HostedPiProvisioningError):
+        cloud.pis["new-pi"].on()
+    with pytest.raises(HostedPiNameExistsError):
+        cloud.create_pi(name="pi0", spec=Pi4ServerSpec())
+
+    pi.wait_until_provisioned(policy=POLICY)
+    assert not api.is_provisioning("new-pi")
+    assert pi.name == "new-pi"
+    assert api.requests["get_provision_status"] == 2
+
+
+def test_fake_api_create_unnamed(api, cloud):
+    [result] = cloud.create_pis([Pi4ServerSpec()], wait=POLICY)
+    assert result.ok
+    assert result.name in api.servers
+    assert len(cloud.pis) == 4
+
+
+def test_fake_api_ssh_keys(api, cloud):
+    pi = cloud.create_pi(name="new-pi", spec=Pi4ServerSpec(), ssh_keys=None)
+    pi.wait_until_provisioned(policy=POLICY)
+    pi.ssh_keys = {"ssh-rsa AAA a@b", "ssh-rsa BBB c@d"}
+    assert {str(key) for key in pi.ssh_keys} == {"ssh-rsa AAA a@b", "ssh-rsa BBB c@d"}
+    assert api.ssh_keys["new-pi"].count("\n") == 1
+
+
+def test_fake_api_key_index(api, cloud):
+    cloud.pis["pi0"].ssh_keys = {"ssh-rsa AAA ben@finn", "ssh-rsa BBB dave@home"}
+    cloud.pis["pi1"].ssh_keys = {"ssh-rsa AAA ben@jake"}
+    index = cloud.get_key_index()
+    assert index.keys["pi2"] == set()
+    assert sorted(index.where("ben@finn")) == ["pi0"]
+    [key] = index.keys["pi1"]
+    assert index.pis[key.fingerprint] == {"pi0", "pi1"}
+    assert api.requests["get_ssh_keys"] == 3
+
+
+def test_fake_api_sync_ssh_keys(api, cloud):
+    cloud.pis["pi0"].ssh_keys = {"ssh-rsa AAA ben@finn", "ssh-rsa BBB dave@home"}
+    cloud.pis["pi1"].ssh_keys = {"ssh-rsa AAA ben@finn"}
+    desired = {
+        "pi0": {"ssh-rsa AAA ben@finn"},
+        "pi1": {"ssh-rsa AAA ben@finn"},
+        "pi2": {"ssh-rsa CCC ben@jake"},
+        "pi9": set(),
+    }
+    results = cloud.sync_ssh_keys(desired, dry_run=True)
+    assert list(results) == ["pi0", "pi1", "pi2", "pi9"]
+    assert [str(key) for key in results["pi0"].value.removed] == ["ssh-rsa BBB dave@home"]
+    assert not results["pi1"].value.changed
+    assert not results["pi9"].ok
+    assert api.requests["put_ssh_keys"] == 2
+
+    results = cloud.sync_ssh_keys(desired, max_workers=2)
+    assert results["pi2"].value.added == {SSHKey("ssh-rsa CCC")}
+    # only the Pis whose keys differ are updated
+    assert api.requests["put_ssh_keys"] == 4
+    for name in ("pi0", "pi1", "pi2"):
+        assert {str(key) for key in cloud.pis[name].ssh_keys} == desired[name]
+    results = cloud.sync_ssh_keys({"pi0": set()})
+    assert api.ssh_keys["pi0"] == ""
+
+
+def test_fake_api_boot_progress(api, cloud):
+    api.boot_polls = 100
+    pi = cloud.pis["pi0"]
+    pi.off()
+    assert pi.status == "Powered off"
+    pi.on()
+    assert pi.is_booting
+    assert pi.status == "Booting: Booting"
+
+
+def test_fake_api_wait_for_boot(api, cloud):
+    api.boot_polls = 3
+    pi = cloud.pis["pi0"]
+    assert pi.reboot(wait=POLICY) is True
+    assert not pi.is_booting
+    assert api.requests["get_server"] >= 4
+
+
+def test_fake_api_reboot_while_booting(api, cloud):
+    pi = cloud.pis["pi0"]
+    pi.reboot()
+    # the fake rejects the second reboot with 409, which the client ignores
+    pi.reboot()
+    assert api.requests["reboot"] == 2
+
+
+def test_fake_api_out_of_stock():
+    with FakeMythicAPI(size=0, stock=1) as api:
+        cloud = PiCloud(auth=MythicAuth(settings=api.settings()))
+        cloud.create_pi(spec=Pi4ServerSpec())
+        with pytest.raises(HostedPiOutOfStockError):
+            cloud.create_pi(spec=Pi4ServerSpec())
+
+
+def test_fake_api_rate_limit():
+    with FakeMythicAPI(size=1, rate_limit=2) as api:
+        settings = api.settings(info_cache_ttl=0, max_retries=0)
+        pi = PiCloud(auth=MythicAuth(settings=settings)).pis["pi0"]
+        pi.info
+        with pytest.raises(HostedPiServerError) as exc:
+            pi.info
+        assert str(exc.value) == "Rate limit exceeded"
+        response = requests.get(api.api_url + "servers", auth=pi._auth)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+
+
+def test_fake_api_inject_error(api, cloud):
+    api.inject_error(409, error="Server provisioning", endpoint="put_power", count=2)
+    pi = cloud.pis["pi0"]
+    pi.info
+    for _ in range(2):
+        with pytest.raises(HostedPiProvisioningError):
+            pi.off()
+    pi.off()
+    assert api.servers["pi0"]["power"] is False
+
+
+def test_fake_api_inject_error_any_endpoint(api, cloud):
+    cloud._auth.token
+    api.inject_error(500, error="Oops")
+    with pytest.raises(HostedPiServerError):
+        cloud.pis
+    assert len(cloud.pis) == 3
+
+
+def test_fake_api_cancel(api, cloud):
+    cloud.pis["pi2"].cancel()
+    assert "pi2" not in api.servers
+
+
+def test_make_pi_info_unique():
+    infos = [make_pi_info(n) for n in range(600)]
+    assert len({info["ip_routed"] for info in infos}) == 600
+    assert len({info["ssh_port"] for info in infos}) == 600
@@ -0,0 +1,133 @@
+import stat
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+from requests import Request
+
+from hostedpi.auth import MythicAuth
+from hostedpi.tokencache import TokenCache, get_cache_dir
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def token_cache(settings) -> TokenCache:
+    return TokenCache.for_settings(settings)
+
+
+def make_auth(settings, auth_response, **kwargs) -> MythicAuth:
+    return MythicAuth(
+        settings=settings,
+        auth_session=Mock(post=Mock(return_value=auth_response)),
+        api_session=Mock(),
+        **kwargs,
+    )
+
+
+def test_get_cache_dir(cache_home, monkeypatch):
+    assert get_cache_dir() == cache_home / "hostedpi"
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    monkeypatch.setenv("HOME", str(cache_home))
+    assert get_cache_dir() == cache_home / ".cache" / "hostedpi"
+
+
+def test_token_cache_keyed_by_id(settings, settings_2, token_cache, cache_home):
+    assert token_cache.path.parent == cache_home / "hostedpi"
+    assert token_cache.path.name.startswith("token-")
+    assert TokenCache.for_settings(settings).path == token_cache.path
+    settings_2.id = "other_id"
+    assert TokenCache.for_settings(settings_2).path != token_cache.path
+    assert repr(token_cache) == f"<TokenCache path={token_cache.path}>"
+
+
+def test_token_cache_save_load(token_cache):
+    assert token_cache.load() is None
+    expiry = datetime.now().replace(microsecond=0) + timedelta(hours=1)
+    token_cache.save("foobar", expiry)
+    assert token_cache.load() == ("foobar", expiry)
+    assert stat.S_IMODE(token_cache.path.stat().st_mode) == 0o600
+    assert stat.S_IMODE(token_cache.path.parent.stat().st_mode) == 0o700
+    assert list(token_cache.path.parent.iterdir()) == [token_cache.path]
+
+    token_cache.clear()
+    assert token_cache.load() is None
+    token_cache.clear()
+
+
+def test_token_cache_invalid_file(token_cache):
+    token_cache.path.parent.mkdir(parents=True)
+    token_cache.path.write_text("not json")
+    assert token_cache.load() is None
+
+
+def test_token_cache_save_failure(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    token_cache = TokenCache(blocker / "token.json")
+    token_cache.save("foobar", datetime.now())
+    assert token_cache.load() is None
+
+
+def test_auth_token_cache_disabled(settings, auth_response, token_cache):
+    auth = make_auth(settings, auth_response)
+    assert auth.token == "foobar"
+    assert not token_cache.path.exists()
+
+
+def test_auth_token_cache_shared(settings, auth_response, token_cache):
+    settings.token_cache = True
+    first = make_auth(settings, auth_response)
+    assert first.token == "foobar"
+    assert token_cache.load()[0] == "foobar"
+
+    second = make_auth(settings, auth_response)
+    assert second.token == "foobar"
+    second._auth_session.post.assert_not_called()
+    assert abs((second._token_expiry - first._token_expiry).total_seconds()) < 1
+
+
+def test_auth_token_cache_expiring(settings, auth_response, token_cache):
+    # a cached token due to be refreshed within the skew is not used
+    token_cache.save("old", datetime.now() + timedelta(seconds=30))
+    auth = make_auth(settings, auth_response, token_cache=token_cache)
+    assert auth.token == "foobar"
+    auth._auth_session.post.assert_called_once()
+    assert token_cache.load()[0] == "foobar"
+
+
+def test_auth_token_cache_refresh_at(settings, auth_response, token_cache):
+    expiry = datetime.now() + timedelta(seconds=600)
+    token_cache.save("cached", expiry)
+    auth = make_auth(settings, auth_response, token_cache=token_cache)
+    assert auth.token == "cached"
+    assert auth._refresh_at == datetime.fromtimestamp(expiry.timestamp()) - timedelta(seconds=60)
+
+
+def test_auth_token_cache_rejected(settings, auth_response, token_cache):
+    token_cache.save("cached", datetime.now() + timedelta(seconds=600))
+    auth = make_auth(settings, auth_response, token_cache=token_cache)
+    request = auth(Request("GET", "http://localhost/servers").prepare())
+    assert request.headers["Authorization"] == "Bearer cached"
+
+    auth._handle_401(Mock(status_code=401, request=request, history=[]))
+    # the rejected token is not loaded from the cache again
+    auth._auth_session.post.assert_called_once()
+    assert auth.token == "foobar"
+    assert token_cache.load()[0] == "foobar"
+
+
+def test_auth_token_cache_rejected_replaced(settings, auth_response, token_cache):
+    token_cache.save("cached", datetime.now() + timedelta(seconds=600))
+    auth = make_auth(settings, auth_response, token_cache=token_cache)
+    request = auth(Request("GET", "http://localhost/servers").prepare())
+    # another process has already replaced the rejected token
+    token_cache.save("other", datetime.now() + timedelta(seconds=600))
+
+    auth._handle_401(Mock(status_code=401, request=request, history=[]))
+    auth._auth_session.post.assert_not_called()
+    assert auth.token == "other"
@@ -0,0 +1,138 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+import pytest
+
+from hostedpi import MythicAuth, Pi4ServerSpec, PiCloud, WaitPolicy
+from hostedpi.exc import HostedPiServerError
+from hostedpi.testing import FakeMythicAPI
+from hostedpi.tracing import NOOP_SPAN, get_tracer, set_tracer, start_span
+
+
+class RecordedSpan:
+    def __init__(self, name, attributes, parent):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.parent = parent
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+
+class RecordingTracer:
+    """
+    Records every span started, along with the span which was current when it started
+    """
+
+    def __init__(self):
+        self.spans: list[RecordedSpan] = []
+        self._current = ContextVar("current", default=None)
+        self._lock = Lock()
+
+    @contextmanager
+    def start_as_current_span(self, name, *, attributes=None):
+        span = RecordedSpan(name, attributes, self._current.get())
+        with self._lock:
+            self.spans.append(span)
+        token = self._current.set(span)
+        try:
+            yield span
+        except Exception as exc:
+            span.error = exc
+            raise
+        finally:
+            self._current.reset(token)
+
+    def named(self, name) -> list[RecordedSpan]:
+        return [span for span in self.spans if span.name == name]
+
+
+@pytest.fixture
+def tracer():
+    tracer = RecordingTracer()
+    set_tracer(tracer)
+    yield tracer
+    set_tracer(None)
+
+
+@pytest.fixture
+def api():
+    with FakeMythicAPI(size=2, provision_polls=2) as api:
+        yield api
+
+
+@pytest.fixture
+def cloud(api) -> PiCloud:
+    return PiCloud(auth=MythicAuth(settings=api.settings(info_cache_ttl=0, max_retries=1)))
+
+
+def test_tracing_disabled():
+    assert get_tracer() is None
+    with start_span("hostedpi.request", {"hostedpi.endpoint": "get_servers"}) as span:
+        assert span is NOOP_SPAN
+        span.set_attribute("http.response.status_code", 200)
+    assert repr(span) == "<NoopSpan>"
+
+
+def test_trace_requests(tracer, cloud):
+    cloud.pis["pi1"].info
+
+    [refresh] = tracer.named("hostedpi.auth.refresh")
+    assert refresh.attributes["http.response.status_code"] == 200
+    assert refresh.parent.name == "hostedpi.request"
+    requests = tracer.named("hostedpi.request")
+    assert [span.attributes["hostedpi.endpoint"] for span in requests] == [
+        "get_servers",
+        "get_server",
+    ]
+    span = requests[1]
+    assert span.attributes["http.request.method"] == "GET"
+    assert span.attributes["url.full"].endswith("/servers/pi1")
+    assert span.attributes["hostedpi.pi.name"] == "pi1"
+    assert span.attributes["http.response.status_code"] == 200
+    assert span.attributes["hostedpi.retries"] == 0
+    assert "hostedpi.pi.name" not in requests[0].attributes
+
+
+def test_trace_request_errors(tracer, api, cloud):
+    cloud.pis
+    api.inject_error(503, endpoint="get_server", count=2)
+    with pytest.raises(HostedPiServerError):
+        cloud.pis["pi0"].info
+
+    span = tracer.named("hostedpi.request")[-1]
+    assert span.attributes["http.response.status_code"] == 503
+    assert span.attributes["hostedpi.retries"] == 1
+    assert isinstance(span.error, HostedPiServerError)
+
+
+def test_trace_wait(tracer, api, cloud):
+    pi = cloud.create_pi(name="new-pi", spec=Pi4ServerSpec())
+    pi.wait_until_provisioned(policy=WaitPolicy(interval=0.01, jitter=0))
+
+    iterations = tracer.named("hostedpi.wait")
+    polls = tracer.named("hostedpi.wait.poll")
+    assert len(iterations) == len(polls) == 3
+    assert iterations[0].attributes["hostedpi.wait.pending"] == 1
+    assert iterations[0].attributes["hostedpi.wait.polls"] == 1
+    assert "hostedpi.wait.sleep" in iterations[1].attributes
+    assert [span.attributes["hostedpi.wait.poll"] for span in polls] == [1, 2, 3]
+    assert [span.attributes["hostedpi.wait.ready"] for span in polls] == [False, False, True]
+    assert all(span.attributes["hostedpi.pi.name"] == "new-pi" for span in polls)
+    # the polls run in worker threads, but are still children of their iteration
+    assert [span.parent for span in polls] == iterations
+    [request] = [span for span in tracer.named("hostedpi.request") if span.parent is polls[0]]
+    assert request.attributes["hostedpi.endpoint"] == "get_provision_status"
+
+
+def test_trace_wait_error(tracer, api, cloud):
+    pi = cloud.create_pi(name="new-pi", spec=Pi4ServerSpec())
+    api.inject_error(500, endpoint="get_provision_status")
+    with pytest.raises(HostedPiServerError):
+        pi.wait_until_provisioned(policy=WaitPolicy(interval=0.01, jitter=0))
+
+    [poll] = tracer.named("hostedpi.wait.poll")
+    assert poll.attributes["error.type"] == "HostedPiServerError"
+    assert "hostedpi.wait.ready" not in poll.attributes
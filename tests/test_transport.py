@@ -0,0 +1,198 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from unittest.mock import patch
+
+import pytest
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import RequestHistory
+
+from hostedpi.auth import MythicAuth
+from hostedpi.transport import (
+    RETRY_MAX_BACKOFF,
+    HostedPiAdapter,
+    HostedPiRetry,
+    get_retry,
+    get_retry_delay,
+    make_session,
+    parse_retry_after,
+)
+
+
+class Handler(BaseHTTPRequestHandler):
+    # each request pops the next status from the server's list of statuses
+    def do_GET(self):
+        self.respond()
+
+    def do_PUT(self):
+        self.respond()
+
+    def do_POST(self):
+        self.respond()
+
+    def respond(self):
+        self.server.requests.append(self.command)
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status)
+        self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.statuses = []
+    server.requests = []
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def server_url(server) -> str:
+    host, port = server.server_address
+    return f"http://{host}:{port}/"
+
+
+def test_adapter_from_settings(settings):
+    adapter = HostedPiAdapter.from_settings(settings)
+    assert adapter.timeout == (settings.connect_timeout, settings.read_timeout)
+    assert adapter._pool_maxsize == settings.pool_size
+    assert adapter.max_retries.total == settings.max_retries
+    assert repr(adapter).startswith("<HostedPiAdapter pool_size=16 max_retries=3")
+
+
+def test_adapter_pool_at_least_max_workers(settings):
+    settings.max_workers = 32
+    adapter = HostedPiAdapter.from_settings(settings)
+    assert adapter._pool_maxsize == 32
+
+
+def test_adapter_default_timeout(settings):
+    adapter = HostedPiAdapter.from_settings(settings)
+    with patch.object(HTTPAdapter, "send") as send:
+        adapter.send("request")
+        assert send.call_args.kwargs["timeout"] == (5, 30)
+        adapter.send("request", timeout=1)
+        assert send.call_args.kwargs["timeout"] == 1
+
+
+def test_get_retry(settings):
+    retry = get_retry(settings)
+    assert retry.total == 3
+    assert retry.allowed_methods == {"GET", "PUT"}
+    assert retry.status_forcelist == {502, 503, 504}
+    assert retry.respect_retry_after_header
+    assert not retry.raise_on_status
+
+
+def test_get_retry_backoff_capped(settings):
+    settings = settings.model_copy(update={"retry_backoff": 100.0})
+    # backoff_max is not passed, as urllib3 1.26 does not accept it
+    with patch.object(
+        HostedPiRetry, "__init__", autospec=True, side_effect=HostedPiRetry.__init__
+    ) as init:
+        retry = get_retry(settings)
+    assert "backoff_max" not in init.call_args.kwargs
+    assert isinstance(retry, HostedPiRetry)
+    history = (RequestHistory("GET", "/", None, 503, None),) * 3
+    retry = retry.new(history=history)
+    assert isinstance(retry, HostedPiRetry)
+    assert retry.get_backoff_time() == RETRY_MAX_BACKOFF
+    assert (
+        get_retry(settings.model_copy(update={"retry_backoff": 0.5}))
+        .new(history=history)
+        .get_backoff_time()
+        == 2.0
+    )
+
+
+def test_make_session(settings):
+    session = make_session(settings)
+    adapter = session.get_adapter("https://api.mythic-beasts.com/beta/pi/")
+    assert isinstance(adapter, HostedPiAdapter)
+    assert session.get_adapter("http://localhost/") is adapter
+
+
+def test_make_session_with_adapter(settings):
+    adapter = HTTPAdapter()
+    session = make_session(settings, adapter=adapter)
+    assert session.get_adapter("https://api.mythic-beasts.com/beta/pi/") is adapter
+
+
+def test_auth_default_sessions_share_transport(settings):
+    auth = MythicAuth(settings=settings)
+    api_adapter = auth._api_session.get_adapter(str(settings.api_url))
+    auth_adapter = auth._auth_session.get_adapter(str(settings.auth_url))
+    assert isinstance(api_adapter, HostedPiAdapter)
+    assert api_adapter is auth_adapter
+
+
+def test_auth_custom_transport(settings):
+    adapter = HTTPAdapter()
+    auth = MythicAuth(settings=settings, transport=adapter)
+    assert auth._api_session.get_adapter(str(settings.api_url)) is adapter
+
+
+def test_retry_get(settings, server, server_url):
+    server.statuses = [503, 502]
+    session = make_session(settings)
+    response = session.get(server_url)
+    assert response.status_code == 200
+    assert server.requests == ["GET", "GET", "GET"]
+
+
+def test_retry_put(settings, server, server_url):
+    server.statuses = [504]
+    session = make_session(settings)
+    response = session.put(server_url)
+    assert response.status_code == 200
+    assert server.requests == ["PUT", "PUT"]
+
+
+def test_retries_exhausted(settings, server, server_url):
+    settings.max_retries = 1
+    server.statuses = [503, 503, 503]
+    session = make_session(settings)
+    response = session.get(server_url)
+    assert response.status_code == 503
+    assert server.requests == ["GET", "GET"]
+
+
+def test_no_retry_post(settings, server, server_url):
+    server.statuses = [503]
+    session = make_session(settings)
+    response = session.post(server_url)
+    assert response.status_code == 503
+    assert server.requests == ["POST"]
+
+
+@pytest.mark.parametrize(
+    "attempt,retry_after,expected",
+    [
+        (1, None, 0),
+        (2, None, 1),
+        (3, None, 2),
+        (20, None, 60),
+        (3, "7", 7),
+        (3, "-1", 0),
+        (3, "soon", 2),
+    ],
+)
+def test_get_retry_delay(settings, attempt, retry_after, expected):
+    assert get_retry_delay(settings, attempt, retry_after) == expected
+
+
+def test_parse_retry_after_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    delay = parse_retry_after(format_datetime(retry_at, usegmt=True))
+    assert 28 < delay <= 30
+    past = datetime.now(timezone.utc) - timedelta(seconds=30)
+    assert parse_retry_after(format_datetime(past, usegmt=True)) == 0
@@ -1,29 +1,50 @@
+from threading import Barrier
 from unittest.mock import Mock, patch
 
 import pytest
+from requests.exceptions import HTTPError, ReadTimeout
 
+from hostedpi.exc import HostedPiKeyImportError
 from hostedpi.utils import (
+    KEY_IMPORT_WORKERS,
     collect_ssh_keys,
     dedupe_ssh_keys,
     fetch_keys_from_url,
     get_error_message,
+    get_key_session,
     remove_imported_ssh_keys,
     remove_ssh_keys_by_label,
     ssh_import_id,
 )
 
 
+def lines(keys) -> set[str]:
+    return {str(key) for key in keys}
+
+
 @pytest.fixture(autouse=True)
 def patch_log_request():
     with patch("hostedpi.utils.log_request"):
         yield
 
 
+@pytest.fixture
+def mock_session():
+    with patch("hostedpi.utils.get_key_session") as get_key_session:
+        yield get_key_session.return_value
+
+
+@pytest.fixture
+def mock_get(mock_session):
+    return mock_session.get
+
+
 @pytest.fixture
 def mock_github_response():
     return Mock(
         status_code=200,
         text="ssh-rsa foo\nssh-rsa bar",
+        headers={},
     )
 
 
@@ -32,6 +53,7 @@ def mock_launchpad_response():
     return Mock(
         status_code=200,
         text="ssh-rsa foobar\r\n\nssh-rsa barfoo",
+        headers={},
     )
 
 
@@ -42,7 +64,7 @@ def test_dedupe_ssh_keys():
         "ssh-rsa foo",
     }
     deduped_keys = dedupe_ssh_keys(keys)
-    assert deduped_keys == {"ssh-rsa foo", "ssh-rsa bar"}
+    assert lines(deduped_keys) == {"ssh-rsa foo", "ssh-rsa bar"}
 
     keys = {
         "ssh-rsa foo # ssh-import-id gh:testuser",
@@ -50,7 +72,7 @@ def test_dedupe_ssh_keys():
         "ssh-rsa foo",
     }
     deduped_keys = dedupe_ssh_keys(keys)
-    assert deduped_keys == {
+    assert lines(deduped_keys) == {
         "ssh-rsa foo # ssh-import-id gh:testuser",
         "ssh-rsa bar",
     }
@@ -72,7 +94,7 @@ def test_dedupe_ssh_keys():
         "ssh-rsa barfoo",
     }
     deduped_keys = dedupe_ssh_keys(keys)
-    assert deduped_keys == {
+    assert lines(deduped_keys) == {
         "ssh-rsa bar testuser@home # ssh-import-id gh:testuser",
         "ssh-rsa barfoo testuser@home # ssh-import-id lp:testuser2",
         "ssh-rsa foo testuser@home # ssh-import-id gh:testuser",
@@ -80,7 +102,6 @@ def test_dedupe_ssh_keys():
     }
 
 
-@patch("hostedpi.utils.requests.get")
 def test_fetch_keys_github(mock_get, mock_github_response):
     mock_get.return_value = mock_github_response
     url = "https://example.com/keys"
@@ -89,7 +110,6 @@ def test_fetch_keys_github(mock_get, mock_github_response):
     assert keys == {"ssh-rsa foo", "ssh-rsa bar"}
 
 
-@patch("hostedpi.utils.requests.get")
 def test_fetch_keys_launchpad(mock_get, mock_launchpad_response):
     mock_get.return_value = mock_launchpad_response
     url = "https://example.com/keys"
@@ -98,33 +118,30 @@ def test_fetch_keys_launchpad(mock_get, mock_launchpad_response):
     assert keys == {"ssh-rsa foobar", "ssh-rsa barfoo"}
 
 
-@patch("hostedpi.utils.requests.get")
 def test_ssh_import_id_github(mock_get, mock_github_response):
     gh_user = "testuser"
     mock_get.return_value = mock_github_response
     keys = ssh_import_id(github_username=gh_user)
     assert mock_get.call_count == 1
     assert mock_get.call_args_list[0][0][0] == f"https://github.com/{gh_user}.keys"
-    assert keys == {
+    assert lines(keys) == {
         "ssh-rsa foo # ssh-import-id gh:testuser",
         "ssh-rsa bar # ssh-import-id gh:testuser",
     }
 
 
-@patch("hostedpi.utils.requests.get")
 def test_ssh_import_id_launchpad(mock_get, mock_launchpad_response):
     lp_user = "testuser2"
     mock_get.return_value = mock_launchpad_response
     keys = ssh_import_id(launchpad_username=lp_user)
     assert mock_get.call_count == 1
     assert mock_get.call_args_list[0][0][0] == f"https://launchpad.net/~{lp_user}/+sshkeys"
-    assert keys == {
+    assert lines(keys) == {
         "ssh-rsa foobar # ssh-import-id lp:testuser2",
         "ssh-rsa barfoo # ssh-import-id lp:testuser2",
     }
 
 
-@patch("hostedpi.utils.requests.get")
 def test_ssh_import_id_both(mock_get, mock_github_response, mock_launchpad_response):
     gh_user = "testuser"
     lp_user = "testuser2"
@@ -133,7 +150,7 @@ def test_ssh_import_id_both(mock_get, mock_github_response, mock_launchpad_respo
     assert mock_get.call_count == 2
     assert mock_get.call_args_list[0][0][0] == f"https://github.com/{gh_user}.keys"
     assert mock_get.call_args_list[1][0][0] == f"https://launchpad.net/~{lp_user}/+sshkeys"
-    assert keys == {
+    assert lines(keys) == {
         "ssh-rsa foo # ssh-import-id gh:testuser",
         "ssh-rsa bar # ssh-import-id gh:testuser",
         "ssh-rsa foobar # ssh-import-id lp:testuser2",
@@ -143,39 +160,41 @@ def test_ssh_import_id_both(mock_get, mock_github_response, mock_launchpad_respo
 
 def test_collect_ssh_keys_set():
     keys = collect_ssh_keys(ssh_keys={"ssh-rsa foo", "ssh-rsa bar"})
-    assert keys == {"ssh-rsa foo", "ssh-rsa bar"}
+    assert lines(keys) == {"ssh-rsa foo", "ssh-rsa bar"}
 
 
 def test_collect_ssh_keys_path(tmp_path):
     key_path = tmp_path / "id_rsa.pub"
     key_path.write_text("ssh-rsa foo")
     keys = collect_ssh_keys(ssh_key_path=key_path)
-    assert keys == {"ssh-rsa foo"}
+    assert lines(keys) == {"ssh-rsa foo"}
 
 
-@patch("hostedpi.utils.requests.get")
 def test_collect_ssh_keys_github(mock_get, mock_github_response):
     mock_get.return_value = mock_github_response
     keys = collect_ssh_keys(github_usernames={"testuser"})
-    assert keys == {
+    assert lines(keys) == {
         "ssh-rsa foo # ssh-import-id gh:testuser",
         "ssh-rsa bar # ssh-import-id gh:testuser",
     }
 
 
-@patch("hostedpi.utils.requests.get")
 def test_collect_ssh_keys_launchpad(mock_get, mock_launchpad_response):
     mock_get.return_value = mock_launchpad_response
     keys = collect_ssh_keys(launchpad_usernames={"testuser"})
-    assert keys == {
+    assert lines(keys) == {
         "ssh-rsa foobar # ssh-import-id lp:testuser",
         "ssh-rsa barfoo # ssh-import-id lp:testuser",
     }
 
 
-@patch("hostedpi.utils.requests.get")
 def test_collect_ssh_keys_all(mock_get, mock_github_response, mock_launchpad_response, tmp_path):
-    mock_get.side_effect = [mock_github_response, mock_launchpad_response]
+    # the users' keys are requested concurrently, so respond by URL rather than in order
+    responses = {
+        "https://github.com/testuser.keys": mock_github_response,
+        "https://launchpad.net/~testuser2/+sshkeys": mock_launchpad_response,
+    }
+    mock_get.side_effect = lambda url, **kwargs: responses[url]
     key_path = tmp_path / "id_rsa.pub"
     key_path.write_text("ssh-rsa localkey")
 
@@ -186,7 +205,7 @@ def test_collect_ssh_keys_all(mock_get, mock_github_response, mock_launchpad_res
         launchpad_usernames={"testuser2"},
     )
 
-    assert keys == {
+    assert lines(keys) == {
         "ssh-rsa foo # ssh-import-id gh:testuser",
         "ssh-rsa bar # ssh-import-id gh:testuser",
         "ssh-rsa foobar # ssh-import-id lp:testuser2",
@@ -195,6 +214,59 @@ def test_collect_ssh_keys_all(mock_get, mock_github_response, mock_launchpad_res
     }
 
 
+def test_fetch_keys_timeout(mock_get, mock_github_response):
+    mock_get.return_value = mock_github_response
+    fetch_keys_from_url("https://example.com/keys", "\n", timeout=(1, 2))
+    mock_get.assert_called_once_with("https://example.com/keys", timeout=(1, 2), headers={})
+
+
+def test_get_key_session():
+    session = get_key_session()
+    assert get_key_session() is session
+    adapter = session.get_adapter("https://github.com/")
+    assert adapter._pool_maxsize == KEY_IMPORT_WORKERS
+
+
+def test_collect_ssh_keys_concurrent(mock_get):
+    barrier = Barrier(4, timeout=5)
+
+    def get(url, **kwargs):
+        # every request must be in flight at once for the barrier to pass
+        barrier.wait()
+        return Mock(status_code=200, text=f"ssh-rsa {url.split('/')[-1]}", headers={})
+
+    mock_get.side_effect = get
+    keys = collect_ssh_keys(github_usernames={"a", "b", "c", "d"}, max_workers=4)
+    assert len(keys) == 4
+    assert mock_get.call_count == 4
+
+
+def test_collect_ssh_keys_partial_failure(mock_get, mock_github_response):
+    def get(url, **kwargs):
+        if url == "https://github.com/slow.keys":
+            raise ReadTimeout("timed out")
+        if url == "https://launchpad.net/~nobody/+sshkeys":
+            raise HTTPError("404 Client Error")
+        return mock_github_response
+
+    mock_get.side_effect = get
+    with pytest.raises(HostedPiKeyImportError) as exc_info:
+        collect_ssh_keys(
+            ssh_keys={"ssh-rsa local"},
+            github_usernames={"testuser", "slow"},
+            launchpad_usernames={"nobody"},
+        )
+    exc = exc_info.value
+    assert str(exc) == "Failed to import SSH keys for gh:slow, lp:nobody"
+    assert lines(exc.keys) == {
+        "ssh-rsa local",
+        "ssh-rsa foo # ssh-import-id gh:testuser",
+        "ssh-rsa bar # ssh-import-id gh:testuser",
+    }
+    assert isinstance(exc.errors["gh:slow"], ReadTimeout)
+    assert isinstance(exc.errors["lp:nobody"], HTTPError)
+
+
 def test_get_error_message_json():
     mock_response = Mock(
         json=Mock(return_value={"error": "Something went wrong"}),
@@ -248,81 +320,81 @@ def test_remove_ssh_keys_by_label():
     }
 
     result = remove_ssh_keys_by_label(ssh_keys, "ben@finn")
-    assert result == {
+    assert lines(result) == {
         "ssh-rsa bar ben@jake",
         "ssh-rsa foobar dave@home # ssh-import-id lp:testuser2",
         "ssh-rsa barfoo # ssh-import-id lp:testuser2",
     }
 
     result = remove_ssh_keys_by_label(ssh_keys, "dave@home")
-    assert result == {
+    assert lines(result) == {
         "ssh-rsa foo ben@finn # ssh-import-id gh:testuser",
         "ssh-rsa bar ben@jake",
         "ssh-rsa barfoo # ssh-import-id lp:testuser2",
     }
 
     result = remove_ssh_keys_by_label(ssh_keys, "")
-    assert result == ssh_keys
+    assert lines(result) == ssh_keys
 
 
 def test_remove_imported_ssh_keys_github():
     ssh_keys = set()
     result = remove_imported_ssh_keys(ssh_keys, "gh", "testuser")
-    assert result == set()
+    assert lines(result) == set()
 
     ssh_keys = {
         "ssh-rsa foo ben@finn # ssh-import-id gh:testuser",
         "ssh-rsa bar ben@jake",
-        "ssh-rsa foo bob@test # ssh-import-id gh:testuser2",
+        "ssh-rsa baz bob@test # ssh-import-id gh:testuser2",
         "ssh-rsa foobar dave@home # ssh-import-id lp:testuser",
         "ssh-rsa barfoo # ssh-import-id lp:testuser",
     }
 
     result = remove_imported_ssh_keys(ssh_keys, "gh", "testuser")
-    assert result == {
+    assert lines(result) == {
         "ssh-rsa bar ben@jake",
-        "ssh-rsa foo bob@test # ssh-import-id gh:testuser2",
+        "ssh-rsa baz bob@test # ssh-import-id gh:testuser2",
         "ssh-rsa foobar dave@home # ssh-import-id lp:testuser",
         "ssh-rsa barfoo # ssh-import-id lp:testuser",
     }
 
     result = remove_imported_ssh_keys(ssh_keys, "gh", "testuser2")
-    assert result == {
+    assert lines(result) == {
         "ssh-rsa foo ben@finn # ssh-import-id gh:testuser",
         "ssh-rsa bar ben@jake",
         "ssh-rsa foobar dave@home # ssh-import-id lp:testuser",
         "ssh-rsa barfoo # ssh-import-id lp:testuser",
     }
     result = remove_imported_ssh_keys(ssh_keys, "gh", "testuser3")
-    assert result == ssh_keys
+    assert lines(result) == ssh_keys
 
 
 def test_remove_imported_ssh_keys_launchpad():
     ssh_keys = set()
     result = remove_imported_ssh_keys(ssh_keys, "lp", "testuser")
-    assert result == set()
+    assert lines(result) == set()
 
     ssh_keys = {
         "ssh-rsa foo ben@finn # ssh-import-id gh:testuser",
         "ssh-rsa bar ben@jake",
-        "ssh-rsa foo bob@test # ssh-import-id lp:testuser2",
+        "ssh-rsa baz bob@test # ssh-import-id lp:testuser2",
         "ssh-rsa foobar dave@home # ssh-import-id lp:testuser",
         "ssh-rsa barfoo # ssh-import-id lp:testuser",
     }
 
     result = remove_imported_ssh_keys(ssh_keys, "lp", "testuser")
-    assert result == {
+    assert lines(result) == {
         "ssh-rsa foo ben@finn # ssh-import-id gh:testuser",
         "ssh-rsa bar ben@jake",
-        "ssh-rsa foo bob@test # ssh-import-id lp:testuser2",
+        "ssh-rsa baz bob@test # ssh-import-id lp:testuser2",
     }
 
     result = remove_imported_ssh_keys(ssh_keys, "lp", "testuser2")
-    assert result == {
+    assert lines(result) == {
         "ssh-rsa foo ben@finn # ssh-import-id gh:testuser",
         "ssh-rsa bar ben@jake",
         "ssh-rsa foobar dave@home # ssh-import-id lp:testuser",
         "ssh-rsa barfoo # ssh-import-id lp:testuser",
     }
     result = remove_imported_ssh_keys(ssh_keys, "lp", "testuser3")
-    assert result == ssh_keys
+    assert lines(result) == ssh_keys
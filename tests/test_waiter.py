@@ -0,0 +1,159 @@
+from concurrent.futures import Future
+from unittest.mock import Mock, patch
+
+import pytest
+
+from hostedpi import waiter as hostedpi_waiter
+from hostedpi.exc import HostedPiTimeoutError, HostedPiUserError
+from hostedpi.models.wait import WaitPolicy
+from hostedpi.waiter import Waiter
+
+
+@pytest.fixture
+def mock_sleep():
+    # a fake clock which sleep advances
+    with patch("hostedpi.waiter.sleep") as sleep, patch("hostedpi.waiter.monotonic") as monotonic:
+        monotonic.return_value = 100
+
+        def advance(delay):
+            monotonic.return_value += delay
+
+        sleep.side_effect = advance
+        yield sleep
+
+
+def make_check(*results):
+    return Mock(side_effect=list(results))
+
+
+def test_waiter_init():
+    waiter = Waiter()
+    assert len(waiter) == 0
+    assert repr(waiter) == "<Waiter pending=0>"
+
+
+def test_waiter_wait_for(mock_sleep):
+    waiter = Waiter(policy=WaitPolicy(jitter=0))
+    pi = Mock()
+    check = make_check(False, False, False, True)
+    assert waiter.wait_for(pi, check) is pi
+    assert check.call_count == 4
+    check.assert_called_with(pi)
+    delays = [call[0][0] for call in mock_sleep.call_args_list]
+    assert delays == [1, 1.5, 2.25]
+    assert len(waiter) == 0
+
+
+def test_waiter_max_interval(mock_sleep):
+    waiter = Waiter(policy=WaitPolicy(interval=4, multiplier=2, max_interval=10, jitter=0))
+    check = make_check(False, False, False, False, True)
+    waiter.wait_for(Mock(), check)
+    delays = [call[0][0] for call in mock_sleep.call_args_list]
+    assert delays == [4, 8, 10, 10]
+
+
+def test_waiter_jitter(mock_sleep):
+    waiter = Waiter(policy=WaitPolicy(interval=10, max_interval=20, jitter=0.1))
+    check = make_check(False, True)
+    waiter.wait_for(Mock(), check)
+    assert 9 <= mock_sleep.call_args[0][0] <= 11
+
+
+def test_waiter_batches(mock_sleep):
+    waiter = Waiter()
+    pis = [Mock() for _ in range(20)]
+    checks = {id(pi): make_check(False, False, True) for pi in pis}
+    futures = [waiter.add(pi, lambda pi: checks[id(pi)](pi)) for pi in pis]
+    assert len(waiter) == 20
+    waiter.wait(futures)
+    assert [future.result() for future in futures] == pis
+    assert all(check.call_count == 3 for check in checks.values())
+    assert mock_sleep.call_count == 2
+
+
+def test_waiter_error(mock_sleep):
+    waiter = Waiter()
+    check = make_check(False, ValueError("failed"))
+    future = waiter.add(Mock(), check)
+    callback = Mock()
+    future.add_done_callback(callback)
+    waiter.wait([future])
+    with pytest.raises(ValueError):
+        future.result()
+    callback.assert_called_once_with(future)
+
+
+def test_waiter_timeout(mock_sleep):
+    waiter = Waiter(policy=WaitPolicy(jitter=0, timeout=3))
+    check = make_check(*[False] * 10)
+    with pytest.raises(HostedPiTimeoutError):
+        waiter.wait_for(Mock(), check)
+    assert check.call_count == 3
+    assert sum(call[0][0] for call in mock_sleep.call_args_list) == pytest.approx(3)
+
+
+def test_waiter_policy_override(mock_sleep):
+    waiter = Waiter()
+    policy = WaitPolicy(interval=5, max_interval=5, jitter=0, timeout=12)
+    check = make_check(*[False] * 10)
+    with pytest.raises(HostedPiTimeoutError):
+        waiter.wait_for(Mock(), check, policy=policy)
+    assert check.call_count == 3
+    assert waiter.policy == WaitPolicy()
+
+
+def test_waiter_mixed_policies(mock_sleep):
+    # the batching window follows the pending policies, not the waiter's default
+    waiter = Waiter(policy=WaitPolicy(interval=100, max_interval=100, jitter=0))
+    fast = WaitPolicy(interval=1, max_interval=1, jitter=0)
+    slow = WaitPolicy(interval=10, max_interval=10, jitter=0)
+    polled = []
+
+    def check(results):
+        def check(pi):
+            polled.append((pi, hostedpi_waiter.monotonic()))
+            return results.pop(0)
+
+        return check
+
+    fast_pi, slow_pi = Mock(), Mock()
+    futures = [
+        waiter.add(fast_pi, check([False] * 11 + [True]), policy=fast),
+        waiter.add(slow_pi, check([False, True]), policy=slow),
+    ]
+    waiter.wait(futures)
+    assert [future.result() for future in futures] == [fast_pi, slow_pi]
+    assert [when for pi, when in polled if pi is slow_pi] == [100, 110]
+    assert [when for pi, when in polled if pi is fast_pi] == list(range(100, 112))
+
+
+def test_waiter_cancelled(mock_sleep):
+    waiter = Waiter()
+    check = make_check(False, True)
+    future = waiter.add(Mock(), check)
+    future.cancel()
+    waiter.wait([future])
+    assert check.call_count == 0
+
+
+def test_waiter_unregistered_future():
+    waiter = Waiter()
+    future = Future()
+    waiter.wait([])
+    waiter.wait([future])
+    with pytest.raises(HostedPiUserError):
+        future.result(timeout=0)
+
+
+def test_waiter_unregistered_future_with_registrations(mock_sleep):
+    waiter = Waiter(policy=WaitPolicy(jitter=0))
+    check = make_check(False, True)
+    pi = Mock()
+    registered = waiter.add(pi, check)
+    orphan = Future()
+    waiter.wait([registered, orphan])
+    with pytest.raises(HostedPiUserError):
+        orphan.result(timeout=0)
+    assert registered.result(timeout=0) is pi
+    assert check.call_count == 2
+    assert len(waiter) == 0